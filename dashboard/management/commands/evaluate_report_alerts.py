@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from dashboard.services.alert_engine import evaluate_all
+
+
+class Command(BaseCommand):
+    help = 'Avalia todos os alertas ativos (ReportAlert) sobre os dados existentes e grava os disparos no histórico'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', type=int, help='Avaliar apenas este ano.')
+        parser.add_argument('--mes', type=int, help='Avaliar apenas este mês.')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        disparados = evaluate_all(ano=options['ano'], mes=options['mes'])
+        for registo in disparados:
+            self.stdout.write(f"  {registo.mes:02d}/{registo.ano}: {registo.mensagem}")
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(disparados)} alertas disparados ({time.monotonic() - inicio:.2f}s).'
+        ))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from dashboard.services.query_cache import query_cache
+
+
+class Command(BaseCommand):
+    help = 'Remove entradas expiradas da cache de consultas do assistente e aplica o limite de tamanho'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Remove todas as entradas da cache',
+        )
+        parser.add_argument(
+            '--max-entries',
+            type=int,
+            default=None,
+            help='Número máximo de entradas a manter (padrão: ARN_QUERY_CACHE_MAX_ENTRIES)',
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            removidas = query_cache.clear()
+            self.stdout.write(self.style.SUCCESS(f'Cache limpa: {removidas} entradas removidas.'))
+            return
+
+        query_cache.flush_hits()
+        expiradas = query_cache.purge_expired()
+        excedentes = query_cache.enforce_limit(options['max_entries'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Cache de consultas: {expiradas} entradas expiradas e {excedentes} excedentes removidas.'
+        ))
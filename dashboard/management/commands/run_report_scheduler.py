@@ -0,0 +1,51 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from dashboard.services.report_scheduler import run_due_schedules
+
+
+class Command(BaseCommand):
+    help = 'Executa os agendamentos de relatórios devidos (ReportSchedule): gera cada relatório uma vez e entrega-o'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'REPORT_SCHEDULER_WORKERS', 2),
+            help='Processos para gerar relatórios em paralelo (padrão: REPORT_SCHEDULER_WORKERS).',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'REPORT_SCHEDULER_POLL_INTERVAL', 60),
+            help='Segundos entre verificações dos agendamentos (padrão: REPORT_SCHEDULER_POLL_INTERVAL).',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Executa os agendamentos devidos e termina (ex.: a partir do cron).',
+        )
+
+    def handle(self, *args, **options):
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self.stdout.write('Agendador de relatórios iniciado.')
+        try:
+            while True:
+                resumo = run_due_schedules(workers=max(1, options['workers']))
+                if resumo['agendamentos']:
+                    self.stdout.write(
+                        f"{resumo['agendamentos']} agendamentos: {resumo['relatorios']} relatórios "
+                        f"({resumo['gerados']} gerados), {resumo['entregues']} entregues, {resumo['falhas']} falhas"
+                    )
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connections.close_all()
+        self.stdout.write(self.style.SUCCESS('Agendador de relatórios terminado.'))
@@ -0,0 +1,57 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from dashboard.services.report_artifacts import (
+    WORKER_HEARTBEAT_KEY, requeue_stale_reports, run_pending_reports, worker_heartbeat,
+)
+
+
+class Command(BaseCommand):
+    help = 'Gera os relatórios pendentes (PDF, Excel, CSV) e grava-os no arquivo de relatórios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'REPORT_WORKER_POLL_INTERVAL', 5),
+            help='Segundos de espera quando a fila está vazia (padrão: REPORT_WORKER_POLL_INTERVAL).',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Gera os relatórios pendentes e termina.',
+        )
+
+    def handle(self, *args, **options):
+        repostos = requeue_stale_reports(getattr(settings, 'REPORT_JOB_TIMEOUT_MINUTES', 30))
+        if repostos:
+            self.stdout.write(f"{repostos} relatórios interrompidos repostos na fila.")
+
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        self.stdout.write('Worker de relatórios iniciado.')
+        # Enquanto houver sinal de vida, os pedidos deixam a geração para este worker
+        # (com --once não há sinal: entre execuções os pedidos geram o relatório)
+        heartbeat = max(options['poll_interval'] * 3, 60)
+        total = 0
+        try:
+            while True:
+                if not options['once']:
+                    worker_heartbeat(heartbeat)
+                gerados = run_pending_reports()
+                total += gerados
+                if options['once']:
+                    break
+                if not gerados:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if not options['once']:
+                cache.delete(WORKER_HEARTBEAT_KEY)
+            connections.close_all()
+        self.stdout.write(self.style.SUCCESS(f'Worker de relatórios terminado ({total} relatórios gerados).'))
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0003_chatintent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='arnquerycache',
+            name='ultimo_acesso',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_arnquerycache_ultimo_acesso'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generatedreport',
+            name='chave',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='erro',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='generatedreport',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='generatedreport',
+            name='template',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='dashboard.reporttemplate'),
+        ),
+        migrations.AddIndex(
+            model_name='generatedreport',
+            index=models.Index(fields=['status', 'created_at'], name='generated_report_fila_idx'),
+        ),
+    ]
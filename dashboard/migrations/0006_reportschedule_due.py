@@ -0,0 +1,30 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:51
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('dashboard', '0005_generatedreport_artifacts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportschedule',
+            name='ultimo_envio',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='generatedreport',
+            name='usuario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='reportschedule',
+            index=models.Index(fields=['ativo', 'proximo_envio'], name='report_schedule_due_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_reportschedule_due'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportalert',
+            name='tipo',
+            field=models.CharField(choices=[('threshold', 'Limite Atingido'), ('variation', 'Variação Significativa'), ('target', 'Meta Atingida'), ('anomaly', 'Anomalia Detectada'), ('share', 'Quota de Mercado')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ReportAlertHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ano', models.IntegerField()),
+                ('mes', models.IntegerField()),
+                ('operadora', models.CharField(blank=True, max_length=50, null=True)),
+                ('valor', models.FloatField()),
+                ('referencia', models.FloatField(blank=True, null=True)),
+                ('mensagem', models.CharField(max_length=300)),
+                ('disparado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('alerta', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historico', to='dashboard.reportalert')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Alerta',
+                'verbose_name_plural': 'Histórico de Alertas',
+                'ordering': ['-disparado_em'],
+                'indexes': [models.Index(fields=['alerta', 'ano', 'mes'], name='alerta_historico_periodo_idx')],
+            },
+        ),
+    ]
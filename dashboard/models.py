@@ -46,19 +46,27 @@ class GeneratedReport(models.Model):
         ('error', 'Erro'),
     ]
     
-    template = models.ForeignKey(ReportTemplate, on_delete=models.CASCADE)
-    usuario = models.ForeignKey(User, on_delete=models.CASCADE)
+    template = models.ForeignKey(ReportTemplate, on_delete=models.CASCADE, null=True, blank=True)  # None: relatório personalizado
+    usuario = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)  # None: relatório agendado
     titulo = models.CharField(max_length=200)
     periodo_inicio = models.DateField()
     periodo_fim = models.DateField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     arquivo_path = models.CharField(max_length=500, blank=True)
     parametros = models.JSONField(default=dict)  # Parâmetros usados na geração
+    # Chave do artefacto: (tipo, formato, ano, versões dos dados); ver dashboard.services.report_artifacts
+    chave = models.CharField(max_length=64, blank=True, db_index=True)
+    erro = models.TextField(blank=True)
     created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Fila do worker: pendentes por ordem de criação
+            models.Index(fields=['status', 'created_at'], name='generated_report_fila_idx'),
+        ]
         verbose_name = 'Relatório Gerado'
         verbose_name_plural = 'Relatórios Gerados'
     
@@ -83,9 +91,14 @@ class ReportSchedule(models.Model):
     destinatarios = models.JSONField(default=list)  # Lista de emails
     ativo = models.BooleanField(default=True)
     proximo_envio = models.DateTimeField()
+    ultimo_envio = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(default=timezone.now)
     
     class Meta:
+        indexes = [
+            # Agendamentos a executar: ativos com proximo_envio <= agora (run_report_scheduler)
+            models.Index(fields=['ativo', 'proximo_envio'], name='report_schedule_due_idx'),
+        ]
         verbose_name = 'Agendamento de Relatório'
         verbose_name_plural = 'Agendamentos de Relatórios'
     
@@ -123,12 +136,13 @@ class ReportAlert(models.Model):
         ('variation', 'Variação Significativa'),
         ('target', 'Meta Atingida'),
         ('anomaly', 'Anomalia Detectada'),
+        ('share', 'Quota de Mercado'),
     ]
     
     nome = models.CharField(max_length=200)
     tipo = models.CharField(max_length=20, choices=ALERT_TYPES)
-    indicador = models.CharField(max_length=100)  # Nome do indicador a monitorar
-    condicao = models.JSONField(default=dict)  # Condições do alerta
+    indicador = models.CharField(max_length=100)  # '<indicador>.<campo>', ex.: 'receitasindicador.receitas_totais'
+    condicao = models.JSONField(default=dict)  # Condições do alerta (ver dashboard.services.alert_engine)
     destinatarios = models.JSONField(default=list)
     ativo = models.BooleanField(default=True)
     ultima_verificacao = models.DateTimeField(null=True, blank=True)
@@ -141,6 +155,28 @@ class ReportAlert(models.Model):
     def __str__(self):
         return f"{self.nome} ({self.get_tipo_display()})"
 
+class ReportAlertHistory(models.Model):
+    """Histórico dos alertas disparados, por período avaliado"""
+    alerta = models.ForeignKey(ReportAlert, on_delete=models.CASCADE, related_name='historico')
+    ano = models.IntegerField()
+    mes = models.IntegerField()
+    operadora = models.CharField(max_length=50, null=True, blank=True)  # None: total do mercado
+    valor = models.FloatField()  # Valor avaliado (valor, variação % ou quota %)
+    referencia = models.FloatField(null=True, blank=True)  # Valor anterior/média usados na comparação
+    mensagem = models.CharField(max_length=300)
+    disparado_em = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        ordering = ['-disparado_em']
+        indexes = [
+            models.Index(fields=['alerta', 'ano', 'mes'], name='alerta_historico_periodo_idx'),
+        ]
+        verbose_name = 'Histórico de Alerta'
+        verbose_name_plural = 'Histórico de Alertas'
+    
+    def __str__(self):
+        return f"{self.alerta.nome} - {self.mes:02d}/{self.ano}: {self.mensagem}"
+
 
 # ===== MODELOS DO CHATBOT ARN =====
 
@@ -194,6 +230,7 @@ class ARNQueryCache(models.Model):
     timestamp = models.DateTimeField(auto_now_add=True)
     validade = models.IntegerField(default=3600)  # Segundos
     hits = models.IntegerField(default=1)
+    ultimo_acesso = models.DateTimeField(null=True, blank=True, db_index=True)
     
     class Meta:
         ordering = ['-timestamp']
@@ -202,6 +239,22 @@ class ARNQueryCache(models.Model):
     
     def __str__(self):
         return f"Cache {self.query_hash[:8]}... ({self.hits} hits)"
+    
+    @property
+    def expirado(self):
+        return (timezone.now() - self.timestamp).total_seconds() >= self.validade
+    
+    @classmethod
+    def get_cached(cls, key):
+        """Retorna o resultado guardado para ``key`` (LRU local, depois tabela) ou None."""
+        from dashboard.services.query_cache import query_cache
+        return query_cache.get(key)
+    
+    @classmethod
+    def set_cache(cls, key, resultado, validade=3600):
+        """Guarda ``resultado`` para ``key`` durante ``validade`` segundos."""
+        from dashboard.services.query_cache import query_cache
+        query_cache.set(key, resultado, validade=validade)
 
 
 class ChatIntent(models.Model):
@@ -2,7 +2,6 @@
 Serviço de IA ARN - Assistente integrado aos dados
 Integração com HuggingFace e DeepSeek API
 """
-import re
 import json
 import time
 from datetime import datetime, timedelta
@@ -20,68 +19,15 @@ from questionarios.models import (
 
 from dashboard.models import ChatSession, ChatMessage, ARNQueryCache
 
+from .intent_engine import ENTITIES, INTENT_PATTERNS, intent_engine
+
 class ARNAssistantService:
     """Assistente ARN Analytics - IA integrada aos dados"""
     
-    # Mapeamento de intenções para palavras-chave
-    INTENT_PATTERNS = {
-        'consulta_assinantes': [
-            r'\b(assinantes?|clientes?|utilizadores?|estações?|quantos?)\b',
-            r'\b(número|total|quantidade)\s+(de\s+)?(assinantes?|clientes?)\b',
-            r'\b(assinantes?\s+(activos?|móveis?|fixos?))\b'
-        ],
-        'analise_trafego': [
-            r'\b(tráfego|trafego|chamadas?|minutos?|voz)\b',
-            r'\b(volume\s+de\s+)?(chamadas?|tráfego)\b',
-            r'\b(on-net|off-net|internacional)\b'
-        ],
-        'mobile_money': [
-            r'\b(mobile\s+money|transferência|carregamento|levantamento)\b',
-            r'\b(transações?\s+financeiras?)\b',
-            r'\b(dinheiro\s+móvel)\b'
-        ],
-        'market_share': [
-            r'\b(quota|market\s+share|percentagem|domínio|liderança)\b',
-            r'\b(participação\s+no\s+mercado)\b',
-            r'\b(maior\s+operadora|líder\s+do\s+mercado)\b'
-        ],
-        'receitas': [
-            r'\b(receitas?|faturamento|volume\s+de\s+negócios|FCFA)\b',
-            r'\b(lucros?|ganhos?|rendimentos?)\b'
-        ],
-        'investimentos': [
-            r'\b(investimentos?|CAPEX|infraestrutura|gastos)\b',
-            r'\b(aplicação\s+de\s+capital)\b'
-        ],
-        'comparacao_operadores': [
-            r'\b(comparar|versus|vs|diferença|melhor|maior)\b',
-            r'\b(TELECEL\s+(vs|versus|contra)\s+Orange)\b',
-            r'\b(qual\s+é\s+(melhor|maior))\b'
-        ],
-        'tendencias': [
-            r'\b(tendência|evolução|crescimento|queda|variação)\b',
-            r'\b(como\s+evoluiu|está\s+crescendo)\b'
-        ]
-    }
-    
-    # Entidades reconhecidas
-    ENTITIES = {
-        'operadores': {
-            'ORANGE': ['orange', 'orange bissau'],
-            'TELECEL': ['telecel', 'telecel', 'antiga telecel']  # TELECEL é a antiga MTN
-        },
-        'periodos': {
-            'pattern': r'\b(20\d{2}|último|este|próximo)\s*(ano|trimestre|mês)?\b',
-            'anos': [2019, 2020, 2021, 2022, 2023, 2024, 2025],
-            'trimestres': [1, 2, 3, 4]
-        },
-        'metricas': {
-            'assinantes': ['assinantes', 'clientes', 'utilizadores'],
-            'receitas': ['receitas', 'faturamento', 'fcfa'],
-            'trafego': ['tráfego', 'chamadas', 'minutos'],
-            'investimento': ['investimento', 'capex', 'gastos']
-        }
-    }
+    # Mapeamento de intenções para palavras-chave e entidades reconhecidas
+    # (compilados em dashboard.services.intent_engine)
+    INTENT_PATTERNS = INTENT_PATTERNS
+    ENTITIES = ENTITIES
     
     def __init__(self):
         self.current_year = timezone.now().year
@@ -144,56 +90,12 @@ class ARNAssistantService:
         }
     
     def detectar_intencao(self, mensagem):
-        """Detecta a intenção da mensagem usando patterns regex"""
-        mensagem_lower = mensagem.lower()
-        
-        scores = {}
-        
-        for intencao, patterns in self.INTENT_PATTERNS.items():
-            score = 0
-            for pattern in patterns:
-                matches = re.findall(pattern, mensagem_lower)
-                score += len(matches)
-            
-            if score > 0:
-                scores[intencao] = score
-        
-        if not scores:
-            return 'nao_entendido', 0.0
-        
-        # Retorna a intenção com maior score
-        melhor_intencao = max(scores, key=scores.get)
-        confianca = min(scores[melhor_intencao] / 3.0, 1.0)  # Normalizar confiança
-        
-        return melhor_intencao, confianca
+        """Detecta a intenção da mensagem (padrões incorporados e intenções ChatIntent)"""
+        return intent_engine.classify(mensagem)
     
     def extrair_entidades(self, mensagem):
         """Extrai entidades da mensagem"""
-        entidades = {}
-        mensagem_lower = mensagem.lower()
-        
-        # Detectar operadoras
-        for operadora, aliases in self.ENTITIES['operadores'].items():
-            for alias in aliases:
-                if alias in mensagem_lower:
-                    entidades['operadora'] = operadora
-                    break
-        
-        # Detectar anos
-        ano_match = re.search(r'\b(20\d{2})\b', mensagem)
-        if ano_match:
-            entidades['ano'] = int(ano_match.group(1))
-        elif 'último ano' in mensagem_lower or 'ano passado' in mensagem_lower:
-            entidades['ano'] = self.current_year - 1
-        elif 'este ano' in mensagem_lower:
-            entidades['ano'] = self.current_year
-        
-        # Detectar trimestres
-        trimestre_match = re.search(r'\b([1-4])º?\s*trimestre\b', mensagem_lower)
-        if trimestre_match:
-            entidades['trimestre'] = int(trimestre_match.group(1))
-        
-        return entidades
+        return intent_engine.extract_entities(mensagem, self.current_year)
     
     def buscar_dados_contextuais(self, intencao, entidades):
         """Busca dados baseado na intenção e entidades"""
@@ -505,6 +407,12 @@ class ARNAssistantService:
                 ]
             }
         
+        elif intencao == 'despedida':
+            return {
+                'texto': "Obrigado por usar o Assistente ARN Analytics! Foi um prazer ajudar com os dados de telecomunicações. Até breve!",
+                'sugestoes': []
+            }
+        
         elif intencao == 'consulta_assinantes':
             return self.resposta_assinantes(dados, entidades)
         
@@ -0,0 +1,361 @@
+"""
+Avaliação incremental dos alertas (ReportAlert).
+
+``ReportAlert.indicador`` identifica o valor monitorizado como
+``'<indicador>.<campo>'`` (ex.: ``'receitasindicador.receitas_totais'``) e
+``condicao`` depende do tipo do alerta:
+
+- threshold: ``{'operador': '>', 'valor': 1000}``
+- target:    ``{'valor': 1000}`` (operador por omissão ``'>='``)
+- variation: ``{'percentual': 10, 'direcao': 'subida'|'descida'|'ambas', 'periodo': 'mes'|'ano'}``
+  (variação face ao mês anterior ou ao mesmo mês do ano anterior)
+- share:     ``{'operadora': 'orange', 'operador': '<', 'valor': 40}`` (quota em %)
+- anomaly:   ``{'desvios': 3, 'meses': 12}`` (desvio face à média dos meses anteriores)
+
+Com ``'operadora'`` na condição é avaliada a série dessa operadora; sem ela,
+o total do mercado.
+
+Os alertas ativos são compilados uma vez (AlertIndex), agrupados por
+indicador; o índice é reconstruído quando um alerta é gravado ou eliminado.
+As alterações dos indicadores chegam pelos sinais (dashboard.signals) como
+{indicador: {(ano, mes)}}: só os alertas desse indicador são avaliados, e só
+para os períodos afetados, com uma consulta à tabela de factos por
+indicador. Os alertas disparados são gravados em ReportAlertHistory.
+"""
+import logging
+import math
+import operator
+import threading
+import uuid
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from questionarios.models import IndicadorFacto
+from questionarios.services.factos import fact_fields
+from questionarios.services.metadata import registry
+
+from ..models import ReportAlert, ReportAlertHistory
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    '>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le, '==': operator.eq, '!=': operator.ne,
+}
+INDEX_VERSION_KEY = 'alertas:indice:versao'
+# Mínimo de meses anteriores com valor para avaliar uma anomalia
+MIN_ANOMALY_HISTORY = 3
+
+
+class AlertConfigError(ValueError):
+    """Indicador, campo ou condição de um alerta inválidos."""
+
+
+def period_index(ano, mes):
+    """Período como inteiro sequencial (meses desde o ano 0), para somar/subtrair meses."""
+    return ano * 12 + mes - 1
+
+
+def period_of(indice):
+    ano, mes = divmod(indice, 12)
+    return ano, mes + 1
+
+
+class FactWindow:
+    """Valores de um indicador nos períodos carregados, por (campo, período) e operadora."""
+
+    def __init__(self, values):
+        # {(campo, indice): {operadora: valor}} e totais do mercado {(campo, indice): soma}
+        self.values = values
+        self.totals = {key: sum(por_operadora.values()) for key, por_operadora in values.items()}
+        self._stats = {}
+
+    def value(self, campo, indice, operadora=None):
+        """Valor da operadora no período (total do mercado se ``operadora`` for None)."""
+        if operadora is None:
+            return self.totals.get((campo, indice))
+        por_operadora = self.values.get((campo, indice))
+        return por_operadora.get(operadora) if por_operadora else None
+
+    def history_stats(self, campo, indice, operadora, meses):
+        """(média, desvio padrão, nº de valores) dos ``meses`` anteriores a ``indice``; partilhado entre alertas."""
+        key = (campo, indice, operadora, meses)
+        stats = self._stats.get(key)
+        if stats is None:
+            historico = [v for v in (self.value(campo, indice - lag, operadora) for lag in range(1, meses + 1))
+                         if v is not None]
+            if historico:
+                media = sum(historico) / len(historico)
+                desvio = math.sqrt(sum((v - media) ** 2 for v in historico) / len(historico))
+            else:
+                media = desvio = 0.0
+            stats = self._stats[key] = (media, desvio, len(historico))
+        return stats
+
+
+def load_window(indicador, campos, periodos):
+    """Lê da tabela de factos os valores de ``campos`` nos ``periodos`` (índices) indicados."""
+    por_ano = defaultdict(set)
+    for indice in periodos:
+        ano, mes = period_of(indice)
+        por_ano[ano].add(mes)
+    filtro = Q()
+    for ano, meses in por_ano.items():
+        filtro |= Q(ano=ano, mes__in=sorted(meses))
+
+    values = {}
+    rows = IndicadorFacto.objects.filter(
+        filtro, indicador=indicador, campo__in=sorted(campos), valor__isnull=False,
+    ).values_list('campo', 'operadora', 'ano', 'mes', 'valor')
+    for campo, operadora, ano, mes, valor in rows:
+        bucket = values.setdefault((campo, period_index(ano, mes)), {})
+        bucket[operadora] = bucket.get(operadora, 0.0) + float(valor)
+    return FactWindow(values)
+
+
+class CompiledAlert:
+    """
+    Alerta pronto a avaliar.
+
+    ``lags``: desfasamentos (em meses) dos períodos lidos para avaliar um período;
+    ``affects``: desfasamentos dos períodos cuja avaliação muda quando um período muda.
+    ``evaluate(window, indice)`` retorna (valor, referência, mensagem) se o alerta disparar.
+    """
+    __slots__ = ('pk', 'nome', 'indicador', 'campo', 'operadora', 'lags', 'affects', 'evaluate')
+
+    def __init__(self, pk, nome, indicador, campo, operadora, lags, affects, evaluate):
+        self.pk = pk
+        self.nome = nome
+        self.indicador = indicador
+        self.campo = campo
+        self.operadora = operadora
+        self.lags = lags
+        self.affects = affects
+        self.evaluate = evaluate
+
+
+def _number(condicao, chave, default=None):
+    valor = condicao.get(chave, default)
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        raise AlertConfigError(f"Condição '{chave}' inválida: {valor!r}")
+
+
+def _comparison(condicao, default):
+    nome = condicao.get('operador', default)
+    if nome not in OPERATORS:
+        raise AlertConfigError(f"Operador inválido: {nome!r}")
+    return nome, OPERATORS[nome]
+
+
+def compile_alert(alert):
+    """Compila um ReportAlert; lança AlertConfigError se a configuração for inválida."""
+    condicao = alert.condicao if isinstance(alert.condicao, dict) else {}
+    indicador, _, campo = (alert.indicador or '').strip().partition('.')
+    indicador = indicador.lower()
+    campo = campo or condicao.get('campo', '')
+    model = registry.model(indicador)
+    if model is None:
+        raise AlertConfigError(f"Indicador desconhecido: {alert.indicador!r}")
+    if campo not in fact_fields(model):
+        raise AlertConfigError(f"Campo desconhecido em {indicador}: {campo!r}")
+    operadora = (condicao.get('operadora') or '').lower() or None
+    rotulo = f"{campo} ({operadora or 'mercado'})"
+
+    if alert.tipo in ('threshold', 'target'):
+        nome_op, comparar = _comparison(condicao, '>=' if alert.tipo == 'target' else '>')
+        limite = _number(condicao, 'valor')
+
+        def evaluate(window, indice):
+            valor = window.value(campo, indice, operadora)
+            if valor is not None and comparar(valor, limite):
+                return valor, limite, f"{rotulo} = {valor:,.2f} {nome_op} {limite:,.2f}"
+        return CompiledAlert(alert.pk, alert.nome, indicador, campo, operadora, (0,), (0,), evaluate)
+
+    if alert.tipo == 'variation':
+        percentual = _number(condicao, 'percentual')
+        direcao = condicao.get('direcao', 'ambas')
+        if direcao not in ('subida', 'descida', 'ambas'):
+            raise AlertConfigError(f"Direção inválida: {direcao!r}")
+        lag = 12 if condicao.get('periodo') == 'ano' else 1
+
+        def evaluate(window, indice):
+            atual = window.value(campo, indice, operadora)
+            anterior = window.value(campo, indice - lag, operadora)
+            if atual is None or not anterior:
+                return None
+            variacao = (atual - anterior) / abs(anterior) * 100
+            if (
+                (direcao == 'subida' and variacao >= percentual)
+                or (direcao == 'descida' and variacao <= -percentual)
+                or (direcao == 'ambas' and abs(variacao) >= percentual)
+            ):
+                ano, mes = period_of(indice - lag)
+                return variacao, anterior, f"{rotulo}: variação de {variacao:+.1f}% face a {mes:02d}/{ano}"
+        return CompiledAlert(alert.pk, alert.nome, indicador, campo, operadora, (0, lag), (0, lag), evaluate)
+
+    if alert.tipo == 'share':
+        if operadora is None:
+            raise AlertConfigError("A quota de mercado requer 'operadora'")
+        nome_op, comparar = _comparison(condicao, '<')
+        limite = _number(condicao, 'valor')
+
+        def evaluate(window, indice):
+            total = window.value(campo, indice)
+            parte = window.value(campo, indice, operadora)
+            if not total or parte is None:
+                return None
+            quota = parte / total * 100
+            if comparar(quota, limite):
+                return quota, limite, f"Quota de {operadora} em {campo} = {quota:.1f}% {nome_op} {limite:g}%"
+        return CompiledAlert(alert.pk, alert.nome, indicador, campo, operadora, (0,), (0,), evaluate)
+
+    if alert.tipo == 'anomaly':
+        desvios = _number(condicao, 'desvios', 3)
+        meses = int(_number(condicao, 'meses', 12))
+        if meses < MIN_ANOMALY_HISTORY:
+            raise AlertConfigError(f"'meses' deve ser pelo menos {MIN_ANOMALY_HISTORY}")
+
+        def evaluate(window, indice):
+            atual = window.value(campo, indice, operadora)
+            if atual is None:
+                return None
+            media, desvio, n = window.history_stats(campo, indice, operadora, meses)
+            if n >= MIN_ANOMALY_HISTORY and desvio and abs(atual - media) / desvio >= desvios:
+                return atual, media, f"{rotulo} = {atual:,.2f} a {abs(atual - media) / desvio:.1f} desvios da média ({media:,.2f})"
+        return CompiledAlert(
+            alert.pk, alert.nome, indicador, campo, operadora, tuple(range(meses + 1)), (0,), evaluate,
+        )
+
+    raise AlertConfigError(f"Tipo de alerta desconhecido: {alert.tipo!r}")
+
+
+class AlertIndex:
+    """
+    Alertas ativos compilados, por indicador.
+
+    A versão do índice é guardada na cache do Django, para que todos os
+    processos reconstruam o seu índice quando um alerta muda.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._alerts = None
+        self._token = None
+
+    def invalidate(self):
+        cache.set(INDEX_VERSION_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._alerts = None
+
+    def _build(self):
+        por_indicador = defaultdict(list)
+        for alert in ReportAlert.objects.filter(ativo=True).only('pk', 'nome', 'tipo', 'indicador', 'condicao'):
+            try:
+                compiled = compile_alert(alert)
+            except AlertConfigError as e:
+                logger.warning(f"Alerta {alert.pk} ({alert.nome}) ignorado: {e}")
+                continue
+            por_indicador[compiled.indicador].append(compiled)
+        return dict(por_indicador)
+
+    def get(self):
+        """{indicador: [CompiledAlert]}"""
+        token = cache.get(INDEX_VERSION_KEY)
+        with self._lock:
+            if self._alerts is None or token != self._token:
+                self._alerts = self._build()
+                self._token = token
+            return self._alerts
+
+
+alert_index = AlertIndex()
+
+
+def evaluate_changes(alteracoes):
+    """
+    Avalia os alertas afetados por alterações nos indicadores.
+
+    Args:
+        alteracoes: {indicador: {(ano, mes), ...}} (indicador como em IndicadorFacto).
+
+    Returns:
+        list: ReportAlertHistory criados (alertas disparados com valores novos).
+    """
+    indice = alert_index.get()
+    avaliados = set()
+    disparos = []
+    for indicador, periodos in alteracoes.items():
+        alertas = indice.get(indicador)
+        if not alertas:
+            continue
+        alterados = {period_index(ano, mes) for ano, mes in periodos}
+        # Muitos alertas partilham os mesmos desfasamentos: calcular os períodos uma vez por combinação
+        afetados_por, janelas = {}, set()
+        tarefas, necessarios, campos = [], set(), set()
+        for alerta in alertas:
+            afetados = afetados_por.get(alerta.affects)
+            if afetados is None:
+                afetados = afetados_por[alerta.affects] = sorted({p + d for p in alterados for d in alerta.affects})
+            if (alerta.affects, alerta.lags) not in janelas:
+                janelas.add((alerta.affects, alerta.lags))
+                necessarios.update(p - lag for p in afetados for lag in alerta.lags)
+            campos.add(alerta.campo)
+            tarefas.append((alerta, afetados))
+
+        window = load_window(indicador, campos, necessarios)
+        for alerta, afetados in tarefas:
+            avaliados.add(alerta.pk)
+            for periodo in afetados:
+                resultado = alerta.evaluate(window, periodo)
+                if resultado is not None:
+                    disparos.append((alerta, periodo, resultado))
+
+    agora = timezone.now()
+    if avaliados:
+        ReportAlert.objects.filter(pk__in=avaliados).update(ultima_verificacao=agora)
+    return _record(disparos, agora)
+
+
+def _record(disparos, agora):
+    """Grava os disparos no histórico, exceto os que repetem o último valor do mesmo alerta/período."""
+    if not disparos:
+        return []
+    ultimos = {}
+    anteriores = ReportAlertHistory.objects.filter(
+        alerta_id__in={alerta.pk for alerta, _, _ in disparos},
+        ano__in={period_of(periodo)[0] for _, periodo, _ in disparos},
+    ).order_by('disparado_em', 'pk').values_list('alerta_id', 'ano', 'mes', 'valor')
+    for alerta_id, ano, mes, valor in anteriores:
+        ultimos[(alerta_id, ano, mes)] = valor
+
+    novos = []
+    for alerta, periodo, (valor, referencia, mensagem) in disparos:
+        ano, mes = period_of(periodo)
+        anterior = ultimos.get((alerta.pk, ano, mes))
+        if anterior is not None and math.isclose(anterior, valor, rel_tol=1e-9):
+            continue
+        novos.append(ReportAlertHistory(
+            alerta_id=alerta.pk, ano=ano, mes=mes, operadora=alerta.operadora, valor=valor,
+            referencia=referencia, mensagem=f"{alerta.nome}: {mensagem}"[:300], disparado_em=agora,
+        ))
+    ReportAlertHistory.objects.bulk_create(novos)
+    if novos:
+        logger.info(f"{len(novos)} alertas disparados")
+    return novos
+
+
+def evaluate_all(ano=None, mes=None):
+    """Avalia todos os alertas ativos nos períodos com dados (opcionalmente filtrados)."""
+    queryset = IndicadorFacto.objects.filter(indicador__in=list(alert_index.get()))
+    if ano is not None:
+        queryset = queryset.filter(ano=ano)
+    if mes is not None:
+        queryset = queryset.filter(mes=mes)
+    alteracoes = defaultdict(set)
+    for indicador, a, m in queryset.values_list('indicador', 'ano', 'mes').distinct():
+        alteracoes[indicador].add((a, m))
+    return evaluate_changes(alteracoes)
@@ -2,11 +2,12 @@
 Serviço de Exportação de Relatórios ARN
 Suporta exportação em PDF, Excel e CSV
 """
+import tempfile
 from io import BytesIO
 from datetime import datetime
 from decimal import Decimal
 
-from django.http import HttpResponse
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
 from django.template.loader import get_template
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
@@ -18,7 +19,8 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
 try:
     from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
     from openpyxl.utils import get_column_letter
     HAS_OPENPYXL = True
 except ImportError:
@@ -26,6 +28,89 @@ except ImportError:
 
 import csv
 
+EXCEL_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+MAX_COLUMN_WIDTH = 50
+
+
+class _Echo:
+    """Pseudo-ficheiro para ``csv.writer``: devolve cada linha em vez de a guardar."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Gera as linhas CSV de ``rows`` uma a uma (sem construir o ficheiro em memória)."""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def streaming_csv_response(rows, filename):
+    """StreamingHttpResponse que envia ``rows`` (iterável de listas) à medida que são geradas."""
+    response = StreamingHttpResponse(iter_csv(rows), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def column_widths(rows):
+    """Largura de cada coluna (1-based) calculada numa passagem pelos valores das linhas."""
+    widths = {}
+    for row in rows:
+        for index, value in enumerate(row, start=1):
+            if value is not None:
+                widths[index] = max(widths.get(index, 0), len(str(value)))
+    return {index: min(width + 2, MAX_COLUMN_WIDTH) for index, width in widths.items()}
+
+
+def write_only_workbook(sheets):
+    """
+    Grava um livro Excel em modo write-only num ficheiro temporário.
+
+    Args:
+        sheets: Iterável de (nome da folha, título, rows), em que ``rows()``
+            devolve um gerador de (valores, negrito). ``rows`` é chamado duas
+            vezes: para calcular as larguras das colunas e para escrever as linhas.
+
+    Returns:
+        Ficheiro temporário (posicionado no início), removido ao ser fechado.
+    """
+    if not HAS_OPENPYXL:
+        raise ImportError("openpyxl não está instalado. Execute: pip install openpyxl")
+
+    wb = Workbook(write_only=True)
+    bold = Font(bold=True)
+    title_font = Font(size=16, bold=True, color='F0B90B')
+    for sheet_name, title, rows in sheets:
+        ws = wb.create_sheet(sheet_name[:31])
+        # No modo write-only as larguras têm de ser definidas antes da primeira linha
+        for index, width in column_widths(values for values, _ in rows()).items():
+            ws.column_dimensions[get_column_letter(index)].width = width
+        title_cell = WriteOnlyCell(ws, value=title)
+        title_cell.font = title_font
+        ws.append([title_cell])
+        ws.append([])
+        for values, is_bold in rows():
+            if is_bold:
+                cells = []
+                for value in values:
+                    cell = WriteOnlyCell(ws, value=value)
+                    cell.font = bold
+                    cells.append(cell)
+                ws.append(cells)
+            else:
+                ws.append(list(values))
+
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    wb.save(output)
+    output.seek(0)
+    return output
+
+
+def excel_file_response(output, filename):
+    """FileResponse que envia (por blocos) e fecha o ficheiro de ``write_only_workbook``."""
+    return FileResponse(output, as_attachment=True, filename=filename, content_type=EXCEL_CONTENT_TYPE)
+
 
 class ARNExportService:
     """Serviço centralizado para exportação de relatórios"""
@@ -112,53 +197,39 @@ class ARNExportService:
     
     def export_to_excel(self):
         """Exporta relatório para Excel"""
-        if not HAS_OPENPYXL:
-            raise ImportError("openpyxl não está instalado. Execute: pip install openpyxl")
-        
-        wb = Workbook()
-        
-        # Remover sheet padrão
-        if 'Sheet' in wb.sheetnames:
-            wb.remove(wb['Sheet'])
-        
-        # Criar sheets por seção
+        with self.export_to_excel_file() as output:
+            return output.read()
+    
+    def export_to_excel_file(self):
+        """Exporta relatório para Excel (modo write-only) num ficheiro temporário"""
         if self.report_type == 'market':
-            self._build_market_report_excel(wb)
+            sheets = self._market_report_excel_sheets()
         elif self.report_type == 'executive':
-            self._build_executive_report_excel(wb)
+            sheets = self._executive_report_excel_sheets()
         elif self.report_type == 'comparative':
-            self._build_comparative_report_excel(wb)
-        
-        # Salvar em buffer
-        buffer = BytesIO()
-        wb.save(buffer)
-        excel = buffer.getvalue()
-        buffer.close()
-        
-        return excel
+            sheets = self._comparative_report_excel_sheets()
+        else:
+            sheets = []
+        return write_only_workbook(sheets)
     
     def export_to_csv(self):
         """Exporta relatório para CSV"""
-        buffer = BytesIO()
-        writer = csv.writer(buffer)
-        
+        return ''.join(iter_csv(self.csv_rows()))
+    
+    def csv_rows(self):
+        """Linhas do relatório CSV, geradas uma a uma (para StreamingHttpResponse)"""
         # Header
-        writer.writerow([f'Relatório ARN - {self.year}'])
-        writer.writerow([f'Gerado em: {self.timestamp.strftime("%d/%m/%Y %H:%M")}'])
-        writer.writerow([])
+        yield [f'Relatório ARN - {self.year}']
+        yield [f'Gerado em: {self.timestamp.strftime("%d/%m/%Y %H:%M")}']
+        yield []
         
         # Conteúdo específico
         if self.report_type == 'market':
-            self._build_market_report_csv(writer)
+            yield from self._market_report_csv_rows()
         elif self.report_type == 'executive':
-            self._build_executive_report_csv(writer)
+            yield from self._executive_report_csv_rows()
         elif self.report_type == 'comparative':
-            self._build_comparative_report_csv(writer)
-        
-        csv_data = buffer.getvalue()
-        buffer.close()
-        
-        return csv_data
+            yield from self._comparative_report_csv_rows()
     
     # ===== MÉTODOS AUXILIARES =====
     
@@ -341,183 +412,100 @@ class ARNExportService:
     
     # ===== CONSTRUÇÃO DE RELATÓRIOS EXCEL =====
     
-    def _build_market_report_excel(self, wb):
-        """Constrói relatório de mercado em Excel"""
-        # Sheet 1: Panorama Geral
-        ws1 = wb.create_sheet("Panorama Geral")
-        self._style_excel_header(ws1, f"Relatório de Mercado - {self.year}")
-        
-        panorama = self.report_data.get('panorama_geral', {})
-        
-        row = 3
-        ws1[f'A{row}'] = "Total de Assinantes"
-        ws1[f'B{row}'] = panorama.get('total_assinantes', 0)
-        
-        row += 1
-        ws1[f'A{row}'] = "Crescimento Anual"
-        ws1[f'B{row}'] = f"{panorama.get('crescimento_percentual', 0):.2f}%"
-        
-        row += 1
-        ws1[f'A{row}'] = "Taxa de Penetração"
-        ws1[f'B{row}'] = f"{panorama.get('taxa_penetracao', 0):.2f}%"
-        
-        # Market Share
-        row += 2
-        ws1[f'A{row}'] = "Market Share"
-        ws1[f'A{row}'].font = Font(bold=True)
-        
-        for operadora, share in panorama.get('market_share', {}).items():
-            row += 1
-            ws1[f'A{row}'] = operadora
-            ws1[f'B{row}'] = f'{share:.2f}%'
-        
-        self._auto_size_columns(ws1)
-        
-        # Sheet 2: Receitas
-        ws2 = wb.create_sheet("Receitas")
-        self._style_excel_header(ws2, "Receitas por Operadora")
-        
-        receitas = self.report_data.get('receitas', {})
-        
-        ws2['A3'] = "Operadora"
-        ws2['B3'] = "Receita Total (FCFA)"
-        ws2['C3'] = "Market Share"
-        self._style_excel_row(ws2, 3, bold=True)
+    def _market_report_excel_sheets(self):
+        """Folhas do relatório de mercado em Excel"""
+        def panorama_rows():
+            panorama = self.report_data.get('panorama_geral', {})
+            yield ["Total de Assinantes", panorama.get('total_assinantes', 0)], False
+            yield ["Crescimento Anual", f"{panorama.get('crescimento_percentual', 0):.2f}%"], False
+            yield ["Taxa de Penetração", f"{panorama.get('taxa_penetracao', 0):.2f}%"], False
+            yield [], False
+            yield ["Market Share"], True
+            for operadora, share in panorama.get('market_share', {}).items():
+                yield [operadora, f'{share:.2f}%'], False
         
-        row = 4
-        for operadora, valor in receitas.get('por_operadora', {}).items():
-            share = receitas.get('quota_receitas', {}).get(operadora, 0)
-            ws2[f'A{row}'] = operadora
-            ws2[f'B{row}'] = valor
-            ws2[f'C{row}'] = f'{share:.1f}%'
-            row += 1
+        def receitas_rows():
+            receitas = self.report_data.get('receitas', {})
+            yield ["Operadora", "Receita Total (FCFA)", "Market Share"], True
+            for operadora, valor in receitas.get('por_operadora', {}).items():
+                share = receitas.get('quota_receitas', {}).get(operadora, 0)
+                yield [operadora, valor, f'{share:.1f}%'], False
         
-        self._auto_size_columns(ws2)
+        return [
+            ("Panorama Geral", f"Relatório de Mercado - {self.year}", panorama_rows),
+            ("Receitas", "Receitas por Operadora", receitas_rows),
+        ]
     
-    def _build_executive_report_excel(self, wb):
-        """Constrói dashboard executivo em Excel"""
-        ws = wb.create_sheet("Dashboard Executivo")
-        self._style_excel_header(ws, f"Dashboard Executivo - {self.year}")
-        
-        kpis = self.report_data.get('kpis_principais', {})
-        
-        ws['A3'] = "Indicador"
-        ws['B3'] = "Valor"
-        ws['C3'] = "Variação"
-        self._style_excel_row(ws, 3, bold=True)
-        
-        row = 4
-        for key, kpi in kpis.items():
-            nome = key.replace('_', ' ').title()
-            ws[f'A{row}'] = nome
-            ws[f'B{row}'] = str(kpi.get('valor', '--'))
-            ws[f'C{row}'] = str(kpi.get('variacao', '--'))
-            row += 1
-        
-        self._auto_size_columns(ws)
+    def _executive_report_excel_sheets(self):
+        """Folhas do dashboard executivo em Excel"""
+        def rows():
+            yield ["Indicador", "Valor", "Variação"], True
+            for key, kpi in self.report_data.get('kpis_principais', {}).items():
+                nome = key.replace('_', ' ').title()
+                yield [nome, str(kpi.get('valor', '--')), str(kpi.get('variacao', '--'))], False
+        
+        return [("Dashboard Executivo", f"Dashboard Executivo - {self.year}", rows)]
     
-    def _build_comparative_report_excel(self, wb):
-        """Constrói relatório comparativo em Excel"""
-        ws = wb.create_sheet("Comparativo")
-        self._style_excel_header(ws, f"Análise Comparativa - {self.year}")
-        
-        ws['A3'] = "Operadora"
-        ws['B3'] = "Assinantes"
-        ws['C3'] = "Market Share"
-        ws['D3'] = "Tráfego Voz"
-        self._style_excel_row(ws, 3, bold=True)
-        
-        if isinstance(self.report_data, list):
-            row = 4
-            for item in self.report_data:
-                ws[f'A{row}'] = item.get('operadora', '--')
-                ws[f'B{row}'] = item.get('assinantes', 0)
-                ws[f'C{row}'] = item.get('market_share', '--')
-                ws[f'D{row}'] = item.get('trafego_voz', 0)
-                row += 1
-        
-        self._auto_size_columns(ws)
+    def _comparative_report_excel_sheets(self):
+        """Folhas do relatório comparativo em Excel"""
+        def rows():
+            yield ["Operadora", "Assinantes", "Market Share", "Tráfego Voz"], True
+            if isinstance(self.report_data, list):
+                for item in self.report_data:
+                    yield [
+                        item.get('operadora', '--'),
+                        item.get('assinantes', 0),
+                        item.get('market_share', '--'),
+                        item.get('trafego_voz', 0),
+                    ], False
+        
+        return [("Comparativo", f"Análise Comparativa - {self.year}", rows)]
     
     # ===== CONSTRUÇÃO DE RELATÓRIOS CSV =====
     
-    def _build_market_report_csv(self, writer):
-        """Constrói relatório de mercado em CSV"""
+    def _market_report_csv_rows(self):
+        """Linhas do relatório de mercado em CSV"""
         panorama = self.report_data.get('panorama_geral', {})
         
-        writer.writerow(['Panorama Geral'])
-        writer.writerow(['Total de Assinantes', panorama.get('total_assinantes', 0)])
-        writer.writerow(['Crescimento Anual', f"{panorama.get('crescimento_percentual', 0):.2f}%"])
-        writer.writerow(['Taxa de Penetração', f"{panorama.get('taxa_penetracao', 0):.2f}%"])
-        writer.writerow([])
+        yield ['Panorama Geral']
+        yield ['Total de Assinantes', panorama.get('total_assinantes', 0)]
+        yield ['Crescimento Anual', f"{panorama.get('crescimento_percentual', 0):.2f}%"]
+        yield ['Taxa de Penetração', f"{panorama.get('taxa_penetracao', 0):.2f}%"]
+        yield []
         
-        writer.writerow(['Market Share'])
+        yield ['Market Share']
         for operadora, share in panorama.get('market_share', {}).items():
-            writer.writerow([operadora, f'{share:.2f}%'])
-        writer.writerow([])
+            yield [operadora, f'{share:.2f}%']
+        yield []
         
         receitas = self.report_data.get('receitas', {})
-        writer.writerow(['Receitas por Operadora'])
-        writer.writerow(['Operadora', 'Receita Total', 'Market Share'])
+        yield ['Receitas por Operadora']
+        yield ['Operadora', 'Receita Total', 'Market Share']
         for operadora, valor in receitas.get('por_operadora', {}).items():
             share = receitas.get('quota_receitas', {}).get(operadora, 0)
-            writer.writerow([operadora, valor, f'{share:.1f}%'])
+            yield [operadora, valor, f'{share:.1f}%']
     
-    def _build_executive_report_csv(self, writer):
-        """Constrói dashboard executivo em CSV"""
+    def _executive_report_csv_rows(self):
+        """Linhas do dashboard executivo em CSV"""
         kpis = self.report_data.get('kpis_principais', {})
         
-        writer.writerow(['KPIs Principais'])
-        writer.writerow(['Indicador', 'Valor', 'Variação'])
+        yield ['KPIs Principais']
+        yield ['Indicador', 'Valor', 'Variação']
         
         for key, kpi in kpis.items():
             nome = key.replace('_', ' ').title()
-            writer.writerow([nome, kpi.get('valor', '--'), kpi.get('variacao', '--')])
+            yield [nome, kpi.get('valor', '--'), kpi.get('variacao', '--')]
     
-    def _build_comparative_report_csv(self, writer):
-        """Constrói relatório comparativo em CSV"""
-        writer.writerow(['Comparação entre Operadoras'])
-        writer.writerow(['Operadora', 'Assinantes', 'Market Share', 'Tráfego Voz'])
+    def _comparative_report_csv_rows(self):
+        """Linhas do relatório comparativo em CSV"""
+        yield ['Comparação entre Operadoras']
+        yield ['Operadora', 'Assinantes', 'Market Share', 'Tráfego Voz']
         
         if isinstance(self.report_data, list):
             for item in self.report_data:
-                writer.writerow([
+                yield [
                     item.get('operadora', '--'),
                     item.get('assinantes', 0),
                     item.get('market_share', '--'),
                     item.get('trafego_voz', 0)
-                ])
-    
-    # ===== ESTILOS EXCEL =====
-    
-    def _style_excel_header(self, ws, title):
-        """Aplica estilo ao cabeçalho do Excel"""
-        ws['A1'] = title
-        ws['A1'].font = Font(size=16, bold=True, color='F0B90B')
-        ws['A1'].alignment = Alignment(horizontal='center')
-        ws.merge_cells('A1:D1')
-    
-    def _style_excel_row(self, ws, row, bold=False, bg_color=None):
-        """Aplica estilo a uma linha do Excel"""
-        for col in ['A', 'B', 'C', 'D']:
-            cell = ws[f'{col}{row}']
-            if bold:
-                cell.font = Font(bold=True)
-            if bg_color:
-                cell.fill = PatternFill(start_color=bg_color, end_color=bg_color, fill_type='solid')
-    
-    def _auto_size_columns(self, ws):
-        """Ajusta largura das colunas automaticamente"""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(cell.value)
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
+                ]
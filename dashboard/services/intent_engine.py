@@ -0,0 +1,372 @@
+"""
+Classificação de intenções e extração de entidades do Assistente ARN.
+
+As intenções vêm de duas fontes: os padrões incorporados (INTENT_PATTERNS)
+e as palavras-chave das intenções ativas da tabela ChatIntent (preenchida
+pelo comando ``populate_chat_intents``). Ambas são compiladas num único
+autómato de palavras (IntentMatcher): cada padrão é expandido nas
+sequências de palavras que reconhece e todas as sequências são guardadas
+numa trie indexada por palavra. A mensagem é dividida em palavras uma vez
+e percorrida uma única vez; em cada palavra seguem-se as sequências que aí
+começam.
+
+Das ChatIntent só se usam os tipos com resposta no assistente: os dos
+padrões incorporados e RESPONSE_INTENTS (as restantes, como 'emprego' ou
+'banda_larga', caíam na resposta genérica em vez da ajuda de 'nao_entendido').
+
+A pontuação de uma intenção é o número de ocorrências (sem sobreposição)
+de cada um dos seus padrões, como o ``re.findall`` por padrão que o
+assistente usava, e a confiança é ``min(pontuação / 3, 1)``. Entre as
+intenções encontradas preferem-se as que atingem a ``confianca_minima``
+da respetiva ChatIntent.
+
+O autómato é reconstruído quando uma ChatIntent é gravada ou eliminada
+(ver dashboard.signals); a versão fica na cache do Django, consultada no
+máximo a cada VERSION_CHECK_INTERVAL segundos, para que os outros
+processos também o reconstruam.
+"""
+import logging
+import re
+import threading
+import time
+import uuid
+
+from django.core.cache import cache
+
+from ..models import ChatIntent
+
+logger = logging.getLogger(__name__)
+
+INTENT_VERSION_KEY = 'chat:intencoes:versao'
+# Segundos entre consultas à versão na cache (as alterações no próprio processo são imediatas)
+VERSION_CHECK_INTERVAL = 5
+NAO_ENTENDIDO = 'nao_entendido'
+# Tipos de ChatIntent, além dos de INTENT_PATTERNS, com resposta em ARNAssistantService.gerar_resposta
+RESPONSE_INTENTS = frozenset({'saudacao', 'despedida'})
+
+# Mapeamento de intenções para palavras-chave (subconjunto de regex: texto,
+# grupos com alternativas, '?', \b e \s+ — ver expand_pattern)
+INTENT_PATTERNS = {
+    'consulta_assinantes': [
+        r'\b(assinantes?|clientes?|utilizadores?|estações?|quantos?)\b',
+        r'\b(número|total|quantidade)\s+(de\s+)?(assinantes?|clientes?)\b',
+        r'\b(assinantes?\s+(activos?|móveis?|fixos?))\b'
+    ],
+    'analise_trafego': [
+        r'\b(tráfego|trafego|chamadas?|minutos?|voz)\b',
+        r'\b(volume\s+de\s+)?(chamadas?|tráfego)\b',
+        r'\b(on-net|off-net|internacional)\b'
+    ],
+    'mobile_money': [
+        r'\b(mobile\s+money|transferência|carregamento|levantamento)\b',
+        r'\b(transações?\s+financeiras?)\b',
+        r'\b(dinheiro\s+móvel)\b'
+    ],
+    'market_share': [
+        r'\b(quota|market\s+share|percentagem|domínio|liderança)\b',
+        r'\b(participação\s+no\s+mercado)\b',
+        r'\b(maior\s+operadora|líder\s+do\s+mercado)\b'
+    ],
+    'receitas': [
+        r'\b(receitas?|faturamento|volume\s+de\s+negócios|FCFA)\b',
+        r'\b(lucros?|ganhos?|rendimentos?)\b'
+    ],
+    'investimentos': [
+        r'\b(investimentos?|CAPEX|infraestrutura|gastos)\b',
+        r'\b(aplicação\s+de\s+capital)\b'
+    ],
+    'comparacao_operadores': [
+        r'\b(comparar|versus|vs|diferença|melhor|maior)\b',
+        r'\b(TELECEL\s+(vs|versus|contra)\s+Orange)\b',
+        r'\b(qual\s+é\s+(melhor|maior))\b'
+    ],
+    'tendencias': [
+        r'\b(tendência|evolução|crescimento|queda|variação)\b',
+        r'\b(como\s+evoluiu|está\s+crescendo)\b'
+    ]
+}
+
+# Entidades reconhecidas
+ENTITIES = {
+    'operadores': {
+        'ORANGE': ['orange', 'orange bissau'],
+        'TELECEL': ['telecel', 'telecel', 'antiga telecel']  # TELECEL é a antiga MTN
+    },
+    'periodos': {
+        'pattern': r'\b(20\d{2}|último|este|próximo)\s*(ano|trimestre|mês)?\b',
+        'anos': [2019, 2020, 2021, 2022, 2023, 2024, 2025],
+        'trimestres': [1, 2, 3, 4]
+    },
+    'metricas': {
+        'assinantes': ['assinantes', 'clientes', 'utilizadores'],
+        'receitas': ['receitas', 'faturamento', 'fcfa'],
+        'trafego': ['tráfego', 'chamadas', 'minutos'],
+        'investimento': ['investimento', 'capex', 'gastos']
+    }
+}
+
+WORD_RE = re.compile(r'\w+')
+# Chave dos padrões que terminam num nó da trie (nunca é uma palavra)
+_FIM = ''
+
+
+class IntentPatternError(ValueError):
+    """Padrão de intenção com sintaxe fora do subconjunto suportado."""
+
+
+def words(text):
+    return tuple(WORD_RE.findall(text.lower()))
+
+
+def expand_pattern(pattern):
+    """
+    Sequências de palavras reconhecidas por um padrão.
+
+    Suporta texto, grupos ``(...)``/``(?:...)`` com alternativas, ``?`` e
+    os separadores ``\\b``, ``\\s`` e ``\\s+``; outra sintaxe (classes,
+    repetições ilimitadas, ``.``) lança IntentPatternError.
+
+    Returns:
+        set: tuplos de palavras em minúsculas.
+    """
+    pos = 0
+
+    def alternation():
+        nonlocal pos
+        resultado = sequence()
+        while pos < len(pattern) and pattern[pos] == '|':
+            pos += 1
+            resultado |= sequence()
+        return resultado
+
+    def sequence():
+        nonlocal pos
+        resultado = {''}
+        while pos < len(pattern) and pattern[pos] not in '|)':
+            parte = atom()
+            if pos < len(pattern) and pattern[pos] == '?':
+                pos += 1
+                parte = parte | {''}
+            resultado = {inicio + fim for inicio in resultado for fim in parte}
+        return resultado
+
+    def atom():
+        nonlocal pos
+        c = pattern[pos]
+        if c == '(':
+            pos += 3 if pattern.startswith('(?:', pos) else 1
+            resultado = alternation()
+            if pos >= len(pattern) or pattern[pos] != ')':
+                raise IntentPatternError(f"Grupo não fechado em {pattern!r}")
+            pos += 1
+            return resultado
+        if c == '\\':
+            escape = pattern[pos + 1:pos + 2]
+            if escape in ('b', 's'):
+                pos += 3 if pattern.startswith('+', pos + 2) else 2
+                return {' '}
+            if not escape or escape.isalnum():
+                raise IntentPatternError(f"Sequência \\{escape} não suportada em {pattern!r}")
+            pos += 2
+            return {escape}
+        if c in '[]{}*+.^$':
+            raise IntentPatternError(f"Sintaxe '{c}' não suportada em {pattern!r}")
+        pos += 1
+        return {c}
+
+    resultado = alternation()
+    if pos != len(pattern):
+        raise IntentPatternError(f"Parêntese sem par em {pattern!r}")
+    return {words(texto) for texto in resultado} - {()}
+
+
+class IntentMatcher:
+    """Autómato compilado: trie de palavras -> padrões que terminam nesse nó."""
+
+    def __init__(self, intents, pattern_intents, trie, thresholds):
+        self.intents = intents
+        self.pattern_intents = pattern_intents
+        self.trie = trie
+        self.thresholds = thresholds
+
+    def scores(self, mensagem):
+        """{intenção: nº de ocorrências dos seus padrões}, numa passagem pelas palavras da mensagem."""
+        palavras = WORD_RE.findall(mensagem.lower())
+        total = len(palavras)
+        trie = self.trie
+        livre = {}  # padrão -> primeira palavra onde pode voltar a contar (sem sobreposição)
+        contagem = {}
+        for i, palavra in enumerate(palavras):
+            no = trie.get(palavra)
+            if no is None:
+                continue
+            fins = {}
+            j = i + 1
+            while True:
+                for padrao in no.get(_FIM, ()):
+                    fins[padrao] = j  # a ocorrência mais longa em i
+                if j == total:
+                    break
+                no = no.get(palavras[j])
+                if no is None:
+                    break
+                j += 1
+            for padrao, fim in fins.items():
+                if i >= livre.get(padrao, 0):
+                    livre[padrao] = fim
+                    intencao = self.pattern_intents[padrao]
+                    contagem[intencao] = contagem.get(intencao, 0) + 1
+        return {intencao: contagem[intencao] for intencao in self.intents if intencao in contagem}
+
+    def classify(self, mensagem):
+        """(intenção, confiança); ('nao_entendido', 0.0) se nenhum padrão ocorrer."""
+        scores = self.scores(mensagem)
+        if not scores:
+            return NAO_ENTENDIDO, 0.0
+        confiaveis = {
+            intencao: score for intencao, score in scores.items()
+            if min(score / 3.0, 1.0) >= self.thresholds.get(intencao, 0.0)
+        }
+        candidatos = confiaveis or scores
+        melhor = max(candidatos, key=candidatos.get)
+        return melhor, min(scores[melhor] / 3.0, 1.0)
+
+
+def build_matcher(patterns, chat_intents=()):
+    """
+    Compila os padrões incorporados e as intenções da base de dados.
+
+    Args:
+        patterns: {intenção: [padrões]} (INTENT_PATTERNS).
+        chat_intents: iterável de (tipo, palavras_chave, confianca_minima).
+            As palavras-chave de cada intenção formam um padrão; as que os
+            padrões incorporados já reconhecem para a mesma intenção são
+            ignoradas, para não serem contadas duas vezes.
+    """
+    intents = []
+    pattern_intents = []
+    frases = []  # (frase, padrão)
+    conhecidas = set()  # (intenção, frase)
+
+    def add_pattern(intencao, sequencias):
+        if not sequencias:
+            return
+        if intencao not in intents:
+            intents.append(intencao)
+        padrao = len(pattern_intents)
+        pattern_intents.append(intencao)
+        for frase in sequencias:
+            conhecidas.add((intencao, frase))
+            frases.append((frase, padrao))
+
+    for intencao, lista in patterns.items():
+        for pattern in lista:
+            add_pattern(intencao, expand_pattern(pattern))
+
+    thresholds = {}
+    for tipo, palavras_chave, confianca_minima in chat_intents:
+        if tipo == NAO_ENTENDIDO:
+            continue
+        thresholds[tipo] = min(thresholds.get(tipo, confianca_minima), confianca_minima)
+        if not isinstance(palavras_chave, list):
+            logger.warning(f"Intenção {tipo}: palavras_chave deve ser uma lista")
+            continue
+        sequencias = {words(kw) for kw in palavras_chave if isinstance(kw, str)}
+        add_pattern(tipo, {frase for frase in sequencias if frase and (tipo, frase) not in conhecidas})
+
+    trie = {}
+    for frase, padrao in frases:
+        no = trie
+        for palavra in frase:
+            no = no.setdefault(palavra, {})
+        no.setdefault(_FIM, []).append(padrao)
+    return IntentMatcher(tuple(intents), pattern_intents, trie, thresholds)
+
+
+def _entity_regex(operadores):
+    """Expressão única para operadoras, anos e trimestres; e {alias: operadora}."""
+    aliases = {}
+    for operadora, lista in operadores.items():
+        for alias in lista:
+            aliases.setdefault(' '.join(words(alias)), operadora)
+    alternativas = '|'.join(
+        r'\s+'.join(re.escape(palavra) for palavra in alias.split())
+        for alias in sorted(aliases, key=len, reverse=True)
+    )
+    regex = re.compile(
+        rf'\b(?P<ano>20\d{{2}})\b'
+        rf'|\b(?P<ano_anterior>último\s+ano|ano\s+passado)\b'
+        rf'|\b(?P<ano_atual>este\s+ano)\b'
+        rf'|\b(?P<trimestre>[1-4])º?\s*trimestre\b'
+        rf'|\b(?P<operadora>{alternativas})\b'
+    )
+    return regex, aliases
+
+
+class IntentEngine:
+    """
+    Autómato de intenções (reconstruído quando as ChatIntent mudam) e
+    extração de entidades.
+    """
+
+    def __init__(self, patterns=INTENT_PATTERNS, operadores=ENTITIES['operadores']):
+        self.patterns = patterns
+        self._lock = threading.Lock()
+        self._matcher = None
+        self._token = None
+        self._proxima_verificacao = 0.0
+        self._entidades, self._aliases = _entity_regex(operadores)
+
+    def invalidate(self):
+        cache.set(INTENT_VERSION_KEY, uuid.uuid4().hex, None)
+        with self._lock:
+            self._matcher = None
+
+    def _build(self):
+        tipos = set(self.patterns) | RESPONSE_INTENTS
+        rows = ChatIntent.objects.filter(ativo=True, tipo__in=tipos).order_by('pk').values_list(
+            'tipo', 'palavras_chave', 'confianca_minima',
+        )
+        return build_matcher(self.patterns, rows)
+
+    def matcher(self):
+        agora = time.monotonic()
+        matcher = self._matcher
+        if matcher is not None and agora < self._proxima_verificacao:
+            return matcher
+        token = cache.get(INTENT_VERSION_KEY)
+        with self._lock:
+            if self._matcher is None or token != self._token:
+                self._matcher = self._build()
+                self._token = token
+            self._proxima_verificacao = agora + VERSION_CHECK_INTERVAL
+            return self._matcher
+
+    def classify(self, mensagem):
+        return self.matcher().classify(mensagem)
+
+    def extract_entities(self, mensagem, ano_atual):
+        """
+        Operadora (a primeira mencionada), ano e trimestre, numa passagem pela mensagem.
+
+        Um ano explícito prevalece sobre 'último ano'/'ano passado', e estes sobre 'este ano'.
+        """
+        encontradas = {}
+        for match in self._entidades.finditer(mensagem.lower()):
+            encontradas.setdefault(match.lastgroup, match.group(match.lastgroup))
+
+        entidades = {}
+        if 'operadora' in encontradas:
+            entidades['operadora'] = self._aliases[' '.join(encontradas['operadora'].split())]
+        if 'ano' in encontradas:
+            entidades['ano'] = int(encontradas['ano'])
+        elif 'ano_anterior' in encontradas:
+            entidades['ano'] = ano_atual - 1
+        elif 'ano_atual' in encontradas:
+            entidades['ano'] = ano_atual
+        if 'trimestre' in encontradas:
+            entidades['trimestre'] = int(encontradas['trimestre'])
+        return entidades
+
+
+intent_engine = IntentEngine()
@@ -0,0 +1,208 @@
+"""
+Cache de consultas do assistente ARN em dois níveis.
+
+Nível 1: LRU em memória do processo (acesso sem consultas à base de dados).
+Nível 2: tabela ARNQueryCache, partilhada entre processos.
+
+A validade de cada entrada é dada por ``validade`` (segundos desde
+``timestamp``). Os acessos (``hits``/``ultimo_acesso``) são acumulados em
+memória e gravados em lote, em vez de um UPDATE por acerto. A tabela é
+limitada a ``ARN_QUERY_CACHE_MAX_ENTRIES`` entradas, removendo as menos
+usadas recentemente.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import (
+    Case, DateTimeField, DurationField, ExpressionWrapper, F, IntegerField, Value, When,
+)
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MAX_ENTRIES = getattr(settings, 'ARN_QUERY_CACHE_LOCAL_SIZE', 256)
+TABLE_MAX_ENTRIES = getattr(settings, 'ARN_QUERY_CACHE_MAX_ENTRIES', 5000)
+HITS_FLUSH_THRESHOLD = getattr(settings, 'ARN_QUERY_CACHE_HITS_FLUSH', 50)
+HITS_FLUSH_INTERVAL = getattr(settings, 'ARN_QUERY_CACHE_HITS_INTERVAL', 30)
+EVICTION_CHECK_EVERY = 100
+
+
+def hash_key(key):
+    """Hash estável (64 caracteres) usado como ``query_hash``."""
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class LocalLRU:
+    """LRU thread-safe com expiração por entrada."""
+
+    def __init__(self, max_entries=LOCAL_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class QueryCache:
+    """Coordena o LRU local, a tabela ARNQueryCache e a gravação dos acessos."""
+
+    def __init__(self):
+        self.local = LocalLRU()
+        self._pending_hits = {}
+        self._hits_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._sets_since_eviction = 0
+
+    @property
+    def model(self):
+        from dashboard.models import ARNQueryCache
+        return ARNQueryCache
+
+    # --- Leitura/escrita ---
+
+    def get(self, key):
+        query_hash = hash_key(key)
+        value = self.local.get(query_hash)
+        if value is not None:
+            self._record_hit(query_hash)
+            return value
+
+        entry = (
+            self.model.objects.filter(query_hash=query_hash)
+            .values('resultado', 'timestamp', 'validade')
+            .first()
+        )
+        if entry is None:
+            return None
+        remaining = (entry['timestamp'] - timezone.now()).total_seconds() + entry['validade']
+        if remaining <= 0:
+            return None
+
+        self.local.set(query_hash, entry['resultado'], remaining)
+        self._record_hit(query_hash)
+        return entry['resultado']
+
+    def set(self, key, value, validade=3600):
+        query_hash = hash_key(key)
+        agora = timezone.now()
+        self.model.objects.update_or_create(
+            query_hash=query_hash,
+            defaults={'resultado': value, 'timestamp': agora, 'validade': validade, 'ultimo_acesso': agora},
+        )
+        self.local.set(query_hash, value, validade)
+
+        self._sets_since_eviction += 1
+        if self._sets_since_eviction >= EVICTION_CHECK_EVERY:
+            self._sets_since_eviction = 0
+            self.enforce_limit()
+
+    def delete(self, key):
+        query_hash = hash_key(key)
+        self.local.delete(query_hash)
+        self.model.objects.filter(query_hash=query_hash).delete()
+
+    # --- Contadores de acesso ---
+
+    def _record_hit(self, query_hash):
+        with self._hits_lock:
+            self._pending_hits[query_hash] = self._pending_hits.get(query_hash, 0) + 1
+            pending = sum(self._pending_hits.values())
+            due = time.monotonic() - self._last_flush >= HITS_FLUSH_INTERVAL
+        if pending >= HITS_FLUSH_THRESHOLD or due:
+            self.flush_hits()
+
+    def flush_hits(self):
+        """Grava os acessos pendentes numa única instrução UPDATE."""
+        with self._hits_lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            self._last_flush = time.monotonic()
+        if not pending:
+            return 0
+        try:
+            self.model.objects.filter(query_hash__in=list(pending)).update(
+                hits=F('hits') + Case(
+                    *[When(query_hash=h, then=Value(n)) for h, n in pending.items()],
+                    default=Value(0),
+                    output_field=IntegerField(),
+                ),
+                ultimo_acesso=timezone.now(),
+            )
+        except Exception as e:
+            logger.warning(f"Não foi possível gravar os acessos da cache de consultas: {e}")
+        return len(pending)
+
+    # --- Manutenção ---
+
+    def purge_expired(self):
+        """Remove da tabela as entradas expiradas (um único DELETE). Retorna o número removido."""
+        duracao = ExpressionWrapper(F('validade') * Value(timedelta(seconds=1)), output_field=DurationField())
+        return self.model.objects.filter(
+            timestamp__lte=ExpressionWrapper(Value(timezone.now()) - duracao, output_field=DateTimeField()),
+        ).delete()[0]
+
+    def enforce_limit(self, max_entries=None):
+        """Mantém a tabela dentro do limite, removendo as entradas menos usadas recentemente."""
+        max_entries = TABLE_MAX_ENTRIES if max_entries is None else max_entries
+        excedentes = list(
+            self.model.objects.order_by('-ultimo_acesso', '-timestamp')
+            .values_list('pk', flat=True)[max_entries:]
+        )
+        if not excedentes:
+            return 0
+        removidas = 0
+        for i in range(0, len(excedentes), 500):
+            removidas += self.model.objects.filter(pk__in=excedentes[i:i + 500]).delete()[0]
+        return removidas
+
+    def clear(self):
+        self.local.clear()
+        with self._hits_lock:
+            self._pending_hits = {}
+        return self.model.objects.all().delete()[0]
+
+
+query_cache = QueryCache()
+
+
+def _flush_on_exit():
+    try:
+        query_cache.flush_hits()
+    except Exception:
+        pass
+
+
+atexit.register(_flush_on_exit)
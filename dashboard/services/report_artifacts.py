@@ -0,0 +1,302 @@
+"""
+Arquivo de relatórios gerados (PDF, Excel, CSV) em disco.
+
+Cada artefacto é identificado pela chave sha256 de (tipo, formato, ano,
+versões dos dados — VersaoDados) e gravado em
+``REPORT_ARTIFACT_ROOT/<2 primeiros carateres>/<chave>.<extensão>``.
+Enquanto os dados de origem não mudarem a chave é a mesma, e o ficheiro
+já gerado é enviado diretamente; quando mudam, o próximo pedido cria um
+novo GeneratedReport ``pending``.
+
+A geração corre fora do pedido HTTP, no comando ``run_report_worker``:
+os relatórios pendentes são reclamados com ``SELECT ... FOR UPDATE SKIP
+LOCKED`` e passam por ``pending`` → ``processing`` → ``completed``/``error``.
+O worker regista um sinal de vida na cache; sem worker ativo (desenvolvimento,
+instalações com um só processo) o relatório é gerado no próprio pedido.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import FileResponse
+from django.urls import reverse
+from django.utils import timezone
+
+from questionarios.services.result_cache import get_versions
+
+from ..models import GeneratedReport
+from ..utils.report_generator import ARNReportGenerator
+from .export_service import EXCEL_CONTENT_TYPE, ARNExportService, iter_csv
+
+logger = logging.getLogger(__name__)
+
+# tipo -> (método do ARNReportGenerator, prefixo do ficheiro, título)
+REPORT_TYPES = {
+    'market': ('generate_market_report', 'relatorio_mercado', 'Relatório de Mercado'),
+    'executive': ('generate_dashboard_data', 'dashboard_executivo', 'Dashboard Executivo'),
+    'comparative': ('generate_comparative_report', 'analise_comparativa', 'Análise Comparativa'),
+}
+# Nomes usados pelo formulário de GenerateReportView
+REPORT_TYPE_ALIASES = {'dashboard': 'executive'}
+
+# formato -> (extensão, content type)
+ARTIFACT_FORMATS = {
+    'pdf': ('pdf', 'application/pdf'),
+    'excel': ('xlsx', EXCEL_CONTENT_TYPE),
+    'csv': ('csv', 'text/csv; charset=utf-8'),
+}
+
+ACTIVE_STATUSES = ('pending', 'processing', 'completed')
+
+WORKER_HEARTBEAT_KEY = 'report_worker:heartbeat'
+
+
+class ArtifactError(ValueError):
+    """Tipo de relatório ou formato inválido."""
+
+
+def artifact_root():
+    return getattr(settings, 'REPORT_ARTIFACT_ROOT', os.path.join(settings.BASE_DIR, 'report_artifacts'))
+
+
+def normalize_request(report_type, format_type):
+    """Valida o pedido; retorna (tipo, formato) canónicos ou lança ArtifactError."""
+    report_type = REPORT_TYPE_ALIASES.get(report_type, report_type)
+    if report_type not in REPORT_TYPES:
+        raise ArtifactError('Tipo de relatório inválido')
+    if format_type not in ARTIFACT_FORMATS:
+        raise ArtifactError('Formato de exportação inválido')
+    return report_type, format_type
+
+
+def artifact_key(report_type, format_type, year, versions=None):
+    """Chave sha256 de (tipo, formato, ano, versões dos dados de todos os indicadores)."""
+    raw = repr((report_type, format_type, int(year), versions if versions is not None else get_versions()))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def artifact_path(key, format_type):
+    extensao = ARTIFACT_FORMATS[format_type][0]
+    return os.path.join(artifact_root(), key[:2], f'{key}.{extensao}')
+
+
+def artifact_filename(report):
+    params = report.parametros
+    extensao = ARTIFACT_FORMATS[params['format']][0]
+    return f"{REPORT_TYPES[params['report_type']][1]}_{params['year']}.{extensao}"
+
+
+def is_ready(report):
+    return report.status == 'completed' and bool(report.arquivo_path) and os.path.exists(report.arquivo_path)
+
+
+def find_artifact(report_type, format_type, year):
+    """
+    Relatório concluído (com ficheiro) ou em curso para a versão atual dos dados, ou None.
+
+    Não cria nem altera registos (usado também pelos pedidos HEAD).
+    """
+    report_type, format_type = normalize_request(report_type, format_type)
+    key = artifact_key(report_type, format_type, int(year))
+    report = GeneratedReport.objects.filter(chave=key, status__in=ACTIVE_STATUSES).order_by('-created_at').first()
+    if report is not None and (report.status != 'completed' or is_ready(report)):
+        return report
+    return None
+
+
+def request_artifact(report_type, format_type, year, user):
+    """
+    Relatório (GeneratedReport) correspondente ao pedido, para a versão atual dos dados.
+
+    Reutiliza um relatório concluído (cujo ficheiro ainda existe) ou em curso
+    com a mesma chave; caso contrário cria um novo relatório ``pending``
+    (``user`` None: relatório agendado).
+    """
+    report_type, format_type = normalize_request(report_type, format_type)
+    year = int(year)
+    report = find_artifact(report_type, format_type, year)
+    if report is not None:
+        return report
+    key = artifact_key(report_type, format_type, year)
+    # Ficheiro removido do disco: gerar de novo
+    GeneratedReport.objects.filter(chave=key, status='completed').exclude(arquivo_path='').update(arquivo_path='')
+
+    return GeneratedReport.objects.create(
+        usuario=user if getattr(user, 'pk', None) else None,
+        titulo=f"{REPORT_TYPES[report_type][2]} {year}",
+        periodo_inicio=date(year, 1, 1),
+        periodo_fim=date(year, 12, 31),
+        parametros={'report_type': report_type, 'year': year, 'format': format_type},
+        chave=key,
+    )
+
+
+def claim_report(report):
+    """Passa um relatório ``pending`` a ``processing``; False se outro worker o reclamou primeiro."""
+    claimed = GeneratedReport.objects.filter(pk=report.pk, status='pending').update(
+        status='processing', started_at=timezone.now(),
+    )
+    if claimed:
+        report.refresh_from_db()
+    return bool(claimed)
+
+
+def claim_next_report():
+    """Reclama o relatório pendente mais antigo, ou None se a fila estiver vazia."""
+    with transaction.atomic():
+        report = (
+            GeneratedReport.objects.select_for_update(skip_locked=True)
+            .filter(status='pending')
+            .order_by('created_at', 'pk')
+            .first()
+        )
+        if report is None or not claim_report(report):
+            return None
+    return report
+
+
+def _write_artifact(service, format_type, path):
+    """Grava o artefacto num ficheiro temporário e move-o para ``path`` (operação atómica)."""
+    pasta = os.path.dirname(path)
+    os.makedirs(pasta, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=pasta, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as destino:
+            if format_type == 'pdf':
+                destino.write(service.export_to_pdf())
+            elif format_type == 'excel':
+                with service.export_to_excel_file() as origem:
+                    shutil.copyfileobj(origem, destino)
+            else:
+                for linha in iter_csv(service.csv_rows()):
+                    destino.write(linha.encode('utf-8'))
+        os.replace(temporario, path)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def _remove_superseded(report):
+    """Remove os ficheiros de versões anteriores do mesmo relatório (tipo, formato, ano)."""
+    params = report.parametros
+    anteriores = (
+        GeneratedReport.objects.filter(
+            status='completed',
+            parametros__report_type=params['report_type'],
+            parametros__format=params['format'],
+            parametros__year=params['year'],
+        )
+        .exclude(chave=report.chave)
+        .exclude(arquivo_path='')
+    )
+    for anterior in anteriores:
+        if os.path.exists(anterior.arquivo_path):
+            os.remove(anterior.arquivo_path)
+    anteriores.update(arquivo_path='')
+
+
+def render_report(report):
+    """
+    Gera o artefacto de um relatório reclamado e grava o estado final.
+
+    Returns:
+        GeneratedReport: o relatório com o estado ``completed`` ou ``error``.
+    """
+    params = report.parametros
+    try:
+        report_type, format_type = normalize_request(params.get('report_type'), params.get('format'))
+        year = int(params['year'])
+        data = getattr(ARNReportGenerator(year=year), REPORT_TYPES[report_type][0])()
+        path = artifact_path(report.chave, format_type)
+        _write_artifact(ARNExportService(data, year, report_type), format_type, path)
+    except Exception as e:
+        logger.error(f"Relatório {report.pk} ({report.titulo}) falhou: {e}", exc_info=True)
+        report.status = 'error'
+        report.erro = str(e)
+        report.completed_at = timezone.now()
+        report.save(update_fields=['status', 'erro', 'completed_at'])
+        return report
+
+    report.status = 'completed'
+    report.arquivo_path = path
+    report.completed_at = timezone.now()
+    report.save(update_fields=['status', 'arquivo_path', 'completed_at'])
+    _remove_superseded(report)
+    logger.info(f"Relatório {report.pk} ({report.titulo}, {format_type}) gerado em {path}")
+    return report
+
+
+def requeue_stale_reports(timeout_minutes=30):
+    """Devolve à fila relatórios ``processing`` há mais de ``timeout_minutes`` (worker terminado a meio)."""
+    limite = timezone.now() - timedelta(minutes=timeout_minutes)
+    repostos = GeneratedReport.objects.filter(status='processing', started_at__lt=limite).update(status='pending')
+    if repostos:
+        logger.warning(f"{repostos} relatórios interrompidos repostos na fila")
+    return repostos
+
+
+def worker_heartbeat(timeout):
+    """Regista que um run_report_worker está ativo durante ``timeout`` segundos."""
+    cache.set(WORKER_HEARTBEAT_KEY, timezone.now().isoformat(), timeout)
+
+
+def worker_running():
+    return cache.get(WORKER_HEARTBEAT_KEY) is not None
+
+
+def render_if_no_worker(report):
+    """
+    Gera no próprio pedido um relatório ``pending`` quando nenhum worker está ativo.
+
+    Com worker ativo (ou relatório já reclamado por outro processo) o
+    relatório é devolvido sem alterações.
+    """
+    if report.status == 'pending' and not worker_running() and claim_report(report):
+        return render_report(report)
+    return report
+
+
+def run_pending_reports(limit=None):
+    """Reclama e gera relatórios até a fila ficar vazia (ou ``limit``). Retorna o nº gerado."""
+    gerados = 0
+    while limit is None or gerados < limit:
+        report = claim_next_report()
+        if report is None:
+            break
+        render_report(report)
+        gerados += 1
+    return gerados
+
+
+def artifact_response(report):
+    """FileResponse com o artefacto do relatório, ou None se ainda não estiver disponível."""
+    if not is_ready(report):
+        return None
+    content_type = ARTIFACT_FORMATS[report.parametros['format']][1]
+    return FileResponse(
+        open(report.arquivo_path, 'rb'), as_attachment=True, filename=artifact_filename(report),
+        content_type=content_type,
+    )
+
+
+def report_status(report):
+    """Estado de um relatório em formato JSON (endpoint de polling)."""
+    return {
+        'id': report.pk,
+        'titulo': report.titulo,
+        'status': report.status,
+        'status_display': report.get_status_display(),
+        'parametros': report.parametros,
+        'erro': report.erro,
+        'status_url': reverse('dashboard:report-artifact-status', args=[report.pk]),
+        'download_url': reverse('dashboard:report-artifact-download', args=[report.pk]) if is_ready(report) else None,
+        'created_at': report.created_at.isoformat() if report.created_at else None,
+        'completed_at': report.completed_at.isoformat() if report.completed_at else None,
+    }
@@ -0,0 +1,78 @@
+"""
+Entrega dos relatórios agendados.
+
+O backend é escolhido em REPORT_DELIVERY_BACKEND (caminho de uma classe com
+o método ``deliver(schedule, report)``):
+
+- ``EmailDelivery`` (padrão): envia o ficheiro em anexo aos destinatários,
+  através do EMAIL_BACKEND do Django (consola/ficheiro em desenvolvimento);
+- ``FileDelivery``: copia o ficheiro para REPORT_DELIVERY_DIR/<agendamento>/.
+"""
+import os
+import shutil
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+from .report_artifacts import ARTIFACT_FORMATS, artifact_filename
+
+
+class BaseDelivery:
+    """Interface dos backends de entrega."""
+
+    def deliver(self, schedule, report):
+        raise NotImplementedError
+
+    def close(self):
+        """Liberta recursos no fim de uma execução do agendador."""
+
+
+class EmailDelivery(BaseDelivery):
+    """Envia o relatório por email (uma ligação ao servidor por execução do agendador)."""
+
+    def __init__(self):
+        self.connection = get_connection()
+
+    def deliver(self, schedule, report):
+        if not schedule.destinatarios:
+            return
+        message = EmailMessage(
+            subject=f"{report.titulo} - {schedule.nome}",
+            body=(
+                f"Segue em anexo o relatório \"{report.titulo}\" ({schedule.get_frequencia_display().lower()}), "
+                f"gerado em {timezone.localtime(report.completed_at).strftime('%d/%m/%Y %H:%M')}.\n\n"
+                "Autoridade Reguladora Nacional (ARN) - Guiné-Bissau"
+            ),
+            to=list(schedule.destinatarios),
+            connection=self.connection,
+        )
+        with open(report.arquivo_path, 'rb') as ficheiro:
+            message.attach(
+                artifact_filename(report), ficheiro.read(), ARTIFACT_FORMATS[report.parametros['format']][1],
+            )
+        message.send()
+
+    def close(self):
+        self.connection.close()
+
+
+class FileDelivery(BaseDelivery):
+    """Copia o relatório para uma pasta por agendamento (útil em desenvolvimento)."""
+
+    def __init__(self):
+        self.root = getattr(settings, 'REPORT_DELIVERY_DIR', os.path.join(settings.BASE_DIR, 'report_deliveries'))
+
+    def deliver(self, schedule, report):
+        pasta = os.path.join(self.root, f"{schedule.pk}-{slugify(schedule.nome)}")
+        os.makedirs(pasta, exist_ok=True)
+        carimbo = timezone.localtime().strftime('%Y%m%d%H%M')
+        shutil.copyfile(report.arquivo_path, os.path.join(pasta, f"{carimbo}_{artifact_filename(report)}"))
+
+
+def get_delivery_backend(path=None):
+    """Instância do backend configurado (REPORT_DELIVERY_BACKEND)."""
+    path = path or getattr(settings, 'REPORT_DELIVERY_BACKEND', 'dashboard.services.report_delivery.EmailDelivery')
+    return import_string(path)()
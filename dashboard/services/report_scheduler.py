@@ -0,0 +1,205 @@
+"""
+Execução dos agendamentos de relatórios (ReportSchedule).
+
+Em cada ciclo do comando ``run_report_scheduler``:
+
+1. os agendamentos ativos com ``proximo_envio <= agora`` são lidos numa
+   única consulta (índice report_schedule_due_idx);
+2. cada um é reclamado avançando ``proximo_envio`` com um UPDATE
+   condicionado ao valor lido, pelo que dois agendadores em simultâneo
+   nunca enviam o mesmo agendamento;
+3. os agendamentos são agrupados pelo relatório que pedem (tipo, formato,
+   ano): cada relatório é gerado uma só vez — ou reutilizado do arquivo de
+   relatórios, se os dados não mudaram — num conjunto limitado de processos;
+4. o ficheiro é entregue a cada agendamento pelo backend configurado
+   (ver dashboard.services.report_delivery).
+"""
+import calendar
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from ..models import GeneratedReport, ReportSchedule
+from .report_artifacts import ArtifactError, claim_report, is_ready, normalize_request, render_report, request_artifact
+from .report_delivery import get_delivery_backend
+
+logger = logging.getLogger(__name__)
+
+# ReportTemplate.tipo -> tipo de relatório do arquivo (ver report_artifacts.REPORT_TYPES)
+TEMPLATE_REPORT_TYPES = {
+    'mercado': 'market',
+    'dashboard_executivo': 'executive',
+    'comparativo': 'comparative',
+    'tendencias': 'market',
+    'trimestral': 'market',
+    'anual': 'market',
+}
+# ReportTemplate.formato -> formato do ficheiro enviado (HTML/dashboard são enviados em PDF)
+TEMPLATE_FORMATS = {'pdf': 'pdf', 'excel': 'excel'}
+
+FREQUENCY_MONTHS = {'monthly': 1, 'quarterly': 3, 'yearly': 12}
+FREQUENCY_DAYS = {'daily': 1, 'weekly': 7}
+
+
+def _add_months(value, months, day):
+    """``value`` deslocado ``months`` meses, no dia ``day`` (limitado ao último dia do mês)."""
+    indice = value.month - 1 + months
+    ano, mes = value.year + indice // 12, indice % 12 + 1
+    return value.replace(year=ano, month=mes, day=min(day, calendar.monthrange(ano, mes)[1]))
+
+
+def next_run(schedule, now=None):
+    """
+    Próximo envio de ``schedule`` depois de ``now``, a partir do ``proximo_envio`` atual.
+
+    Envios em atraso (agendador parado) não se acumulam: salta-se para a
+    primeira data futura.
+    """
+    now = now or timezone.now()
+    atual = timezone.localtime(schedule.proximo_envio)
+    hora = schedule.hora
+    if isinstance(hora, str):
+        hora = datetime.strptime(hora, '%H:%M').time()
+    dia = schedule.dia_mes or atual.day
+
+    proximo = atual
+    while proximo <= now:
+        if schedule.frequencia in FREQUENCY_DAYS:
+            proximo = proximo + timedelta(days=FREQUENCY_DAYS[schedule.frequencia])
+        else:
+            proximo = _add_months(proximo, FREQUENCY_MONTHS.get(schedule.frequencia, 1), dia)
+        proximo = proximo.replace(hour=hora.hour, minute=hora.minute, second=0, microsecond=0)
+    return proximo
+
+
+def schedule_request(schedule):
+    """
+    (tipo, formato, ano) do relatório de um agendamento.
+
+    ``template.configuracao`` pode fixar 'report_type', 'format' e 'year';
+    por omissão o ano é o do envio (o anterior, nos relatórios anuais).
+    """
+    config = schedule.template.configuracao or {}
+    report_type = config.get('report_type') or TEMPLATE_REPORT_TYPES.get(schedule.template.tipo, 'market')
+    format_type = config.get('format') or TEMPLATE_FORMATS.get(schedule.template.formato, 'pdf')
+    envio = timezone.localtime(schedule.proximo_envio)
+    year = config.get('year') or (envio.year - 1 if schedule.frequencia == 'yearly' else envio.year)
+    return normalize_request(report_type, format_type) + (int(year),)
+
+
+def claim_due_schedules(now=None):
+    """
+    Agendamentos a executar, reclamados avançando ``proximo_envio`` de forma atómica.
+
+    Os objetos devolvidos mantêm o ``proximo_envio`` do envio reclamado. Nos
+    agendamentos mensais, trimestrais e anuais sem ``dia_mes``, o dia do
+    primeiro envio fica gravado em ``dia_mes``: as datas seguintes podem ser
+    limitadas ao fim do mês (31 → 28) e não servem de referência.
+    """
+    now = now or timezone.now()
+    due = ReportSchedule.objects.filter(ativo=True, proximo_envio__lte=now).select_related('template')
+    claimed = []
+    for schedule in due.order_by('proximo_envio', 'pk'):
+        campos = {'proximo_envio': next_run(schedule, now), 'ultimo_envio': now}
+        if schedule.dia_mes is None and schedule.frequencia in FREQUENCY_MONTHS:
+            campos['dia_mes'] = timezone.localtime(schedule.proximo_envio).day
+        updated = ReportSchedule.objects.filter(pk=schedule.pk, proximo_envio=schedule.proximo_envio).update(**campos)
+        if updated:
+            claimed.append(schedule)
+    return claimed
+
+
+def group_schedules(schedules):
+    """{(tipo, formato, ano): [agendamentos]}; agendamentos com template inválido são ignorados."""
+    grupos = defaultdict(list)
+    for schedule in schedules:
+        try:
+            grupos[schedule_request(schedule)].append(schedule)
+        except (ArtifactError, TypeError, ValueError) as e:
+            logger.error(f"Agendamento {schedule.pk} ({schedule.nome}) ignorado: {e}")
+    return dict(grupos)
+
+
+def _render_in_process(pk):
+    """Gera um relatório já reclamado (num processo do conjunto)."""
+    try:
+        return render_report(GeneratedReport.objects.get(pk=pk)).status
+    finally:
+        connections.close_all()
+
+
+def render_reports(reports, workers=None):
+    """Gera os relatórios (já reclamados) em até ``workers`` processos."""
+    workers = workers or getattr(settings, 'REPORT_SCHEDULER_WORKERS', 2)
+    if workers <= 1 or len(reports) <= 1:
+        for report in reports:
+            render_report(report)
+        return
+    # Não partilhar ligações abertas com os processos filhos
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=min(workers, len(reports))) as executor:
+        list(executor.map(_render_in_process, [report.pk for report in reports]))
+
+
+def wait_for_report(report, timeout=None, interval=1):
+    """Espera que um relatório em geração noutro worker termine (ou ``timeout`` segundos)."""
+    timeout = timeout if timeout is not None else getattr(settings, 'REPORT_JOB_TIMEOUT_MINUTES', 30) * 60
+    limite = time.monotonic() + timeout
+    report.refresh_from_db()
+    while report.status in ('pending', 'processing') and time.monotonic() < limite:
+        time.sleep(interval)
+        report.refresh_from_db()
+    return report
+
+
+def run_due_schedules(now=None, workers=None, delivery=None):
+    """
+    Executa os agendamentos devidos: reclama, gera cada relatório uma vez e entrega.
+
+    Returns:
+        dict: {'agendamentos', 'relatorios', 'gerados', 'entregues', 'falhas'}
+    """
+    resumo = {'agendamentos': 0, 'relatorios': 0, 'gerados': 0, 'entregues': 0, 'falhas': 0}
+    schedules = claim_due_schedules(now)
+    if not schedules:
+        return resumo
+    resumo['agendamentos'] = len(schedules)
+
+    grupos = group_schedules(schedules)
+    resumo['falhas'] += len(schedules) - sum(len(lista) for lista in grupos.values())
+    reports = {pedido: request_artifact(*pedido, user=None) for pedido in grupos}
+    resumo['relatorios'] = len(reports)
+
+    a_gerar = [report for report in reports.values() if report.status == 'pending' and claim_report(report)]
+    render_reports(a_gerar, workers)
+    resumo['gerados'] = len(a_gerar)
+
+    delivery = delivery or get_delivery_backend()
+    try:
+        for pedido, lista in grupos.items():
+            report = wait_for_report(reports[pedido])
+            if not is_ready(report):
+                logger.error(f"Relatório {report.pk} ({report.titulo}) indisponível: {report.status} {report.erro}")
+                resumo['falhas'] += len(lista)
+                continue
+            for schedule in lista:
+                try:
+                    delivery.deliver(schedule, report)
+                    resumo['entregues'] += 1
+                except Exception as e:
+                    logger.error(f"Falha na entrega do agendamento {schedule.pk} ({schedule.nome}): {e}", exc_info=True)
+                    resumo['falhas'] += 1
+    finally:
+        delivery.close()
+
+    logger.info(
+        f"Agendamentos: {resumo['agendamentos']} executados, {resumo['relatorios']} relatórios "
+        f"({resumo['gerados']} gerados), {resumo['entregues']} entregues, {resumo['falhas']} falhas"
+    )
+    return resumo
@@ -0,0 +1,89 @@
+"""
+Sinais que disparam a avaliação incremental dos alertas (ver dashboard.services.alert_engine)
+e a recompilação das intenções do assistente (dashboard.services.intent_engine).
+
+As alterações de uma transação são acumuladas por indicador e avaliadas uma
+única vez após o commit, quando a tabela de factos já está atualizada.
+"""
+import logging
+import threading
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from questionarios.models.base import IndicadorBase
+from questionarios.services.factos import indicator_key
+from questionarios.services.importacao import indicadores_atualizados_em_lote
+
+from .models import ChatIntent, ReportAlert
+from .services.alert_engine import alert_index, evaluate_changes
+from .services.intent_engine import intent_engine
+
+logger = logging.getLogger(__name__)
+
+_pendentes = threading.local()
+
+
+class _AlteracoesPendentes:
+    """Alterações acumuladas numa transação, avaliadas de uma vez pelo callback ``on_commit``."""
+
+    def __init__(self):
+        self.alteracoes = defaultdict(set)
+
+    def __call__(self):
+        if getattr(_pendentes, 'lote', None) is self:
+            del _pendentes.lote
+        try:
+            evaluate_changes(self.alteracoes)
+        except Exception as e:
+            logger.error(f"Erro ao avaliar alertas ({', '.join(self.alteracoes)}): {e}", exc_info=True)
+
+
+def register_change(model, periodos):
+    """Regista períodos (ano, mes) alterados de ``model``; avaliados após o commit da transação."""
+    connection = transaction.get_connection()
+    lote = getattr(_pendentes, 'lote', None)
+    # Reutilizar o lote enquanto o seu callback estiver pendente (descartado se a transação foi anulada)
+    if lote is not None and connection.in_atomic_block and any(
+        func is lote for _, func, _ in connection.run_on_commit
+    ):
+        lote.alteracoes[indicator_key(model)].update(periodos)
+        return
+    lote = _pendentes.lote = _AlteracoesPendentes()
+    lote.alteracoes[indicator_key(model)].update(periodos)
+    transaction.on_commit(lote)
+
+
+@receiver(post_save)
+def indicador_guardado(sender, instance, raw=False, **kwargs):
+    if raw or not issubclass(sender, IndicadorBase):
+        return
+    register_change(sender, [(instance.ano, instance.mes)])
+
+
+@receiver(post_delete)
+def indicador_eliminado(sender, instance, **kwargs):
+    if not issubclass(sender, IndicadorBase):
+        return
+    register_change(sender, [(instance.ano, instance.mes)])
+
+
+@receiver(indicadores_atualizados_em_lote)
+def indicadores_importados(sender, periodos, **kwargs):
+    register_change(sender, {(ano, mes) for _, ano, mes in periodos})
+
+
+@receiver(post_save, sender=ReportAlert)
+@receiver(post_delete, sender=ReportAlert)
+def alerta_alterado(sender, **kwargs):
+    """Recompila os alertas no próximo uso."""
+    alert_index.invalidate()
+
+
+@receiver(post_save, sender=ChatIntent)
+@receiver(post_delete, sender=ChatIntent)
+def intencao_alterada(sender, **kwargs):
+    """Recompila o autómato de intenções no próximo uso."""
+    intent_engine.invalidate()
@@ -10,7 +10,9 @@
     const CONFIG = {
         exportBaseUrl: '/dashboard/reports/export/',
         loadingClass: 'exporting',
-        errorDisplayTime: 5000
+        errorDisplayTime: 5000,
+        pollInterval: 2000,      // ms entre consultas ao estado do relatório
+        maxPollAttempts: 150     // desistir ao fim de ~5 minutos
     };
     
     /**
@@ -79,33 +81,88 @@
     
     /**
      * Faz download do arquivo
+     *
+     * 200: o ficheiro já gerado vem na resposta.
+     * 202: o relatório está em geração; consulta status_url até haver download_url.
      */
     function downloadFile(url, triggerElement) {
-        // Criar elemento temporário para download
-        const link = document.createElement('a');
-        link.href = url;
-        link.style.display = 'none';
-        document.body.appendChild(link);
-        
-        // Verificar se o download foi bem-sucedido
-        fetch(url, { method: 'HEAD' })
+        fetch(url, { credentials: 'same-origin' })
             .then(response => {
-                if (response.ok) {
-                    link.click();
-                    showSuccess(triggerElement);
-                } else {
+                if (response.status === 202) {
+                    return response.json()
+                        .then(status => waitForReport(status.status_url))
+                        .then(downloadUrl => clickLink(downloadUrl));
+                }
+                if (!response.ok) {
                     throw new Error('Erro ao exportar relatório');
                 }
+                return response.blob().then(blob => {
+                    const objectUrl = URL.createObjectURL(blob);
+                    clickLink(objectUrl, getFilename(response));
+                    setTimeout(() => URL.revokeObjectURL(objectUrl), 1000);
+                });
+            })
+            .then(() => {
+                showSuccess(triggerElement);
             })
             .catch(error => {
                 showError(triggerElement, error.message);
             })
             .finally(() => {
                 hideLoading(triggerElement);
-                document.body.removeChild(link);
             });
     }
     
+    /**
+     * Consulta o estado do relatório até estar concluído; resolve com download_url
+     */
+    function waitForReport(statusUrl, attempt = 0) {
+        return new Promise(resolve => setTimeout(resolve, CONFIG.pollInterval))
+            .then(() => fetch(statusUrl, { credentials: 'same-origin' }))
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Erro ao consultar o estado do relatório');
+                }
+                return response.json();
+            })
+            .then(status => {
+                if (status.download_url) {
+                    return status.download_url;
+                }
+                if (status.status === 'error') {
+                    throw new Error(status.erro || 'Erro ao gerar relatório');
+                }
+                if (attempt + 1 >= CONFIG.maxPollAttempts) {
+                    throw new Error('O relatório ainda está a ser gerado; tente novamente mais tarde');
+                }
+                return waitForReport(statusUrl, attempt + 1);
+            });
+    }
+    
+    /**
+     * Abre um link de download temporário
+     */
+    function clickLink(href, filename) {
+        const link = document.createElement('a');
+        link.href = href;
+        if (filename) {
+            link.download = filename;
+        }
+        link.style.display = 'none';
+        document.body.appendChild(link);
+        link.click();
+        document.body.removeChild(link);
+    }
+    
+    /**
+     * Nome do ficheiro indicado no cabeçalho Content-Disposition
+     */
+    function getFilename(response) {
+        const disposition = response.headers.get('Content-Disposition') || '';
+        const match = disposition.match(/filename="?([^";]+)"?/);
+        return match ? match[1] : '';
+    }
+    
     /**
      * Obtém tipo de relatório atual da URL ou contexto
      */
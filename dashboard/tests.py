@@ -1,3 +1,345 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from questionarios.models import AssinantesIndicador, ReceitasIndicador
+from questionarios.services.importacao import bulk_upsert
+from questionarios.services.result_cache import bump_version
+
+from .models import ARNQueryCache, ChatIntent, GeneratedReport, ReportAlert, ReportAlertHistory, ReportSchedule, ReportTemplate
+from .services.alert_engine import alert_index
+from .services.export_service import ARNExportService, column_widths, streaming_csv_response
+from .services.ai_service import ARNAssistantService
+from .services.intent_engine import INTENT_PATTERNS, build_matcher, intent_engine
+from .services.query_cache import LocalLRU, hash_key, query_cache
+from .services.report_artifacts import WORKER_HEARTBEAT_KEY, run_pending_reports, worker_heartbeat
+from .services.report_scheduler import claim_due_schedules, next_run, run_due_schedules
+
+REPORT_DATA = {
+    'panorama_geral': {
+        'total_assinantes': 1500000,
+        'crescimento_percentual': 4.5,
+        'taxa_penetracao': 82.1,
+        'market_share': {'Orange': 55.0, 'TELECEL': 45.0},
+    },
+    'receitas': {
+        'por_operadora': {'Orange': 1000, 'TELECEL': 800},
+        'quota_receitas': {'Orange': 55.6, 'TELECEL': 44.4},
+    },
+}
+
+
+class ExportServiceTests(TestCase):
+    """CSV gerado linha a linha e Excel em modo write-only com larguras calculadas dos dados."""
+
+    def test_csv_is_streamed_row_by_row(self):
+        service = ARNExportService(REPORT_DATA, 2024, 'market')
+        response = streaming_csv_response(service.csv_rows(), 'relatorio.csv')
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content, service.export_to_csv())
+        self.assertIn('Orange,1000,55.6%', content)
+
+    def test_excel_is_written_in_write_only_mode(self):
+        workbook = load_workbook(BytesIO(ARNExportService(REPORT_DATA, 2024, 'market').export_to_excel()))
+        self.assertEqual(workbook.sheetnames, ['Panorama Geral', 'Receitas'])
+        panorama = workbook['Panorama Geral']
+        self.assertEqual(panorama['A1'].value, 'Relatório de Mercado - 2024')
+        self.assertEqual(panorama['B3'].value, 1500000)
+        # Larguras calculadas a partir dos dados (o título não conta)
+        self.assertEqual(panorama.column_dimensions['A'].width, len('Total de Assinantes') + 2)
+        receitas = workbook['Receitas']
+        self.assertTrue(receitas['A3'].font.bold)
+        self.assertEqual([c.value for c in receitas[4]], ['Orange', 1000, '55.6%'])
+
+    def test_column_widths_are_capped(self):
+        self.assertEqual(column_widths([['x' * 80, 12], [None, 123456]]), {1: 50, 2: 8})
+
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ReportArtifactTests(TestCase):
+    """Relatórios gerados em segundo plano e servidos do disco enquanto os dados não mudarem."""
+
+    def setUp(self):
+        # Cache própria dos testes, com um run_report_worker simulado
+        cache.clear()
+        worker_heartbeat(60)
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        override = override_settings(REPORT_ARTIFACT_ROOT=pasta.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(User.objects.create_user('analista', is_staff=True))
+        self.url = reverse('dashboard:export-report-new', args=['comparative', 'csv'])
+
+    def export(self):
+        return self.client.get(self.url, {'year': 2024}, secure=True)
+
+    def test_artifact_is_rendered_once_and_served_from_disk(self):
+        response = self.export()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['status'], 'pending')
+        self.assertEqual(run_pending_reports(), 1)
+
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Comparação entre Operadoras', b''.join(response.streaming_content).decode())
+        self.assertEqual(self.export().status_code, 200)
+        self.assertEqual(GeneratedReport.objects.count(), 1)
+        self.assertEqual(run_pending_reports(), 0)
+
+        report = GeneratedReport.objects.get()
+        status = self.client.get(reverse('dashboard:report-artifact-status', args=[report.pk]), secure=True).json()
+        self.assertEqual(status['status'], 'completed')
+        self.assertEqual(status['download_url'], reverse('dashboard:report-artifact-download', args=[report.pk]))
+
+    def test_data_change_renders_new_artifact(self):
+        self.export()
+        run_pending_reports()
+        antigo = GeneratedReport.objects.get()
+
+        bump_version(ReceitasIndicador)
+        self.assertEqual(self.export().status_code, 202)
+        run_pending_reports()
+        self.assertEqual(self.export().status_code, 200)
+
+        novo = GeneratedReport.objects.exclude(pk=antigo.pk).get()
+        self.assertNotEqual(novo.chave, antigo.chave)
+        self.assertFalse(os.path.exists(antigo.arquivo_path))
+        antigo.refresh_from_db()
+        self.assertEqual(antigo.arquivo_path, '')
+
+    def test_head_does_not_queue_a_report(self):
+        self.assertEqual(self.client.head(self.url, {'year': 2024}, secure=True).status_code, 202)
+        self.assertFalse(GeneratedReport.objects.exists())
+
+        self.export()
+        run_pending_reports()
+        self.assertEqual(self.client.head(self.url, {'year': 2024}, secure=True).status_code, 200)
+        self.assertEqual(GeneratedReport.objects.count(), 1)
+
+    def test_renders_in_request_without_worker(self):
+        cache.delete(WORKER_HEARTBEAT_KEY)
+        response = self.export()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Comparação entre Operadoras', b''.join(response.streaming_content).decode())
+        self.assertEqual(GeneratedReport.objects.get().status, 'completed')
+
+
+class ReportScheduleTests(TestCase):
+    """Agendamentos devidos geram cada relatório uma vez e avançam proximo_envio."""
+
+    def setUp(self):
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        override = override_settings(REPORT_ARTIFACT_ROOT=pasta.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.template = ReportTemplate.objects.create(nome='Mercado', tipo='mercado', formato='excel')
+
+    def schedule(self, nome, proximo_envio, frequencia='monthly', **kwargs):
+        return ReportSchedule.objects.create(
+            template=self.template, nome=nome, frequencia=frequencia, hora=time(8, 0),
+            destinatarios=[f'{nome}@arn.gw'], proximo_envio=proximo_envio, **kwargs,
+        )
+
+    def test_due_schedules_share_one_rendering(self):
+        agora = timezone.now()
+        devidos = [self.schedule(f'analista{i}', agora - timedelta(minutes=i)) for i in range(3)]
+        futuro = self.schedule('futuro', agora + timedelta(days=1))
+
+        resumo = run_due_schedules(now=agora, workers=1)
+        self.assertEqual(resumo, {'agendamentos': 3, 'relatorios': 1, 'gerados': 1, 'entregues': 3, 'falhas': 0})
+        self.assertEqual(GeneratedReport.objects.count(), 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].attachments[0][0], f'relatorio_mercado_{timezone.localtime(agora).year}.xlsx')
+        for schedule in devidos:
+            schedule.refresh_from_db()
+            self.assertGreater(schedule.proximo_envio, agora)
+        futuro.refresh_from_db()
+        self.assertIsNone(futuro.ultimo_envio)
+
+        self.assertEqual(run_due_schedules(now=agora, workers=1)['agendamentos'], 0)
+
+    def test_next_run_clamps_month_end_and_skips_missed_runs(self):
+        tz = timezone.get_current_timezone()
+        mensal = self.schedule('mensal', datetime(2025, 1, 31, 8, 0, tzinfo=tz), dia_mes=31)
+        self.assertEqual(next_run(mensal, datetime(2025, 2, 1, tzinfo=tz)), datetime(2025, 2, 28, 8, 0, tzinfo=tz))
+        diario = self.schedule('diario', datetime(2025, 3, 1, 8, 0, tzinfo=tz), frequencia='daily')
+        self.assertEqual(next_run(diario, datetime(2025, 3, 10, 9, 0, tzinfo=tz)), datetime(2025, 3, 11, 8, 0, tzinfo=tz))
+
+    def test_month_end_day_does_not_drift_without_dia_mes(self):
+        tz = timezone.get_current_timezone()
+        mensal = self.schedule('mensal', datetime(2025, 1, 31, 8, 0, tzinfo=tz))
+        for agora, esperado in (
+            (datetime(2025, 2, 1, tzinfo=tz), datetime(2025, 2, 28, 8, 0, tzinfo=tz)),
+            (datetime(2025, 3, 1, tzinfo=tz), datetime(2025, 3, 31, 8, 0, tzinfo=tz)),
+            (datetime(2025, 4, 1, tzinfo=tz), datetime(2025, 4, 30, 8, 0, tzinfo=tz)),
+        ):
+            self.assertEqual([s.pk for s in claim_due_schedules(now=agora)], [mensal.pk])
+            mensal.refresh_from_db()
+            self.assertEqual((mensal.proximo_envio, mensal.dia_mes), (esperado, 31))
+
+
+class AlertEngineTests(TestCase):
+    """Alertas compilados avaliados apenas para o indicador e os períodos alterados."""
+
+    def alerta(self, tipo, condicao, indicador='assinantesindicador.assinantes_pre_pago'):
+        return ReportAlert.objects.create(nome=tipo, tipo=tipo, indicador=indicador, condicao=condicao)
+
+    def test_changes_trigger_only_affected_alerts(self):
+        self.alerta('threshold', {'operador': '>', 'valor': 240})
+        self.alerta('variation', {'operadora': 'orange', 'percentual': 20, 'direcao': 'subida'})
+        self.alerta('share', {'operadora': 'telecel', 'operador': '<', 'valor': 45})
+        self.alerta('anomaly', {'operadora': 'orange', 'desvios': 3, 'meses': 5})
+        outro = self.alerta('threshold', {'valor': 0}, indicador='empregoindicador.emprego_direto_total')
+
+        serie = {'orange': [100, 102, 98, 101, 99, 150], 'telecel': [100] * 6}
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_upsert(AssinantesIndicador, [
+                {'operadora': operadora, 'ano': 2024, 'mes': mes, 'assinantes_pre_pago': valores[mes - 1]}
+                for operadora, valores in serie.items() for mes in range(1, 7)
+            ])
+        disparos = ReportAlertHistory.objects.order_by('alerta__tipo')
+        self.assertEqual([(h.alerta.tipo, h.mes) for h in disparos],
+                         [('anomaly', 6), ('share', 6), ('threshold', 6), ('variation', 6)])
+        self.assertEqual(disparos.get(alerta__tipo='share').valor, 40.0)
+        outro.refresh_from_db()
+        self.assertIsNone(outro.ultima_verificacao)
+
+        # Só o total do mercado muda: a quota deixa de disparar e os valores repetidos não são gravados
+        registo = AssinantesIndicador.objects.get(operadora='telecel', ano=2024, mes=6)
+        registo.assinantes_pre_pago = 150
+        with self.captureOnCommitCallbacks(execute=True):
+            registo.save()
+        novos = ReportAlertHistory.objects.exclude(pk__in=[h.pk for h in disparos])
+        self.assertEqual([(h.alerta.tipo, h.valor) for h in novos], [('threshold', 300.0)])
+
+    def test_index_recompiles_when_alerts_change(self):
+        invalido = self.alerta('threshold', {'valor': 1}, indicador='assinantesindicador.inexistente')
+        self.assertNotIn('assinantesindicador', alert_index.get())
+        invalido.indicador = 'assinantesindicador.assinantes_pre_pago'
+        invalido.save()
+        [compilado] = alert_index.get()['assinantesindicador']
+        self.assertEqual((compilado.pk, compilado.campo), (invalido.pk, 'assinantes_pre_pago'))
+
+
+
+class IntentEngineTests(TestCase):
+    """Autómato de intenções compilado dos padrões incorporados e das ChatIntent ativas."""
+
+    def test_matches_builtin_pattern_scores(self):
+        matcher = build_matcher(INTENT_PATTERNS)
+        self.assertEqual(
+            matcher.scores('Comparar o volume de chamadas on-net da TELECEL vs Orange'),
+            {'analise_trafego': 3, 'comparacao_operadores': 3},
+        )
+        self.assertEqual(matcher.classify('Qual o número de assinantes móveis?'), ('consulta_assinantes', 1.0))
+        self.assertEqual(matcher.classify('Preciso de ajuda'), ('nao_entendido', 0.0))
+        self.assertEqual(
+            intent_engine.extract_entities('Assinantes da antiga  Telecel no 2º trimestre do ano passado', 2025),
+            {'operadora': 'TELECEL', 'ano': 2024, 'trimestre': 2},
+        )
+
+    def test_chat_intents_reload_matcher(self):
+        self.assertEqual(intent_engine.classify('Olá, bom dia'), ('nao_entendido', 0.0))
+        intencao = ChatIntent.objects.create(
+            nome='saudacao', tipo='saudacao', palavras_chave=['olá', 'bom dia'], template_resposta='Olá!',
+            confianca_minima=0.9,
+        )
+        self.assertEqual(intent_engine.classify('Olá, bom dia'), ('saudacao', 2 / 3))
+        # Abaixo da confiança mínima, a saudação só ganha se nenhuma outra intenção a atingir
+        self.assertEqual(intent_engine.classify('Olá, bom dia. Quantos?'), ('consulta_assinantes', 1 / 3))
+        intencao.delete()
+        self.assertEqual(intent_engine.classify('Olá, bom dia')[0], 'nao_entendido')
+
+    def test_only_intents_with_a_response_are_scored(self):
+        for tipo, palavras in (('despedida', ['obrigado', 'até logo']), ('emprego', ['emprego', 'trabalhadores'])):
+            ChatIntent.objects.create(nome=tipo, tipo=tipo, palavras_chave=palavras, template_resposta='-')
+
+        self.assertEqual(intent_engine.classify('Obrigado, até logo')[0], 'despedida')
+        self.assertEqual(intent_engine.classify('Dados de emprego')[0], 'nao_entendido')
+
+        assistente = ARNAssistantService()
+        self.assertIn('Até breve', assistente.gerar_resposta('despedida', {}, {})['texto'])
+        self.assertIn('não entendi', assistente.gerar_resposta('nao_entendido', {}, {})['texto'])
+
+
+class QueryCacheTests(TestCase):
+    """Cache de consultas do assistente: LRU local, tabela ARNQueryCache, expiração e acessos."""
+
+    def setUp(self):
+        query_cache.clear()
+
+    def expire(self, key, seconds):
+        ARNQueryCache.objects.filter(query_hash=hash_key(key)).update(
+            timestamp=timezone.now() - timedelta(seconds=seconds),
+        )
+        query_cache.local.clear()
+
+    def test_hit_miss_and_expiry(self):
+        self.assertIsNone(ARNQueryCache.get_cached('assinantes:2024'))
+        ARNQueryCache.set_cache('assinantes:2024', {'total': 10}, validade=60)
+        with self.assertNumQueries(0):
+            self.assertEqual(ARNQueryCache.get_cached('assinantes:2024'), {'total': 10})
+        query_cache.local.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(ARNQueryCache.get_cached('assinantes:2024'), {'total': 10})
+
+        ARNQueryCache.set_cache('receitas:2024', {'total': 5}, validade=60)
+        self.expire('assinantes:2024', 120)
+        self.assertIsNone(ARNQueryCache.get_cached('assinantes:2024'))
+        self.assertEqual(query_cache.purge_expired(), 1)
+        self.assertEqual(
+            list(ARNQueryCache.objects.values_list('query_hash', flat=True)), [hash_key('receitas:2024')],
+        )
+
+    def test_hits_are_flushed_in_batch(self):
+        ARNQueryCache.set_cache('trafego:2024', [1, 2], validade=60)
+        query_cache.flush_hits()
+        for _ in range(3):
+            ARNQueryCache.get_cached('trafego:2024')
+        query_cache.flush_hits()
+        self.assertEqual(ARNQueryCache.objects.get(query_hash=hash_key('trafego:2024')).hits, 4)
+
+    def test_lru_eviction_order(self):
+        lru = LocalLRU(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+        self.assertEqual((lru.get('a'), lru.get('b'), lru.get('c')), (1, None, 3))
+
+        agora = timezone.now()
+        for i, key in enumerate(('antiga', 'recente', 'media')):
+            ARNQueryCache.set_cache(key, i, validade=60)
+        for key, minutos in (('antiga', 30), ('recente', 1), ('media', 10)):
+            ARNQueryCache.objects.filter(query_hash=hash_key(key)).update(
+                ultimo_acesso=agora - timedelta(minutes=minutos),
+            )
+        self.assertEqual(query_cache.enforce_limit(2), 1)
+        self.assertFalse(ARNQueryCache.objects.filter(query_hash=hash_key('antiga')).exists())
+
+    def test_purge_command(self):
+        for key in ('a', 'b', 'c'):
+            ARNQueryCache.set_cache(key, key, validade=60)
+        self.expire('a', 120)
+        out = StringIO()
+        call_command('purge_query_cache', '--max-entries', '1', stdout=out)
+        self.assertIn('1 entradas expiradas e 1 excedentes removidas', out.getvalue())
+        self.assertEqual(ARNQueryCache.objects.count(), 1)
+
+        call_command('purge_query_cache', '--all', stdout=StringIO())
+        self.assertFalse(ARNQueryCache.objects.exists())
+        self.assertIsNone(ARNQueryCache.get_cached('b'))
@@ -40,6 +40,8 @@ urlpatterns = [
     # ===== EXPORTAÇÃO DE RELATÓRIOS =====
     path('reports/export/<str:report_type>/<str:format_type>/', export_views.ExportReportView.as_view(), name='export-report-new'),
     path('reports/quick-export/', export_views.QuickExportView.as_view(), name='quick-export'),
+    path('reports/artifacts/<int:pk>/', export_views.ReportArtifactStatusView.as_view(), name='report-artifact-status'),
+    path('reports/artifacts/<int:pk>/download/', export_views.ReportArtifactDownloadView.as_view(), name='report-artifact-download'),
     
     # ===== ANÁLISES AVANÇADAS (PRIORIDADE 1) =====
     # Dashboard consolidado
@@ -46,29 +46,10 @@ class ARNReportGenerator:
     
     def _calcular_receita_total_expression(self):
         """
-        Retorna expressão F() para calcular receita total.
-        Método helper para evitar repetição de código.
+        Retorna a soma da receita total usando a expressão do registo
+        CALCULATION_FIELDS (mesma semântica de calcular_total_receitas).
         """
-        return Sum(
-            F('receitas_mensalidades') +
-            F('receitas_chamadas_on_net') +
-            F('receitas_chamadas_off_net') +
-            F('receitas_chamadas_telecel') +
-            F('receitas_chamadas_rede_movel_b') +
-            F('receitas_servico_telefonico_fixo') +
-            F('receitas_chamadas_cedeao') +
-            F('receitas_chamadas_cplp') +
-            F('receitas_chamadas_palop') +
-            F('receitas_chamadas_resto_africa') +
-            F('receitas_chamadas_resto_mundo') +
-            F('receitas_voz_roaming_out') +
-            F('receitas_mensagens') +
-            F('receitas_dados_moveis') +
-            F('receitas_internet_banda_larga') +
-            F('outras_receitas_retalhistas') +
-            F('receitas_terminacao_voz') +
-            F('outras_receitas_grossistas')
-        )
+        return Sum(ReceitasIndicador.get_calculation_expression('calcular_total_receitas'))
         
     def generate_market_report(self):
         """Gera relatório completo do mercado"""
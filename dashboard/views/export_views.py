@@ -4,11 +4,26 @@ Views para exportação de relatórios em PDF, Excel e CSV
 """
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views import View
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
 
-from ..utils.report_generator import ARNReportGenerator
-from ..services.export_service import ARNExportService
+from ..models import GeneratedReport
+from ..services.report_artifacts import (
+    ArtifactError, artifact_response, find_artifact, is_ready, render_if_no_worker, report_status, request_artifact,
+)
+
+
+def artifact_or_pending_response(report):
+    """
+    Envia o ficheiro já gerado; senão 202 com o estado do relatório (gerado pelo run_report_worker).
+
+    Sem worker ativo, o relatório é gerado no próprio pedido.
+    """
+    response = artifact_response(render_if_no_worker(report))
+    if response is not None:
+        return response
+    return JsonResponse(report_status(report), status=202, json_dumps_params={'ensure_ascii': False})
 
 
 class ExportReportView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -21,67 +36,57 @@ class ExportReportView(LoginRequiredMixin, UserPassesTestMixin, View):
         """
         Exporta relatório no formato solicitado
         
+        Enquanto os dados não mudarem, o ficheiro gerado anteriormente é
+        enviado diretamente; caso contrário é agendada a geração (resposta 202
+        com ``status_url`` para acompanhar o relatório).
+        
         Args:
             report_type: 'market', 'executive', 'comparative'
             format_type: 'pdf', 'excel', 'csv'
         """
         year = int(request.GET.get('year', timezone.now().year))
         
-        # Gerar dados do relatório
-        generator = ARNReportGenerator(year=year)
-        
-        if report_type == 'market':
-            report_data = generator.generate_market_report()
-            filename = f'relatorio_mercado_{year}'
-        elif report_type == 'executive':
-            report_data = generator.generate_dashboard_data()
-            filename = f'dashboard_executivo_{year}'
-        elif report_type == 'comparative':
-            report_data = generator.generate_comparative_report()
-            filename = f'analise_comparativa_{year}'
-        else:
-            return HttpResponse('Tipo de relatório inválido', status=400)
+        try:
+            report = request_artifact(report_type, format_type, year, request.user)
+        except ArtifactError as e:
+            return HttpResponse(str(e), status=400)
         
-        # Criar serviço de exportação
-        export_service = ARNExportService(report_data, year, report_type)
-        
-        # Exportar no formato solicitado
-        if format_type == 'pdf':
-            try:
-                content = export_service.export_to_pdf()
-                content_type = 'application/pdf'
-                file_extension = 'pdf'
-            except Exception as e:
-                return HttpResponse(f'Erro ao gerar PDF: {str(e)}', status=500)
-        
-        elif format_type == 'excel':
-            try:
-                content = export_service.export_to_excel()
-                content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-                file_extension = 'xlsx'
-            except ImportError:
-                return HttpResponse(
-                    'openpyxl não está instalado. Execute: pip install openpyxl',
-                    status=500
-                )
-            except Exception as e:
-                return HttpResponse(f'Erro ao gerar Excel: {str(e)}', status=500)
-        
-        elif format_type == 'csv':
-            try:
-                content = export_service.export_to_csv()
-                content_type = 'text/csv'
-                file_extension = 'csv'
-            except Exception as e:
-                return HttpResponse(f'Erro ao gerar CSV: {str(e)}', status=500)
-        
-        else:
-            return HttpResponse('Formato de exportação inválido', status=400)
+        return artifact_or_pending_response(report)
+    
+    def head(self, request, report_type, format_type):
+        """200 se o ficheiro já estiver gerado, 202 caso contrário (sem agendar a geração)"""
+        year = int(request.GET.get('year', timezone.now().year))
         
-        # Preparar resposta HTTP
-        response = HttpResponse(content, content_type=content_type)
-        response['Content-Disposition'] = f'attachment; filename="{filename}.{file_extension}"'
+        try:
+            report = find_artifact(report_type, format_type, year)
+        except ArtifactError as e:
+            return HttpResponse(str(e), status=400)
         
+        return HttpResponse(status=200 if report is not None and is_ready(report) else 202)
+
+
+class ReportArtifactStatusView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Estado de um relatório em geração (JSON, consultado periodicamente)"""
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get(self, request, pk):
+        report = get_object_or_404(GeneratedReport, pk=pk)
+        return JsonResponse(report_status(report), json_dumps_params={'ensure_ascii': False})
+
+
+class ReportArtifactDownloadView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Download do ficheiro de um relatório já gerado"""
+    
+    def test_func(self):
+        return self.request.user.is_staff
+    
+    def get(self, request, pk):
+        report = get_object_or_404(GeneratedReport, pk=pk)
+        response = artifact_response(report)
+        if response is None:
+            return JsonResponse(report_status(report), status=404, json_dumps_params={'ensure_ascii': False})
         return response
 
 
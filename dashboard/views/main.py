@@ -18,6 +18,8 @@ from questionarios.models import (
     EmpregoIndicador,
     InvestimentoIndicador
 )
+from questionarios.services import cobertura
+
 class DashboardView(LoginRequiredMixin, TemplateView):
    template_name = 'dashboard/home.html'
    
@@ -48,25 +50,28 @@ class DashboardView(LoginRequiredMixin, TemplateView):
            return self.get_admin_stats()
        return self.get_operator_stats()
 
+   def get_operator_code(self):
+       """Código da operadora do utilizador (username igual ao código), se existir."""
+       username = (self.request.user.username or '').lower()
+       return username if username in cobertura.default_operadoras() else None
+
    def get_operator_stats(self):
-       operator = self.request.user
        current_month = timezone.now().month
        current_year = timezone.now().year
-       
-       # Verificar se usuário tem submissões pendentes
-       pending_submissions = 0
-       for model in self.INDICATOR_MODELS:
-           if hasattr(model, 'operadora'):
-               exists = model.objects.filter(
-                   mes=current_month,
-                   ano=current_year
-               ).exists()
-               if not exists:
-                   pending_submissions += 1
+       operadora = self.get_operator_code()
+
+       # Indicadores sem submissão no mês corrente (uma consulta ao índice de cobertura)
+       submetidos = cobertura.submitted_periods(
+           current_year,
+           operadoras=[operadora] if operadora else None,
+           indicadores=self.INDICATOR_MODELS,
+           meses=[current_month],
+       )
+       pending_submissions = len(self.INDICATOR_MODELS) - len({periodo[0] for periodo in submetidos})
 
        return {
            'pending_submissions': pending_submissions,
-           'last_submission': self.get_last_submission_date(operator),
+           'last_submission': self.get_last_submission_date(operadora),
            'license_status': 'Válida'  # Placeholder - implementar lógica real quando necessário
        }
 
@@ -76,40 +81,23 @@ class DashboardView(LoginRequiredMixin, TemplateView):
        current_month = timezone.now().month
        current_year = timezone.now().year
 
-       monthly_submissions = sum([
-           model.objects.filter(
-               mes=current_month,
-               ano=current_year
-           ).count()
-           for model in self.INDICATOR_MODELS
-       ])
+       conformidade = cobertura.compliance_rate(
+           current_year, meses=[current_month], indicadores=self.INDICATOR_MODELS
+       )
 
        # Placeholder para aprovações pendentes
        pending_approvals = 0
 
-       expected_submissions = total_operators * len(self.INDICATOR_MODELS)
-       compliance_rate = (monthly_submissions / expected_submissions * 100) if expected_submissions > 0 else 0
-
        return {
            'total_operators': total_operators,
-           'monthly_submissions': monthly_submissions,
+           'monthly_submissions': conformidade['submetidas'],
            'pending_approvals': pending_approvals,
-           'compliance_rate': round(compliance_rate, 1)
+           'compliance_rate': conformidade['taxa']
        }
 
    def get_recent_activities(self):
        # Implement based on your activity tracking
        return []
 
-   def get_last_submission_date(self, operator):
-       dates = []
-       
-       for model in self.INDICATOR_MODELS:
-           latest = model.objects.filter(
-               operadora=operator
-           ).order_by('-data_criacao').first()
-           
-           if latest:
-               dates.append(latest.data_criacao)
-       
-       return max(dates) if dates else None
\ No newline at end of file
+   def get_last_submission_date(self, operadora=None):
+       return cobertura.last_submission(operadora, indicadores=self.INDICATOR_MODELS)
@@ -19,7 +19,10 @@ from questionarios.models import (
 
 from dashboard.models import ReportTemplate, GeneratedReport, ReportSchedule
 from ..utils.report_generator import ARNReportGenerator
-from ..services.export_service import ARNExportService
+from ..services.report_artifacts import ARTIFACT_FORMATS, ArtifactError, request_artifact
+from .export_views import artifact_or_pending_response
+from questionarios.services import cobertura
+from questionarios.services.result_cache import CachedContextMixin
 
 class ReportsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
    template_name = 'dashboard/reports.html'
@@ -118,15 +121,8 @@ class ReportsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
        }
 
    def get_available_years(self):
-       years = set()
-       models = [
-           EstacoesMoveisIndicador,
-           TrafegoOriginadoIndicador,
-           ReceitasIndicador
-       ]
-       for model in models:
-           years.update(model.objects.values_list('ano', flat=True).distinct())
-       return sorted(years, reverse=True)
+       anos = cobertura.available_years([EstacoesMoveisIndicador, TrafegoOriginadoIndicador, ReceitasIndicador])
+       return sorted(anos, reverse=True)
 
    def calcular_crescimento(self, model, year, field):
        ano_atual = model.objects.filter(ano=year).aggregate(total=Sum(field))['total'] or 0
@@ -209,7 +205,7 @@ class ExportReportView(LoginRequiredMixin, UserPassesTestMixin, View):
 
 # ===== NOVAS VIEWS COM SISTEMA DE RELATÓRIOS ARN =====
 
-class MarketReportView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+class MarketReportView(LoginRequiredMixin, UserPassesTestMixin, CachedContextMixin, TemplateView):
     """Relatório completo do mercado de telecomunicações"""
     template_name = 'dashboard/reports/market_report.html'
     
@@ -235,13 +231,8 @@ class MarketReportView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     
     def get_available_years(self):
         """Anos disponíveis nos dados"""
-        years = set()
-        models = [AssinantesIndicador, ReceitasIndicador, TrafegoOriginadoIndicador]
-        
-        for model in models:
-            years.update(model.objects.values_list('ano', flat=True).distinct())
-        
-        return sorted(years, reverse=True)
+        anos = cobertura.available_years([AssinantesIndicador, ReceitasIndicador, TrafegoOriginadoIndicador])
+        return sorted(anos, reverse=True)
     
     def get_chart_configurations(self, data):
         """Configurações dos gráficos para o template"""
@@ -275,7 +266,7 @@ class DashboardExecutiveView(LoginRequiredMixin, UserPassesTestMixin, TemplateVi
         
         return context
 
-class ComparativeReportView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
+class ComparativeReportView(LoginRequiredMixin, UserPassesTestMixin, CachedContextMixin, TemplateView):
     """Análise comparativa entre operadoras"""
     template_name = 'dashboard/reports/comparative_report.html'
     
@@ -299,13 +290,8 @@ class ComparativeReportView(LoginRequiredMixin, UserPassesTestMixin, TemplateVie
     
     def get_available_years(self):
         """Anos disponíveis nos dados"""
-        years = set()
-        models = [AssinantesIndicador, ReceitasIndicador]
-        
-        for model in models:
-            years.update(model.objects.values_list('ano', flat=True).distinct())
-        
-        return sorted(years, reverse=True)
+        anos = cobertura.available_years([AssinantesIndicador, ReceitasIndicador])
+        return sorted(anos, reverse=True)
 
 class ReportAPIView(LoginRequiredMixin, UserPassesTestMixin, View):
     """API para dados dos relatórios (para gráficos dinâmicos)"""
@@ -343,6 +329,14 @@ class GenerateReportView(LoginRequiredMixin, UserPassesTestMixin, View):
             year = int(request.POST.get('year', timezone.now().year))
             format_type = request.POST.get('format', 'json')
             
+            # Ficheiros (PDF/Excel/CSV): arquivo de relatórios gerados em segundo plano
+            if format_type in ARTIFACT_FORMATS:
+                try:
+                    report = request_artifact(report_type, format_type, year, request.user)
+                except ArtifactError as e:
+                    return JsonResponse({'error': str(e)}, status=400)
+                return artifact_or_pending_response(report)
+            
             # Gerar dados
             generator = ARNReportGenerator(year=year)
             
@@ -370,48 +364,14 @@ class GenerateReportView(LoginRequiredMixin, UserPassesTestMixin, View):
                 completed_at=timezone.now()
             )
             
-            # Retornar dados baseado no formato
-            if format_type == 'csv':
-                return self.export_csv(data, title)
-            elif format_type == 'excel':
-                return self.export_excel(data, title)
-            else:
-                return JsonResponse({
-                    'success': True,
-                    'report_id': generated_report.id,
-                    'data': data
-                }, json_dumps_params={'ensure_ascii': False})
+            return JsonResponse({
+                'success': True,
+                'report_id': generated_report.id,
+                'data': data
+            }, json_dumps_params={'ensure_ascii': False})
                 
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
-    
-    def export_csv(self, data, title):
-        """Exportar para CSV"""
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
-        response['Content-Disposition'] = f'attachment; filename="{title}.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([title])
-        writer.writerow(['Gerado em:', timezone.now().strftime('%d/%m/%Y %H:%M')])
-        writer.writerow([])  # Linha vazia
-        
-        # Escrever dados de forma simples
-        if isinstance(data, dict):
-            for key, value in data.items():
-                writer.writerow([key, str(value)])
-        elif isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict):
-                    writer.writerow(item.values())
-                else:
-                    writer.writerow([item])
-        
-        return response
-    
-    def export_excel(self, data, title):
-        """Exportar para Excel (implementação futura)"""
-        # Implementar com openpyxl quando necessário
-        return JsonResponse({'error': 'Exportação Excel em desenvolvimento'}, status=501)
 
 class ReportHistoryView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     """Histórico de relatórios gerados"""
@@ -3,4 +3,9 @@ from django.apps import AppConfig
 
 class HomeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'home' 
\ No newline at end of file
+    name = 'home'
+
+    def ready(self):
+        # Regista o check do tier de cache e reporta o tier ativo no arranque
+        from observatorio.cache import log_cache_tier
+        log_cache_tier()
@@ -0,0 +1,126 @@
+"""
+Tier de cache partilhado do Observatório.
+
+Todas as funcionalidades de cache da aplicação (histórico do chatbot, cache
+de resultados das análises, contadores) usam ``django.core.cache.cache``,
+configurado em ``settings.CACHES`` a partir de ``CACHE_BACKEND``:
+
+- ``file`` (padrão): ficheiros em disco partilhados por todos os workers do
+  mesmo servidor, sem serviços externos, com limite de entradas e remoção
+  das menos usadas recentemente (LRUFileBasedCache).
+- ``redis``: RedisCache do Django em ``REDIS_URL`` (partilhado entre servidores).
+- ``locmem``: memória do processo; apenas para desenvolvimento/testes.
+"""
+import logging
+import os
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.checks import Info, Tags, Warning, register
+
+logger = logging.getLogger('observatorio')
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """
+    FileBasedCache com remoção LRU.
+
+    Cada leitura com sucesso atualiza o mtime do ficheiro; quando o número de
+    entradas atinge MAX_ENTRIES, é removida a fração 1/CULL_FREQUENCY das
+    entradas com acesso mais antigo (em vez de uma amostra aleatória).
+    """
+
+    _sentinel = object()
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, self._sentinel, version)
+        if value is self._sentinel:
+            return default
+        try:
+            os.utime(self._key_to_file(key, version), None)
+        except OSError:
+            pass
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+
+        def last_access(fname):
+            try:
+                return os.path.getmtime(fname)
+            except OSError:
+                return 0
+
+        filelist.sort(key=last_access)
+        for fname in filelist[:int(num_entries / self._cull_frequency)]:
+            self._delete(fname)
+
+
+TIER_BY_BACKEND = {
+    'observatorio.cache.LRUFileBasedCache': ('file', True),
+    'django.core.cache.backends.filebased.FileBasedCache': ('file', True),
+    'django.core.cache.backends.redis.RedisCache': ('redis', True),
+    'django_redis.cache.RedisCache': ('redis', True),
+    'django.core.cache.backends.db.DatabaseCache': ('database', True),
+    'django.core.cache.backends.memcached.PyMemcacheCache': ('memcached', True),
+    'django.core.cache.backends.locmem.LocMemCache': ('locmem', False),
+    'django.core.cache.backends.dummy.DummyCache': ('dummy', False),
+}
+
+
+def describe_cache_tier(alias='default'):
+    """Descreve o tier de cache ativo: tipo, backend, localização e se é partilhado."""
+    config = settings.CACHES.get(alias, {})
+    backend = config.get('BACKEND', 'django.core.cache.backends.locmem.LocMemCache')
+    tier, shared = TIER_BY_BACKEND.get(backend, ('custom', True))
+    location = config.get('LOCATION', '')
+    if tier == 'redis' and '@' in str(location):
+        # Não expor credenciais do URL
+        location = str(location).split('@', 1)[1]
+    return {
+        'tier': tier,
+        'backend': backend,
+        'location': str(location),
+        'shared': shared,
+        'max_entries': config.get('OPTIONS', {}).get('MAX_ENTRIES'),
+    }
+
+
+@register(Tags.caches)
+def check_cache_tier(app_configs, **kwargs):
+    """Check de arranque que reporta o tier de cache ativo."""
+    info = describe_cache_tier()
+    message = f"Cache ativa: tier '{info['tier']}' ({info['backend']}) em '{info['location']}'."
+    requested = getattr(settings, 'CACHE_BACKEND_REQUESTED', None)
+    if requested and requested != getattr(settings, 'CACHE_BACKEND', requested):
+        message += f" CACHE_BACKEND='{requested}' não está disponível; a usar '{settings.CACHE_BACKEND}'."
+    messages = [Info(message, id='observatorio.I001')]
+    if not info['shared'] and not settings.DEBUG:
+        messages.append(Warning(
+            "A cache não é partilhada entre processos: cada worker terá a sua própria cópia.",
+            hint="Defina CACHE_BACKEND=file ou CACHE_BACKEND=redis com REDIS_URL.",
+            id='observatorio.W001',
+        ))
+    if info['tier'] == 'file':
+        location = info['location']
+        parent = location if os.path.isdir(location) else os.path.dirname(location.rstrip(os.sep))
+        if not os.access(parent or '.', os.W_OK):
+            messages.append(Warning(
+                f"Diretório da cache sem permissão de escrita: {location}",
+                hint="Ajuste CACHE_DIR para um diretório partilhado e gravável.",
+                id='observatorio.W002',
+            ))
+    return messages
+
+
+def log_cache_tier():
+    info = describe_cache_tier()
+    logger.info(
+        f"Cache: tier={info['tier']} backend={info['backend']} "
+        f"location={info['location']} partilhada={info['shared']}"
+    )
@@ -90,6 +90,22 @@ def health_check_detailed(request):
         'configured': hf_configured
     }
     
+    # Check 7: Cache partilhada
+    from django.core.cache import cache
+    from .cache import describe_cache_tier
+    cache_info = describe_cache_tier()
+    try:
+        cache.set('health:ping', 1, 10)
+        cache_ok = cache.get('health:ping') == 1
+    except Exception:
+        cache_ok = False
+    health_status['checks']['cache'] = {
+        'status': 'healthy' if cache_ok and cache_info['shared'] else 'warning',
+        'tier': cache_info['tier'],
+        'shared': cache_info['shared'],
+        'reachable': cache_ok
+    }
+    
     # Status HTTP baseado nos checks
     status_code = 200 if health_status['status'] == 'healthy' else 503
     
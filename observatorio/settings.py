@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -106,9 +107,82 @@ DATABASES = {
     }
 }
 
+# Cache Configuration
+# Tier partilhado por todos os workers (ver observatorio/cache.py):
+#   file   - ficheiros em disco com limite de tamanho e remoção LRU (padrão, sem serviços externos)
+#   redis  - Redis em REDIS_URL (requer o pacote redis)
+#   locmem - memória do processo (apenas desenvolvimento)
+# Também aceita o caminho completo de um backend (ex.: django_redis.cache.RedisCache).
+REDIS_URL = os.getenv('REDIS_URL')
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'redis' if REDIS_URL else 'file')
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'observatorio_cache'))
+CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))
+CACHE_CULL_FREQUENCY = int(os.getenv('CACHE_CULL_FREQUENCY', 4))
+CACHE_DEFAULT_TIMEOUT = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
+# Valor pedido; difere de CACHE_BACKEND quando se recorre ao tier em ficheiros (check observatorio.I001)
+CACHE_BACKEND_REQUESTED = CACHE_BACKEND
+
+if CACHE_BACKEND == 'redis' or '.' in CACHE_BACKEND:
+    if CACHE_BACKEND == 'redis':
+        try:
+            import redis  # noqa: F401
+            _cache_backend = 'django.core.cache.backends.redis.RedisCache'
+        except ImportError:
+            _cache_backend = None
+    else:
+        _cache_backend = CACHE_BACKEND
+    if _cache_backend and REDIS_URL:
+        CACHES = {
+            'default': {
+                'BACKEND': _cache_backend,
+                'LOCATION': REDIS_URL,
+                'TIMEOUT': CACHE_DEFAULT_TIMEOUT,
+                'KEY_PREFIX': 'observatorio',
+            }
+        }
+    else:
+        # Redis pedido mas indisponível: recorrer ao tier em ficheiros
+        CACHE_BACKEND = 'file'
+elif CACHE_BACKEND not in ('locmem', 'file'):
+    # Tier desconhecido (ex.: memcached): recorrer explicitamente ao tier em ficheiros
+    CACHE_BACKEND = 'file'
+
+if CACHE_BACKEND == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'observatorio',
+            'TIMEOUT': CACHE_DEFAULT_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': CACHE_CULL_FREQUENCY},
+        }
+    }
+elif CACHE_BACKEND == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'observatorio.cache.LRUFileBasedCache',
+            'LOCATION': CACHE_DIR,
+            'TIMEOUT': CACHE_DEFAULT_TIMEOUT,
+            'OPTIONS': {'MAX_ENTRIES': CACHE_MAX_ENTRIES, 'CULL_FREQUENCY': CACHE_CULL_FREQUENCY},
+        }
+    }
+
 # Supabase Configuration
 SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_KEY = os.getenv('SUPABASE_KEY')
+# Outbox do Supabase (comando flush_supabase_outbox)
+SUPABASE_CONNECT_TIMEOUT = float(os.getenv('SUPABASE_CONNECT_TIMEOUT', 3.05))
+SUPABASE_READ_TIMEOUT = float(os.getenv('SUPABASE_READ_TIMEOUT', 10))
+SUPABASE_POOL_SIZE = int(os.getenv('SUPABASE_POOL_SIZE', 10))
+SUPABASE_OUTBOX_BATCH_SIZE = int(os.getenv('SUPABASE_OUTBOX_BATCH_SIZE', 500))
+SUPABASE_OUTBOX_POLL_INTERVAL = float(os.getenv('SUPABASE_OUTBOX_POLL_INTERVAL', 5))
+SUPABASE_OUTBOX_MAX_TENTATIVAS = int(os.getenv('SUPABASE_OUTBOX_MAX_TENTATIVAS', 8))
+SUPABASE_OUTBOX_BACKOFF_SECONDS = float(os.getenv('SUPABASE_OUTBOX_BACKOFF_SECONDS', 5))
+SUPABASE_OUTBOX_BACKOFF_MAX_SECONDS = float(os.getenv('SUPABASE_OUTBOX_BACKOFF_MAX_SECONDS', 3600))
+# Sincronização completa/incremental (comando sync_to_supabase)
+SUPABASE_SYNC_WORKERS = int(os.getenv('SUPABASE_SYNC_WORKERS', 4))
+SUPABASE_SYNC_PAGE_SIZE = int(os.getenv('SUPABASE_SYNC_PAGE_SIZE', 1000))
+SUPABASE_SYNC_BATCH_SIZE = int(os.getenv('SUPABASE_SYNC_BATCH_SIZE', 500))
+SUPABASE_SYNC_OVERLAP_SECONDS = int(os.getenv('SUPABASE_SYNC_OVERLAP_SECONDS', 300))
 
 # Hugging Face Configuration
 HUGGINGFACE_TOKEN = os.getenv('HUGGINGFACE_TOKEN')
@@ -182,6 +256,30 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Importações Excel em segundo plano (comando run_import_worker)
+IMPORT_WORKERS = int(os.getenv('IMPORT_WORKERS', 2))
+IMPORT_WORKER_POLL_INTERVAL = float(os.getenv('IMPORT_WORKER_POLL_INTERVAL', 5))
+IMPORT_JOB_TIMEOUT_MINUTES = int(os.getenv('IMPORT_JOB_TIMEOUT_MINUTES', 60))
+# Processos de leitura por importação em lote (zip/diretório); 0 = número de CPUs
+IMPORT_BATCH_WORKERS = int(os.getenv('IMPORT_BATCH_WORKERS', 0))
+# Tamanho máximo (descomprimido, em bytes) de cada livro num zip importado em lote
+IMPORT_BATCH_MAX_WORKBOOK_SIZE = int(os.getenv('IMPORT_BATCH_MAX_WORKBOOK_SIZE', 50 * 1024 * 1024))
+
+# Exportação dos registos em bruto (comando export_indicators e /questionarios/exportar/<indicador>/)
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 2000))
+EXPORT_PARQUET_ROW_GROUP_SIZE = int(os.getenv('EXPORT_PARQUET_ROW_GROUP_SIZE', 50000))
+
+# Arquivo de relatórios gerados (comando run_report_worker); fora de MEDIA_ROOT, servido só a utilizadores staff
+REPORT_ARTIFACT_ROOT = os.getenv('REPORT_ARTIFACT_ROOT', os.path.join(BASE_DIR, 'report_artifacts'))
+REPORT_WORKER_POLL_INTERVAL = float(os.getenv('REPORT_WORKER_POLL_INTERVAL', 5))
+REPORT_JOB_TIMEOUT_MINUTES = int(os.getenv('REPORT_JOB_TIMEOUT_MINUTES', 30))
+# Agendamentos (comando run_report_scheduler)
+REPORT_SCHEDULER_WORKERS = int(os.getenv('REPORT_SCHEDULER_WORKERS', 2))
+REPORT_SCHEDULER_POLL_INTERVAL = float(os.getenv('REPORT_SCHEDULER_POLL_INTERVAL', 60))
+# Entrega: EmailDelivery (usa EMAIL_BACKEND) ou FileDelivery (copia para REPORT_DELIVERY_DIR)
+REPORT_DELIVERY_BACKEND = os.getenv('REPORT_DELIVERY_BACKEND', 'dashboard.services.report_delivery.EmailDelivery')
+REPORT_DELIVERY_DIR = os.getenv('REPORT_DELIVERY_DIR', os.path.join(BASE_DIR, 'report_deliveries'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -20,7 +20,9 @@ from .models import (
     InvestimentoIndicador,
     TarifarioVozOrangeIndicador,
     TarifarioVozMTNIndicador,
-    EmpregoIndicador
+    EmpregoIndicador,
+    ImportacaoExcel,
+    SupabaseOutbox,
 )
 
 logger = logging.getLogger(__name__)
@@ -606,4 +608,35 @@ class RegistroQuestionarioAdmin(admin.ModelAdmin):
             super().save_model(request, obj, form, change)
         except Exception as e:
             logger.error(f"Erro ao salvar RegistroQuestionario: {e}")
-            raise
\ No newline at end of file
+            raise
+
+@admin.register(ImportacaoExcel)
+class ImportacaoExcelAdmin(admin.ModelAdmin):
+    list_display = [
+        'nome_ficheiro', 'operadora', 'ano', 'estado', 'simulacao', 'processados', 'erros',
+        'registos_novos', 'registos_atualizados', 'registos_inalterados', 'criado_por', 'criado_em',
+    ]
+    list_filter = ['estado', 'simulacao', 'operadora', 'ano']
+    search_fields = ['nome_ficheiro']
+    readonly_fields = [
+        'estado', 'worker', 'tentativas', 'progresso', 'total_folhas', 'folhas_processadas',
+        'processados', 'erros', 'registos_novos', 'registos_atualizados', 'registos_inalterados',
+        'detalhes', 'criado_por', 'criado_em', 'iniciado_em', 'concluido_em',
+    ]
+
+
+@admin.register(SupabaseOutbox)
+class SupabaseOutboxAdmin(admin.ModelAdmin):
+    list_display = ['tabela', 'registo_id', 'operacao', 'estado', 'tentativas', 'proxima_tentativa', 'criado_em']
+    list_filter = ['estado', 'operacao', 'tabela']
+    search_fields = ['tabela', 'registo_id', 'ultimo_erro']
+    readonly_fields = [
+        'tabela', 'registo_id', 'operacao', 'estado', 'tentativas', 'proxima_tentativa', 'ultimo_erro', 'criado_em',
+    ]
+    actions = ['repor_na_fila']
+
+    @admin.action(description="Repor na fila as entradas falhadas selecionadas")
+    def repor_na_fila(self, request, queryset):
+        from .services.supabase_outbox import retry_dead_letters
+        repostas = retry_dead_letters(queryset)
+        self.message_user(request, f"{repostas} entradas repostas na fila.")
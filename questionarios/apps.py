@@ -7,7 +7,13 @@ class QuestionariosConfig(AppConfig):
 
     def ready(self):
         """
-        Registra os sinais para sincronização com o Supabase
+        Registra os sinais para sincronização com o Supabase e para
+        manutenção das tabelas derivadas dos indicadores, e constrói o
+        registo de metadados dos indicadores
         """
         # Importar sinais
         import questionarios.supabase_sync
+        import questionarios.signals
+
+        from questionarios.services.metadata import registry
+        registry.build()
@@ -0,0 +1,170 @@
+"""
+Mapeamento declarativo das folhas do ficheiro KPI ARN para os modelos de indicadores.
+
+Cada entrada de SHEET_MAPPINGS descreve uma folha:
+
+- ``model``: nome do modelo (subclasse de IndicadorBase);
+- ``sheet_names``: nomes aceites para a folha (comparados sem acentos,
+  maiúsculas ou separadores);
+- ``header_row``: linha (0-based) do cabeçalho com as colunas 'Cod.',
+  'INDICADOR' e os meses;
+- ``fields`` (opcional): {código KPI ou designação: campo do modelo}. Quando
+  omitido, é derivado do registo de metadados (código KPI do verbose_name,
+  designação e nome do campo);
+- ``month_columns`` (opcional): {coluna: mês}, por omissão MONTH_MAPPING;
+- ``operadora`` (opcional): operadora fixa do modelo (tarifários).
+
+Um novo indicador só precisa de uma entrada aqui; o parser genérico
+(excel_parser.parse_sheet) trata de todas as folhas.
+"""
+
+# Mapping from Excel INDICADOR names (or Cod.) to Model field names
+# Adjust based on exact Excel names and your model field names
+INDICATOR_FIELD_MAPPING = {
+    # Cod. | INDICADOR
+    1.1: 'por_via_satelite',
+    1.2: 'por_sistema_hertziano_fixo_terra',
+    1.3: 'fibra_otica',
+    # 2.1 - Banda Estreita - Not directly in TrafegoInternetIndicador model?
+    2.11: 'kbps_64_128', # Check if Cod. are 2.1.1 or 2.11
+    2.12: 'kbps_128_256',
+    2.13: 'banda_estreita_outros',
+    # 2.2 - Banda Larga
+    2.21: 'kbits_256_2mbits',
+    2.22: 'mbits_2_4',
+    2.23: 'mbits_10', # Assuming 10 Mbit/s matches 2.2.3
+    2.24: 'banda_larga_outros',
+    # 3 - Tráfego por categoria
+    3.1: 'residencial',
+    3.2: 'corporativo_empresarial',
+    3.31: 'instituicoes_publicas',
+    3.32: 'instituicoes_ensino',
+    3.33: 'instituicoes_saude',
+    4: 'ong_outros',
+    # 5 - Tráfego por Região
+    5.1: 'cidade_bissau',
+    5.2: 'bafata',
+    5.3: 'biombo',
+    5.4: 'bolama_bijagos',
+    5.5: 'cacheu',
+    5.6: 'gabu',
+    5.7: 'oio',
+    5.8: 'quinara',
+    5.9: 'tombali', # Assuming Tombali is 5.9 based on pattern
+    # 6 - Tráfego por acesso público via rádio (PWLAN) 
+    # Need corresponding model fields if these exist
+    # 6.1: 'acesso_livre', 
+    # 6.2: 'acesso_condicionado',
+    
+    # Mapping by Name if Cod. is unreliable
+    "Por via Satélite": "por_via_satelite",
+    "Por Sistema Hertziano Fixo de Terra (FH) + PROXIM": "por_sistema_hertziano_fixo_terra",
+    "Fibra Ótica": "fibra_otica",
+    "64 - 128 Kbps": "kbps_64_128",
+    "128 - 256 Kbps": "kbps_128_256",
+    "Outros (Especificar)": "banda_estreita_outros", # Might need specific handling
+    "256 Kbit/s - 2 Mbit/s": "kbits_256_2mbits",
+    "2 - 4 Mbit/s": "mbits_2_4", 
+    "10 Mbit/s": "mbits_10",
+    # "Outros (Especificar)" again - needs context or better label
+    "Residencial": "residencial",
+    "Corporativo / empresarial": "corporativo_empresarial",
+    "Instituições Públicas": "instituicoes_publicas",
+    "Instituições de Ensino": "instituicoes_ensino",
+    "Instituições de Saúde": "instituicoes_saude",
+    "ONG e outros (especificar)": "ong_outros",
+    "Cidade de Bissau": "cidade_bissau",
+    "Bafatá": "bafata",
+    "Biombo": "biombo",
+    "Bolama Bijagós": "bolama_bijagos",
+    "Cacheu": "cacheu",
+    "Gabú": "gabu",
+    "Oio": "oio",
+    "Quinara": "quinara",
+    "Tombali": "tombali",
+    
+    # Add other mappings...
+}
+
+MONTH_MAPPING = {
+    'JANEIRO': 1, 'FEVEREIRO': 2, 'MARÇO': 3, 'ABRIL': 4,
+    'MAIO': 5, 'JUNHO': 6, 'JULHO': 7, 'AGOSTO': 8,
+    'SETEMBRO': 9, 'OUTUBRO': 10, 'NOVEMBRO': 11, 'DEZEMBRO': 12
+}
+
+SHEET_MAPPINGS = {
+    'estacoes_moveis': {
+        'model': 'EstacoesMoveisIndicador',
+        'sheet_names': ('Estacoes_Moveis', 'Estações Móveis', 'EM'),
+        'header_row': 3,
+    },
+    'trafego_originado': {
+        'model': 'TrafegoOriginadoIndicador',
+        'sheet_names': ('Trafego_Originado', 'Tráfego Originado'),
+        'header_row': 3,
+    },
+    'trafego_terminado': {
+        'model': 'TrafegoTerminadoIndicador',
+        'sheet_names': ('Trafego_Terminado', 'Tráfego Terminado'),
+        'header_row': 3,
+    },
+    'trafego_roaming_internacional': {
+        'model': 'TrafegoRoamingInternacionalIndicador',
+        'sheet_names': ('Roaming_Internacional', 'Trafego_Roaming', 'Tráfego Roaming Internacional'),
+        'header_row': 3,
+    },
+    'lbi': {
+        'model': 'LBIIndicador',
+        'sheet_names': ('LBI', 'Largura_Banda_Internacional'),
+        'header_row': 3,
+    },
+    'trafego_internet': {
+        'model': 'TrafegoInternetIndicador',
+        'sheet_names': ('Internet_Trafico', 'Internet_Trafic'),
+        'header_row': 3,
+        'fields': INDICATOR_FIELD_MAPPING,
+    },
+    'internet_fixo': {
+        'model': 'InternetFixoIndicador',
+        'sheet_names': ('Internet_Fixo', 'Internet_Assinantes'),
+        'header_row': 3,
+    },
+    'receitas': {
+        'model': 'ReceitasIndicador',
+        'sheet_names': ('RECEITAS', 'Receitas'),
+        'header_row': 3,
+    },
+    'emprego': {
+        'model': 'EmpregoIndicador',
+        'sheet_names': ('Emprego',),
+        'header_row': 3,
+    },
+    'investimento': {
+        'model': 'InvestimentoIndicador',
+        'sheet_names': ('Investimento', 'Investimentos'),
+        'header_row': 3,
+    },
+    'assinantes': {
+        'model': 'AssinantesIndicador',
+        'sheet_names': ('Assinantes',),
+        'header_row': 3,
+    },
+    'tarifario_voz_orange': {
+        'model': 'TarifarioVozOrangeIndicador',
+        'sheet_names': ('Tarifario_Orange', 'Tarifário Voz Orange'),
+        'header_row': 3,
+        'operadora': 'orange',
+    },
+    'tarifario_voz_mtn': {
+        'model': 'TarifarioVozMTNIndicador',
+        'sheet_names': ('Tarifario_MTN', 'Tarifário Voz MTN'),
+        'header_row': 3,
+        'operadora': 'TELECEL',
+    },
+    'tarifario_voz_telecel': {
+        'model': 'TarifarioVozTelecelIndicador',
+        'sheet_names': ('Tarifario_Telecel', 'Tarifário Voz Telecel'),
+        'header_row': 3,
+        'operadora': 'telecel',
+    },
+}
@@ -1,99 +1,20 @@
+import numpy as np
 import pandas as pd
 import re
 import logging
+import unicodedata
+from contextlib import ExitStack
 from decimal import Decimal, InvalidOperation
-from django.contrib.auth.models import User # To set user
-# Import FieldDoesNotExist
-from django.core.exceptions import FieldDoesNotExist
-from django.db import transaction # Import transaction
+from django.apps import apps
 from datetime import datetime
 
-# Import all relevant models from questionarios
-from questionarios.models import (
-    TrafegoInternetIndicador, ReceitasIndicador, EmpregoIndicador,
-    EstacoesMoveisIndicador, AssinantesIndicador, TrafegoOriginadoIndicador,
-    TrafegoTerminadoIndicador, TrafegoRoamingInternacionalIndicador,
-    LBIIndicador, InternetFixoIndicador, InvestimentoIndicador,
-    TarifarioVozOrangeIndicador, TarifarioVozMTNIndicador, TarifarioVozTelecelIndicador
-    # Ensure RegistroQuestionario is not needed here unless processed from Excel
-)
+from questionarios.excel_mappings import MONTH_MAPPING, SHEET_MAPPINGS
+from questionarios.excel_reader import open_workbook
+from questionarios.services.importacao import incremental_upsert
+from questionarios.services.metadata import registry
 
 logger = logging.getLogger(__name__)
 
-# Mapping from Excel INDICADOR names (or Cod.) to Model field names
-# Adjust based on exact Excel names and your model field names
-INDICATOR_FIELD_MAPPING = {
-    # Cod. | INDICADOR
-    1.1: 'por_via_satelite',
-    1.2: 'por_sistema_hertziano_fixo_terra',
-    1.3: 'fibra_otica',
-    # 2.1 - Banda Estreita - Not directly in TrafegoInternetIndicador model?
-    2.11: 'kbps_64_128', # Check if Cod. are 2.1.1 or 2.11
-    2.12: 'kbps_128_256',
-    2.13: 'banda_estreita_outros',
-    # 2.2 - Banda Larga
-    2.21: 'kbits_256_2mbits',
-    2.22: 'mbits_2_4',
-    2.23: 'mbits_10', # Assuming 10 Mbit/s matches 2.2.3
-    2.24: 'banda_larga_outros',
-    # 3 - Tráfego por categoria
-    3.1: 'residencial',
-    3.2: 'corporativo_empresarial',
-    3.31: 'instituicoes_publicas',
-    3.32: 'instituicoes_ensino',
-    3.33: 'instituicoes_saude',
-    4: 'ong_outros',
-    # 5 - Tráfego por Região
-    5.1: 'cidade_bissau',
-    5.2: 'bafata',
-    5.3: 'biombo',
-    5.4: 'bolama_bijagos',
-    5.5: 'cacheu',
-    5.6: 'gabu',
-    5.7: 'oio',
-    5.8: 'quinara',
-    5.9: 'tombali', # Assuming Tombali is 5.9 based on pattern
-    # 6 - Tráfego por acesso público via rádio (PWLAN) 
-    # Need corresponding model fields if these exist
-    # 6.1: 'acesso_livre', 
-    # 6.2: 'acesso_condicionado',
-    
-    # Mapping by Name if Cod. is unreliable
-    "Por via Satélite": "por_via_satelite",
-    "Por Sistema Hertziano Fixo de Terra (FH) + PROXIM": "por_sistema_hertziano_fixo_terra",
-    "Fibra Ótica": "fibra_otica",
-    "64 - 128 Kbps": "kbps_64_128",
-    "128 - 256 Kbps": "kbps_128_256",
-    "Outros (Especificar)": "banda_estreita_outros", # Might need specific handling
-    "256 Kbit/s - 2 Mbit/s": "kbits_256_2mbits",
-    "2 - 4 Mbit/s": "mbits_2_4", 
-    "10 Mbit/s": "mbits_10",
-    # "Outros (Especificar)" again - needs context or better label
-    "Residencial": "residencial",
-    "Corporativo / empresarial": "corporativo_empresarial",
-    "Instituições Públicas": "instituicoes_publicas",
-    "Instituições de Ensino": "instituicoes_ensino",
-    "Instituições de Saúde": "instituicoes_saude",
-    "ONG e outros (especificar)": "ong_outros",
-    "Cidade de Bissau": "cidade_bissau",
-    "Bafatá": "bafata",
-    "Biombo": "biombo",
-    "Bolama Bijagós": "bolama_bijagos",
-    "Cacheu": "cacheu",
-    "Gabú": "gabu",
-    "Oio": "oio",
-    "Quinara": "quinara",
-    "Tombali": "tombali",
-    
-    # Add other mappings...
-}
-
-MONTH_MAPPING = {
-    'JANEIRO': 1, 'FEVEREIRO': 2, 'MARÇO': 3, 'ABRIL': 4,
-    'MAIO': 5, 'JUNHO': 6, 'JULHO': 7, 'AGOSTO': 8,
-    'SETEMBRO': 9, 'OUTUBRO': 10, 'NOVEMBRO': 11, 'DEZEMBRO': 12
-}
-
 def clean_value(value):
     """Cleans monetary/number values from Excel."""
     if pd.isna(value):
@@ -118,191 +39,399 @@ def clean_value(value):
         logger.warning(f"Could not convert text value '{value}' to Decimal.")
         return None
 
-def parse_internet_traffic(df, year, operadora_code, user):
-    """Parses the TrafegoInternetIndicador data from the DataFrame."""
-    processed_count = 0
+NA_MARKERS = ('NA', '-', '')
+
+
+def clean_values(values):
+    """Vectorized version of clean_value for a block of cells.
+
+    Numeric cells are kept, text cells are normalised in one pandas pass
+    (strip, NA markers, '.' thousands / ',' decimal separators) and validated
+    with pd.to_numeric. Returns an object array of Decimal/None with the same shape.
+    """
+    block = np.asarray(values, dtype=object)
+    flat = pd.Series(block.ravel(), dtype=object)
+    if flat.empty:
+        return block.copy()
+
+    is_text = (flat.map(type) == str).to_numpy()
+    result = np.full(len(flat), None, dtype=object)
+
+    numbers = pd.to_numeric(flat[~is_text], errors='coerce').astype(float)
+    valid = numbers.index[np.isfinite(numbers.to_numpy())]
+    result[valid] = [_number_to_decimal(v) for v in flat[valid].tolist()]
+
+    text = flat[is_text].str.strip()
+    text = text[~text.str.upper().isin(NA_MARKERS)]
+    text = text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False)
+    text = text[pd.to_numeric(text, errors='coerce').notna()]
+    result[text.index] = [Decimal(v) for v in text.tolist()]
+
+    return result.reshape(block.shape)
+
+
+def _number_to_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(str(value))
+    return Decimal(int(value))
+
+
+def normalize_label(value):
+    """Normalised indicator label / sheet name used as a lookup key (no accents, case or extra spaces)."""
+    text = unicodedata.normalize('NFKD', str(value))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.split()).casefold()
+
+
+def _sheet_key(name):
+    return re.sub(r'[^0-9a-z]', '', normalize_label(name))
+
+
+class SheetIndex:
+    """Row lookup for a sheet, built once: 'Cod.' (numeric or text) -> row and label -> row."""
+
+    def __init__(self, df):
+        self.codes = {}
+        self.text_codes = {}
+        self.labels = {}
+        if 'Cod.' in df.columns:
+            codes = pd.to_numeric(df['Cod.'], errors='coerce').to_numpy(dtype=float)
+            for position, code in enumerate(codes):
+                if not np.isnan(code):
+                    self.codes.setdefault(round(float(code), 6), position)
+            for position, code in enumerate(df['Cod.'].astype(str)):
+                self.text_codes.setdefault(normalize_label(code), position)
+        if 'INDICADOR' in df.columns:
+            for position, label in enumerate(df['INDICADOR'].astype(str)):
+                self.labels.setdefault(normalize_label(label), position)
+
+    def find(self, excel_code):
+        """Row position for an Excel code (numeric, then textual code, then label), or None."""
+        if isinstance(excel_code, (float, int)):
+            position = self.codes.get(round(float(excel_code), 6))
+            if position is not None:
+                return position
+        key = normalize_label(excel_code)
+        position = self.text_codes.get(key)
+        if position is not None:
+            return position
+        return self.labels.get(key)
+
+
+def get_sheet_model(mapping):
+    return apps.get_model('questionarios', mapping['model'])
+
+
+def resolve_field_mapping(indicator_type):
+    """{Excel code/label: model field} for a SHEET_MAPPINGS entry.
+
+    Explicit ``fields`` are used as given; otherwise the mapping is derived
+    from the indicator metadata registry (KPI code, label and field name).
+    """
+    mapping = SHEET_MAPPINGS[indicator_type]
+    if mapping.get('fields'):
+        return dict(mapping['fields'])
+    fields = {}
+    for campo, meta in registry.fields(get_sheet_model(mapping)).items():
+        if meta.kpi_code:
+            fields[meta.kpi_code] = campo
+        fields.setdefault(meta.label, campo)
+        fields.setdefault(campo, campo)
+    return fields
+
+
+def extract_sheet_records(df, indicator_type, year, operadora_code):
+    """Extracts one record per month from a sheet described in SHEET_MAPPINGS, without writing.
+
+    Rows are located through a SheetIndex built once per sheet and the month
+    columns of all mapped rows are extracted as one block and cleaned in a
+    single vectorized pass. The records are plain dicts, so extraction can
+    run in a worker process (see questionarios.services.batch_import).
+
+    Blank cells are left out of the records and months without any value are
+    skipped, so a partially filled sheet only writes the months it contains
+    and never overwrites stored values with empty cells.
+
+    Returns:
+        tuple: (records, processed_count, error_count, errors)
+    """
+    mapping = SHEET_MAPPINGS[indicator_type]
+    model = get_sheet_model(mapping)
+    month_mapping = mapping.get('month_columns', MONTH_MAPPING)
+    operadora_code = mapping.get('operadora', operadora_code)
+    explicit_fields = bool(mapping.get('fields'))
     error_count = 0
     errors = []
 
-    # Ensure Cod. column is suitable for matching (e.g., float or text)
-    # df['Cod.'] = df['Cod.'].astype(str) # Example: if matching by string code
+    index = SheetIndex(df)
+    month_columns = [(name, num) for name, num in month_mapping.items() if name in df.columns]
+    for month_name in month_mapping:
+        if month_name not in df.columns:
+            logger.warning(f"Month column '{month_name}' not found in sheet for {model.__name__}.")
 
-    for excel_code, model_field in INDICATOR_FIELD_MAPPING.items():
-        # Find the row matching the code or indicator name
-        row = None
-        try:
-            if isinstance(excel_code, (float, int)):
-                 # Try matching by numeric code first
-                 numeric_code = float(excel_code)
-                 if 'Cod.' in df.columns:
-                     # Ensure comparison is between floats after handling potential NaNs
-                     df_codes_float = pd.to_numeric(df['Cod.'], errors='coerce')
-                     row = df[df_codes_float == numeric_code]
-            if row is None or row.empty:
-                 # Try matching by indicator name if code fails or isn't numeric
-                 if 'INDICADOR' in df.columns:
-                     row = df[df['INDICADOR'].astype(str).str.strip() == str(excel_code)]
-
-            if row is None or row.empty:
+    positions = []
+    fields = []
+    for excel_code, model_field in resolve_field_mapping(indicator_type).items():
+        if model_field in fields:
+            continue  # Already located through another code/label alias
+        if not registry.has_field(model, model_field):
+            logger.warning(f"Model field '{model_field}' mapped from Excel '{excel_code}' does not exist in {model.__name__}.")
+            continue
+        position = index.find(excel_code)
+        if position is None:
+            # Derived mappings list several aliases per field; only explicit entries are errors
+            if explicit_fields:
                 logger.warning(f"Could not find row for indicator code/name: {excel_code}")
                 errors.append(f"Indicador não encontrado no Excel: {excel_code}")
                 error_count += 1
-                continue
-            
-            row_data = row.iloc[0] # Get the first matching row
-
-            for month_name, month_num in MONTH_MAPPING.items():
-                if month_name in row_data:
-                    value = clean_value(row_data[month_name])
-                    
-                    # Check if field exists in model before trying to update
-                    try:
-                         TrafegoInternetIndicador._meta.get_field(model_field)
-                    except FieldDoesNotExist:
-                        logger.warning(f"Model field '{model_field}' mapped from Excel '{excel_code}' does not exist in TrafegoInternetIndicador.")
-                        # errors.append(f"Campo do modelo '{model_field}' não existe.") # Option: report as error
-                        # error_count += 1
-                        continue # Skip this field
-                        
-                    try:
-                        obj, created = TrafegoInternetIndicador.objects.update_or_create(
-                            operadora=operadora_code,
-                            ano=year,
-                            mes=month_num,
-                            defaults={model_field: value, 'atualizado_por': user}
-                        )
-                        if created:
-                            obj.criado_por = user
-                            obj.save()
-                        # Only count as processed if update_or_create succeeded
-                        processed_count += 1 
-                    except Exception as e:
-                        logger.error(f"Error updating/creating TrafegoInternet for {year}-{month_num}, Op:{operadora_code}, Field:{model_field}: {e}")
-                        errors.append(f"Erro BD ({year}-{month_num}, {model_field}): {e}")
-                        error_count += 1
-                else:
-                    logger.warning(f"Month column '{month_name}' not found in DataFrame for indicator {excel_code}.")
-                    # Optionally report missing month column as an error
-                    # errors.append(f"Coluna do mês '{month_name}' não encontrada.")
-                    # error_count += 1
-
-        except Exception as e:
-            logger.error(f"Error processing indicator {excel_code} ({model_field}): {e}")
-            errors.append(f"Erro ao processar indicador {excel_code}: {e}")
-            error_count += 1
-            
-    # Recalculate processed count based only on successful updates/creates if needed
-    # This count might be slightly off if update_or_create fails mid-loop for a row
-    # A more accurate count would increment inside the inner try block
+            continue
+        positions.append(position)
+        fields.append(model_field)
+
+    if not positions or not month_columns:
+        return [], 0, error_count, errors
+
+    block = clean_values(df.iloc[positions][[name for name, _ in month_columns]].to_numpy(dtype=object))
+    records = {month_num: {} for _, month_num in month_columns}
+    for row_values, model_field in zip(block, fields):
+        for (_, month_num), value in zip(month_columns, row_values):
+            if value is not None:
+                records[month_num][model_field] = value
+    processed_count = sum(len(values) for values in records.values())
+
+    return [
+        {'operadora': operadora_code, 'ano': year, 'mes': month_num, **values}
+        for month_num, values in records.items() if values
+    ], processed_count, error_count, errors
+
+
+def parse_sheet(df, indicator_type, year, operadora_code, user, dry_run=False, diff=None, origem=''):
+    """Generic parser for any sheet described in SHEET_MAPPINGS.
+
+    The records from extract_sheet_records are compared with the existing
+    data and only new or changed months are written, in a single bulk upsert
+    (see questionarios.services.importacao.incremental_upsert). With
+    ``dry_run`` nothing is written. When ``diff`` is given it accumulates the
+    'novos' / 'atualizados' / 'inalterados' counts.
+    """
+    model = get_sheet_model(SHEET_MAPPINGS[indicator_type])
+    records, processed_count, error_count, errors = extract_sheet_records(df, indicator_type, year, operadora_code)
+    if not records:
+        return processed_count, error_count, errors
+
+    try:
+        resumo = incremental_upsert(model, records, user=user, dry_run=dry_run, origem=origem)
+    except Exception as e:
+        logger.error(f"Error saving {model.__name__} for {year}, Op:{operadora_code}: {e}")
+        errors.append(f"Erro BD ({model._meta.verbose_name}, {year}): {e}")
+        error_count += processed_count
+        processed_count = 0
+    else:
+        if diff is not None:
+            merge_diff(diff, resumo)
 
     return processed_count, error_count, errors
 
-def process_excel_file(uploaded_file, user, operadora_code=None, year=None, indicator_type=None):
+
+def merge_diff(diff, resumo):
+    """Adds the counts of an incremental_upsert summary to ``diff``."""
+    for key in ('novos', 'atualizados', 'inalterados'):
+        diff[key] = diff.get(key, 0) + resumo[key]
+    return diff
+
+
+def parse_internet_traffic(df, year, operadora_code, user):
+    """Parses the TrafegoInternetIndicador data from the DataFrame."""
+    return parse_sheet(df, 'trafego_internet', year, operadora_code, user)
+
+
+def read_mapped_sheet(workbook, sheet_name, indicator_type):
+    """Streams one sheet keeping only 'Cod.', 'INDICADOR', the month columns and the mapped rows.
+
+    ``workbook`` is a questionarios.excel_reader.StreamingWorkbook; the rows
+    are matched with the same codes/labels SheetIndex looks up, so the small
+    DataFrame returned parses exactly like the full sheet.
+    """
+    mapping = SHEET_MAPPINGS[indicator_type]
+    month_mapping = mapping.get('month_columns', MONTH_MAPPING)
+    numeric_codes, text_keys = set(), set()
+    for excel_code in resolve_field_mapping(indicator_type):
+        if isinstance(excel_code, (int, float)):
+            numeric_codes.add(round(float(excel_code), 6))
+        text_keys.add(normalize_label(excel_code))
+
+    def row_filter(row):
+        code = row.get('Cod.')
+        if code is not None:
+            try:
+                if round(float(code), 6) in numeric_codes:
+                    return True
+            except (TypeError, ValueError):
+                pass
+            if normalize_label(code) in text_keys:
+                return True
+        label = row.get('INDICADOR')
+        return label is not None and normalize_label(label) in text_keys
+
+    return workbook.read_sheet(
+        sheet_name,
+        header_row=mapping['header_row'],
+        columns={'Cod.', 'INDICADOR', *month_mapping},
+        row_filter=row_filter,
+    )
+
+
+def find_sheet(sheet_names, mapping):
+    """Actual sheet name in the workbook matching a SHEET_MAPPINGS entry, or None."""
+    available = {_sheet_key(name): name for name in sheet_names}
+    for candidate in mapping['sheet_names']:
+        name = available.get(_sheet_key(candidate))
+        if name is not None:
+            return name
+    return None
+
+
+def header_text(df):
+    """Full header row of a sheet read by read_mapped_sheet (or the DataFrame columns) as text."""
+    return " ".join(map(str, df.attrs.get('header') or df.columns))
+
+
+def detect_year(df):
+    """Attempt to extract year from header cells like 'I TRIMESTRE 2023'."""
+    try:
+        match = re.search(r'\b(20\d{2})\b', header_text(df))
+        if match:
+            return int(match.group(1))
+    except Exception as e:
+        logger.warning(f"Could not automatically detect year from headers/cells: {e}")
+    return None
+
+
+# Nomes (normalizados) pelos quais cada operadora aparece em ficheiros e cabeçalhos
+OPERADORA_ALIASES = {
+    'orange': 'orange',
+    'telecel': 'telecel',
+    'mtn': 'telecel',
+}
+_OPERADORA_RE = re.compile(r'(?<![a-z])(' + '|'.join(OPERADORA_ALIASES) + r')(?![a-z])')
+_YEAR_RE = re.compile(r'(?<!\d)(20\d{2})(?!\d)')
+
+
+def detect_operadora(text):
+    """Operadora code mentioned in a filename or header text ('KPI_Orange_2023.xlsx' -> 'orange'), or None."""
+    match = _OPERADORA_RE.search(normalize_label(text))
+    return OPERADORA_ALIASES[match.group(1)] if match else None
+
+
+def detect_year_in_text(text):
+    """Year mentioned in a filename or header text ('kpi_telecel_2024_T1' -> 2024), or None."""
+    match = _YEAR_RE.search(str(text))
+    return int(match.group(1)) if match else None
+
+
+def process_excel_file(uploaded_file, user, operadora_code=None, year=None, indicator_type=None, on_sheet=None,
+                       dry_run=False):
     """Main function to process the uploaded Excel file.
-    
+
+    The upload is spooled to a temporary file and opened once as a streaming
+    (openpyxl read_only) workbook; every sheet described in SHEET_MAPPINGS
+    that exists in it is read row by row, keeping only the mapped rows and
+    month columns (see questionarios.excel_reader).
+
     Args:
         uploaded_file: The uploaded Excel file
         user: The user uploading the file
-        operadora_code: The operadora code (orange, telecel, telecel)
+        operadora_code: The operadora code (orange, telecel)
         year: The year for the data (integer)
-        indicator_type: Type of indicator to process ('trafego_internet', 'receitas', etc.)
+        indicator_type: Key of SHEET_MAPPINGS to process ('trafego_internet', 'receitas', etc.);
+            all known sheets when omitted
+        on_sheet: Optional progress callback ``on_sheet(sheet_name, estado, processados, erros, total)``
+            called when each recognised sheet starts ('em_execucao') and ends ('concluido'/'erro')
+        dry_run: Compare with the existing data and report the diff without writing
+
+    Returns:
+        dict: 'processed', 'errors', 'error_details' and 'diff' ({'novos', 'atualizados', 'inalterados'}
+        monthly records)
     """
     results = {
         'processed': 0,
         'errors': 0,
-        'error_details': []
-    }
-    
-    # Define mapping of indicator types to sheet names and parser functions
-    indicator_processors = {
-        'trafego_internet': {
-            'sheet_name': 'Internet_Trafico',
-            'parser_function': parse_internet_traffic,
-            'header_row': 3
-        },
-        # Add other indicator types as needed
-        # 'receitas': {
-        #    'sheet_name': 'RECEITAS',
-        #    'parser_function': parse_receitas,
-        #    'header_row': 3
-        # },
+        'error_details': [],
+        'diff': {'novos': 0, 'atualizados': 0, 'inalterados': 0},
     }
-    
-    # If no specific indicator type provided, try to process all known types
-    if not indicator_type:
-        processor_list = indicator_processors.values()
-    else:
-        if indicator_type not in indicator_processors:
-            results['error_details'].append(f"Tipo de indicador '{indicator_type}' não reconhecido.")
-            results['errors'] += 1
-            return results
-        
-        processor_list = [indicator_processors[indicator_type]]
-    
-    for processor in processor_list:
-        sheet_name = processor['sheet_name']
-        parser_function = processor['parser_function']
-        header_row_index = processor['header_row']
-        
-        try:
-            # Load the sheet
-            excel_data = pd.read_excel(
-                uploaded_file, 
-                sheet_name=sheet_name, 
-                header=header_row_index
-            )
-            
-            # Determine Year if not provided 
-            sheet_year = year
-            if not sheet_year:
-                try:
-                    # Attempt to extract year from header cell like 'I TRIMESTRE 2023'
-                    # Combine column headers into a single string to search
-                    header_text = " ".join(map(str, excel_data.columns))
-                    match = re.search(r'\b(20\d{2})\b', header_text)
-                    if match:
-                        sheet_year = int(match.group(1))
-                except Exception as e:
-                    logger.warning(f"Could not automatically detect year from headers/cells: {e}")
-            
-            if not sheet_year:
-                current_year = datetime.now().year
-                sheet_year = current_year  # Use current year as fallback
-                results['error_details'].append(f"Aviso: Ano não especificado para aba '{sheet_name}'. Usando ano atual: {current_year}.")
-            
-            # Use provided operadora or fallback
-            sheet_operadora = operadora_code
+
+    if indicator_type and indicator_type not in SHEET_MAPPINGS:
+        results['error_details'].append(f"Tipo de indicador '{indicator_type}' não reconhecido.")
+        results['errors'] += 1
+        return results
+    indicator_types = [indicator_type] if indicator_type else list(SHEET_MAPPINGS)
+
+    stack = ExitStack()
+    try:
+        workbook = stack.enter_context(open_workbook(uploaded_file))
+    except Exception as e:
+        logger.error(f"Erro ao abrir o ficheiro Excel: {e}", exc_info=True)
+        results['errors'] += 1
+        results['error_details'].append(f"Erro ao abrir o ficheiro Excel: {e}")
+        return results
+
+    def notify(sheet_name, estado, processed=0, errors=0):
+        if on_sheet is not None:
+            on_sheet(sheet_name, estado, processed, errors, len(sheets))
+
+    with stack:
+        sheets = []
+        not_found = []
+        for key in indicator_types:
+            sheet_name = find_sheet(workbook.sheet_names, SHEET_MAPPINGS[key])
+            if sheet_name is None:
+                not_found.append(SHEET_MAPPINGS[key]['sheet_names'][0])
+            else:
+                sheets.append((key, sheet_name))
+
+        for key, sheet_name in sheets:
+            mapping = SHEET_MAPPINGS[key]
+            sheet_operadora = mapping.get('operadora', operadora_code)
             if not sheet_operadora:
-                # Try to extract from filename or sheet
-                # For now, default to requesting user to specify
                 results['error_details'].append(f"Aviso: Operadora não especificada para aba '{sheet_name}'. Por favor, selecione a operadora no formulário.")
                 results['errors'] += 1
-                continue  # Skip this processor if operadora not specified
-            
-            logger.info(f"Processing sheet '{sheet_name}' for Year: {sheet_year}, Operadora: {sheet_operadora}")
-            
-            # Parse the sheet with the appropriate function
-            p_count, e_count, errors = parser_function(excel_data, sheet_year, sheet_operadora, user)
-            results['processed'] += p_count
-            results['errors'] += e_count
-            results['error_details'].extend(errors)
-            
-            if p_count > 0 or e_count > 0:
-                results['error_details'].insert(0, f"Planilha '{sheet_name}': {p_count} processados, {e_count} erros.")
-                
-        except ValueError as ve:
-            # Specific error for sheet not found
-            if f"Worksheet named '{sheet_name}' not found" in str(ve):
-                logger.warning(f"Planilha '{sheet_name}' não encontrada no arquivo.")
-                results['error_details'].append(f"Aviso: Planilha '{sheet_name}' não encontrada ou nome incorreto. Pulando esta planilha.")
-            else:
-                # Re-raise other ValueErrors or handle them
-                logger.error(f"Erro de valor ao ler planilha '{sheet_name}': {ve}", exc_info=True)
+                notify(sheet_name, 'erro', 0, 1)
+                continue
+
+            notify(sheet_name, 'em_execucao')
+            try:
+                excel_data = read_mapped_sheet(workbook, sheet_name, key)
+
+                sheet_year = year or detect_year(excel_data)
+                if not sheet_year:
+                    sheet_year = datetime.now().year  # Use current year as fallback
+                    results['error_details'].append(f"Aviso: Ano não especificado para aba '{sheet_name}'. Usando ano atual: {sheet_year}.")
+
+                logger.info(f"Processing sheet '{sheet_name}' for Year: {sheet_year}, Operadora: {sheet_operadora}")
+                p_count, e_count, errors = parse_sheet(
+                    excel_data, key, sheet_year, sheet_operadora, user,
+                    dry_run=dry_run, diff=results['diff'], origem=f"{getattr(uploaded_file, 'name', '')} / {sheet_name}",
+                )
+                results['processed'] += p_count
+                results['errors'] += e_count
+                results['error_details'].extend(errors)
+
+                if p_count > 0 or e_count > 0:
+                    results['error_details'].insert(0, f"Planilha '{sheet_name}': {p_count} processados, {e_count} erros.")
+                notify(sheet_name, 'concluido', p_count, e_count)
+            except Exception as e:
+                logger.error(f"Erro ao processar planilha '{sheet_name}': {e}", exc_info=True)
                 results['errors'] += 1
-                results['error_details'].append(f"Erro de valor ao ler planilha '{sheet_name}': {ve}")
-        except Exception as e:
-            logger.error(f"Erro ao processar planilha '{sheet_name}': {e}", exc_info=True)
-            results['errors'] += 1
-            results['error_details'].append(f"Erro geral ao processar planilha '{sheet_name}': {e}")
-    
-    return results 
\ No newline at end of file
+                results['error_details'].append(f"Erro geral ao processar planilha '{sheet_name}': {e}")
+                notify(sheet_name, 'erro', 0, 1)
+
+        if not_found:
+            if indicator_type:
+                logger.warning(f"Planilha '{not_found[0]}' não encontrada no arquivo.")
+                results['error_details'].append(f"Aviso: Planilha '{not_found[0]}' não encontrada ou nome incorreto. Pulando esta planilha.")
+            else:
+                logger.info(f"Planilhas não encontradas no arquivo: {', '.join(not_found)}")
+
+    return results
@@ -0,0 +1,141 @@
+"""
+Leitura em streaming de livros Excel com memória limitada.
+
+O ficheiro carregado é primeiro copiado (por blocos) para um ficheiro
+temporário, quando ainda não existe em disco, e aberto com o modo
+``read_only`` do openpyxl: as folhas são lidas linha a linha apenas quando
+pedidas, e de cada folha só são guardadas as colunas e as linhas pedidas
+(ex.: 'Cod.', 'INDICADOR', os meses e as linhas do mapeamento). A memória
+usada não depende do tamanho do livro nem do número de folhas irrelevantes.
+"""
+import io
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+from openpyxl import load_workbook
+
+logger = logging.getLogger(__name__)
+
+SPOOL_CHUNK_SIZE = 1024 * 1024
+
+
+def _disk_path(source):
+    """Caminho em disco de ``source``, se já existir um (sem copiar)."""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    # TemporaryUploadedFile do Django
+    if hasattr(source, 'temporary_file_path'):
+        return source.temporary_file_path()
+    # FieldFile em FileSystemStorage, ou ficheiro aberto com open()
+    try:
+        path = getattr(source, 'path', None)
+    except (NotImplementedError, ValueError):
+        path = None
+    if path is None and isinstance(source, io.IOBase):
+        path = getattr(source, 'name', None)
+    if isinstance(path, str) and os.path.isfile(path):
+        return path
+    return None
+
+
+@contextmanager
+def spooled_path(source, suffix='.xlsx'):
+    """
+    Caminho de um ficheiro em disco com o conteúdo de ``source``.
+
+    Caminhos e uploads já guardados em disco são usados diretamente; os
+    restantes (uploads em memória, storage remoto) são copiados por blocos
+    para um ficheiro temporário, removido no fim.
+    """
+    path = _disk_path(source)
+    if path is not None:
+        yield path
+        return
+
+    temporario = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+    try:
+        with temporario:
+            if hasattr(source, 'seek'):
+                source.seek(0)
+            if hasattr(source, 'chunks'):
+                for chunk in source.chunks(SPOOL_CHUNK_SIZE):
+                    temporario.write(chunk)
+            else:
+                shutil.copyfileobj(source, temporario, SPOOL_CHUNK_SIZE)
+        yield temporario.name
+    finally:
+        os.unlink(temporario.name)
+
+
+class StreamingWorkbook:
+    """Livro Excel aberto com ``openpyxl`` em modo read_only (sem carregar as folhas)."""
+
+    def __init__(self, path):
+        self._workbook = load_workbook(path, read_only=True, data_only=True)
+
+    @property
+    def sheet_names(self):
+        return self._workbook.sheetnames
+
+    def read_sheet(self, sheet_name, header_row=0, columns=None, row_filter=None):
+        """
+        Lê uma folha linha a linha para um DataFrame pequeno.
+
+        Args:
+            sheet_name: Nome da folha.
+            header_row: Linha do cabeçalho (0-based, como ``header`` do pandas).
+            columns: Nomes de colunas a manter (as restantes são descartadas ao ler).
+            row_filter: Função ``row_filter(dict_da_linha) -> bool``; só as linhas aceites são guardadas.
+
+        Returns:
+            DataFrame (dtype object) com as colunas e linhas pedidas; o cabeçalho
+            completo da folha fica em ``df.attrs['header']``.
+        """
+        worksheet = self._workbook[sheet_name]
+        header = None
+        positions = []
+        names = []
+        rows = []
+        for index, values in enumerate(worksheet.iter_rows(values_only=True)):
+            if index < header_row:
+                continue
+            if header is None:
+                header = ['' if v is None else v for v in values]
+                seen = set()
+                for position, name in enumerate(header):
+                    if name in seen or (columns is not None and name not in columns):
+                        continue
+                    seen.add(name)
+                    positions.append(position)
+                    names.append(name)
+                continue
+            row = [values[p] if p < len(values) else None for p in positions]
+            if all(v is None for v in row):
+                continue
+            if row_filter is None or row_filter(dict(zip(names, row))):
+                rows.append(row)
+
+        df = pd.DataFrame(rows, columns=names, dtype=object)
+        df.attrs['header'] = header or []
+        return df
+
+    def close(self):
+        self._workbook.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@contextmanager
+def open_workbook(source):
+    """Abre ``source`` (caminho, upload ou ficheiro) como StreamingWorkbook sobre um ficheiro em disco."""
+    with spooled_path(source) as path:
+        with StreamingWorkbook(path) as workbook:
+            yield workbook
@@ -4,17 +4,18 @@ from ..models.base import IndicadorBase
 
 class ExcelUploadForm(forms.Form):
     excel_file = forms.FileField(
-        label='Selecione o arquivo Excel (.xlsx)',
-        widget=forms.ClearableFileInput(attrs={'accept': '.xlsx'}),
-        help_text='Certifique-se que o arquivo segue a estrutura esperada.'
+        label='Selecione o arquivo Excel (.xlsx) ou um zip com vários arquivos',
+        widget=forms.ClearableFileInput(attrs={'accept': '.xlsx,.zip'}),
+        help_text='Certifique-se que o arquivo segue a estrutura esperada. Num zip, a operadora e o ano '
+                  'de cada arquivo são detetados pelo nome (ex.: KPI_Orange_2023.xlsx) ou pelos cabeçalhos.'
     )
     
     # Dropdown for operadora selection
     operadora = forms.ChoiceField(
         label='Operadora',
-        choices=IndicadorBase.OPERADORAS_CHOICES,
-        required=True,
-        help_text='Selecione a operadora para este conjunto de dados.'
+        choices=[('', 'Detetar automaticamente')] + list(IndicadorBase.OPERADORAS_CHOICES),
+        required=False,
+        help_text='Selecione a operadora para este conjunto de dados (num zip, usada quando não é detetada).'
     )
     
     # Year for the data
@@ -23,9 +24,18 @@ class ExcelUploadForm(forms.Form):
         initial=timezone.now().year,
         min_value=2000,
         max_value=2100,
-        required=True,
-        help_text='Ano dos dados (substitui qualquer ano detectado no arquivo).'
+        required=False,
+        help_text='Ano dos dados (substitui qualquer ano detectado no arquivo; num zip, usado quando não é detetado).'
     )
-    # We can add fields later to specify year/operadora if not in the file
-    # ano = forms.IntegerField(label='Ano dos Dados') 
-    # operadora = forms.ChoiceField(label='Operadora', choices=...) 
\ No newline at end of file
+
+    dry_run = forms.BooleanField(
+        label='Apenas simular',
+        required=False,
+        help_text='Mostra quantos registos mensais seriam novos, atualizados ou inalterados, sem gravar.'
+    )
+
+    def clean_excel_file(self):
+        excel_file = self.cleaned_data['excel_file']
+        if not excel_file.name.lower().endswith(('.xlsx', '.xlsm', '.zip')):
+            raise forms.ValidationError('Envie um arquivo .xlsx ou .zip.')
+        return excel_file
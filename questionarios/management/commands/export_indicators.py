@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from questionarios.services.exportacao import (
+    EXPORT_FORMATS, ExportError, iter_csv, iter_ndjson, parse_filters, write_parquet,
+)
+from questionarios.services.metadata import registry
+
+
+class Command(BaseCommand):
+    help = 'Exporta os registos mensais de um indicador em CSV, NDJSON ou Parquet (leitura por blocos)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('indicador', help="Modelo do indicador (ex.: receitasindicador).")
+        parser.add_argument(
+            '--formato',
+            choices=list(EXPORT_FORMATS),
+            default='csv',
+            help='Formato de saída (padrão: csv). Parquet requer o pacote pyarrow.',
+        )
+        parser.add_argument('--ano', action='append', help='Filtrar por ano (pode repetir-se ou usar vírgulas).')
+        parser.add_argument('--mes', action='append', help='Filtrar por mês (pode repetir-se ou usar vírgulas).')
+        parser.add_argument(
+            '--operadora', action='append', help='Filtrar por operadora (pode repetir-se ou usar vírgulas).',
+        )
+        parser.add_argument(
+            '--output',
+            help='Ficheiro de saída (padrão: stdout em CSV/NDJSON; obrigatório em Parquet).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            help='Registos lidos da base de dados de cada vez (padrão: EXPORT_CHUNK_SIZE).',
+        )
+
+    def handle(self, *args, **options):
+        model = registry.model(options['indicador'].lower())
+        if model is None:
+            raise CommandError(f"Indicador '{options['indicador']}' desconhecido")
+        formato = options['formato']
+        output = options['output']
+        if formato == 'parquet' and not output:
+            raise CommandError('A exportação Parquet requer --output')
+
+        try:
+            filtros = parse_filters({nome: options[nome] for nome in ('ano', 'mes', 'operadora')})
+        except ExportError as e:
+            raise CommandError(str(e))
+        chunk_size = options['chunk_size']
+
+        inicio = time.monotonic()
+        try:
+            if formato == 'parquet':
+                total = write_parquet(model, output, chunk_size=chunk_size, **filtros)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{total} registos exportados para {output} ({time.monotonic() - inicio:.1f}s)'
+                ))
+                return
+
+            blocos = iter_csv if formato == 'csv' else iter_ndjson
+            if output:
+                with open(output, 'wb') as ficheiro:
+                    for bloco in blocos(model, chunk_size=chunk_size, **filtros):
+                        ficheiro.write(bloco)
+                self.stdout.write(self.style.SUCCESS(
+                    f'{model._meta.model_name} exportado para {output} ({time.monotonic() - inicio:.1f}s)'
+                ))
+            else:
+                destino = getattr(self.stdout._out, 'buffer', None)
+                for bloco in blocos(model, chunk_size=chunk_size, **filtros):
+                    if destino is not None:
+                        destino.write(bloco)
+                    else:
+                        self.stdout.write(bloco.decode('utf-8'), ending='')
+                if destino is not None:
+                    destino.flush()
+        except ExportError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,67 @@
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from questionarios.services.supabase_outbox import flush_all, is_configured, retry_dead_letters
+
+
+class Command(BaseCommand):
+    help = 'Envia para o Supabase as alterações pendentes da outbox (SupabaseOutbox), em lote'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'SUPABASE_OUTBOX_BATCH_SIZE', 500),
+            help='Entradas por lote (padrão: SUPABASE_OUTBOX_BATCH_SIZE).',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'SUPABASE_OUTBOX_POLL_INTERVAL', 5),
+            help='Segundos de espera quando a outbox está vazia.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Envia as entradas pendentes e termina.',
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Repõe na fila as entradas falhadas (dead letters) antes de enviar.',
+        )
+
+    def handle(self, *args, **options):
+        if not is_configured():
+            self.stdout.write(self.style.WARNING('SUPABASE_URL/SUPABASE_KEY não configurados; nada a enviar.'))
+            return
+
+        if options['retry_failed']:
+            repostas = retry_dead_letters()
+            self.stdout.write(f"{repostas} entradas falhadas repostas na fila.")
+
+        if options['once']:
+            self._report(flush_all(options['batch_size']))
+            return
+
+        self.stdout.write('Envio da outbox do Supabase iniciado.')
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        try:
+            while True:
+                resumo = flush_all(options['batch_size'])
+                if any(resumo.values()):
+                    self._report(resumo)
+                else:
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Envio da outbox do Supabase terminado.'))
+
+    def _report(self, resumo):
+        style = self.style.WARNING if resumo['falhados'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{resumo['enviados']} enviadas, {resumo['reagendados']} reagendadas, {resumo['falhados']} falhadas."
+        ))
@@ -0,0 +1,76 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from questionarios.excel_mappings import SHEET_MAPPINGS
+from questionarios.services.batch_import import batch_import, default_workers
+
+
+class Command(BaseCommand):
+    help = 'Importa em lote os livros KPI ARN de um diretório ou ficheiro zip (um livro por operadora/período)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('origem', help='Diretório, ficheiro .zip ou livro .xlsx a importar.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Processos de leitura em paralelo (padrão: IMPORT_BATCH_WORKERS ou nº de CPUs).',
+        )
+        parser.add_argument('--operadora', help='Operadora por omissão, quando não é detetada no ficheiro.')
+        parser.add_argument('--ano', type=int, help='Ano por omissão, quando não é detetado no ficheiro.')
+        parser.add_argument(
+            '--indicador',
+            choices=sorted(SHEET_MAPPINGS),
+            help='Importar apenas uma folha (chave de SHEET_MAPPINGS).',
+        )
+        parser.add_argument('--user', help='Username registado como autor dos registos.')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostra as diferenças (novos/atualizados/inalterados) sem gravar.',
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"Utilizador '{options['user']}' não encontrado")
+
+        workers = options['workers'] or default_workers()
+        self.stdout.write(f"Importando {options['origem']} com {workers} processos...")
+
+        def progresso(nome, estado, processados, erros, total):
+            self.stdout.write(f"  {nome}: {processados} valores, {erros} erros")
+
+        inicio = time.monotonic()
+        results = batch_import(
+            options['origem'],
+            user=user,
+            operadora=options['operadora'],
+            ano=options['ano'],
+            workers=workers,
+            indicator_type=options['indicador'],
+            on_workbook=progresso,
+            dry_run=options['dry_run'],
+        )
+        duracao = time.monotonic() - inicio
+
+        for (operadora, ano), diff in sorted(results['grupos'].items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            self.stdout.write(
+                f"  {operadora} {ano}: {diff['novos']} novos, {diff['atualizados']} atualizados, "
+                f"{diff['inalterados']} inalterados"
+            )
+        for detalhe in results['error_details']:
+            self.stdout.write(self.style.WARNING(f"  {detalhe}"))
+
+        diff = results['diff']
+        acao = 'analisados (simulação, nada foi gravado)' if options['dry_run'] else 'importados'
+        self.stdout.write(self.style.SUCCESS(
+            f"{results['livros']} livros {acao} em {duracao:.1f}s: "
+            f"{results['processed']} valores processados, {results['errors']} erros; registos mensais: "
+            f"{diff['novos']} novos, {diff['atualizados']} atualizados, {diff['inalterados']} inalterados."
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from questionarios.services.cobertura import rebuild_coverage
+from questionarios.services.metadata import registry
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de cobertura das submissões a partir das tabelas de indicadores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indicador',
+            action='append',
+            dest='indicadores',
+            help='Indicador a reconstruir (nome do modelo, ex.: receitasindicador). Pode ser repetido.',
+        )
+
+    def handle(self, *args, **options):
+        modelos = None
+        if options['indicadores']:
+            modelos = [registry.model(nome.lower()) for nome in options['indicadores']]
+            desconhecidos = [nome for nome, modelo in zip(options['indicadores'], modelos) if modelo is None]
+            if desconhecidos:
+                raise CommandError(f"Indicador(es) desconhecido(s): {', '.join(desconhecidos)}")
+
+        self.stdout.write('Reconstruindo índice de cobertura...')
+        counts = rebuild_coverage(modelos)
+        self.stdout.write(self.style.SUCCESS(
+            f"Cobertura reconstruída: {sum(counts.values())} períodos em {len(counts)} indicadores."
+        ))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from questionarios.services.factos import indicator_key, indicator_models, rebuild_facts
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói em lote a tabela de factos (formato longo) a partir dos indicadores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indicador',
+            action='append',
+            dest='indicadores',
+            help='Indicador a reconstruir (nome do modelo, ex.: receitasindicador). Pode ser repetido.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Número de factos por INSERT (padrão: 2000)',
+        )
+
+    def handle(self, *args, **options):
+        modelos = indicator_models()
+        if options['indicadores']:
+            por_chave = {indicator_key(m): m for m in modelos}
+            desconhecidos = [i for i in options['indicadores'] if i.lower() not in por_chave]
+            if desconhecidos:
+                raise CommandError(
+                    f"Indicadores desconhecidos: {', '.join(desconhecidos)}. "
+                    f"Disponíveis: {', '.join(sorted(por_chave))}"
+                )
+            modelos = [por_chave[i.lower()] for i in options['indicadores']]
+
+        self.stdout.write(f'Reconstruindo factos de {len(modelos)} indicador(es)...')
+        counts = rebuild_facts(modelos, batch_size=options['batch_size'])
+        for indicador, total in counts.items():
+            self.stdout.write(f'  {indicador}: {total} factos')
+        self.stdout.write(self.style.SUCCESS(f'Tabela de factos reconstruída: {sum(counts.values())} factos no total.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from questionarios.services.factos import rebuild_facts
+from questionarios.services.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói os rollups trimestrais e anuais a partir da tabela de factos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--with-facts',
+            action='store_true',
+            help='Reconstrói também a tabela de factos antes dos rollups',
+        )
+        parser.add_argument(
+            '--indicador',
+            action='append',
+            dest='indicadores',
+            help='Indicador a reconstruir (nome do modelo, ex.: receitasindicador). Pode ser repetido.',
+        )
+
+    def handle(self, *args, **options):
+        if options['with_facts']:
+            self.stdout.write('Reconstruindo tabela de factos...')
+            counts = rebuild_facts()
+            self.stdout.write(f'  {sum(counts.values())} factos')
+
+        self.stdout.write('Reconstruindo rollups...')
+        result = rebuild_rollups(options['indicadores'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rollups reconstruídos: {result['trimestral']} trimestrais, {result['anual']} anuais."
+        ))
@@ -0,0 +1,89 @@
+import logging
+import multiprocessing
+import signal
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from questionarios.services.import_jobs import requeue_stale_jobs, run_pending, worker_id
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_loop(index, poll_interval, once):
+    """Ciclo de um processo worker: reclama e executa trabalhos até ser terminado."""
+    # Cada processo abre as suas próprias ligações à base de dados
+    connections.close_all()
+    nome = worker_id(index)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            executados = run_pending(nome)
+            if once:
+                return
+            if not executados:
+                time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Executa as importações Excel pendentes (fila ImportacaoExcel) em processos worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'IMPORT_WORKERS', 2),
+            help='Número de processos worker em paralelo (padrão: IMPORT_WORKERS).',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'IMPORT_WORKER_POLL_INTERVAL', 5),
+            help='Segundos de espera quando a fila está vazia.',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Processa os trabalhos pendentes e termina.',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        once = options['once']
+
+        repostos = requeue_stale_jobs(getattr(settings, 'IMPORT_JOB_TIMEOUT_MINUTES', 60))
+        if repostos:
+            self.stdout.write(f"{repostos} importações interrompidas repostas na fila.")
+
+        if workers == 1:
+            self.stdout.write('Worker de importação iniciado (1 processo).')
+            _worker_loop(0, poll_interval, once)
+            self.stdout.write(self.style.SUCCESS('Worker de importação terminado.'))
+            return
+
+        # Não partilhar ligações abertas com os processos filhos
+        connections.close_all()
+        processos = [
+            multiprocessing.Process(target=_worker_loop, args=(i, poll_interval, once), daemon=False)
+            for i in range(workers)
+        ]
+        for processo in processos:
+            processo.start()
+        self.stdout.write(f"Worker de importação iniciado ({workers} processos).")
+
+        try:
+            for processo in processos:
+                processo.join()
+        except KeyboardInterrupt:
+            for processo in processos:
+                processo.terminate()
+            for processo in processos:
+                processo.join()
+        self.stdout.write(self.style.SUCCESS('Worker de importação terminado.'))
@@ -1,14 +1,68 @@
+import time
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from questionarios.supabase_sync import sync_all_data
+
+from questionarios.services.supabase_outbox import SUPABASE_MODELS, is_configured
+from questionarios.utils.supabase_sync import SupabaseClient, sync_all_data
 
 class Command(BaseCommand):
-    help = 'Sincroniza todos os dados existentes com o Supabase'
+    help = 'Sincroniza todos os dados existentes com o Supabase (incremental por data_atualizacao, ou completa)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Compara todos os registos e remove do Supabase os que já não existem.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=getattr(settings, 'SUPABASE_SYNC_WORKERS', 4),
+            help='Tabelas sincronizadas em simultâneo (padrão: SUPABASE_SYNC_WORKERS).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'SUPABASE_SYNC_BATCH_SIZE', 500),
+            help='Registos por upsert (padrão: SUPABASE_SYNC_BATCH_SIZE).',
+        )
+        parser.add_argument(
+            '--tabela',
+            action='append',
+            choices=SUPABASE_MODELS,
+            help='Sincronizar apenas este modelo (pode repetir-se).',
+        )
 
     def handle(self, *args, **options):
-        self.stdout.write(self.style.SUCCESS('Iniciando sincronização com o Supabase...'))
-        
-        try:
-            sync_all_data()
-            self.stdout.write(self.style.SUCCESS('Sincronização concluída com sucesso!'))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR(f'Erro durante a sincronização: {e}')) 
\ No newline at end of file
+        if not is_configured():
+            self.stdout.write(self.style.ERROR('SUPABASE_URL e SUPABASE_KEY não estão configurados.'))
+            return
+
+        modo = 'completa' if options['full'] else 'incremental'
+        self.stdout.write(self.style.SUCCESS(f'Iniciando sincronização {modo} com o Supabase...'))
+
+        inicio = time.monotonic()
+        resultados = sync_all_data(
+            full=options['full'],
+            workers=options['workers'],
+            tables=options['tabela'],
+            client=SupabaseClient(batch_size=options['batch_size']),
+        )
+        erros = 0
+        for r in resultados:
+            linha = (
+                f"  {r['tabela']}: {r['comparados']} comparados, {r['enviados']} enviados, "
+                f"{r['removidos']} removidos ({r['segundos']}s)"
+            )
+            if r['erro']:
+                erros += 1
+                self.stdout.write(self.style.ERROR(f"{linha} - erro: {r['erro']}"))
+            else:
+                self.stdout.write(linha)
+
+        duracao = time.monotonic() - inicio
+        if erros:
+            self.stdout.write(self.style.ERROR(f'Sincronização concluída com {erros} tabelas com erro ({duracao:.1f}s).'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Sincronização concluída com sucesso! ({duracao:.1f}s)'))
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0005_auto_20250825_1606'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicadorFacto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indicador', models.CharField(max_length=60, verbose_name='Indicador')),
+                ('registro_id', models.BigIntegerField(verbose_name='ID do registo de origem')),
+                ('campo', models.CharField(max_length=80, verbose_name='Campo')),
+                ('operadora', models.CharField(blank=True, max_length=50, null=True, verbose_name='Operadora')),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('mes', models.IntegerField(verbose_name='Mês')),
+                ('valor', models.DecimalField(blank=True, decimal_places=4, max_digits=24, null=True, verbose_name='Valor')),
+            ],
+            options={
+                'verbose_name': 'Facto de Indicador',
+                'verbose_name_plural': 'Factos de Indicadores',
+                'indexes': [models.Index(fields=['indicador', 'campo', 'ano', 'mes'], name='facto_ind_campo_periodo_idx'), models.Index(fields=['ano', 'mes', 'operadora'], name='facto_periodo_operadora_idx'), models.Index(fields=['operadora', 'indicador', 'ano'], name='facto_operadora_ind_ano_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='indicadorfacto',
+            constraint=models.UniqueConstraint(fields=('indicador', 'registro_id', 'campo'), name='indicador_facto_unico'),
+        ),
+    ]
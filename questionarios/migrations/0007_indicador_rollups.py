@@ -0,0 +1,50 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0006_indicadorfacto'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicadorRollupTrimestral',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indicador', models.CharField(max_length=60, verbose_name='Indicador')),
+                ('campo', models.CharField(max_length=80, verbose_name='Campo')),
+                ('operadora', models.CharField(blank=True, max_length=50, null=True, verbose_name='Operadora')),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('trimestre', models.PositiveSmallIntegerField(verbose_name='Trimestre')),
+                ('valor', models.DecimalField(blank=True, decimal_places=4, max_digits=28, null=True, verbose_name='Soma')),
+                ('registos', models.IntegerField(default=0, verbose_name='Nº de valores preenchidos')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Rollup Trimestral',
+                'verbose_name_plural': 'Rollups Trimestrais',
+                'indexes': [models.Index(fields=['indicador', 'ano', 'trimestre', 'operadora'], name='rollup_trim_bucket_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='IndicadorRollupAnual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indicador', models.CharField(max_length=60, verbose_name='Indicador')),
+                ('campo', models.CharField(max_length=80, verbose_name='Campo')),
+                ('operadora', models.CharField(blank=True, max_length=50, null=True, verbose_name='Operadora')),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('valor', models.DecimalField(blank=True, decimal_places=4, max_digits=28, null=True, verbose_name='Soma')),
+                ('registos', models.IntegerField(default=0, verbose_name='Nº de valores preenchidos')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Rollup Anual',
+                'verbose_name_plural': 'Rollups Anuais',
+                'indexes': [models.Index(fields=['indicador', 'ano', 'operadora'], name='rollup_anual_bucket_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.11 on 2026-10-18 13:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0007_indicador_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersaoDados',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indicador', models.CharField(max_length=60, unique=True, verbose_name='Indicador')),
+                ('versao', models.BigIntegerField(default=0, verbose_name='Versão')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Versão de Dados',
+                'verbose_name_plural': 'Versões de Dados',
+            },
+        ),
+    ]
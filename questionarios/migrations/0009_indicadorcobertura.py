@@ -0,0 +1,38 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:04
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('questionarios', '0008_versaodados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndicadorCobertura',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indicador', models.CharField(max_length=60, verbose_name='Indicador')),
+                ('operadora', models.CharField(blank=True, max_length=50, null=True, verbose_name='Operadora')),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('mes', models.IntegerField(verbose_name='Mês')),
+                ('registos', models.IntegerField(default=1, verbose_name='Nº de registos')),
+                ('ultima_atualizacao', models.DateTimeField(blank=True, null=True, verbose_name='Última atualização')),
+                ('atualizado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='coberturas_atualizadas', to=settings.AUTH_USER_MODEL, verbose_name='Atualizado por')),
+            ],
+            options={
+                'verbose_name': 'Cobertura de Indicador',
+                'verbose_name_plural': 'Cobertura de Indicadores',
+                'indexes': [models.Index(fields=['operadora', 'ano', 'mes'], name='cobertura_operadora_idx'), models.Index(fields=['ano', 'mes'], name='cobertura_periodo_idx'), models.Index(fields=['-ultima_atualizacao'], name='cobertura_atualizacao_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='indicadorcobertura',
+            constraint=models.UniqueConstraint(fields=('indicador', 'operadora', 'ano', 'mes'), name='cobertura_periodo_unico'),
+        ),
+    ]
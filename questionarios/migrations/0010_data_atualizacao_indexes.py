@@ -0,0 +1,78 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0009_indicadorcobertura'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='empregoindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='estacoesmoveisindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='internetfixoindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='investimentoindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='lbiindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='receitasindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='tarifariovozmtnindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='tarifariovozorangeindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='tarifariovoztelecelindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='trafegointernetindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='trafegooriginadoindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='trafegoroaminginternacionalindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='trafegoterminadoindicador',
+            name='data_atualizacao',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
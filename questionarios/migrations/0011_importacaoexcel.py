@@ -0,0 +1,46 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:15
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('questionarios', '0010_data_atualizacao_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoExcel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ficheiro', models.FileField(upload_to='importacoes/%Y/%m/', verbose_name='Ficheiro')),
+                ('nome_ficheiro', models.CharField(max_length=255, verbose_name='Nome do ficheiro')),
+                ('operadora', models.CharField(blank=True, max_length=50, null=True, verbose_name='Operadora')),
+                ('ano', models.IntegerField(blank=True, null=True, verbose_name='Ano')),
+                ('tipo_indicador', models.CharField(blank=True, max_length=60, null=True, verbose_name='Tipo de indicador')),
+                ('estado', models.CharField(choices=[('pendente', 'Pendente'), ('em_execucao', 'Em execução'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='pendente', max_length=20, verbose_name='Estado')),
+                ('worker', models.CharField(blank=True, max_length=100, verbose_name='Worker')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('progresso', models.JSONField(blank=True, default=dict, verbose_name='Progresso por folha')),
+                ('total_folhas', models.PositiveIntegerField(default=0, verbose_name='Total de folhas')),
+                ('folhas_processadas', models.PositiveIntegerField(default=0, verbose_name='Folhas processadas')),
+                ('processados', models.PositiveIntegerField(default=0, verbose_name='Valores processados')),
+                ('erros', models.PositiveIntegerField(default=0, verbose_name='Erros')),
+                ('detalhes', models.JSONField(blank=True, default=list, verbose_name='Detalhes')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True, verbose_name='Iniciado em')),
+                ('concluido_em', models.DateTimeField(blank=True, null=True, verbose_name='Concluído em')),
+                ('criado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='importacoes_excel', to=settings.AUTH_USER_MODEL, verbose_name='Criado por')),
+            ],
+            options={
+                'verbose_name': 'Importação Excel',
+                'verbose_name_plural': 'Importações Excel',
+                'ordering': ['-criado_em'],
+                'indexes': [models.Index(fields=['estado', 'criado_em'], name='importacao_fila_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0011_importacaoexcel'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacaoHash',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indicador', models.CharField(max_length=60, verbose_name='Indicador')),
+                ('operadora', models.CharField(blank=True, max_length=10, null=True, verbose_name='Operadora')),
+                ('ano', models.IntegerField(verbose_name='Ano')),
+                ('mes', models.IntegerField(verbose_name='Mês')),
+                ('hash', models.CharField(max_length=64, verbose_name='Hash do conteúdo')),
+                ('origem', models.CharField(blank=True, max_length=255, verbose_name='Ficheiro / folha de origem')),
+                ('registo_atualizado_em', models.DateTimeField(blank=True, null=True, verbose_name='Atualização do registo')),
+                ('atualizado_em', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Hash de importação',
+                'verbose_name_plural': 'Hashes de importação',
+            },
+        ),
+        migrations.AddField(
+            model_name='importacaoexcel',
+            name='registos_atualizados',
+            field=models.PositiveIntegerField(default=0, verbose_name='Registos atualizados'),
+        ),
+        migrations.AddField(
+            model_name='importacaoexcel',
+            name='registos_inalterados',
+            field=models.PositiveIntegerField(default=0, verbose_name='Registos inalterados'),
+        ),
+        migrations.AddField(
+            model_name='importacaoexcel',
+            name='registos_novos',
+            field=models.PositiveIntegerField(default=0, verbose_name='Registos novos'),
+        ),
+        migrations.AddField(
+            model_name='importacaoexcel',
+            name='simulacao',
+            field=models.BooleanField(default=False, verbose_name='Simulação (sem gravar)'),
+        ),
+        migrations.AddConstraint(
+            model_name='importacaohash',
+            constraint=models.UniqueConstraint(fields=('indicador', 'operadora', 'ano', 'mes'), name='importacao_hash_periodo_unico'),
+        ),
+    ]
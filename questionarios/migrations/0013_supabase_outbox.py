@@ -0,0 +1,36 @@
+# Generated by Django 4.2.11 on 2026-10-18 14:38
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0012_importacao_incremental'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupabaseOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabela', models.CharField(max_length=100, verbose_name='Tabela Supabase')),
+                ('registo_id', models.CharField(max_length=64, verbose_name='ID do registo')),
+                ('operacao', models.CharField(choices=[('upsert', 'Inserir/atualizar'), ('delete', 'Remover')], max_length=10, verbose_name='Operação')),
+                ('dados', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='Dados')),
+                ('estado', models.CharField(choices=[('pendente', 'Pendente'), ('falhado', 'Falhado (dead letter)')], default='pendente', max_length=10, verbose_name='Estado')),
+                ('tentativas', models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas')),
+                ('proxima_tentativa', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Próxima tentativa')),
+                ('ultimo_erro', models.TextField(blank=True, verbose_name='Último erro')),
+                ('criado_em', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Sincronização Supabase pendente',
+                'verbose_name_plural': 'Sincronizações Supabase pendentes',
+                'ordering': ['pk'],
+                'indexes': [models.Index(fields=['estado', 'proxima_tentativa'], name='supabase_outbox_fila_idx')],
+            },
+        ),
+    ]
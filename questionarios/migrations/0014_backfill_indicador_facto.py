@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+from django.db import migrations, models, transaction
+
+# Modelos de indicador existentes neste ponto do histórico de migrações
+INDICATOR_MODELS = (
+    'EstacoesMoveisIndicador', 'TrafegoOriginadoIndicador', 'TrafegoTerminadoIndicador',
+    'TrafegoRoamingInternacionalIndicador', 'LBIIndicador', 'TrafegoInternetIndicador', 'InternetFixoIndicador',
+    'ReceitasIndicador', 'EmpregoIndicador', 'InvestimentoIndicador', 'TarifarioVozOrangeIndicador',
+    'TarifarioVozMTNIndicador', 'TarifarioVozTelecelIndicador', 'AssinantesIndicador',
+)
+NUMERIC_FIELD_TYPES = (models.IntegerField, models.DecimalField, models.FloatField)
+BATCH_SIZE = 2000
+
+
+def _fact_fields(model):
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if isinstance(field, NUMERIC_FIELD_TYPES)
+        and not field.primary_key
+        and not field.is_relation
+        and field.name not in ('id', 'ano', 'mes')
+    ]
+
+
+def backfill_facts(apps, schema_editor):
+    """
+    Preenche a tabela de factos com os registos já existentes.
+
+    Os sinais só mantêm os factos dos registos gravados depois da criação da
+    tabela; sem este preenchimento, os rollups e os alertas liam apenas esses
+    registos. Usa apenas os modelos históricos (não o código dos serviços).
+    """
+    IndicadorFacto = apps.get_model('questionarios', 'IndicadorFacto')
+
+    for name in INDICATOR_MODELS:
+        model = apps.get_model('questionarios', name)
+        indicador = model._meta.model_name
+        campos = _fact_fields(model)
+        with transaction.atomic():
+            IndicadorFacto.objects.filter(indicador=indicador).delete()
+            buffer = []
+            rows = model.objects.values('id', 'operadora', 'ano', 'mes', *campos).order_by()
+            for row in rows.iterator(chunk_size=BATCH_SIZE):
+                buffer.extend(
+                    IndicadorFacto(
+                        indicador=indicador, registro_id=row['id'], campo=campo, operadora=row['operadora'],
+                        ano=row['ano'], mes=row['mes'],
+                        valor=None if row[campo] is None else Decimal(str(row[campo])),
+                    )
+                    for campo in campos
+                )
+                if len(buffer) >= BATCH_SIZE:
+                    IndicadorFacto.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
+                    buffer = []
+            IndicadorFacto.objects.bulk_create(buffer, batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0013_supabase_outbox'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_facts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+from django.db import migrations, transaction
+from django.db.models import Count, Sum
+
+BATCH_SIZE = 2000
+
+
+def backfill_rollups(apps, schema_editor):
+    """
+    Calcula os rollups trimestrais e anuais dos factos já existentes.
+
+    As views confiam nos rollups logo que exista uma linha para (indicador,
+    ano); sem este preenchimento, a primeira gravação após a migração fazia
+    os relatórios mostrarem apenas esse registo. Usa apenas os modelos
+    históricos (não o código dos serviços).
+    """
+    IndicadorFacto = apps.get_model('questionarios', 'IndicadorFacto')
+    IndicadorRollupTrimestral = apps.get_model('questionarios', 'IndicadorRollupTrimestral')
+    IndicadorRollupAnual = apps.get_model('questionarios', 'IndicadorRollupAnual')
+
+    # (indicador, campo, operadora, ano, trimestre) -> [soma, nº de valores]
+    trimestral = {}
+    rows = (
+        IndicadorFacto.objects
+        .values('indicador', 'campo', 'operadora', 'ano', 'mes')
+        .annotate(total=Sum('valor'), n=Count('valor'))
+        .order_by()
+    )
+    for row in rows.iterator():
+        chave = (row['indicador'], row['campo'], row['operadora'], row['ano'], (row['mes'] - 1) // 3 + 1)
+        entrada = trimestral.setdefault(chave, [None, 0])
+        if row['total'] is not None:
+            entrada[0] = (entrada[0] or 0) + row['total']
+        entrada[1] += row['n']
+
+    anual = {}
+    for (indicador, campo, operadora, ano, _), (valor, registos) in trimestral.items():
+        entrada = anual.setdefault((indicador, campo, operadora, ano), [None, 0])
+        if valor is not None:
+            entrada[0] = (entrada[0] or 0) + valor
+        entrada[1] += registos
+
+    with transaction.atomic():
+        IndicadorRollupTrimestral.objects.all().delete()
+        IndicadorRollupAnual.objects.all().delete()
+        IndicadorRollupTrimestral.objects.bulk_create([
+            IndicadorRollupTrimestral(
+                indicador=i, campo=c, operadora=o, ano=a, trimestre=t, valor=v, registos=n,
+            )
+            for (i, c, o, a, t), (v, n) in trimestral.items()
+        ], batch_size=BATCH_SIZE)
+        IndicadorRollupAnual.objects.bulk_create([
+            IndicadorRollupAnual(indicador=i, campo=c, operadora=o, ano=a, valor=v, registos=n)
+            for (i, c, o, a), (v, n) in anual.items()
+        ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0014_backfill_indicador_facto'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations, transaction
+
+# Modelos de indicador existentes neste ponto do histórico de migrações
+INDICATOR_MODELS = (
+    'EstacoesMoveisIndicador', 'TrafegoOriginadoIndicador', 'TrafegoTerminadoIndicador',
+    'TrafegoRoamingInternacionalIndicador', 'LBIIndicador', 'TrafegoInternetIndicador', 'InternetFixoIndicador',
+    'ReceitasIndicador', 'EmpregoIndicador', 'InvestimentoIndicador', 'TarifarioVozOrangeIndicador',
+    'TarifarioVozMTNIndicador', 'TarifarioVozTelecelIndicador', 'AssinantesIndicador',
+)
+BATCH_SIZE = 1000
+
+
+def backfill_coverage(apps, schema_editor):
+    """
+    Preenche o índice de cobertura com os períodos já existentes.
+
+    Os sinais só indexam os períodos gravados depois da criação do índice; sem
+    este preenchimento, uma única gravação tornava o índice não vazio e as
+    faltas, os anos disponíveis e o resumo dos indicadores ignoravam os
+    restantes períodos. Cada período fica com o nº de registos e a data e o
+    autor do registo mais recente. Usa apenas os modelos históricos.
+    """
+    IndicadorCobertura = apps.get_model('questionarios', 'IndicadorCobertura')
+
+    for name in INDICATOR_MODELS:
+        model = apps.get_model('questionarios', name)
+        field_names = {f.name for f in model._meta.concrete_fields}
+        columns = [c for c in ('data_atualizacao', 'atualizado_por_id') if c.replace('_id', '') in field_names]
+        ordering = ['operadora', 'ano', 'mes', '-pk']
+        if 'data_atualizacao' in columns:
+            ordering.insert(3, '-data_atualizacao')
+
+        # Uma passagem ordenada: o primeiro registo de cada período é o mais recente
+        periodos = {}
+        for row in model.objects.order_by(*ordering).values('operadora', 'ano', 'mes', *columns).iterator():
+            periodo = (row['operadora'], row['ano'], row['mes'])
+            if periodo in periodos:
+                periodos[periodo]['registos'] += 1
+            else:
+                periodos[periodo] = {
+                    'registos': 1,
+                    'ultima_atualizacao': row.get('data_atualizacao'),
+                    'atualizado_por_id': row.get('atualizado_por_id'),
+                }
+
+        indicador = model._meta.model_name
+        with transaction.atomic():
+            IndicadorCobertura.objects.filter(indicador=indicador).delete()
+            IndicadorCobertura.objects.bulk_create([
+                IndicadorCobertura(indicador=indicador, operadora=operadora, ano=ano, mes=mes, **valores)
+                for (operadora, ano, mes), valores in periodos.items()
+            ], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0015_backfill_indicador_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_coverage, migrations.RunPython.noop),
+    ]
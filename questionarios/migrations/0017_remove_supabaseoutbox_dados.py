@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 15:34
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('questionarios', '0016_backfill_indicador_cobertura'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='supabaseoutbox',
+            name='dados',
+        ),
+    ]
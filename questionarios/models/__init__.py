@@ -11,6 +11,12 @@ from .emprego import EmpregoIndicador
 from .investimento import InvestimentoIndicador
 from .tarifario_voz import TarifarioVozOrangeIndicador, TarifarioVozMTNIndicador
 from .tarifario_voz_telecel import TarifarioVozTelecelIndicador
+from .factos import IndicadorFacto
+from .rollups import IndicadorRollupTrimestral, IndicadorRollupAnual
+from .versao import VersaoDados
+from .cobertura import IndicadorCobertura
+from .importacao import ImportacaoExcel, ImportacaoHash
+from .sincronizacao import SupabaseOutbox
 
 # Import RegistroQuestionario and AssinantesIndicador if they exist
 try:
@@ -50,4 +56,12 @@ __all__ = [
     'InvestimentoIndicador',
     'RegistroQuestionario',
     'AssinantesIndicador',
+    'IndicadorFacto',
+    'IndicadorRollupTrimestral',
+    'IndicadorRollupAnual',
+    'VersaoDados',
+    'IndicadorCobertura',
+    'ImportacaoExcel',
+    'ImportacaoHash',
+    'SupabaseOutbox',
 ]
\ No newline at end of file
@@ -44,6 +44,16 @@ class AssinantesIndicador(IndicadorBase):
         default=0
     )
     
+    # Existências: o valor de um período é o do último mês
+    AGGREGATION = 'stock'
+
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_movel': ('assinantes_pre_pago', 'assinantes_pos_pago'),
+        'calcular_total_internet': ('assinantes_internet_movel', 'assinantes_internet_fixa'),
+        'calcular_total_assinantes': ('calcular_total_movel', 'assinantes_fixo', 'calcular_total_internet'),
+    }
+
     def calcular_total_assinantes(self):
         """Calcula o total de assinantes ativos"""
         return (
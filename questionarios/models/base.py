@@ -1,8 +1,8 @@
-from django.db import models
-from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Sum, Value, ExpressionWrapper
+from django.db.models.functions import Coalesce
 import os
 import json
-import requests
 import logging
 import decimal
 
@@ -20,59 +20,109 @@ class IndicadorBase(models.Model):
     ano = models.IntegerField(default=2025)  # Valor padrão para o ano atual
     mes = models.IntegerField(default=1)     # Valor padrão para janeiro
     
+    # Registo dos totais derivados: nome do método calcular_* -> campos (ou outros
+    # métodos do registo) que somam. Cada modelo declara os seus totais para que
+    # possam ser calculados na base de dados com a mesma semântica do método Python.
+    CALCULATION_FIELDS = {}
+    
+    # Semântica de agregação no tempo dos campos do indicador: 'sum' para fluxos
+    # (receitas, tráfego) ou 'stock' para existências (assinantes, emprego), em
+    # que o valor de um período é o do último mês. FIELD_AGGREGATION permite
+    # exceções por campo. Usado pelo registo de metadados (services.metadata).
+    AGGREGATION = 'sum'
+    FIELD_AGGREGATION = {}
+    
     class Meta:
         abstract = True
     
+    @classmethod
+    def get_calculation_fields(cls, method_name):
+        """Expande um total do registo na lista de campos do modelo que o compõem."""
+        fields = []
+        for part in cls.CALCULATION_FIELDS[method_name]:
+            if part in cls.CALCULATION_FIELDS:
+                fields.extend(cls.get_calculation_fields(part))
+            else:
+                fields.append(part)
+        return fields
+    
+    @classmethod
+    def get_calculation_expression(cls, method_name):
+        """
+        Retorna a expressão ORM equivalente a ``method_name``.
+        
+        Campos nulos contam como zero (``Coalesce``), tal como o ``or 0`` dos métodos.
+        """
+        fields = [cls._meta.get_field(name) for name in cls.get_calculation_fields(method_name)]
+        decimal_places = [f.decimal_places for f in fields if isinstance(f, models.DecimalField)]
+        if decimal_places:
+            output_field = models.DecimalField(max_digits=30, decimal_places=max(decimal_places))
+        else:
+            output_field = models.BigIntegerField()
+        
+        expression = None
+        for field in fields:
+            term = Coalesce(F(field.name), Value(0), output_field=output_field)
+            expression = term if expression is None else expression + term
+        return ExpressionWrapper(expression, output_field=output_field)
+    
+    @classmethod
+    def get_calculation_expressions(cls):
+        """Retorna {nome do método: expressão ORM} para todos os totais do registo."""
+        return {name: cls.get_calculation_expression(name) for name in cls.CALCULATION_FIELDS}
+    
+    @classmethod
+    def get_calculation_methods(cls):
+        """Retorna {nome do método: descrição} para os totais do registo."""
+        methods = {}
+        for name in cls.CALCULATION_FIELDS:
+            doc = getattr(getattr(cls, name, None), '__doc__', None)
+            methods[name] = doc.strip().splitlines()[0] if doc else name.replace('_', ' ')
+        return methods
+    
+    @classmethod
+    def aggregate_calculations(cls, queryset=None, method_names=None):
+        """
+        Soma os totais do registo sobre ``queryset`` numa única consulta.
+        
+        Returns:
+            dict: {nome do método: soma}, com 0 quando não há linhas.
+        """
+        if queryset is None:
+            queryset = cls.objects.all()
+        method_names = list(method_names or cls.CALCULATION_FIELDS)
+        totals = queryset.aggregate(
+            **{name: Sum(cls.get_calculation_expression(name)) for name in method_names}
+        )
+        return {name: totals[name] or 0 for name in method_names}
+    
+    def save(self, *args, **kwargs):
+        # Os sinais post_save (ex.: a entrada na outbox do Supabase) ficam na mesma transação
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def save_to_supabase(self, table_name):
         """
-        Salva os dados do indicador no Supabase.
+        Salva os dados do indicador no Supabase (envio imediato, num único upsert).
+        
+        A sincronização normal passa pela outbox (flush_supabase_outbox); este
+        método serve para envios pontuais.
         
         Args:
             table_name (str): Nome da tabela no Supabase
         """
+        from ..services.supabase_outbox import SupabaseRequestError, is_configured, upsert_rows
+        
+        if not is_configured():
+            logger.warning("Configurações do Supabase não encontradas. Ignorando sincronização.")
+            return False
         try:
-            # Verifica se as configurações do Supabase existem
-            if not hasattr(settings, 'SUPABASE_URL') or not hasattr(settings, 'SUPABASE_KEY'):
-                logger.warning("Configurações do Supabase não encontradas. Ignorando sincronização.")
-                return False
-                
-            supabase_url = settings.SUPABASE_URL
-            supabase_key = settings.SUPABASE_KEY
-            
-            # Preparar dados para envio
-            data = self._prepare_data_for_supabase()
-            
-            # Definir cabeçalhos para requisição
-            headers = {
-                "apikey": supabase_key,
-                "Authorization": f"Bearer {supabase_key}",
-                "Content-Type": "application/json",
-                "Prefer": "return=representation"
-            }
-            
-            # Verificar se o registro já existe
-            check_url = f"{supabase_url}/rest/v1/{table_name}?id=eq.{self.id}"
-            check_response = requests.get(check_url, headers=headers)
-            
-            if check_response.status_code == 200 and len(check_response.json()) > 0:
-                # Atualizar registro existente
-                update_url = f"{supabase_url}/rest/v1/{table_name}?id=eq.{self.id}"
-                response = requests.patch(update_url, headers=headers, json=data)
-            else:
-                # Inserir novo registro
-                insert_url = f"{supabase_url}/rest/v1/{table_name}"
-                response = requests.post(insert_url, headers=headers, json=data)
-            
-            if response.status_code in [200, 201, 204]:
-                logger.info(f"Dados salvos com sucesso no Supabase: {table_name}, ID: {self.id}")
-                return True
-            else:
-                logger.error(f"Erro ao salvar no Supabase: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
+            upsert_rows(table_name, [self._prepare_data_for_supabase()])
+        except SupabaseRequestError as e:
             logger.error(f"Erro ao salvar no Supabase: {e}")
             return False
+        logger.info(f"Dados salvos com sucesso no Supabase: {table_name}, ID: {self.id}")
+        return True
     
     def delete_from_supabase(self, table_name):
         """
@@ -81,36 +131,18 @@ class IndicadorBase(models.Model):
         Args:
             table_name (str): Nome da tabela no Supabase
         """
+        from ..services.supabase_outbox import SupabaseRequestError, delete_rows, is_configured
+        
+        if not is_configured():
+            logger.warning("Configurações do Supabase não encontradas. Ignorando deleção.")
+            return False
         try:
-            # Verifica se as configurações do Supabase existem
-            if not hasattr(settings, 'SUPABASE_URL') or not hasattr(settings, 'SUPABASE_KEY'):
-                logger.warning("Configurações do Supabase não encontradas. Ignorando deleção.")
-                return False
-                
-            supabase_url = settings.SUPABASE_URL
-            supabase_key = settings.SUPABASE_KEY
-            
-            # Definir cabeçalhos para requisição
-            headers = {
-                "apikey": supabase_key,
-                "Authorization": f"Bearer {supabase_key}",
-                "Content-Type": "application/json"
-            }
-            
-            # Remover registro do Supabase
-            delete_url = f"{supabase_url}/rest/v1/{table_name}?id=eq.{self.id}"
-            response = requests.delete(delete_url, headers=headers)
-            
-            if response.status_code in [200, 204]:
-                logger.info(f"Dados removidos com sucesso do Supabase: {table_name}, ID: {self.id}")
-                return True
-            else:
-                logger.error(f"Erro ao remover do Supabase: {response.status_code} - {response.text}")
-                return False
-                
-        except Exception as e:
+            delete_rows(table_name, [self.id])
+        except SupabaseRequestError as e:
             logger.error(f"Erro ao remover do Supabase: {e}")
             return False
+        logger.info(f"Dados removidos com sucesso do Supabase: {table_name}, ID: {self.id}")
+        return True
     
     def _prepare_data_for_supabase(self):
         """
@@ -0,0 +1,39 @@
+# models/cobertura.py
+from django.conf import settings
+from django.db import models
+
+
+class IndicadorCobertura(models.Model):
+    """
+    Índice de cobertura das submissões: uma linha por (indicador, operadora,
+    ano, mês) com dados submetidos.
+
+    Mantido pelos sinais de IndicadorBase (ver questionarios.services.cobertura)
+    para responder a perguntas de conformidade e disponibilidade sem consultar
+    cada tabela de indicador.
+    """
+    indicador = models.CharField(max_length=60, verbose_name="Indicador")
+    operadora = models.CharField(max_length=50, null=True, blank=True, verbose_name="Operadora")
+    ano = models.IntegerField(verbose_name="Ano")
+    mes = models.IntegerField(verbose_name="Mês")
+    registos = models.IntegerField(default=1, verbose_name="Nº de registos")
+    ultima_atualizacao = models.DateTimeField(null=True, blank=True, verbose_name="Última atualização")
+    atualizado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='coberturas_atualizadas', verbose_name="Atualizado por",
+    )
+
+    class Meta:
+        verbose_name = "Cobertura de Indicador"
+        verbose_name_plural = "Cobertura de Indicadores"
+        constraints = [
+            models.UniqueConstraint(fields=['indicador', 'operadora', 'ano', 'mes'], name='cobertura_periodo_unico'),
+        ]
+        indexes = [
+            models.Index(fields=['operadora', 'ano', 'mes'], name='cobertura_operadora_idx'),
+            models.Index(fields=['ano', 'mes'], name='cobertura_periodo_idx'),
+            models.Index(fields=['-ultima_atualizacao'], name='cobertura_atualizacao_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.indicador} - {self.operadora or 'N/D'} - {self.ano}/{self.mes}"
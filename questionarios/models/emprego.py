@@ -28,7 +28,7 @@ class EmpregoIndicador(IndicadorBase):
         related_name='emprego_atualizado'
     )
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Emprego - {self.ano}/{self.mes}"
@@ -38,6 +38,18 @@ class EmpregoIndicador(IndicadorBase):
         verbose_name_plural = "Empregos"
         unique_together = ('ano', 'mes', 'operadora')
 
+    # Existências: o valor de um período é o do último mês
+    AGGREGATION = 'stock'
+
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_emprego_direto': ('emprego_direto_total',),
+        'calcular_total_nacionais': ('nacionais_total',),
+        'calcular_total_nacionais_genero': ('nacionais_homem', 'nacionais_mulher'),
+        'calcular_total_emprego_indireto': ('emprego_indireto',),
+        'calcular_total_geral': ('emprego_direto_total', 'emprego_indireto'),
+    }
+
     def calcular_total_emprego_direto(self):
         return self.emprego_direto_total
 
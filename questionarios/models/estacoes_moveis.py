@@ -261,9 +261,36 @@ class EstacoesMoveisIndicador(IndicadorBase):
         related_name='estacoes_moveis_atualizadas'
     )
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     # ========== MÉTODOS DE CÁLCULO ==========
+    # Existências (estações/utilizadores); os movimentos de Mobile Money são fluxos
+    AGGREGATION = 'stock'
+    FIELD_AGGREGATION = {
+        campo: 'sum' for campo in (
+            'total_carregamentos', 'total_carregamentos_mulher', 'total_carregamentos_homem',
+            'total_levantamentos', 'total_levantamentos_mulher', 'total_levantamentos_homem',
+            'total_transferencias', 'total_transferencias_mulher', 'total_transferencias_homem',
+        )
+    }
+
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_estacoes_moveis': (
+            'afectos_planos_pos_pagos', 'afectos_planos_pre_pagos',
+            'associados_situacoes_especificas', 'outros_residuais',
+        ),
+        'calcular_total_estacoes_com_utilizacao': (
+            'afectos_planos_pos_pagos_utilizacao', 'afectos_planos_pre_pagos_utilizacao',
+        ),
+        'calcular_total_3g': ('utilizadores_servico_3g_upgrades', 'utilizadores_acesso_internet_3g'),
+        'calcular_total_4g': ('utilizadores_servico_4g', 'utilizadores_acesso_internet_4g'),
+        'calcular_total_linhas_alugadas': (
+            'linhas_64kbit', 'linhas_128kbit', 'linhas_256kbit',
+            'linhas_512kbit', 'linhas_1mbit', 'linhas_maior_2mbit',
+        ),
+    }
+
     def calcular_total_estacoes_moveis(self):
         """Calcula total de estações móveis ativas"""
         return (
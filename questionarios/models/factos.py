@@ -0,0 +1,39 @@
+# models/factos.py
+from django.db import models
+
+
+class IndicadorFacto(models.Model):
+    """
+    Tabela de factos em formato longo: um valor numérico por
+    (indicador, campo, operadora, ano, mês).
+
+    É mantida incrementalmente pelos sinais de IndicadorBase (ver
+    questionarios.signals) e pode ser reconstruída com o comando
+    ``rebuild_indicator_facts``. Permite responder a consultas que cruzam
+    vários indicadores com uma única leitura indexada.
+    """
+    indicador = models.CharField(max_length=60, verbose_name="Indicador")
+    registro_id = models.BigIntegerField(verbose_name="ID do registo de origem")
+    campo = models.CharField(max_length=80, verbose_name="Campo")
+    operadora = models.CharField(max_length=50, null=True, blank=True, verbose_name="Operadora")
+    ano = models.IntegerField(verbose_name="Ano")
+    mes = models.IntegerField(verbose_name="Mês")
+    valor = models.DecimalField(max_digits=24, decimal_places=4, null=True, blank=True, verbose_name="Valor")
+
+    class Meta:
+        verbose_name = "Facto de Indicador"
+        verbose_name_plural = "Factos de Indicadores"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['indicador', 'registro_id', 'campo'],
+                name='indicador_facto_unico',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['indicador', 'campo', 'ano', 'mes'], name='facto_ind_campo_periodo_idx'),
+            models.Index(fields=['ano', 'mes', 'operadora'], name='facto_periodo_operadora_idx'),
+            models.Index(fields=['operadora', 'indicador', 'ano'], name='facto_operadora_ind_ano_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.indicador}.{self.campo} - {self.ano}/{self.mes} - {self.operadora or 'N/D'}: {self.valor}"
@@ -0,0 +1,102 @@
+# models/importacao.py
+from django.conf import settings
+from django.db import models
+
+
+class ImportacaoExcel(models.Model):
+    """
+    Trabalho de importação de um ficheiro Excel, executado fora do pedido HTTP
+    pelo comando ``run_import_worker`` (ver questionarios.services.import_jobs).
+    """
+    ESTADO_PENDENTE = 'pendente'
+    ESTADO_EM_EXECUCAO = 'em_execucao'
+    ESTADO_CONCLUIDO = 'concluido'
+    ESTADO_ERRO = 'erro'
+    ESTADO_CHOICES = [
+        (ESTADO_PENDENTE, 'Pendente'),
+        (ESTADO_EM_EXECUCAO, 'Em execução'),
+        (ESTADO_CONCLUIDO, 'Concluído'),
+        (ESTADO_ERRO, 'Erro'),
+    ]
+
+    ficheiro = models.FileField(upload_to='importacoes/%Y/%m/', verbose_name="Ficheiro")
+    nome_ficheiro = models.CharField(max_length=255, verbose_name="Nome do ficheiro")
+    operadora = models.CharField(max_length=50, null=True, blank=True, verbose_name="Operadora")
+    ano = models.IntegerField(null=True, blank=True, verbose_name="Ano")
+    tipo_indicador = models.CharField(max_length=60, null=True, blank=True, verbose_name="Tipo de indicador")
+
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default=ESTADO_PENDENTE, verbose_name="Estado")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Worker")
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    simulacao = models.BooleanField(default=False, verbose_name="Simulação (sem gravar)")
+
+    # Progresso por folha: {folha: {'estado', 'processados', 'erros'}}
+    progresso = models.JSONField(default=dict, blank=True, verbose_name="Progresso por folha")
+    total_folhas = models.PositiveIntegerField(default=0, verbose_name="Total de folhas")
+    folhas_processadas = models.PositiveIntegerField(default=0, verbose_name="Folhas processadas")
+    processados = models.PositiveIntegerField(default=0, verbose_name="Valores processados")
+    erros = models.PositiveIntegerField(default=0, verbose_name="Erros")
+    # Diferenças face aos dados existentes (registos mensais)
+    registos_novos = models.PositiveIntegerField(default=0, verbose_name="Registos novos")
+    registos_atualizados = models.PositiveIntegerField(default=0, verbose_name="Registos atualizados")
+    registos_inalterados = models.PositiveIntegerField(default=0, verbose_name="Registos inalterados")
+    detalhes = models.JSONField(default=list, blank=True, verbose_name="Detalhes")
+
+    criado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='importacoes_excel', verbose_name="Criado por",
+    )
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+    iniciado_em = models.DateTimeField(null=True, blank=True, verbose_name="Iniciado em")
+    concluido_em = models.DateTimeField(null=True, blank=True, verbose_name="Concluído em")
+
+    class Meta:
+        verbose_name = "Importação Excel"
+        verbose_name_plural = "Importações Excel"
+        ordering = ['-criado_em']
+        indexes = [
+            models.Index(fields=['estado', 'criado_em'], name='importacao_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.nome_ficheiro} ({self.get_estado_display()})"
+
+    @property
+    def percentagem(self):
+        if self.estado == self.ESTADO_CONCLUIDO:
+            return 100
+        if not self.total_folhas:
+            return 0
+        return round(self.folhas_processadas / self.total_folhas * 100)
+
+    @property
+    def terminado(self):
+        return self.estado in (self.ESTADO_CONCLUIDO, self.ESTADO_ERRO)
+
+
+class ImportacaoHash(models.Model):
+    """
+    Hash do conteúdo importado para cada período (indicador, operadora, ano, mês).
+
+    Permite reconhecer um reenvio sem alterações sem ler os valores gravados:
+    o hash só é válido enquanto ``registo_atualizado_em`` coincidir com o
+    ``data_atualizacao`` do registo (edições manuais invalidam-no).
+    """
+    indicador = models.CharField(max_length=60, verbose_name="Indicador")
+    operadora = models.CharField(max_length=10, null=True, blank=True, verbose_name="Operadora")
+    ano = models.IntegerField(verbose_name="Ano")
+    mes = models.IntegerField(verbose_name="Mês")
+    hash = models.CharField(max_length=64, verbose_name="Hash do conteúdo")
+    origem = models.CharField(max_length=255, blank=True, verbose_name="Ficheiro / folha de origem")
+    registo_atualizado_em = models.DateTimeField(null=True, blank=True, verbose_name="Atualização do registo")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Hash de importação"
+        verbose_name_plural = "Hashes de importação"
+        constraints = [
+            models.UniqueConstraint(fields=['indicador', 'operadora', 'ano', 'mes'], name='importacao_hash_periodo_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.indicador} {self.operadora} {self.mes}/{self.ano}"
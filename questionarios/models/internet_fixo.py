@@ -38,7 +38,29 @@ class InternetFixoIndicador(IndicadorBase):
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='internet_fixo_criado')
     atualizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='internet_fixo_atualizado')
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Existências: o valor de um período é o do último mês
+    AGGREGATION = 'stock'
+
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_assinantes_radio': (
+            'cidade_bissau', 'bafata', 'biombo', 'bolama_bijagos', 'cacheu',
+            'gabu', 'oio', 'quinara', 'tombali',
+        ),
+        'calcular_total_assinantes_ativos': (
+            'airbox', 'sistema_hertziano_fixo_terra', 'outros_proxim', 'fibra_otica',
+        ),
+        'calcular_total_banda_larga': (
+            'banda_larga_256kbits_2mbits', 'banda_larga_2_4mbits',
+            'banda_larga_5_10mbits', 'banda_larga_outros',
+        ),
+        'calcular_total_assinantes_categoria': (
+            'residencial', 'corporativo_empresarial', 'instituicoes_publicas',
+            'instituicoes_ensino', 'instituicoes_saude', 'ong_outros',
+        ),
+    }
 
     def calcular_total_assinantes_radio(self):
         return (self.cidade_bissau + self.bafata + self.biombo + 
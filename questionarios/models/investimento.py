@@ -55,7 +55,7 @@ class InvestimentoIndicador(IndicadorBase):
         related_name='investimento_atualizado'
     )
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     # Campos adicionais dinâmicos
     outros_investimentos = models.CharField(
@@ -65,6 +65,13 @@ class InvestimentoIndicador(IndicadorBase):
         help_text="Campos adicionais de investimentos"
     )
 
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_corporeo': ('servicos_telecomunicacoes', 'servicos_internet'),
+        'calcular_total_incorporeo': ('servicos_telecomunicacoes_incorporeo', 'servicos_internet_incorporeo'),
+        'calcular_total_geral': ('calcular_total_corporeo', 'calcular_total_incorporeo'),
+    }
+
     def calcular_total_corporeo(self):
         try:
             telecomunicacoes = self.servicos_telecomunicacoes or 0
@@ -23,7 +23,7 @@ class LBIIndicador(IndicadorBase):
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='lbi_criado')
     atualizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='lbi_atualizado')
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"LBI - {self.ano}/{self.mes}"
@@ -31,6 +31,16 @@ class LBIIndicador(IndicadorBase):
     class Meta:
         unique_together = ('ano', 'mes', 'operadora')
 
+    # Existências: o valor de um período é o do último mês
+    AGGREGATION = 'stock'
+
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_tecnologia': ('satelite', 'cabo_fibra_optica', 'feixe_hertziano'),
+        'calcular_total_down': ('utilizada_down',),
+        'calcular_total_up': ('utilizada_up',),
+    }
+
     def calcular_total_tecnologia(self):
         return (self.satelite or 0) + self.cabo_fibra_optica + self.feixe_hertziano
 
@@ -53,7 +53,7 @@ class ReceitasIndicador(IndicadorBase):
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='receitas_criado')
     atualizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='receitas_atualizado')
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Receitas - {self.ano}/{self.mes}"
@@ -63,6 +63,33 @@ class ReceitasIndicador(IndicadorBase):
         verbose_name_plural = "Receitas"
         unique_together = ('ano', 'mes', 'operadora')
 
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_receitas_internacional': (
+            'receitas_chamadas_cedeao', 'receitas_chamadas_cplp', 'receitas_chamadas_palop',
+            'receitas_chamadas_resto_africa', 'receitas_chamadas_resto_mundo',
+        ),
+        'calcular_total_receitas_voz': (
+            'receitas_chamadas_on_net', 'receitas_chamadas_off_net', 'receitas_chamadas_telecel',
+            'receitas_chamadas_rede_movel_b', 'receitas_chamadas_outros',
+            'receitas_servico_telefonico_fixo', 'calcular_total_receitas_internacional',
+        ),
+        'calcular_total_receitas_dados': (
+            'receitas_dados_moveis', 'receitas_internet_banda_larga', 'receitas_videochamadas',
+            'receitas_mobile_tv', 'receitas_outros_servicos_dados',
+        ),
+        'calcular_total_receitas_retalhistas': (
+            'receitas_mensalidades', 'calcular_total_receitas_voz', 'receitas_voz_roaming_out',
+            'receitas_mensagens', 'calcular_total_receitas_dados', 'receitas_roaming_out_dados',
+            'outras_receitas_retalhistas',
+        ),
+        'calcular_total_receitas_grossistas': (
+            'receitas_terminacao_voz', 'receitas_terminacao_dados', 'receitas_originacao_trafego',
+            'receitas_servicos_especiais', 'outras_receitas_grossistas',
+        ),
+        'calcular_total_receitas': ('calcular_total_receitas_retalhistas', 'calcular_total_receitas_grossistas'),
+    }
+
     def calcular_total_receitas_voz(self):
         return (
             self.receitas_chamadas_on_net +
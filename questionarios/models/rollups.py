@@ -0,0 +1,54 @@
+# models/rollups.py
+from django.db import models
+
+
+class IndicadorRollupTrimestral(models.Model):
+    """
+    Totais pré-calculados por (indicador, campo, operadora, ano, trimestre).
+
+    Atualizados apenas para o trimestre afetado quando um registo de indicador
+    é gravado ou eliminado (ver questionarios.services.rollups).
+    """
+    indicador = models.CharField(max_length=60, verbose_name="Indicador")
+    campo = models.CharField(max_length=80, verbose_name="Campo")
+    operadora = models.CharField(max_length=50, null=True, blank=True, verbose_name="Operadora")
+    ano = models.IntegerField(verbose_name="Ano")
+    trimestre = models.PositiveSmallIntegerField(verbose_name="Trimestre")
+    valor = models.DecimalField(max_digits=28, decimal_places=4, null=True, blank=True, verbose_name="Soma")
+    registos = models.IntegerField(default=0, verbose_name="Nº de valores preenchidos")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Rollup Trimestral"
+        verbose_name_plural = "Rollups Trimestrais"
+        indexes = [
+            models.Index(fields=['indicador', 'ano', 'trimestre', 'operadora'], name='rollup_trim_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.indicador}.{self.campo} - {self.ano}/T{self.trimestre} - {self.operadora or 'N/D'}: {self.valor}"
+
+
+class IndicadorRollupAnual(models.Model):
+    """
+    Totais pré-calculados por (indicador, campo, operadora, ano).
+
+    Derivados dos rollups trimestrais do mesmo ano.
+    """
+    indicador = models.CharField(max_length=60, verbose_name="Indicador")
+    campo = models.CharField(max_length=80, verbose_name="Campo")
+    operadora = models.CharField(max_length=50, null=True, blank=True, verbose_name="Operadora")
+    ano = models.IntegerField(verbose_name="Ano")
+    valor = models.DecimalField(max_digits=28, decimal_places=4, null=True, blank=True, verbose_name="Soma")
+    registos = models.IntegerField(default=0, verbose_name="Nº de valores preenchidos")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Rollup Anual"
+        verbose_name_plural = "Rollups Anuais"
+        indexes = [
+            models.Index(fields=['indicador', 'ano', 'operadora'], name='rollup_anual_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.indicador}.{self.campo} - {self.ano} - {self.operadora or 'N/D'}: {self.valor}"
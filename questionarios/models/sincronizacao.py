@@ -0,0 +1,47 @@
+# models/sincronizacao.py
+from django.db import models
+from django.utils import timezone
+
+
+class SupabaseOutbox(models.Model):
+    """
+    Alteração de um indicador a enviar para o Supabase (padrão *transactional outbox*).
+
+    A entrada é gravada na mesma transação que o indicador; o comando
+    ``flush_supabase_outbox`` envia-as em lote (ver questionarios.services.supabase_outbox),
+    de modo que a gravação do formulário não espera pela API remota.
+    """
+    OPERACAO_UPSERT = 'upsert'
+    OPERACAO_DELETE = 'delete'
+    OPERACAO_CHOICES = [
+        (OPERACAO_UPSERT, 'Inserir/atualizar'),
+        (OPERACAO_DELETE, 'Remover'),
+    ]
+
+    ESTADO_PENDENTE = 'pendente'
+    ESTADO_FALHADO = 'falhado'
+    ESTADO_CHOICES = [
+        (ESTADO_PENDENTE, 'Pendente'),
+        (ESTADO_FALHADO, 'Falhado (dead letter)'),
+    ]
+
+    tabela = models.CharField(max_length=100, verbose_name="Tabela Supabase")
+    registo_id = models.CharField(max_length=64, verbose_name="ID do registo")
+    operacao = models.CharField(max_length=10, choices=OPERACAO_CHOICES, verbose_name="Operação")
+
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default=ESTADO_PENDENTE, verbose_name="Estado")
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    proxima_tentativa = models.DateTimeField(default=timezone.now, verbose_name="Próxima tentativa")
+    ultimo_erro = models.TextField(blank=True, verbose_name="Último erro")
+    criado_em = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+
+    class Meta:
+        verbose_name = "Sincronização Supabase pendente"
+        verbose_name_plural = "Sincronizações Supabase pendentes"
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['estado', 'proxima_tentativa'], name='supabase_outbox_fila_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_operacao_display()} {self.tabela} #{self.registo_id} ({self.get_estado_display()})"
@@ -86,7 +86,7 @@ class TarifarioVozOrangeIndicador(IndicadorBase):
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='tarifario_orange_criado')
     atualizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='tarifario_orange_atualizado')
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Tarifário Orange - {self.ano}/{self.mes}"
@@ -231,7 +231,7 @@ class TarifarioVozMTNIndicador(IndicadorBase):
         related_name='tarifario_telecel_atualizado'
     )
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         verbose_name = "Tarifário MTN"
@@ -44,7 +44,7 @@ class TarifarioVozTelecelIndicador(IndicadorBase):
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='telecel_criado')
     atualizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='telecel_atualizado')
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
     taxa_imposto = models.DecimalField(max_digits=5, decimal_places=2, default=0.15, verbose_name="Taxa de Imposto Aplicável")
     link_plano = models.URLField(max_length=200, blank=True, null=True, verbose_name="Link para o Plano Tarifário Oficial")
 
@@ -48,7 +48,7 @@ class TrafegoInternetIndicador(IndicadorBase):
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='trafego_internet_criado')
     atualizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='trafego_internet_atualizado')
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Tráfego de Internet - {self.ano}/{self.mes}"
@@ -56,6 +56,20 @@ class TrafegoInternetIndicador(IndicadorBase):
     class Meta:
         unique_together = ('ano', 'mes', 'operadora')
 
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_trafego': ('trafego_total',),
+        'calcular_total_banda_larga': ('banda_larga_total',),
+        'calcular_total_categoria': (
+            'residencial', 'corporativo_empresarial', 'instituicoes_publicas',
+            'instituicoes_ensino', 'instituicoes_saude', 'ong_outros',
+        ),
+        'calcular_total_regiao': (
+            'cidade_bissau', 'bafata', 'biombo', 'bolama_bijagos', 'cacheu',
+            'gabu', 'oio', 'quinara', 'tombali',
+        ),
+    }
+
     def calcular_total_trafego(self):
         return self.trafego_total
 
@@ -370,10 +370,57 @@ class TrafegoOriginadoIndicador(IndicadorBase):
         related_name='trafego_originado_atualizado'
     )
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     # ========== MÉTODOS DE CÁLCULO ==========
     
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_dados_2g_mb': ('trafego_dados_2g_mbytes',),
+        'calcular_total_dados_3g_mb': (
+            'trafego_dados_3g_upgrade_mbytes', 'internet_3g_mbytes',
+            'internet_3g_placas_modem_mbytes', 'internet_3g_modem_usb_mbytes',
+        ),
+        'calcular_total_dados_4g_mb': (
+            'trafego_dados_4g_mbytes', 'internet_4g_mbytes',
+            'internet_4g_placas_modem_mbytes', 'internet_4g_modem_usb_mbytes',
+        ),
+        'calcular_total_dados_mb': (
+            'calcular_total_dados_2g_mb', 'calcular_total_dados_3g_mb', 'calcular_total_dados_4g_mb',
+        ),
+        'calcular_total_sessoes': (
+            'trafego_dados_2g_sessoes', 'trafego_dados_3g_upgrade_sessoes', 'internet_3g_sessoes',
+            'internet_3g_placas_modem_sessoes', 'internet_3g_modem_usb_sessoes',
+            'trafego_dados_4g_sessoes', 'internet_4g_sessoes',
+            'internet_4g_placas_modem_sessoes', 'internet_4g_modem_usb_sessoes',
+        ),
+        'calcular_total_sms_nacional': ('sms_on_net', 'sms_off_net_nacional'),
+        'calcular_total_sms_internacional': (
+            'sms_cedeao', 'sms_palop', 'sms_cplp', 'sms_resto_africa', 'sms_resto_mundo',
+        ),
+        'calcular_total_sms': ('calcular_total_sms_nacional', 'calcular_total_sms_internacional'),
+        'calcular_total_voz_nacional_minutos': (
+            'voz_on_net_minutos', 'voz_off_net_nacional_minutos',
+            'voz_rede_fixa_minutos', 'voz_outras_redes_moveis_minutos',
+        ),
+        'calcular_total_voz_internacional_minutos': (
+            'voz_cedeao_minutos', 'voz_palop_minutos', 'voz_cplp_minutos',
+            'voz_resto_africa_minutos', 'voz_resto_mundo_minutos',
+        ),
+        'calcular_total_voz_minutos': (
+            'calcular_total_voz_nacional_minutos', 'calcular_total_voz_internacional_minutos',
+        ),
+        'calcular_total_chamadas_nacional': (
+            'chamadas_on_net', 'chamadas_off_net_nacional',
+            'chamadas_rede_fixa', 'chamadas_outras_redes_moveis',
+        ),
+        'calcular_total_chamadas_internacional': (
+            'chamadas_cedeao', 'chamadas_palop', 'chamadas_cplp',
+            'chamadas_resto_africa', 'chamadas_resto_mundo',
+        ),
+        'calcular_total_chamadas': ('calcular_total_chamadas_nacional', 'calcular_total_chamadas_internacional'),
+    }
+
     def calcular_total_dados_2g_mb(self):
         """Calcula total de dados 2G em MB"""
         return self.trafego_dados_2g_mbytes
@@ -44,7 +44,7 @@ class TrafegoTerminadoIndicador(IndicadorBase):
     criado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='trafego_terminado_criado')
     atualizado_por = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='trafego_terminado_atualizado')
     data_criacao = models.DateTimeField(auto_now_add=True)
-    data_atualizacao = models.DateTimeField(auto_now=True)
+    data_atualizacao = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"Tráfego Terminado - {self.ano}/{self.mes}"
@@ -52,6 +52,23 @@ class TrafegoTerminadoIndicador(IndicadorBase):
     class Meta:
         unique_together = ('ano', 'mes', 'operadora')
 
+    # Totais derivados calculáveis na base de dados (ver IndicadorBase.CALCULATION_FIELDS)
+    CALCULATION_FIELDS = {
+        'calcular_total_chamadas': (
+            'chamadas_outros_op_moveis_nacionais', 'chamadas_telecel', 'chamadas_operador_b',
+            'chamadas_outros', 'chamadas_operador_rede_fixa', 'chamadas_cedeao', 'chamadas_cplp',
+            'chamadas_palop', 'chamadas_resto_africa', 'chamadas_resto_mundo', 'chamadas_numeros_curtos',
+        ),
+        'calcular_total_minutos': (
+            'minutos_outros_op_moveis_nacionais', 'minutos_telecel', 'minutos_operador_b',
+            'minutos_outros', 'minutos_operador_rede_fixa', 'minutos_cedeao', 'minutos_cplp',
+            'minutos_palop', 'minutos_resto_africa', 'minutos_resto_mundo', 'minutos_numeros_curtos',
+        ),
+        'calcular_total_sms': (
+            'sms_outras_redes_moveis_nacionais', 'sms_outras_redes_internacionais', 'sms_outros',
+        ),
+    }
+
     def calcular_total_chamadas(self):
         return (
             self.chamadas_outros_op_moveis_nacionais +
@@ -0,0 +1,22 @@
+# models/versao.py
+from django.db import models
+
+
+class VersaoDados(models.Model):
+    """
+    Contador de geração dos dados de cada indicador.
+
+    É incrementado sempre que um registo do indicador é gravado ou eliminado;
+    os resultados em cache são indexados por estas versões e ficam obsoletos
+    automaticamente quando os dados mudam.
+    """
+    indicador = models.CharField(max_length=60, unique=True, verbose_name="Indicador")
+    versao = models.BigIntegerField(default=0, verbose_name="Versão")
+    atualizado_em = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Versão de Dados"
+        verbose_name_plural = "Versões de Dados"
+
+    def __str__(self):
+        return f"{self.indicador} v{self.versao}"
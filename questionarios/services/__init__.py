@@ -0,0 +1,3 @@
+"""
+Serviços de domínio do app questionarios (agregação, importação, sincronização).
+"""
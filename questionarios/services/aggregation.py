@@ -0,0 +1,309 @@
+"""
+Motor de agregação agrupada para as views de análise de mercado.
+
+Em vez de uma consulta por (operadora × trimestre) e outra por (operadora × ano),
+todos os campos de ``aggregate_fields`` são agregados numa única consulta
+``GROUP BY operadora, trimestre``. Os totais de mercado, os valores por operadora
+e os valores anuais são depois consolidados em Python a partir dessas linhas.
+"""
+import logging
+from decimal import Decimal
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Avg, Case, Count, IntegerField, Sum, Value, When
+
+from . import rollups
+from .metadata import AGGREGATION_STOCK, registry
+
+logger = logging.getLogger(__name__)
+
+QUARTERS = (1, 2, 3, 4)
+TOTAL_KEY = 'TOTAL'
+
+
+def quarter_expression(month_field='mes'):
+    """Expressão SQL portável que converte o mês (1-12) no trimestre (1-4)."""
+    return Case(
+        When(**{f'{month_field}__lte': 3}, then=Value(1)),
+        When(**{f'{month_field}__lte': 6}, then=Value(2)),
+        When(**{f'{month_field}__lte': 9}, then=Value(3)),
+        default=Value(4),
+        output_field=IntegerField(),
+    )
+
+
+@lru_cache(maxsize=None)
+def _resolve_fields(model, field_specs):
+    """
+    Valida uma única vez por modelo os campos pedidos.
+
+    Retorna um tuplo de (campo, é_média) apenas com os campos existentes; os
+    inexistentes são registados no log e devolvidos a zero pelo motor.
+    """
+    resolved = []
+    for field, agg_func in field_specs:
+        if not registry.has_field(model, field):
+            try:
+                model._meta.get_field(field)
+            except FieldDoesNotExist:
+                logger.warning(f"Field '{field}' does not exist on model {model.__name__}. Skipping aggregation.")
+                continue
+        resolved.append((field, agg_func is Avg))
+    return tuple(resolved)
+
+
+def _to_number(value):
+    if value is None:
+        return 0
+    return float(value) if isinstance(value, Decimal) else value
+
+
+def _empty_bucket():
+    return {'sum': {}, 'count': {}}
+
+
+def _accumulate(bucket, row, fields):
+    for field, is_avg in fields:
+        value = row[f'sum__{field}']
+        if value is not None:
+            bucket['sum'][field] = bucket['sum'].get(field, 0) + value
+        if is_avg:
+            bucket['count'][field] = bucket['count'].get(field, 0) + (row[f'count__{field}'] or 0)
+
+
+def _finalize(bucket, fields, all_fields):
+    result = {}
+    valid = dict(fields)
+    for field in all_fields:
+        if field not in valid:
+            result[f'total_{field}'] = 0
+            continue
+        total = bucket['sum'].get(field)
+        if valid[field]:
+            count = bucket['count'].get(field, 0)
+            total = (total / count) if count and total is not None else None
+        result[f'total_{field}'] = _to_number(total)
+    return result
+
+
+def aggregate_market_data(model, year, aggregate_fields, operadoras=()):
+    """
+    Agrega ``aggregate_fields`` de ``model`` para ``year`` numa única consulta.
+
+    Args:
+        model: Modelo de indicador (subclasse de IndicadorBase).
+        year: Ano a analisar.
+        aggregate_fields: dict {campo: Sum|Avg} como definido nas views de análise.
+        operadoras: Códigos de operadora a incluir como chaves próprias no resultado.
+
+    Returns:
+        dict no formato esperado pelos templates de análise::
+
+            {'TOTAL': {'quarterly': {'Q1': {'total_<campo>': valor}, ...},
+                       'annual': {'total_<campo>': valor}},
+             'ORANGE': {...}, 'TELECEL': {...}}
+    """
+    all_fields = list(aggregate_fields.keys())
+    fields = _resolve_fields(model, tuple(aggregate_fields.items()))
+
+    operator_codes = []
+    for op in operadoras:
+        code = (op or '').lower()
+        if code and code not in operator_codes:
+            operator_codes.append(code)
+
+    keys = [TOTAL_KEY] + [code.upper() for code in operator_codes]
+    quarterly = {key: {q: _empty_bucket() for q in QUARTERS} for key in keys}
+    annual = {key: _empty_bucket() for key in keys}
+
+    if fields:
+        annotations = {}
+        for field, is_avg in fields:
+            annotations[f'sum__{field}'] = Sum(field)
+            if is_avg:
+                annotations[f'count__{field}'] = Count(field)
+
+        # Rollups pré-calculados primeiro; tabela larga apenas se ainda não existirem
+        rows = rollups.quarterly_rollup_rows(model, year, [field for field, _ in fields])
+        if rows is None:
+            rows = (
+                model.objects.filter(ano=year)
+                .annotate(trimestre=quarter_expression())
+                .values('operadora', 'trimestre')
+                .annotate(**annotations)
+                .order_by()
+            )
+        try:
+            for row in rows:
+                targets = [TOTAL_KEY]
+                op_key = (row['operadora'] or '').lower()
+                if op_key in operator_codes:
+                    targets.append(op_key.upper())
+                for key in targets:
+                    _accumulate(quarterly[key][row['trimestre']], row, fields)
+                    _accumulate(annual[key], row, fields)
+        except Exception as agg_error:
+            logger.error(f"Error during grouped aggregation for model {model.__name__}, year {year}: {agg_error}")
+            quarterly = {key: {q: _empty_bucket() for q in QUARTERS} for key in keys}
+            annual = {key: _empty_bucket() for key in keys}
+
+    return {
+        key: {
+            'quarterly': {f'Q{q}': _finalize(quarterly[key][q], fields, all_fields) for q in QUARTERS},
+            'annual': _finalize(annual[key], fields, all_fields),
+        }
+        for key in keys
+    }
+
+
+def is_stock_total(model, method_name):
+    """True se todos os campos do total ``method_name`` são existências (ex.: assinantes)."""
+    return all(
+        registry.aggregation(model, campo) == AGGREGATION_STOCK
+        for campo in model.get_calculation_fields(method_name)
+    )
+
+
+def _last_month_totals(model, method_name, ano, meses=None):
+    """{operadora: total do último mês com dados no período}, numa consulta ``GROUP BY operadora, mes``."""
+    queryset = model.objects.filter(ano=ano)
+    if meses:
+        queryset = queryset.filter(mes__in=meses)
+    rows = (
+        queryset.values('operadora', 'mes')
+        .annotate(total=Sum(model.get_calculation_expression(method_name)))
+        .order_by('operadora', 'mes')
+    )
+    # Ordenado por mês: o último valor de cada operadora é o do mês mais recente
+    return {row['operadora']: row['total'] or 0 for row in rows}
+
+
+def calculation_totals_by_operator(model, method_name, ano, meses=None):
+    """
+    Total derivado ``method_name`` (ver ``CALCULATION_FIELDS``) por operadora num período.
+
+    Fluxos (receitas, tráfego) são somados: lê os rollups anuais (ou
+    trimestrais, quando ``meses`` é um trimestre completo); sem rollups, faz
+    uma única consulta ``GROUP BY operadora``. Existências (assinantes,
+    estações móveis) não se somam no tempo: vale o último mês com dados de
+    cada operadora no período.
+
+    Returns:
+        dict: {'total': soma de mercado, 'por_operadora': {operadora: total}}
+    """
+    por_operadora = None
+    meses = sorted(meses) if meses else None
+    if is_stock_total(model, method_name):
+        por_operadora = _last_month_totals(model, method_name, ano, meses)
+
+    trimestre = (meses[0] - 1) // 3 + 1 if meses else None
+    if por_operadora is None and (meses is None or meses == rollups.quarter_months(trimestre)):
+        totais = rollups.calculation_totals_from_rollups(model, ano, [method_name], trimestre=trimestre)
+        if totais is not None:
+            por_operadora = {op: valores[method_name] for op, valores in totais.items()}
+
+    if por_operadora is None:
+        queryset = model.objects.filter(ano=ano)
+        if meses:
+            queryset = queryset.filter(mes__in=meses)
+        rows = (
+            queryset.values('operadora')
+            .annotate(total=Sum(model.get_calculation_expression(method_name)))
+            .order_by()
+        )
+        por_operadora = {row['operadora']: row['total'] or 0 for row in rows}
+
+    return {
+        'total': sum(por_operadora.values()),
+        'por_operadora': por_operadora,
+    }
+
+
+def calculation_totals_by_quarter(queryset, method_names):
+    """
+    Soma os totais derivados ``method_names`` por trimestre numa única consulta.
+
+    Returns:
+        dict: {trimestre (1-4): {nome do método: soma}}, com 0 nos trimestres sem dados.
+    """
+    model = queryset.model
+    rows = (
+        queryset.annotate(trimestre=quarter_expression())
+        .values('trimestre')
+        .annotate(**{name: Sum(model.get_calculation_expression(name)) for name in method_names})
+        .order_by()
+    )
+    totals = {q: {name: 0 for name in method_names} for q in QUARTERS}
+    for row in rows:
+        for name in method_names:
+            totals[row['trimestre']][name] = row[name] or 0
+    return totals
+
+
+def _stock_totals_for_year(model, ano, method_names, operadora=None):
+    """
+    Totais de existências de um ano: o último mês com dados de cada operadora
+    em cada trimestre e no ano, numa consulta ``GROUP BY operadora, mes``.
+
+    Returns:
+        tuple: ({trimestre: {nome do método: total}}, {nome do método: total anual})
+    """
+    queryset = model.objects.filter(ano=ano)
+    if operadora:
+        queryset = queryset.filter(operadora=operadora)
+    rows = (
+        queryset.values('operadora', 'mes')
+        .annotate(**{name: Sum(model.get_calculation_expression(name)) for name in method_names})
+        .order_by('operadora', 'mes')
+    )
+    # Ordenado por mês: a última linha de cada operadora/trimestre é a do mês mais recente
+    ultimo_trimestre = {}
+    ultimo_ano = {}
+    for row in rows:
+        ultimo_trimestre[(row['operadora'], rollups.quarter_of(row['mes']))] = row
+        ultimo_ano[row['operadora']] = row
+
+    por_trimestre = {q: {name: 0 for name in method_names} for q in QUARTERS}
+    for (_, trimestre), row in ultimo_trimestre.items():
+        for name in method_names:
+            por_trimestre[trimestre][name] += row[name] or 0
+    anual = {name: sum(row[name] or 0 for row in ultimo_ano.values()) for name in method_names}
+    return por_trimestre, anual
+
+
+def calculation_totals_for_year(model, ano, method_names, operadora=None, with_annual=False):
+    """
+    Totais derivados por trimestre de um ano, a partir dos rollups quando existem.
+
+    Fluxos são somados; existências (ver ``is_stock_total``) usam o último mês
+    com dados de cada operadora no trimestre e, no total anual, no ano.
+
+    Returns:
+        dict: {trimestre (1-4): {nome do método: total}}; com ``with_annual``,
+        o tuplo (por trimestre, {nome do método: total anual}).
+    """
+    method_names = list(method_names)
+    existencias = [name for name in method_names if is_stock_total(model, name)]
+    fluxos = [name for name in method_names if name not in existencias]
+
+    por_trimestre = {q: {} for q in QUARTERS}
+    anual = {}
+    if fluxos:
+        totais = rollups.quarterly_calculation_totals_from_rollups(model, ano, fluxos, operadora=operadora)
+        if totais is None:
+            queryset = model.objects.filter(ano=ano)
+            if operadora:
+                queryset = queryset.filter(operadora=operadora)
+            totais = calculation_totals_by_quarter(queryset, fluxos)
+        for q in QUARTERS:
+            por_trimestre[q].update(totais.get(q, {name: 0 for name in fluxos}))
+        anual.update({name: sum(por_trimestre[q][name] for q in QUARTERS) for name in fluxos})
+    if existencias:
+        totais, anual_existencias = _stock_totals_for_year(model, ano, existencias, operadora=operadora)
+        for q in QUARTERS:
+            por_trimestre[q].update(totais[q])
+        anual.update(anual_existencias)
+
+    por_trimestre = {q: {name: por_trimestre[q][name] for name in method_names} for q in QUARTERS}
+    return (por_trimestre, anual) if with_annual else por_trimestre
@@ -0,0 +1,260 @@
+"""
+Importação em lote de livros KPI ARN (zip ou diretório com um livro por operadora/período).
+
+1. Cada livro é lido em streaming (``read_mapped_sheet``) e convertido em
+   registos num pool de processos (``extract_sheet_records``), sem acesso à
+   base de dados;
+2. a operadora e o ano de cada livro são detetados pelo nome do ficheiro ou
+   pelos cabeçalhos das folhas (com valores por omissão opcionais);
+3. os registos são agrupados por (operadora, ano) e gravados por ordem, numa
+   transação por grupo, com ``incremental_upsert`` (só os meses novos ou
+   alterados) — grupos diferentes nunca escrevem nas mesmas linhas e um grupo
+   com erro não afeta os restantes.
+"""
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import transaction
+
+from ..excel_mappings import SHEET_MAPPINGS
+from ..excel_parser import (
+    detect_operadora, detect_year, detect_year_in_text, extract_sheet_records, find_sheet, get_sheet_model,
+    header_text, merge_diff, read_mapped_sheet,
+)
+from ..excel_reader import open_workbook
+from .importacao import incremental_upsert
+
+logger = logging.getLogger(__name__)
+
+WORKBOOK_SUFFIXES = ('.xlsx', '.xlsm')
+PERIOD_FIELDS = ('operadora', 'ano', 'mes')
+
+
+def default_workers():
+    return getattr(settings, 'IMPORT_BATCH_WORKERS', None) or os.cpu_count() or 1
+
+
+def max_workbook_size():
+    return getattr(settings, 'IMPORT_BATCH_MAX_WORKBOOK_SIZE', 50 * 1024 * 1024)
+
+
+def _is_workbook(name):
+    base = os.path.basename(name)
+    return base.lower().endswith(WORKBOOK_SUFFIXES) and not base.startswith(('~$', '.'))
+
+
+def _extract_zip(source, destino):
+    """
+    Extrai os livros de um zip para ``destino`` (apenas o nome base, sem subdiretórios).
+
+    Cada entrada é copiada em blocos; entradas maiores do que
+    IMPORT_BATCH_MAX_WORKBOOK_SIZE (tamanho descomprimido) rejeitam o zip.
+    """
+    limite = max_workbook_size()
+    caminhos = []
+    with zipfile.ZipFile(source) as arquivo:
+        for info in sorted(arquivo.infolist(), key=lambda i: i.filename):
+            if info.is_dir() or '__MACOSX' in info.filename or not _is_workbook(info.filename):
+                continue
+            if info.file_size > limite:
+                raise ValueError(
+                    f"{info.filename}: {info.file_size} bytes descomprimidos excedem o limite de {limite} bytes."
+                )
+            nome = os.path.basename(info.filename)
+            caminho = os.path.join(destino, f"{len(caminhos):04d}_{nome}")
+            # ZipExtFile não lê além de file_size, pelo que o limite vale também para a cópia
+            with arquivo.open(info) as origem, open(caminho, 'wb') as ficheiro:
+                shutil.copyfileobj(origem, ficheiro)
+            caminhos.append((nome, caminho))
+    return caminhos
+
+
+def collect_workbooks(source, destino):
+    """
+    Lista (nome, caminho) dos livros em ``source``, por ordem do nome.
+
+    ``source`` pode ser um diretório (percorrido recursivamente), um ficheiro
+    zip (caminho ou objeto ficheiro, extraído para ``destino``) ou um livro.
+    """
+    # Um .xlsx também é um zip: decide-se pela extensão (objetos ficheiro são zips)
+    if hasattr(source, 'read') or str(source).lower().endswith('.zip'):
+        return _extract_zip(source, destino)
+    if os.path.isdir(source):
+        caminhos = []
+        for raiz, _, ficheiros in os.walk(source):
+            caminhos.extend(
+                (nome, os.path.join(raiz, nome)) for nome in ficheiros if _is_workbook(nome)
+            )
+        return sorted(caminhos)
+    return [(os.path.basename(source), source)]
+
+
+def _init_worker():
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def parse_workbook(nome, caminho, operadora=None, ano=None, indicator_type=None):
+    """
+    Lê um livro e devolve os registos de cada folha reconhecida (sem gravar).
+
+    A operadora e o ano detetados no nome do ficheiro têm prioridade; depois
+    os cabeçalhos das folhas e, por fim, os valores por omissão indicados.
+    """
+    resultado = {'nome': nome, 'folhas': [], 'error_details': []}
+    operadora = detect_operadora(nome) or operadora
+    ano_ficheiro = detect_year_in_text(os.path.splitext(nome)[0])
+    tipos = [indicator_type] if indicator_type else list(SHEET_MAPPINGS)
+
+    stack = ExitStack()
+    try:
+        workbook = stack.enter_context(open_workbook(caminho))
+    except Exception as e:
+        resultado['error_details'].append(f"{nome}: erro ao abrir o ficheiro Excel: {e}")
+        return resultado
+
+    with stack:
+        for key in tipos:
+            mapping = SHEET_MAPPINGS[key]
+            sheet_name = find_sheet(workbook.sheet_names, mapping)
+            if sheet_name is None:
+                continue
+            try:
+                df = read_mapped_sheet(workbook, sheet_name, key)
+                sheet_operadora = mapping.get('operadora') or operadora or detect_operadora(header_text(df))
+                sheet_ano = ano_ficheiro or detect_year(df) or ano
+                if not sheet_operadora or not sheet_ano:
+                    falta = 'operadora' if not sheet_operadora else 'ano'
+                    resultado['error_details'].append(
+                        f"{nome} / '{sheet_name}': {falta} não detetado(a) no nome do ficheiro nem nos cabeçalhos."
+                    )
+                    continue
+                registos, processados, erros, detalhes = extract_sheet_records(df, key, sheet_ano, sheet_operadora)
+            except Exception as e:
+                logger.error(f"Erro ao ler '{sheet_name}' de {nome}: {e}", exc_info=True)
+                resultado['error_details'].append(f"{nome} / '{sheet_name}': {e}")
+                continue
+            resultado['folhas'].append({
+                'indicator_type': key,
+                'sheet': sheet_name,
+                'operadora': sheet_operadora,
+                'ano': sheet_ano,
+                'records': registos,
+                'processed': processados,
+                'errors': erros,
+                'error_details': [f"{nome} / '{sheet_name}': {d}" for d in detalhes],
+            })
+    return resultado
+
+
+def _parse_all(livros, workers, operadora, ano, indicator_type):
+    """Gera os resultados de parse_workbook pela ordem de ``livros``."""
+    argumentos = [(nome, caminho, operadora, ano, indicator_type) for nome, caminho in livros]
+    if workers <= 1 or len(livros) <= 1:
+        for args in argumentos:
+            yield parse_workbook(*args)
+        return
+    # Os processos filhos só leem ficheiros; não usam as ligações à base de dados
+    with ProcessPoolExecutor(max_workers=min(workers, len(livros)), initializer=_init_worker) as executor:
+        yield from executor.map(parse_workbook, *zip(*argumentos))
+
+
+def _merge_records(periodos, registos):
+    """
+    Junta ``registos`` a ``periodos`` ({(operadora, ano, mes): valores}).
+
+    Só os valores preenchidos são copiados: um livro de outro trimestre (com
+    os restantes meses vazios) não apaga os meses importados antes; para o
+    mesmo campo, o último livro prevalece.
+    """
+    for registo in registos:
+        periodo = tuple(registo[field] for field in PERIOD_FIELDS)
+        periodos.setdefault(periodo, {}).update({k: v for k, v in registo.items() if v is not None})
+
+
+def batch_import(source, user=None, operadora=None, ano=None, workers=None, indicator_type=None, on_workbook=None,
+                 dry_run=False):
+    """
+    Importa todos os livros de um zip ou diretório.
+
+    Args:
+        source: Diretório, ficheiro zip (caminho ou objeto ficheiro) ou livro Excel.
+        user: Utilizador registado em criado_por/atualizado_por.
+        operadora: Operadora por omissão, quando não é detetada num livro.
+        ano: Ano por omissão, quando não é detetado num livro.
+        workers: Processos de leitura em paralelo (padrão: IMPORT_BATCH_WORKERS ou nº de CPUs).
+        indicator_type: Limitar a uma entrada de SHEET_MAPPINGS.
+        on_workbook: Callback ``on_workbook(nome, estado, processados, erros, total)`` após a leitura de cada livro.
+        dry_run: Compara com os dados existentes e devolve as diferenças sem gravar.
+
+    Returns:
+        dict: {'livros', 'processed', 'errors', 'error_details', 'diff',
+        'grupos': {(operadora, ano): {'novos', 'atualizados', 'inalterados'}}}
+    """
+    workers = workers or default_workers()
+    results = {
+        'livros': 0, 'processed': 0, 'errors': 0, 'error_details': [], 'grupos': {},
+        'diff': {'novos': 0, 'atualizados': 0, 'inalterados': 0},
+    }
+
+    with tempfile.TemporaryDirectory(prefix='importacao_lote_') as destino:
+        livros = collect_workbooks(source, destino)
+        results['livros'] = len(livros)
+        if not livros:
+            results['error_details'].append('Nenhum livro Excel (.xlsx) encontrado.')
+            return results
+
+        # (operadora, ano) -> indicador -> (operadora, ano, mes) -> valores, pela ordem dos livros
+        grupos = {}
+        processados_por_grupo = {}
+        origens = {}
+        for resultado in _parse_all(livros, workers, operadora, ano, indicator_type):
+            results['errors'] += len(resultado['error_details'])
+            results['error_details'].extend(resultado['error_details'])
+            processados = erros = 0
+            for folha in resultado['folhas']:
+                chave = (folha['operadora'], folha['ano'])
+                _merge_records(grupos.setdefault(chave, {}).setdefault(folha['indicator_type'], {}), folha['records'])
+                if resultado['nome'] not in origens.setdefault(chave, []):
+                    origens[chave].append(resultado['nome'])
+                processados_por_grupo[chave] = processados_por_grupo.get(chave, 0) + folha['processed']
+                processados += folha['processed']
+                erros += folha['errors']
+                results['errors'] += folha['errors']
+                results['error_details'].extend(folha['error_details'])
+            if on_workbook is not None:
+                estado = 'erro' if resultado['error_details'] and not resultado['folhas'] else 'concluido'
+                on_workbook(resultado['nome'], estado, processados, erros + len(resultado['error_details']), len(livros))
+
+    for chave in sorted(grupos, key=lambda k: (str(k[0]), k[1])):
+        operadora_grupo, ano_grupo = chave
+        diff = {'novos': 0, 'atualizados': 0, 'inalterados': 0}
+        try:
+            with transaction.atomic():
+                for key, periodos in grupos[chave].items():
+                    merge_diff(diff, incremental_upsert(
+                        get_sheet_model(SHEET_MAPPINGS[key]), list(periodos.values()), user=user, dry_run=dry_run,
+                        origem=', '.join(origens[chave]),
+                    ))
+        except Exception as e:
+            logger.error(f"Erro ao gravar {operadora_grupo}/{ano_grupo}: {e}", exc_info=True)
+            results['errors'] += processados_por_grupo[chave]
+            results['error_details'].append(f"Erro BD ({operadora_grupo}, {ano_grupo}): {e}")
+            continue
+        results['processed'] += processados_por_grupo[chave]
+        results['grupos'][chave] = diff
+        merge_diff(results['diff'], diff)
+        logger.info(
+            f"Lote {operadora_grupo}/{ano_grupo}: {diff['novos']} novos, {diff['atualizados']} atualizados, "
+            f"{diff['inalterados']} inalterados{' (simulação)' if dry_run else ''}"
+        )
+
+    return results
@@ -0,0 +1,254 @@
+"""
+Índice de cobertura das submissões (IndicadorCobertura).
+
+Cada período (indicador, operadora, ano, mês) com dados tem uma linha no
+índice, atualizada pelos sinais de IndicadorBase. As perguntas de conformidade
+("que meses faltam à operadora X?", taxa de conformidade, anos disponíveis,
+última submissão) são respondidas com uma única consulta indexada, em vez de
+uma consulta por tabela de indicador.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models import CharField, Count, DateTimeField, Max, Sum, Value
+
+from ..models.base import IndicadorBase
+from ..models.cobertura import IndicadorCobertura
+from .factos import indicator_key, indicator_models
+
+logger = logging.getLogger(__name__)
+
+MONTHS = tuple(range(1, 13))
+
+
+def default_operadoras():
+    """Códigos das operadoras que devem submeter dados."""
+    return [code for code, _ in IndicadorBase.OPERADORAS_CHOICES]
+
+
+def _indicator_keys(indicadores=None):
+    return [
+        indicator if isinstance(indicator, str) else indicator_key(indicator)
+        for indicator in (indicadores or indicator_models())
+    ]
+
+
+def _period_summary(model, operadora, ano, mes):
+    """Nº de registos, última atualização e autor de um período de ``model``."""
+    queryset = model.objects.filter(operadora=operadora, ano=ano, mes=mes)
+    has_timestamp = any(f.name == 'data_atualizacao' for f in model._meta.concrete_fields)
+    has_author = any(f.name == 'atualizado_por' for f in model._meta.concrete_fields)
+    ordering = ['-data_atualizacao', '-pk'] if has_timestamp else ['-pk']
+    columns = [c for c, present in (('data_atualizacao', has_timestamp), ('atualizado_por_id', has_author)) if present]
+
+    registos = queryset.count()
+    if not registos:
+        return 0, None, None
+    latest = queryset.order_by(*ordering).values(*columns).first() or {}
+    return registos, latest.get('data_atualizacao'), latest.get('atualizado_por_id')
+
+
+def refresh_coverage(model, periodos):
+    """
+    Recalcula as linhas de cobertura dos períodos indicados.
+
+    Args:
+        model: Modelo do indicador.
+        periodos: Iterável de (operadora, ano, mes).
+    """
+    key = indicator_key(model)
+    for operadora, ano, mes in set(periodos):
+        registos, atualizado, autor = _period_summary(model, operadora, ano, mes)
+        with transaction.atomic():
+            IndicadorCobertura.objects.filter(indicador=key, operadora=operadora, ano=ano, mes=mes).delete()
+            if registos:
+                IndicadorCobertura.objects.create(
+                    indicador=key, operadora=operadora, ano=ano, mes=mes, registos=registos,
+                    ultima_atualizacao=atualizado, atualizado_por_id=autor,
+                )
+
+
+def _latest_authors(model, has_timestamp):
+    """{(operadora, ano, mes): autor do registo mais recente}, numa passagem ordenada."""
+    ordering = ['operadora', 'ano', 'mes', *(['-data_atualizacao'] if has_timestamp else []), '-pk']
+    autores = {}
+    for operadora, ano, mes, autor in (
+        model.objects.order_by(*ordering).values_list('operadora', 'ano', 'mes', 'atualizado_por_id').iterator()
+    ):
+        autores.setdefault((operadora, ano, mes), autor)
+    return autores
+
+
+def rebuild_coverage(models_to_rebuild=None):
+    """
+    Reconstrói o índice de cobertura com uma consulta agrupada por indicador.
+
+    O autor de cada período é o do registo mais recente, como em
+    ``refresh_coverage``.
+
+    Returns:
+        dict: {indicador: número de períodos}
+    """
+    counts = {}
+    for model in models_to_rebuild or indicator_models():
+        key = indicator_key(model)
+        field_names = {f.name for f in model._meta.concrete_fields}
+        has_timestamp = 'data_atualizacao' in field_names
+        annotations = {'registos': Count('pk')}
+        if has_timestamp:
+            annotations['ultima_atualizacao'] = Max('data_atualizacao')
+        rows = model.objects.values('operadora', 'ano', 'mes').annotate(**annotations).order_by()
+        autores = _latest_authors(model, has_timestamp) if 'atualizado_por' in field_names else {}
+        with transaction.atomic():
+            IndicadorCobertura.objects.filter(indicador=key).delete()
+            IndicadorCobertura.objects.bulk_create([
+                IndicadorCobertura(
+                    indicador=key, operadora=row['operadora'], ano=row['ano'], mes=row['mes'],
+                    registos=row['registos'], ultima_atualizacao=row.get('ultima_atualizacao'),
+                    atualizado_por_id=autores.get((row['operadora'], row['ano'], row['mes'])),
+                )
+                for row in rows
+            ], batch_size=1000)
+        counts[key] = IndicadorCobertura.objects.filter(indicador=key).count()
+        logger.info(f"Cobertura reconstruída para {key}: {counts[key]} períodos")
+    return counts
+
+
+def submitted_periods(ano=None, operadoras=None, indicadores=None, meses=None):
+    """Conjunto de (indicador, operadora, ano, mes) submetidos, numa consulta."""
+    queryset = IndicadorCobertura.objects.filter(indicador__in=_indicator_keys(indicadores))
+    if ano is not None:
+        queryset = queryset.filter(ano=ano)
+    if operadoras:
+        queryset = queryset.filter(operadora__in=operadoras)
+    if meses:
+        queryset = queryset.filter(mes__in=meses)
+    return set(queryset.values_list('indicador', 'operadora', 'ano', 'mes'))
+
+
+def missing_months(operadora, ano, indicadores=None, ate_mes=12):
+    """
+    Meses sem submissão de ``operadora`` em ``ano``, por indicador.
+
+    Args:
+        ate_mes: Último mês a considerar (ex.: o mês corrente).
+
+    Returns:
+        dict: {indicador: [meses em falta]} (apenas indicadores com falhas)
+    """
+    keys = _indicator_keys(indicadores)
+    meses = MONTHS[:ate_mes]
+    submetidos = submitted_periods(ano, [operadora], keys, meses)
+    em_falta = {}
+    for key in keys:
+        faltam = [mes for mes in meses if (key, operadora, ano, mes) not in submetidos]
+        if faltam:
+            em_falta[key] = faltam
+    return em_falta
+
+
+def compliance_rate(ano, meses=None, operadoras=None, indicadores=None):
+    """
+    Taxa de conformidade: períodos submetidos / períodos esperados.
+
+    Returns:
+        dict: {'esperadas', 'submetidas', 'taxa' (%), 'por_operadora': {op: taxa}}
+    """
+    keys = _indicator_keys(indicadores)
+    operadoras = list(operadoras or default_operadoras())
+    meses = list(meses or MONTHS)
+    submetidos = submitted_periods(ano, operadoras, keys, meses)
+
+    esperadas_por_operadora = len(keys) * len(meses)
+    por_operadora = {}
+    for operadora in operadoras:
+        feitas = sum(1 for periodo in submetidos if periodo[1] == operadora)
+        por_operadora[operadora] = (
+            round(feitas / esperadas_por_operadora * 100, 1) if esperadas_por_operadora else 0
+        )
+
+    esperadas = esperadas_por_operadora * len(operadoras)
+    return {
+        'esperadas': esperadas,
+        'submetidas': len(submetidos),
+        'taxa': round(len(submetidos) / esperadas * 100, 1) if esperadas else 0,
+        'por_operadora': por_operadora,
+    }
+
+
+def available_years(indicadores=None):
+    """Anos com dados (ordem crescente) nos indicadores indicados."""
+    keys = _indicator_keys(indicadores)
+    anos = list(
+        IndicadorCobertura.objects.filter(indicador__in=keys)
+        .values_list('ano', flat=True).distinct().order_by('ano')
+    )
+    if anos or IndicadorCobertura.objects.exists():
+        return anos
+
+    # Índice ainda não construído (migração 0016 / rebuild_indicator_coverage): consultar as tabelas
+    modelos = {indicator_key(m): m for m in indicator_models()}
+    encontrados = set()
+    for key in keys:
+        if key in modelos:
+            encontrados.update(modelos[key].objects.values_list('ano', flat=True).distinct())
+    return sorted(encontrados)
+
+
+def last_submission(operadora=None, indicadores=None):
+    """Data da última atualização registada (opcionalmente de uma operadora)."""
+    queryset = IndicadorCobertura.objects.filter(indicador__in=_indicator_keys(indicadores))
+    if operadora:
+        queryset = queryset.filter(operadora=operadora)
+    return queryset.aggregate(ultima=Max('ultima_atualizacao'))['ultima']
+
+
+def _live_summary(modelos):
+    """Contagem e última atualização de cada tabela numa única consulta UNION ALL."""
+    queries = []
+    for model in modelos:
+        has_timestamp = any(f.name == 'data_atualizacao' for f in model._meta.concrete_fields)
+        queries.append(
+            model.objects.order_by()
+            .annotate(indicador=Value(indicator_key(model), output_field=CharField()))
+            .values('indicador')
+            .annotate(
+                total=Count('pk'),
+                ultima=Max('data_atualizacao') if has_timestamp else Value(None, output_field=DateTimeField()),
+            )
+            .values('indicador', 'total', 'ultima')
+        )
+    if not queries:
+        return []
+    return list(queries[0].union(*queries[1:], all=True))
+
+
+def indicator_summary(indicadores=None):
+    """
+    Número de registos e última atualização de cada indicador.
+
+    Lê o índice de cobertura (uma consulta agrupada, independente do tamanho das
+    tabelas); se o índice ainda não tiver sido construído, usa uma única consulta
+    UNION ALL sobre as tabelas dos indicadores.
+
+    Returns:
+        dict: {indicador: {'count': int, 'ultima_atualizacao': datetime | None}}
+    """
+    modelos = [
+        m for m in indicator_models()
+        if indicadores is None or m in indicadores or indicator_key(m) in indicadores
+    ]
+    keys = [indicator_key(m) for m in modelos]
+    rows = list(
+        IndicadorCobertura.objects.filter(indicador__in=keys)
+        .values('indicador')
+        .annotate(total=Sum('registos'), ultima=Max('ultima_atualizacao'))
+        .order_by()
+    )
+    if not rows:
+        rows = _live_summary(modelos)
+
+    summary = {key: {'count': 0, 'ultima_atualizacao': None} for key in keys}
+    for row in rows:
+        summary[row['indicador']] = {'count': row['total'] or 0, 'ultima_atualizacao': row['ultima']}
+    return summary
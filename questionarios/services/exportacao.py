@@ -0,0 +1,184 @@
+"""
+Exportação dos registos mensais (em bruto) de qualquer indicador.
+
+Os registos são lidos com ``QuerySet.iterator(chunk_size=...)`` — cursores do
+lado do servidor no PostgreSQL — e convertidos à medida que chegam, pelo que
+a memória usada não depende do número de linhas exportadas:
+
+- CSV e NDJSON: geradores de blocos de bytes (StreamingHttpResponse ou ficheiro);
+- Parquet (requer ``pyarrow``): escrito por *row groups* num ficheiro.
+"""
+import csv
+import io
+import logging
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+# Tamanho aproximado de cada bloco enviado (CSV/NDJSON)
+STREAM_BLOCK_SIZE = 64 * 1024
+
+
+class ExportError(ValueError):
+    """Filtro ou formato de exportação inválido."""
+
+
+def default_chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', 2000)
+
+
+def export_columns(model):
+    """Colunas exportadas: todos os campos concretos (chaves estrangeiras como ``<campo>_id``)."""
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def export_queryset(model, ano=None, mes=None, operadora=None):
+    """Registos de ``model`` filtrados, por ordem de período, como tuplos (ver export_columns)."""
+    queryset = model.objects.all()
+    if ano is not None:
+        queryset = queryset.filter(ano__in=ano if isinstance(ano, (list, tuple)) else [ano])
+    if mes is not None:
+        queryset = queryset.filter(mes__in=mes if isinstance(mes, (list, tuple)) else [mes])
+    if operadora:
+        # Sem distinguir maiúsculas: alguns indicadores guardam o código em maiúsculas (ex.: 'TELECEL')
+        condicao = models.Q()
+        for valor in operadora if isinstance(operadora, (list, tuple)) else [operadora]:
+            condicao |= models.Q(operadora__iexact=valor)
+        queryset = queryset.filter(condicao)
+    return queryset.order_by('ano', 'mes', 'operadora', 'pk').values_list(*export_columns(model))
+
+
+def iter_csv(model, chunk_size=None, **filters):
+    """Blocos de bytes CSV (cabeçalho + linhas), com cerca de STREAM_BLOCK_SIZE cada."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(export_columns(model))
+    for row in export_queryset(model, **filters).iterator(chunk_size=chunk_size or default_chunk_size()):
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_BLOCK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def iter_ndjson(model, chunk_size=None, **filters):
+    """Blocos de bytes NDJSON (um objeto JSON por linha; decimais e datas como texto)."""
+    columns = export_columns(model)
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    linhas = []
+    tamanho = 0
+    for row in export_queryset(model, **filters).iterator(chunk_size=chunk_size or default_chunk_size()):
+        linha = encoder.encode(dict(zip(columns, row))) + '\n'
+        linhas.append(linha)
+        tamanho += len(linha)
+        if tamanho >= STREAM_BLOCK_SIZE:
+            yield ''.join(linhas).encode('utf-8')
+            linhas, tamanho = [], 0
+    if linhas:
+        yield ''.join(linhas).encode('utf-8')
+
+
+def _arrow_type(field):
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, (models.IntegerField, models.AutoField, models.ForeignKey)):
+        return pa.int64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    if isinstance(field, models.FloatField):
+        return pa.float64()
+    return pa.string()
+
+
+def parquet_schema(model):
+    fields = model._meta.concrete_fields
+    return pa.schema([pa.field(field.attname, _arrow_type(field)) for field in fields])
+
+
+def write_parquet(model, output, chunk_size=None, row_group_size=None, **filters):
+    """
+    Escreve os registos em Parquet em ``output`` (caminho ou ficheiro binário).
+
+    Cada *row group* tem ``row_group_size`` linhas (padrão: EXPORT_PARQUET_ROW_GROUP_SIZE),
+    que é o máximo mantido em memória.
+
+    Returns:
+        int: Número de linhas escritas.
+    """
+    if not HAS_PYARROW:
+        raise ExportError("A exportação Parquet requer o pacote pyarrow (pip install pyarrow).")
+
+    row_group_size = row_group_size or getattr(settings, 'EXPORT_PARQUET_ROW_GROUP_SIZE', 50000)
+    schema = parquet_schema(model)
+    columns = schema.names
+    total = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        lote = []
+
+        def flush():
+            colunas = list(zip(*lote))
+            writer.write_batch(pa.record_batch(
+                [pa.array(valores, type=schema.field(nome).type) for nome, valores in zip(columns, colunas)],
+                schema=schema,
+            ))
+
+        for row in export_queryset(model, **filters).iterator(chunk_size=chunk_size or default_chunk_size()):
+            lote.append(row)
+            if len(lote) >= row_group_size:
+                flush()
+                total += len(lote)
+                lote = []
+        if lote:
+            flush()
+            total += len(lote)
+    return total
+
+
+def parse_filters(params):
+    """
+    Converte os filtros de um pedido/comando (listas de texto) em ``export_queryset`` kwargs.
+
+    Aceita vários valores por filtro (repetidos ou separados por vírgulas).
+    """
+    def valores(nome):
+        brutos = params.getlist(nome) if hasattr(params, 'getlist') else (params.get(nome) or [])
+        if isinstance(brutos, (str, int)):
+            brutos = [brutos]
+        return [v.strip() for bruto in brutos for v in str(bruto).split(',') if v.strip()]
+
+    filtros = {}
+    for nome in ('ano', 'mes'):
+        lista = valores(nome)
+        if lista:
+            try:
+                filtros[nome] = [int(v) for v in lista]
+            except ValueError:
+                raise ExportError(f"Filtro '{nome}' inválido: {', '.join(lista)}")
+    if any(not 1 <= m <= 12 for m in filtros.get('mes', [])):
+        raise ExportError("Filtro 'mes' deve estar entre 1 e 12")
+    operadoras = [v.lower() for v in valores('operadora')]
+    if operadoras:
+        filtros['operadora'] = operadoras
+    return filtros
+
@@ -0,0 +1,195 @@
+"""
+Manutenção da tabela de factos em formato longo (IndicadorFacto).
+
+Cada registo de um indicador (modelo largo, dezenas de colunas) é decomposto em
+linhas (indicador, campo, operadora, ano, mes, valor). A atualização é
+incremental, por registo, a partir dos sinais de IndicadorBase; a reconstrução
+completa é feita em lotes pelo comando ``rebuild_indicator_facts``.
+"""
+import logging
+from decimal import Decimal
+from functools import lru_cache
+
+from django.apps import apps
+from django.db import models, transaction
+from django.db.models import Sum
+
+from ..models.base import IndicadorBase
+from ..models.factos import IndicadorFacto
+
+logger = logging.getLogger(__name__)
+
+# Campos de identificação do período que não são valores de indicador
+EXCLUDED_FIELDS = {'id', 'ano', 'mes'}
+NUMERIC_FIELD_TYPES = (models.IntegerField, models.DecimalField, models.FloatField)
+
+
+def indicator_models():
+    """Retorna todos os modelos concretos que herdam de IndicadorBase."""
+    return [
+        model for model in apps.get_app_config('questionarios').get_models()
+        if issubclass(model, IndicadorBase)
+    ]
+
+
+def indicator_key(model):
+    """Identificador estável do indicador na tabela de factos."""
+    return model._meta.model_name
+
+
+@lru_cache(maxsize=None)
+def fact_fields(model):
+    """Campos numéricos de ``model`` que geram factos (calculado uma vez por modelo)."""
+    return tuple(
+        field.attname for field in model._meta.concrete_fields
+        if isinstance(field, NUMERIC_FIELD_TYPES)
+        and not field.primary_key
+        and not field.is_relation
+        and field.name not in EXCLUDED_FIELDS
+    )
+
+
+def _to_decimal(value):
+    if value is None:
+        return None
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def build_facts(model, values):
+    """
+    Constrói os objetos IndicadorFacto de um registo.
+
+    Args:
+        model: Modelo do indicador.
+        values: dict com 'id', 'operadora', 'ano', 'mes' e os campos numéricos
+            (uma instância convertida ou uma linha de ``values()``).
+    """
+    key = indicator_key(model)
+    return [
+        IndicadorFacto(
+            indicador=key,
+            registro_id=values['id'],
+            campo=campo,
+            operadora=values['operadora'],
+            ano=values['ano'],
+            mes=values['mes'],
+            valor=_to_decimal(values[campo]),
+        )
+        for campo in fact_fields(model)
+    ]
+
+
+def _instance_values(instance):
+    values = {'id': instance.pk, 'operadora': instance.operadora, 'ano': instance.ano, 'mes': instance.mes}
+    for campo in fact_fields(type(instance)):
+        values[campo] = getattr(instance, campo)
+    return values
+
+
+def stored_period(instance):
+    """
+    Período (operadora, ano, mes) atualmente registado nos factos de ``instance``.
+
+    Usado antes de atualizar os factos para detetar mudanças de período.
+    """
+    return (
+        IndicadorFacto.objects
+        .filter(indicador=indicator_key(type(instance)), registro_id=instance.pk)
+        .values_list('operadora', 'ano', 'mes')
+        .first()
+    )
+
+
+def sync_instance_facts(instance):
+    """Atualiza (upsert) os factos de um registo gravado."""
+    facts = build_facts(type(instance), _instance_values(instance))
+    if facts:
+        IndicadorFacto.objects.bulk_create(
+            facts,
+            update_conflicts=True,
+            unique_fields=['indicador', 'registro_id', 'campo'],
+            update_fields=['operadora', 'ano', 'mes', 'valor'],
+        )
+
+
+def sync_bulk_facts(model, instances, batch_size=2000):
+    """Atualiza (upsert) os factos de vários registos de ``model`` em lote."""
+    facts = []
+    for instance in instances:
+        facts.extend(build_facts(model, _instance_values(instance)))
+    if facts:
+        IndicadorFacto.objects.bulk_create(
+            facts,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['indicador', 'registro_id', 'campo'],
+            update_fields=['operadora', 'ano', 'mes', 'valor'],
+        )
+    return len(facts)
+
+
+def delete_instance_facts(instance):
+    """Remove os factos de um registo eliminado."""
+    IndicadorFacto.objects.filter(
+        indicador=indicator_key(type(instance)),
+        registro_id=instance.pk,
+    ).delete()
+
+
+def rebuild_facts(models_to_rebuild=None, batch_size=2000):
+    """
+    Reconstrói a tabela de factos em lote.
+
+    Args:
+        models_to_rebuild: Modelos a reconstruir (por omissão, todos os indicadores).
+        batch_size: Número de factos por INSERT.
+
+    Returns:
+        dict: {indicador: número de factos criados}
+    """
+    counts = {}
+    for model in models_to_rebuild or indicator_models():
+        key = indicator_key(model)
+        columns = ['id', 'operadora', 'ano', 'mes', *fact_fields(model)]
+        total = 0
+        with transaction.atomic():
+            IndicadorFacto.objects.filter(indicador=key).delete()
+            buffer = []
+            for row in model.objects.values(*columns).order_by().iterator(chunk_size=batch_size):
+                buffer.extend(build_facts(model, row))
+                if len(buffer) >= batch_size:
+                    IndicadorFacto.objects.bulk_create(buffer, batch_size=batch_size)
+                    total += len(buffer)
+                    buffer = []
+            if buffer:
+                IndicadorFacto.objects.bulk_create(buffer, batch_size=batch_size)
+                total += len(buffer)
+        counts[key] = total
+        logger.info(f"Factos reconstruídos para {key}: {total}")
+    return counts
+
+
+def fact_totals(ano, indicadores=None, campos=None, operadora=None, meses=None):
+    """
+    Soma valores de vários indicadores/campos numa única consulta indexada.
+
+    Returns:
+        dict: {(indicador, campo): {operadora: soma}}
+    """
+    queryset = IndicadorFacto.objects.filter(ano=ano)
+    if indicadores:
+        queryset = queryset.filter(indicador__in=indicadores)
+    if campos:
+        queryset = queryset.filter(campo__in=campos)
+    if operadora:
+        queryset = queryset.filter(operadora=operadora)
+    if meses:
+        queryset = queryset.filter(mes__in=meses)
+
+    totals = {}
+    rows = queryset.values('indicador', 'campo', 'operadora').annotate(total=Sum('valor')).order_by()
+    for row in rows:
+        totals.setdefault((row['indicador'], row['campo']), {})[row['operadora']] = row['total'] or 0
+    return totals
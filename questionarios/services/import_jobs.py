@@ -0,0 +1,201 @@
+"""
+Fila de importações Excel (ImportacaoExcel) executada fora do pedido HTTP.
+
+O upload grava o ficheiro e cria um trabalho ``pendente``; o comando
+``run_import_worker`` reclama trabalhos com bloqueio de linha
+(``SELECT ... FOR UPDATE SKIP LOCKED``) e executa ``process_excel_file``
+(ou ``batch_import``, para um zip de livros), registando o progresso de
+cada folha. Vários processos podem trabalhar em
+paralelo sem processar o mesmo ficheiro duas vezes.
+"""
+import logging
+import os
+import socket
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models.importacao import ImportacaoExcel
+
+logger = logging.getLogger(__name__)
+
+# Máximo de mensagens guardadas em ImportacaoExcel.detalhes
+MAX_DETALHES = 200
+
+
+def worker_id(suffix=None):
+    """Identificador do processo worker (host:pid[:sufixo])."""
+    base = f"{socket.gethostname()}:{os.getpid()}"
+    return f"{base}:{suffix}" if suffix is not None else base
+
+
+def enqueue_import(uploaded_file, user, operadora=None, ano=None, tipo_indicador=None, simulacao=False):
+    """Grava o ficheiro e cria um trabalho de importação pendente (``simulacao``: só calcula as diferenças)."""
+    return ImportacaoExcel.objects.create(
+        simulacao=simulacao,
+        ficheiro=uploaded_file,
+        nome_ficheiro=os.path.basename(getattr(uploaded_file, 'name', '') or 'importacao.xlsx'),
+        operadora=operadora or None,
+        ano=ano or None,
+        tipo_indicador=tipo_indicador or None,
+        criado_por=user if getattr(user, 'pk', None) else None,
+    )
+
+
+def claim_next_job(worker=None):
+    """
+    Reclama o trabalho pendente mais antigo, ou None se a fila estiver vazia.
+
+    O SELECT usa ``skip_locked`` para que workers concorrentes passem ao
+    trabalho seguinte; o UPDATE condicionado ao estado garante a exclusividade
+    também em bases de dados sem bloqueio de linha (SQLite).
+    """
+    worker = worker or worker_id()
+    with transaction.atomic():
+        job = (
+            ImportacaoExcel.objects.select_for_update(skip_locked=True)
+            .filter(estado=ImportacaoExcel.ESTADO_PENDENTE)
+            .order_by('criado_em', 'pk')
+            .first()
+        )
+        if job is None:
+            return None
+        agora = timezone.now()
+        claimed = ImportacaoExcel.objects.filter(pk=job.pk, estado=ImportacaoExcel.ESTADO_PENDENTE).update(
+            estado=ImportacaoExcel.ESTADO_EM_EXECUCAO,
+            worker=worker,
+            iniciado_em=agora,
+            tentativas=job.tentativas + 1,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def run_job(job):
+    """
+    Executa um trabalho reclamado, gravando o progresso após cada folha.
+
+    Returns:
+        ImportacaoExcel: o trabalho com o estado final (concluido/erro).
+    """
+    # Import tardio: o parser depende de pandas
+    from ..excel_parser import detect_operadora, process_excel_file
+    from .batch_import import batch_import
+
+    progresso = {}
+
+    def on_sheet(sheet_name, estado, processados, erros, total):
+        progresso[sheet_name] = {'estado': estado, 'processados': processados, 'erros': erros}
+        terminadas = sum(1 for p in progresso.values() if p['estado'] != ImportacaoExcel.ESTADO_EM_EXECUCAO)
+        ImportacaoExcel.objects.filter(pk=job.pk).update(
+            progresso=progresso,
+            total_folhas=total,
+            folhas_processadas=terminadas,
+            processados=sum(p['processados'] for p in progresso.values()),
+            erros=sum(p['erros'] for p in progresso.values()),
+        )
+
+    try:
+        with job.ficheiro.open('rb') as ficheiro:
+            if job.nome_ficheiro.lower().endswith('.zip'):
+                # Zip com vários livros: progresso por livro em vez de por folha
+                results = batch_import(
+                    ficheiro, job.criado_por, job.operadora, job.ano,
+                    indicator_type=job.tipo_indicador, on_workbook=on_sheet, dry_run=job.simulacao,
+                )
+            else:
+                operadora = job.operadora or detect_operadora(job.nome_ficheiro)
+                results = process_excel_file(
+                    ficheiro, job.criado_por, operadora, job.ano, job.tipo_indicador, on_sheet=on_sheet,
+                    dry_run=job.simulacao,
+                )
+    except Exception as e:
+        logger.error(f"Importação {job.pk} ({job.nome_ficheiro}) falhou: {e}", exc_info=True)
+        job.refresh_from_db()
+        job.estado = ImportacaoExcel.ESTADO_ERRO
+        job.detalhes = [f"Erro ao processar o ficheiro: {e}"]
+        job.concluido_em = timezone.now()
+        job.save(update_fields=['estado', 'detalhes', 'concluido_em'])
+        return job
+
+    job.refresh_from_db()
+    job.processados = results['processed']
+    job.erros = results['errors']
+    job.detalhes = results['error_details'][:MAX_DETALHES]
+    job.folhas_processadas = job.total_folhas
+    job.registos_novos = results['diff']['novos']
+    job.registos_atualizados = results['diff']['atualizados']
+    job.registos_inalterados = results['diff']['inalterados']
+    # Um ficheiro sem nenhum valor processado e com erros é considerado falhado
+    falhou = results['errors'] and not results['processed']
+    job.estado = ImportacaoExcel.ESTADO_ERRO if falhou else ImportacaoExcel.ESTADO_CONCLUIDO
+    job.concluido_em = timezone.now()
+    job.save(update_fields=[
+        'processados', 'erros', 'detalhes', 'folhas_processadas', 'estado', 'concluido_em',
+        'registos_novos', 'registos_atualizados', 'registos_inalterados',
+    ])
+    logger.info(
+        f"Importação {job.pk} ({job.nome_ficheiro}) {job.estado}: "
+        f"{job.processados} processados, {job.erros} erros"
+    )
+    return job
+
+
+def requeue_stale_jobs(timeout_minutes=60, max_tentativas=3):
+    """
+    Devolve à fila trabalhos ``em_execucao`` há mais de ``timeout_minutes``
+    (worker terminado a meio); após ``max_tentativas`` ficam em erro.
+    """
+    limite = timezone.now() - timedelta(minutes=timeout_minutes)
+    presos = ImportacaoExcel.objects.filter(estado=ImportacaoExcel.ESTADO_EM_EXECUCAO, iniciado_em__lt=limite)
+    falhados = presos.filter(tentativas__gte=max_tentativas).update(
+        estado=ImportacaoExcel.ESTADO_ERRO, concluido_em=timezone.now(),
+    )
+    repostos = presos.filter(tentativas__lt=max_tentativas).update(
+        estado=ImportacaoExcel.ESTADO_PENDENTE, worker='',
+    )
+    if falhados or repostos:
+        logger.warning(f"Importações interrompidas: {repostos} repostas na fila, {falhados} marcadas com erro")
+    return repostos
+
+
+def run_pending(worker=None, limit=None):
+    """Reclama e executa trabalhos até a fila ficar vazia (ou ``limit``). Retorna o nº executado."""
+    executados = 0
+    while limit is None or executados < limit:
+        job = claim_next_job(worker)
+        if job is None:
+            break
+        run_job(job)
+        executados += 1
+    return executados
+
+
+def job_status(job):
+    """Estado de um trabalho em formato JSON (endpoint de polling)."""
+    return {
+        'id': job.pk,
+        'ficheiro': job.nome_ficheiro,
+        'estado': job.estado,
+        'estado_display': job.get_estado_display(),
+        'terminado': job.terminado,
+        'percentagem': job.percentagem,
+        'total_folhas': job.total_folhas,
+        'folhas_processadas': job.folhas_processadas,
+        'processados': job.processados,
+        'erros': job.erros,
+        'simulacao': job.simulacao,
+        'diff': {
+            'novos': job.registos_novos,
+            'atualizados': job.registos_atualizados,
+            'inalterados': job.registos_inalterados,
+        },
+        'folhas': job.progresso,
+        'detalhes': job.detalhes if job.terminado else [],
+        'criado_em': job.criado_em.isoformat() if job.criado_em else None,
+        'iniciado_em': job.iniciado_em.isoformat() if job.iniciado_em else None,
+        'concluido_em': job.concluido_em.isoformat() if job.concluido_em else None,
+    }
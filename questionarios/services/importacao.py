@@ -0,0 +1,347 @@
+"""
+Gravação em lote de registos de indicadores importados (Excel, ficheiros em lote).
+
+Os importadores constroem primeiro um registo em memória por período
+(operadora, ano, mes) e gravam-nos todos numa única transação com
+``bulk_create(update_conflicts=True)``. Em vez de um ``post_save`` por registo,
+é enviado um único sinal ``indicadores_atualizados_em_lote`` com os registos
+afetados, que atualiza factos, rollups, cobertura e versões de uma só vez;
+as entradas da outbox do Supabase são gravadas na mesma transação.
+
+``incremental_upsert`` compara primeiro os registos com os dados existentes
+(hash do conteúdo em ImportacaoHash e, se necessário, os valores gravados) e
+só grava os períodos novos ou alterados; ``dry_run`` devolve o mesmo resumo
+sem gravar.
+"""
+import hashlib
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import models, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from ..models.importacao import ImportacaoHash
+from . import supabase_outbox
+from .factos import indicator_key
+
+logger = logging.getLogger(__name__)
+
+# Enviado após uma gravação em lote: sender=modelo, instances=[...], periodos={(operadora, ano, mes)}
+indicadores_atualizados_em_lote = Signal()
+
+PERIOD_FIELDS = ('operadora', 'ano', 'mes')
+
+
+def _unique_fields(model):
+    """Campos da restrição de unicidade do período (unique_together do modelo)."""
+    for fields in model._meta.unique_together:
+        if {'ano', 'mes'} <= set(fields):
+            return list(fields)
+    return None
+
+
+def _required_defaults(model):
+    """Valores neutros para campos numéricos obrigatórios sem valor por omissão."""
+    defaults = {}
+    for field in model._meta.concrete_fields:
+        if field.null or field.has_default() or field.primary_key or field.name in PERIOD_FIELDS:
+            continue
+        if isinstance(field, models.DecimalField):
+            defaults[field.attname] = Decimal('0')
+        elif isinstance(field, (models.IntegerField, models.FloatField)):
+            defaults[field.attname] = 0
+    return defaults
+
+
+def _period(values):
+    return tuple(values.get(field) for field in PERIOD_FIELDS)
+
+
+def _merge_by_period(registos):
+    """{(operadora, ano, mes): valores}; registos repetidos do mesmo período são combinados."""
+    por_periodo = {}
+    for registo in registos:
+        # O último valor prevalece
+        por_periodo.setdefault(_period(registo), {}).update(registo)
+    return por_periodo
+
+
+def bulk_upsert(model, registos, user=None, batch_size=500, notify=True):
+    """
+    Cria ou atualiza registos de ``model`` numa única transação.
+
+    Args:
+        model: Modelo do indicador.
+        registos: Iterável de dicts com 'operadora', 'ano', 'mes' e os campos a gravar.
+        user: Utilizador registado em criado_por/atualizado_por.
+        batch_size: Registos por instrução INSERT.
+        notify: Envia ``indicadores_atualizados_em_lote`` após o commit.
+
+    Returns:
+        dict: {'criados': n, 'atualizados': n, 'instances': [...]}
+    """
+    por_periodo = _merge_by_period(registos)
+    if not por_periodo:
+        return {'criados': 0, 'atualizados': 0, 'instances': []}
+
+    attnames = {f.attname for f in model._meta.concrete_fields}
+    unique_fields = _unique_fields(model)
+    has_constraint = unique_fields is not None
+    unique_fields = unique_fields or list(PERIOD_FIELDS)
+    key_index = [PERIOD_FIELDS.index(f) for f in unique_fields]
+    required = _required_defaults(model)
+    audit = [name for name in ('criado_por', 'atualizado_por') if f'{name}_id' in attnames]
+
+    def chave(periodo):
+        return tuple(periodo[i] for i in key_index)
+
+    existentes = _existing_keys(model, por_periodo, unique_fields)
+
+    # Agrupar por conjunto de campos, para que cada UPDATE só toque nos campos importados
+    grupos = {}
+    for periodo, valores in por_periodo.items():
+        campos = frozenset(k for k in valores if k in attnames and k not in PERIOD_FIELDS)
+        grupos.setdefault(campos, []).append((periodo, valores))
+
+    agora = timezone.now()
+    criados = 0
+    with transaction.atomic():
+        for campos, itens in grupos.items():
+            objetos = []
+            for periodo, valores in itens:
+                novo = chave(periodo) not in existentes
+                criados += novo
+                # Os obrigatórios entram também nos existentes: o INSERT é validado
+                # antes do ON CONFLICT, mas só update_fields são atualizados
+                dados = dict(required)
+                dados.update({k: v for k, v in valores.items() if k in attnames})
+                if user is not None:
+                    dados.update({name: user for name in audit})
+                if 'data_atualizacao' in attnames:
+                    dados['data_atualizacao'] = agora
+                objetos.append(model(**dados))
+
+            update_fields = sorted(campos)
+            if user is not None and 'atualizado_por' in audit:
+                update_fields.append('atualizado_por')
+            if 'data_atualizacao' in attnames:
+                update_fields.append('data_atualizacao')
+
+            if has_constraint and update_fields:
+                model.objects.bulk_create(
+                    objetos,
+                    batch_size=batch_size,
+                    update_conflicts=True,
+                    unique_fields=unique_fields,
+                    update_fields=update_fields,
+                )
+            else:
+                # Sem restrição de unicidade: inserir os novos e atualizar os existentes por pk
+                novos = [o for o in objetos if chave(_period(o.__dict__)) not in existentes]
+                atuais = [o for o in objetos if chave(_period(o.__dict__)) in existentes]
+                for obj in atuais:
+                    obj.pk = existentes[chave(_period(obj.__dict__))]
+                model.objects.bulk_create(novos, batch_size=batch_size)
+                if atuais and update_fields:
+                    model.objects.bulk_update(atuais, update_fields, batch_size=batch_size)
+
+        instances = _fetch_instances(model, por_periodo)
+        # Entradas da outbox do Supabase na mesma transação (enviadas por flush_supabase_outbox)
+        supabase_outbox.enqueue(model, [i.pk for i in instances])
+        if notify:
+            periodos = {(i.operadora, i.ano, i.mes) for i in instances}
+            transaction.on_commit(lambda: indicadores_atualizados_em_lote.send(
+                sender=model, instances=instances, periodos=periodos,
+            ))
+
+    atualizados = len(por_periodo) - criados
+    logger.info(f"{model.__name__}: {criados} registos criados, {atualizados} atualizados em lote")
+    return {'criados': criados, 'atualizados': atualizados, 'instances': instances}
+
+
+def _period_queryset(model, por_periodo):
+    return model.objects.filter(
+        operadora__in={op for op, _, _ in por_periodo},
+        ano__in={ano for _, ano, _ in por_periodo},
+        mes__in={mes for _, _, mes in por_periodo},
+    )
+
+
+def _existing_keys(model, por_periodo, unique_fields):
+    """{chave de unicidade: pk} dos períodos que já existem (uma consulta)."""
+    queryset = model.objects.filter(
+        ano__in={ano for _, ano, _ in por_periodo},
+        mes__in={mes for _, _, mes in por_periodo},
+    )
+    return {tuple(row[:-1]): row[-1] for row in queryset.values_list(*unique_fields, 'pk')}
+
+
+def _fetch_instances(model, por_periodo):
+    """Relê os registos gravados (com pk) numa consulta."""
+    return [i for i in _period_queryset(model, por_periodo) if (i.operadora, i.ano, i.mes) in por_periodo]
+
+
+def _canonical(field, value):
+    """Representação estável de um valor, tal como ficaria gravado no campo."""
+    if value is None:
+        return ''
+    try:
+        if isinstance(field, models.DecimalField):
+            value = Decimal(value).quantize(Decimal(1).scaleb(-field.decimal_places))
+            return format(value.normalize(), 'f')
+        if isinstance(field, models.IntegerField):
+            return str(int(Decimal(value)))
+        if isinstance(field, models.FloatField):
+            return repr(float(value))
+    except (InvalidOperation, TypeError, ValueError):
+        pass
+    return str(value)
+
+
+def content_hash(model, valores, campos=None):
+    """SHA-256 dos valores (canónicos) de um registo, para os campos indicados."""
+    campos = sorted(campos if campos is not None else (k for k in valores if k not in PERIOD_FIELDS))
+    partes = [f"{campo}={_canonical(model._meta.get_field(campo), valores.get(campo))}" for campo in campos]
+    return hashlib.sha256('|'.join(partes).encode('utf-8')).hexdigest()
+
+
+def diff_records(model, registos):
+    """
+    Classifica os registos de ``model`` face aos dados existentes, sem gravar.
+
+    Um período é ``inalterado`` quando o hash guardado na última importação
+    coincide e o registo não foi alterado desde então (só uma consulta
+    estreita a ``data_atualizacao``); caso contrário, os valores gravados são
+    lidos numa única consulta e comparados campo a campo.
+
+    Returns:
+        dict: {'novos', 'atualizados', 'inalterados'}: listas de registos,
+        'hashes': {periodo: hash}, 'alteracoes': {periodo: [campos alterados]},
+        'atualizado_em': {periodo: data_atualizacao dos registos existentes},
+        'hash_valido': períodos reconhecidos pelo hash guardado
+    """
+    attnames = {f.attname for f in model._meta.concrete_fields}
+    por_periodo = {
+        periodo: {k: v for k, v in valores.items() if k in attnames}
+        for periodo, valores in _merge_by_period(registos).items()
+    }
+    resultado = {
+        'novos': [], 'atualizados': [], 'inalterados': [],
+        'hashes': {}, 'alteracoes': {}, 'atualizado_em': {}, 'hash_valido': set(),
+    }
+    if not por_periodo:
+        return resultado
+
+    key = indicator_key(model)
+    campos_por_periodo = {p: sorted(k for k in v if k not in PERIOD_FIELDS) for p, v in por_periodo.items()}
+    hashes = {p: content_hash(model, v, campos_por_periodo[p]) for p, v in por_periodo.items()}
+    resultado['hashes'] = hashes
+
+    guardados = {
+        (op, ano, mes): (h, quando)
+        for op, ano, mes, h, quando in ImportacaoHash.objects.filter(
+            indicador=key,
+            ano__in={ano for _, ano, _ in por_periodo},
+            mes__in={mes for _, _, mes in por_periodo},
+        ).values_list('operadora', 'ano', 'mes', 'hash', 'registo_atualizado_em')
+    }
+
+    has_timestamp = 'data_atualizacao' in attnames
+    existentes = {
+        (row[0], row[1], row[2]): row[3:]
+        for row in _period_queryset(model, por_periodo).values_list(
+            'operadora', 'ano', 'mes', 'pk', *(['data_atualizacao'] if has_timestamp else [])
+        )
+        if (row[0], row[1], row[2]) in por_periodo
+    }
+    if has_timestamp:
+        resultado['atualizado_em'] = {periodo: row[1] for periodo, row in existentes.items()}
+
+    a_comparar = []
+    for periodo, valores in por_periodo.items():
+        if periodo not in existentes:
+            resultado['novos'].append(valores)
+            continue
+        guardado = guardados.get(periodo)
+        atualizado = existentes[periodo][1] if has_timestamp else None
+        if guardado and has_timestamp and guardado[0] == hashes[periodo] and guardado[1] == atualizado:
+            resultado['inalterados'].append(valores)
+            resultado['hash_valido'].add(periodo)
+        else:
+            a_comparar.append(periodo)
+
+    if a_comparar:
+        campos = sorted({c for p in a_comparar for c in campos_por_periodo[p]})
+        gravados = {
+            (row['operadora'], row['ano'], row['mes']): row
+            for row in model.objects.filter(pk__in=[existentes[p][0] for p in a_comparar])
+            .values('operadora', 'ano', 'mes', *campos)
+        }
+        for periodo in a_comparar:
+            valores = por_periodo[periodo]
+            gravado = gravados.get(periodo, {})
+            alterados = [
+                campo for campo in campos_por_periodo[periodo]
+                if _canonical(model._meta.get_field(campo), valores[campo])
+                != _canonical(model._meta.get_field(campo), gravado.get(campo))
+            ]
+            if alterados:
+                resultado['atualizados'].append(valores)
+                resultado['alteracoes'][periodo] = alterados
+            else:
+                resultado['inalterados'].append(valores)
+    return resultado
+
+
+def incremental_upsert(model, registos, user=None, dry_run=False, origem=''):
+    """
+    Grava apenas os registos novos ou com valores diferentes dos existentes.
+
+    Os registos inalterados não são escritos nem notificados (sem factos,
+    rollups ou sincronização). Com ``dry_run`` devolve o mesmo resumo sem gravar.
+
+    Returns:
+        dict: {'novos': n, 'atualizados': n, 'inalterados': n, 'alteracoes': {periodo: [campos]}}
+    """
+    diff = diff_records(model, registos)
+    resumo = {
+        'novos': len(diff['novos']),
+        'atualizados': len(diff['atualizados']),
+        'inalterados': len(diff['inalterados']),
+        'alteracoes': diff['alteracoes'],
+    }
+    if dry_run or not diff['hashes']:
+        return resumo
+
+    a_gravar = diff['novos'] + diff['atualizados']
+    atualizacoes = dict(diff['atualizado_em'])
+    if a_gravar:
+        gravados = bulk_upsert(model, a_gravar, user=user)
+        atualizacoes.update({
+            (i.operadora, i.ano, i.mes): getattr(i, 'data_atualizacao', None) for i in gravados['instances']
+        })
+
+    # Guardar o hash (com o data_atualizacao atual do registo) dos períodos em que mudou
+    por_periodo = {_period(v): v for v in a_gravar + diff['inalterados']}
+    por_periodo = {p: v for p, v in por_periodo.items() if p not in diff['hash_valido']}
+    if not por_periodo:
+        return resumo
+    key = indicator_key(model)
+    ImportacaoHash.objects.bulk_create(
+        [
+            ImportacaoHash(
+                indicador=key, operadora=op, ano=ano, mes=mes, hash=diff['hashes'][(op, ano, mes)],
+                origem=origem[:255], registo_atualizado_em=atualizacoes.get((op, ano, mes)),
+            )
+            for op, ano, mes in por_periodo
+        ],
+        update_conflicts=True,
+        unique_fields=['indicador', 'operadora', 'ano', 'mes'],
+        update_fields=['hash', 'origem', 'registo_atualizado_em', 'atualizado_em'],
+    )
+    logger.info(
+        f"{model.__name__}: {resumo['novos']} novos, {resumo['atualizados']} atualizados, "
+        f"{resumo['inalterados']} inalterados"
+    )
+    return resumo
@@ -0,0 +1,208 @@
+"""
+Registo de metadados dos indicadores, construído uma vez no arranque.
+
+Para cada campo numérico de cada modelo de indicador guarda:
+
+- ``kpi_code``: código da secção KPI ARN extraído do verbose_name
+  (ex.: "2.1.5.1 Utilizadores de serviço de 3G" -> "2.1.5.1");
+- ``label``: descrição sem o código;
+- ``unit``: unidade (FCFA, minutos, MBytes, Mbit/s, segundos, unidades);
+- ``aggregation``: semântica de agregação no tempo — ``sum`` (fluxos, ex.
+  receitas, tráfego), ``stock`` (existências, ex. assinantes: vale o último
+  mês do período) ou ``avg`` (médias, ex. duração média de chamada);
+- ``derived_totals``: métodos calcular_* de CALCULATION_FIELDS que incluem o campo.
+
+O registo é preenchido em ``QuestionariosConfig.ready()``; as consultas são
+lookups em dicionários, sem introspeção de ``_meta`` em cada chamada.
+"""
+import logging
+import re
+import threading
+
+from .factos import fact_fields, indicator_key, indicator_models
+
+logger = logging.getLogger(__name__)
+
+KPI_CODE_RE = re.compile(r'^(\d+(?:\.\d+)*(?:\.[a-z])?)\s+(.+)$')
+
+AGGREGATION_SUM = 'sum'
+AGGREGATION_STOCK = 'stock'
+AGGREGATION_AVG = 'avg'
+
+# Unidade por omissão de cada indicador (quando o campo não indica outra)
+MODEL_UNITS = {
+    'receitasindicador': 'FCFA',
+    'investimentoindicador': 'FCFA',
+    'trafegointernetindicador': 'Mbit/s',
+    'lbiindicador': 'Mbit/s',
+}
+DEFAULT_UNIT = 'unidades'
+
+# (padrão no nome ou help_text, unidade), avaliados por ordem
+UNIT_HINTS = (
+    ('segundos', 'segundos'),
+    ('minutos', 'minutos'),
+    ('mbytes', 'MBytes'),
+    ('volume', 'MBytes'),
+    ('mbit', 'Mbit/s'),
+    ('valor monetário', 'FCFA'),
+    ('receita', 'FCFA'),
+)
+
+
+class FieldMetadata:
+    """Metadados (imutáveis) de um campo de indicador."""
+
+    __slots__ = ('indicador', 'model', 'name', 'kpi_code', 'label', 'unit', 'aggregation', 'derived_totals')
+
+    def __init__(self, indicador, model, name, kpi_code, label, unit, aggregation, derived_totals):
+        self.indicador = indicador
+        self.model = model
+        self.name = name
+        self.kpi_code = kpi_code
+        self.label = label
+        self.unit = unit
+        self.aggregation = aggregation
+        self.derived_totals = derived_totals
+
+    @property
+    def is_stock(self):
+        return self.aggregation == AGGREGATION_STOCK
+
+    def as_dict(self):
+        return {
+            'indicador': self.indicador,
+            'campo': self.name,
+            'kpi_code': self.kpi_code,
+            'label': self.label,
+            'unit': self.unit,
+            'aggregation': self.aggregation,
+            'derived_totals': list(self.derived_totals),
+        }
+
+    def __repr__(self):
+        return f"<FieldMetadata {self.indicador}.{self.name} ({self.kpi_code or '-'}, {self.unit}, {self.aggregation})>"
+
+
+def _split_verbose_name(field):
+    verbose_name = str(field.verbose_name).strip()
+    match = KPI_CODE_RE.match(verbose_name)
+    if match:
+        return match.group(1), match.group(2)
+    return None, verbose_name
+
+
+def _field_unit(model, field):
+    text = f"{field.name} {field.help_text or ''}".lower()
+    for hint, unit in UNIT_HINTS:
+        if hint in text:
+            return unit
+    return MODEL_UNITS.get(indicator_key(model), DEFAULT_UNIT)
+
+
+def _field_aggregation(model, field):
+    overrides = getattr(model, 'FIELD_AGGREGATION', {})
+    if field.name in overrides:
+        return overrides[field.name]
+    if 'media' in field.name:
+        return AGGREGATION_AVG
+    return getattr(model, 'AGGREGATION', AGGREGATION_SUM)
+
+
+class IndicatorRegistry:
+    """Índices em memória: (indicador, campo), código KPI e modelo."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ready = False
+        self._fields = {}
+        self._by_model = {}
+        self._by_kpi = {}
+        self._models = {}
+
+    def build(self, models_to_register=None):
+        """(Re)constrói o registo a partir dos modelos de indicador."""
+        fields, by_model, by_kpi, by_key = {}, {}, {}, {}
+        for model in models_to_register or indicator_models():
+            key = indicator_key(model)
+            by_key[key] = model
+            membership = {}
+            for method_name in model.CALCULATION_FIELDS:
+                for campo in model.get_calculation_fields(method_name):
+                    membership.setdefault(campo, []).append(method_name)
+
+            entries = {}
+            for campo in fact_fields(model):
+                field = model._meta.get_field(campo)
+                kpi_code, label = _split_verbose_name(field)
+                meta = FieldMetadata(
+                    indicador=key,
+                    model=model,
+                    name=campo,
+                    kpi_code=kpi_code,
+                    label=label,
+                    unit=_field_unit(model, field),
+                    aggregation=_field_aggregation(model, field),
+                    derived_totals=tuple(membership.get(campo, ())),
+                )
+                entries[campo] = meta
+                fields[(key, campo)] = meta
+                if kpi_code:
+                    by_kpi.setdefault(kpi_code, []).append(meta)
+            by_model[key] = entries
+
+        with self._lock:
+            self._fields, self._by_model, self._by_kpi, self._models = fields, by_model, by_kpi, by_key
+            self._ready = True
+        logger.debug(f"Registo de indicadores: {len(by_key)} modelos, {len(fields)} campos")
+        return self
+
+    def _ensure_ready(self):
+        if not self._ready:
+            self.build()
+
+    @staticmethod
+    def _key(model):
+        return model if isinstance(model, str) else indicator_key(model)
+
+    def field(self, model, campo):
+        """Metadados de um campo, ou None se não for um campo de indicador."""
+        self._ensure_ready()
+        return self._fields.get((self._key(model), campo))
+
+    def fields(self, model):
+        """dict {campo: FieldMetadata} de um indicador (ordem dos campos do modelo)."""
+        self._ensure_ready()
+        return self._by_model.get(self._key(model), {})
+
+    def has_field(self, model, campo):
+        return self.field(model, campo) is not None
+
+    def by_kpi(self, kpi_code):
+        """Campos (de qualquer indicador) com o código KPI indicado."""
+        self._ensure_ready()
+        return list(self._by_kpi.get(kpi_code, ()))
+
+    def model(self, indicador):
+        """Modelo a partir do identificador do indicador (ex.: 'receitasindicador')."""
+        self._ensure_ready()
+        return self._models.get(indicador)
+
+    def models(self):
+        self._ensure_ready()
+        return list(self._models.values())
+
+    def derived_totals(self, model, campo):
+        meta = self.field(model, campo)
+        return meta.derived_totals if meta else ()
+
+    def aggregation(self, model, campo):
+        meta = self.field(model, campo)
+        return meta.aggregation if meta else None
+
+    def unit(self, model, campo):
+        meta = self.field(model, campo)
+        return meta.unit if meta else None
+
+
+registry = IndicatorRegistry()
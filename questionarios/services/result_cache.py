@@ -0,0 +1,203 @@
+"""
+Cache de resultados indexada pela versão dos dados.
+
+Cada indicador tem um contador de geração (VersaoDados) incrementado a cada
+gravação/eliminação. As chaves de cache incluem (view/função, parâmetros,
+versões dos indicadores usados), pelo que um resultado deixa de ser servido
+assim que os dados de origem mudam, sem depender de um TTL adivinhado.
+
+Uso numa view::
+
+    class MinhaView(CachedContextMixin, TemplateView):
+        cache_models = [ReceitasIndicador]
+
+Uso numa função::
+
+    @cached_result(models=[ReceitasIndicador])
+    def totais(ano): ...
+"""
+import functools
+import hashlib
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db.models import F
+from django.views.generic.base import ContextMixin
+
+from ..models.versao import VersaoDados
+from .factos import indicator_key, indicator_models
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'resultado'
+DEFAULT_TIMEOUT = 60 * 60 * 24
+
+
+def bump_version(model):
+    """Incrementa a geração dos dados de ``model``."""
+    key = indicator_key(model) if not isinstance(model, str) else model
+    if not VersaoDados.objects.filter(indicador=key).update(versao=F('versao') + 1):
+        obj, created = VersaoDados.objects.get_or_create(indicador=key, defaults={'versao': 1})
+        if not created:
+            VersaoDados.objects.filter(pk=obj.pk).update(versao=F('versao') + 1)
+
+
+def get_versions(models=None):
+    """
+    Retorna as versões atuais dos indicadores numa única consulta.
+
+    Args:
+        models: Modelos a considerar (por omissão, todos os indicadores).
+
+    Returns:
+        tuple: ((indicador, versão), ...) ordenado, adequado para chaves de cache.
+    """
+    keys = sorted(indicator_key(m) for m in (models or indicator_models()))
+    versions = dict(VersaoDados.objects.filter(indicador__in=keys).values_list('indicador', 'versao'))
+    return tuple((key, versions.get(key, 0)) for key in keys)
+
+
+class ResultCache:
+    """Fachada sobre a cache do Django com contadores de acertos/falhas."""
+
+    _MISSING = object()
+
+    def __init__(self, prefix=KEY_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._local_stats = {'hits': 0, 'misses': 0}
+
+    def make_key(self, namespace, params=None, models=None):
+        """Chave (namespace, parâmetros, versões dos dados)."""
+        raw = repr((sorted((params or {}).items()), get_versions(models)))
+        digest = hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+        return f'{self.prefix}:{namespace}:{digest}'
+
+    def _count(self, stat):
+        with self._lock:
+            self._local_stats[stat] += 1
+        stat_key = f'{self.prefix}:stats:{stat}'
+        try:
+            cache.incr(stat_key)
+        except ValueError:
+            cache.add(stat_key, 1, timeout=None)
+
+    def get(self, key, default=None):
+        value = cache.get(key, self._MISSING)
+        if value is self._MISSING:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        try:
+            cache.set(key, value, timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"Não foi possível guardar '{key}' na cache de resultados: {e}")
+            return False
+
+    def evict(self, key):
+        """Remove uma entrada específica."""
+        cache.delete(key)
+
+    def stats(self):
+        """Contadores globais (partilhados pela cache) e do processo atual."""
+        hits = cache.get(f'{self.prefix}:stats:hits', 0)
+        misses = cache.get(f'{self.prefix}:stats:misses', 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total * 100, 1) if total else 0,
+            'processo': dict(self._local_stats),
+        }
+
+    def reset_stats(self):
+        cache.delete_many([f'{self.prefix}:stats:hits', f'{self.prefix}:stats:misses'])
+        with self._lock:
+            self._local_stats = {'hits': 0, 'misses': 0}
+
+
+result_cache = ResultCache()
+
+
+def cached_result(models=None, timeout=DEFAULT_TIMEOUT, namespace=None):
+    """
+    Decorador para funções cujo resultado depende apenas dos argumentos e dos
+    dados de ``models`` (por omissão, todos os indicadores).
+    """
+    def decorator(func):
+        ns = namespace or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = result_cache.make_key(ns, {'args': args, **kwargs}, models)
+            value = result_cache.get(key, ResultCache._MISSING)
+            if value is ResultCache._MISSING:
+                value = func(*args, **kwargs)
+                result_cache.set(key, value, timeout)
+            return value
+
+        wrapper.cache_namespace = ns
+        return wrapper
+    return decorator
+
+
+class CachedContextMixin:
+    """
+    Mixin para TemplateView: guarda o contexto calculado por (view, GET, kwargs,
+    versões dos dados) e reutiliza-o enquanto os dados não mudarem. Num acerto,
+    o ``get_context_data`` da view não é executado.
+
+    Atributos:
+        cache_models: Modelos de que o contexto depende (None = todos os indicadores).
+        cache_timeout: Validade máxima da entrada (segundos).
+        cache_vary_on_user: Inclui o utilizador na chave (contexto por utilizador).
+        cache_exclude_keys: Chaves de contexto que não devem ser guardadas.
+    """
+    cache_models = None
+    cache_timeout = DEFAULT_TIMEOUT
+    cache_vary_on_user = False
+    cache_exclude_keys = ('view',)
+
+    def get_cache_models(self):
+        return self.cache_models
+
+    def get_cache_params(self):
+        params = {
+            'get': sorted(self.request.GET.lists()),
+            'kwargs': sorted(self.kwargs.items()),
+        }
+        if self.cache_vary_on_user:
+            params['user'] = getattr(self.request.user, 'pk', None)
+        return params
+
+    def get_cache_key(self):
+        namespace = f'{type(self).__module__}.{type(self).__qualname__}'
+        return result_cache.make_key(namespace, self.get_cache_params(), self.get_cache_models())
+
+    def get_cached_context_data(self, **kwargs):
+        """Contexto vindo da cache ou calculado por ``get_context_data`` e guardado."""
+        key = self.get_cache_key()
+        cached = result_cache.get(key)
+        if cached is not None:
+            context = ContextMixin.get_context_data(self, **kwargs)
+            context.update(cached)
+            return context
+
+        context = self.get_context_data(**kwargs)
+        excluded = set(self.cache_exclude_keys) | set(kwargs)
+        result_cache.set(
+            key,
+            {k: v for k, v in context.items() if k not in excluded},
+            self.cache_timeout,
+        )
+        return context
+
+    def get(self, request, *args, **kwargs):
+        # Substitui TemplateView.get para que a cache envolva o get_context_data
+        # completo, independentemente da posição do mixin na hierarquia.
+        return self.render_to_response(self.get_cached_context_data(**kwargs))
@@ -0,0 +1,232 @@
+"""
+Rollups trimestrais e anuais dos indicadores.
+
+Os totais por (indicador, campo, operadora, ano, trimestre) e por
+(indicador, campo, operadora, ano) são calculados a partir da tabela de factos
+e guardados em IndicadorRollupTrimestral/IndicadorRollupAnual. Quando um
+registo muda, só o trimestre (e o ano) afetado é recalculado; as views de
+relatório e análise leem estes totais antes de recorrer às tabelas largas.
+"""
+import logging
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import Count, Sum
+
+from ..models.factos import IndicadorFacto
+from ..models.rollups import IndicadorRollupAnual, IndicadorRollupTrimestral
+from .factos import indicator_key
+
+logger = logging.getLogger(__name__)
+
+
+def quarter_of(mes):
+    """Trimestre (1-4) de um mês (1-12)."""
+    return (int(mes) - 1) // 3 + 1
+
+
+def quarter_months(trimestre):
+    return list(range((trimestre - 1) * 3 + 1, trimestre * 3 + 1))
+
+
+def _refresh_annual(indicador, operadora, ano):
+    IndicadorRollupAnual.objects.filter(indicador=indicador, operadora=operadora, ano=ano).delete()
+    rows = (
+        IndicadorRollupTrimestral.objects
+        .filter(indicador=indicador, operadora=operadora, ano=ano)
+        .values('campo')
+        .annotate(total=Sum('valor'), n=Sum('registos'))
+        .order_by()
+    )
+    IndicadorRollupAnual.objects.bulk_create([
+        IndicadorRollupAnual(
+            indicador=indicador, campo=row['campo'], operadora=operadora, ano=ano,
+            valor=row['total'], registos=row['n'] or 0,
+        )
+        for row in rows
+    ])
+
+
+def refresh_bucket(indicador, operadora, ano, mes):
+    """Recalcula os rollups do trimestre de ``mes`` e do respetivo ano."""
+    trimestre = quarter_of(mes)
+    with transaction.atomic():
+        IndicadorRollupTrimestral.objects.filter(
+            indicador=indicador, operadora=operadora, ano=ano, trimestre=trimestre,
+        ).delete()
+        rows = (
+            IndicadorFacto.objects
+            .filter(indicador=indicador, operadora=operadora, ano=ano, mes__in=quarter_months(trimestre))
+            .values('campo')
+            .annotate(total=Sum('valor'), n=Count('valor'))
+            .order_by()
+        )
+        IndicadorRollupTrimestral.objects.bulk_create([
+            IndicadorRollupTrimestral(
+                indicador=indicador, campo=row['campo'], operadora=operadora,
+                ano=ano, trimestre=trimestre, valor=row['total'], registos=row['n'],
+            )
+            for row in rows
+        ])
+        _refresh_annual(indicador, operadora, ano)
+
+
+def refresh_periods(model, periodos):
+    """
+    Recalcula os rollups de um conjunto de períodos de ``model``.
+
+    Args:
+        periodos: iterável de (operadora, ano, mes); trimestres repetidos são
+            recalculados uma só vez.
+    """
+    indicador = indicator_key(model)
+    buckets = {(operadora, ano, quarter_of(mes)) for operadora, ano, mes in periodos if ano and mes}
+    for operadora, ano, trimestre in buckets:
+        refresh_bucket(indicador, operadora, ano, trimestre * 3)
+
+
+def rebuild_rollups(indicadores=None):
+    """
+    Reconstrói todos os rollups a partir da tabela de factos.
+
+    Returns:
+        dict: {'trimestral': nº de linhas, 'anual': nº de linhas}
+    """
+    from .aggregation import quarter_expression
+
+    facts = IndicadorFacto.objects.all()
+    trimestral = IndicadorRollupTrimestral.objects.all()
+    anual = IndicadorRollupAnual.objects.all()
+    if indicadores:
+        facts = facts.filter(indicador__in=indicadores)
+        trimestral = trimestral.filter(indicador__in=indicadores)
+        anual = anual.filter(indicador__in=indicadores)
+
+    with transaction.atomic():
+        trimestral.delete()
+        anual.delete()
+        rows = (
+            facts.annotate(trimestre=quarter_expression())
+            .values('indicador', 'campo', 'operadora', 'ano', 'trimestre')
+            .annotate(total=Sum('valor'), n=Count('valor'))
+            .order_by()
+        )
+        quarterly = [
+            IndicadorRollupTrimestral(
+                indicador=row['indicador'], campo=row['campo'], operadora=row['operadora'],
+                ano=row['ano'], trimestre=row['trimestre'], valor=row['total'], registos=row['n'],
+            )
+            for row in rows.iterator()
+        ]
+        IndicadorRollupTrimestral.objects.bulk_create(quarterly, batch_size=2000)
+
+        annual = {}
+        for item in quarterly:
+            key = (item.indicador, item.campo, item.operadora, item.ano)
+            entry = annual.setdefault(key, [None, 0])
+            if item.valor is not None:
+                entry[0] = (entry[0] or 0) + item.valor
+            entry[1] += item.registos
+        IndicadorRollupAnual.objects.bulk_create([
+            IndicadorRollupAnual(indicador=i, campo=c, operadora=o, ano=a, valor=v, registos=n)
+            for (i, c, o, a), (v, n) in annual.items()
+        ], batch_size=2000)
+
+    logger.info(f"Rollups reconstruídos: {len(quarterly)} trimestrais, {len(annual)} anuais")
+    return {'trimestral': len(quarterly), 'anual': len(annual)}
+
+
+def _native(model, campo, valor):
+    """Converte a soma guardada (Decimal) para o tipo do campo de origem."""
+    if valor is None:
+        return None
+    if isinstance(model._meta.get_field(campo), models.IntegerField):
+        return int(valor)
+    return valor
+
+
+def quarterly_rollup_rows(model, ano, campos):
+    """
+    Lê os rollups trimestrais no formato das linhas ``GROUP BY operadora, trimestre``
+    usadas pelo motor de agregação (chaves ``sum__<campo>``/``count__<campo>``).
+
+    Returns:
+        list ou None se ainda não houver rollups para (indicador, ano).
+    """
+    rollups = list(
+        IndicadorRollupTrimestral.objects
+        .filter(indicador=indicator_key(model), ano=ano, campo__in=campos)
+        .values_list('operadora', 'trimestre', 'campo', 'valor', 'registos')
+    )
+    if not rollups:
+        return None
+
+    rows = {}
+    for operadora, trimestre, campo, valor, registos in rollups:
+        row = rows.get((operadora, trimestre))
+        if row is None:
+            row = {'operadora': operadora, 'trimestre': trimestre}
+            for name in campos:
+                row[f'sum__{name}'] = None
+                row[f'count__{name}'] = 0
+            rows[(operadora, trimestre)] = row
+        row[f'sum__{campo}'] = _native(model, campo, valor)
+        row[f'count__{campo}'] = registos
+    return list(rows.values())
+
+
+def _calculation_totals(model, queryset, group_by, method_names):
+    campos_por_metodo = {name: model.get_calculation_fields(name) for name in method_names}
+    campos = {campo for lista in campos_por_metodo.values() for campo in lista}
+    inteiros = {
+        name: all(isinstance(model._meta.get_field(c), models.IntegerField) for c in lista)
+        for name, lista in campos_por_metodo.items()
+    }
+
+    valores = {}
+    for chave, campo, valor in queryset.filter(campo__in=campos).values_list(group_by, 'campo', 'valor'):
+        por_campo = valores.setdefault(chave, {})
+        por_campo[campo] = por_campo.get(campo, Decimal(0)) + (valor or Decimal(0))
+
+    totals = {}
+    for chave, por_campo in valores.items():
+        totals[chave] = {}
+        for name, lista in campos_por_metodo.items():
+            total = sum((por_campo.get(campo, Decimal(0)) for campo in lista), Decimal(0))
+            totals[chave][name] = int(total) if inteiros[name] else total
+    return totals
+
+
+def calculation_totals_from_rollups(model, ano, method_names, trimestre=None):
+    """
+    Calcula totais do registo CALCULATION_FIELDS por operadora a partir dos rollups.
+
+    Sem ``trimestre`` usa os rollups anuais; com ``trimestre`` os trimestrais.
+
+    Returns:
+        dict {operadora: {método: soma}} ou None se ainda não houver rollups.
+    """
+    if trimestre is None:
+        queryset = IndicadorRollupAnual.objects.filter(indicador=indicator_key(model), ano=ano)
+    else:
+        queryset = IndicadorRollupTrimestral.objects.filter(
+            indicador=indicator_key(model), ano=ano, trimestre=trimestre,
+        )
+    if not queryset.exists():
+        return None
+    return _calculation_totals(model, queryset, 'operadora', method_names)
+
+
+def quarterly_calculation_totals_from_rollups(model, ano, method_names, operadora=None):
+    """
+    Calcula totais do registo CALCULATION_FIELDS por trimestre a partir dos rollups.
+
+    Returns:
+        dict {trimestre: {método: soma}} ou None se ainda não houver rollups.
+    """
+    queryset = IndicadorRollupTrimestral.objects.filter(indicador=indicator_key(model), ano=ano)
+    if not queryset.exists():
+        return None
+    if operadora:
+        queryset = queryset.filter(operadora=operadora)
+    return _calculation_totals(model, queryset, 'trimestre', method_names)
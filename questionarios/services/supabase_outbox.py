@@ -0,0 +1,303 @@
+"""
+Sincronização com o Supabase através de uma tabela *outbox* (SupabaseOutbox).
+
+1. A gravação ou remoção de um indicador escreve uma entrada na outbox na
+   mesma transação (sinais ``post_save``/``post_delete`` e ``bulk_upsert``),
+   sem qualquer pedido HTTP — o formulário não espera pela API remota;
+2. o comando ``flush_supabase_outbox`` reclama as entradas pendentes
+   (``SELECT ... FOR UPDATE SKIP LOCKED``), lê o estado atual dos registos e
+   envia-os em lote ao PostgREST: um ``POST`` com a lista de registos e
+   ``on_conflict=id`` por tabela, e um ``DELETE ?id=in.(...)`` para os removidos;
+3. falhas temporárias (rede, timeout, 408/429/5xx) são repetidas com espera
+   exponencial; erros definitivos (restantes 4xx) e entradas que esgotam as
+   tentativas ficam no estado ``falhado`` (dead letter) para análise no admin.
+
+Como o envio usa o estado atual do registo, várias gravações do mesmo
+registo resultam num único envio, e uma repetição atrasada nunca repõe dados
+antigos.
+"""
+import logging
+import re
+from datetime import timedelta
+
+import requests
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from ..models.sincronizacao import SupabaseOutbox
+
+logger = logging.getLogger(__name__)
+
+# Lista de modelos a serem sincronizados com o Supabase
+SUPABASE_MODELS = [
+    'TarifarioVozOrangeIndicador',
+    'TarifarioVozMTNIndicador',
+    'EstacoesMoveisIndicador',
+    'TrafegoOriginadoIndicador',
+    'TrafegoTerminadoIndicador',
+    'TrafegoRoamingInternacionalIndicador',
+    'LBIIndicador',
+    'TrafegoInternetIndicador',
+    'InternetFixoIndicador',
+    'ReceitasIndicador',
+    'EmpregoIndicador',
+    'InvestimentoIndicador',
+]
+
+# Estados HTTP que justificam nova tentativa (além de erros de rede e timeouts)
+RETRY_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+# IDs por pedido DELETE (limita o tamanho do URL)
+DELETE_CHUNK_SIZE = 200
+
+_session = None
+
+
+def is_configured():
+    return bool(getattr(settings, 'SUPABASE_URL', None) and getattr(settings, 'SUPABASE_KEY', None))
+
+
+def supabase_table(model):
+    """Nome da tabela no Supabase (CamelCase -> snake_case)."""
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', model.__name__).lower()
+
+
+def get_session():
+    """``requests.Session`` partilhada pelo processo, com pool de ligações persistentes."""
+    global _session
+    if _session is None:
+        session = requests.Session()
+        pool = getattr(settings, 'SUPABASE_POOL_SIZE', 10)
+        adapter = HTTPAdapter(pool_connections=pool, pool_maxsize=pool)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
+
+
+def _timeout():
+    return (
+        getattr(settings, 'SUPABASE_CONNECT_TIMEOUT', 3.05),
+        getattr(settings, 'SUPABASE_READ_TIMEOUT', 10),
+    )
+
+
+def _headers(prefer):
+    key = settings.SUPABASE_KEY
+    return {
+        'apikey': key,
+        'Authorization': f'Bearer {key}',
+        'Content-Type': 'application/json',
+        'Prefer': prefer,
+    }
+
+
+class SupabaseRequestError(Exception):
+    """Falha de um pedido ao PostgREST; ``retryable`` indica se vale a pena repetir."""
+
+    def __init__(self, message, retryable):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _request(method, tabela, session=None, **kwargs):
+    url = f"{settings.SUPABASE_URL.rstrip('/')}/rest/v1/{tabela}"
+    try:
+        response = (session or get_session()).request(method, url, timeout=_timeout(), **kwargs)
+    except requests.RequestException as e:
+        raise SupabaseRequestError(f"{type(e).__name__}: {e}", retryable=True)
+    if response.status_code >= 400:
+        raise SupabaseRequestError(
+            f"HTTP {response.status_code}: {response.text[:500]}",
+            retryable=response.status_code in RETRY_STATUS,
+        )
+    return response
+
+
+def fetch_rows(tabela, params, limit, session=None):
+    """Lê até ``limit`` linhas com os filtros PostgREST ``params`` (limite pelo cabeçalho Range)."""
+    headers = _headers('count=none')
+    headers.update({'Range-Unit': 'items', 'Range': f'0-{limit - 1}'})
+    return _request('GET', tabela, session, params=params, headers=headers).json()
+
+
+def upsert_rows(tabela, rows, session=None):
+    """Insere ou atualiza ``rows`` (lista de dicts com 'id') num único pedido."""
+    # O PostgREST exige as mesmas chaves em todos os objetos do lote: campos em falta vão a null
+    colunas = {}
+    for row in rows:
+        colunas.update(dict.fromkeys(row))
+    rows = [{coluna: row.get(coluna) for coluna in colunas} for row in rows]
+    return _request(
+        'POST', tabela, session,
+        params={'on_conflict': 'id'},
+        headers=_headers('resolution=merge-duplicates,return=minimal'),
+        json=rows,
+    )
+
+
+def delete_rows(tabela, ids, session=None):
+    """Remove os registos ``ids`` (um pedido por cada DELETE_CHUNK_SIZE IDs)."""
+    ids = list(ids)
+    for inicio in range(0, len(ids), DELETE_CHUNK_SIZE):
+        lista = ','.join(str(i) for i in ids[inicio:inicio + DELETE_CHUNK_SIZE])
+        _request('DELETE', tabela, session, params={'id': f'in.({lista})'}, headers=_headers('return=minimal'))
+
+
+def enqueue(model, pks, operacao=SupabaseOutbox.OPERACAO_UPSERT):
+    """
+    Regista na outbox os registos ``pks`` de ``model`` (numa única instrução).
+
+    Deve ser chamado dentro da transação que grava os registos. Não faz nada
+    se o Supabase não estiver configurado ou se o modelo não for sincronizado.
+    """
+    if model.__name__ not in SUPABASE_MODELS or not is_configured():
+        return 0
+    entradas = [
+        SupabaseOutbox(tabela=supabase_table(model), registo_id=str(pk), operacao=operacao)
+        for pk in pks if pk is not None
+    ]
+    SupabaseOutbox.objects.bulk_create(entradas)
+    return len(entradas)
+
+
+def backoff(tentativas):
+    """Espera antes da tentativa seguinte: base * 2^(tentativas - 1), limitada ao máximo."""
+    base = getattr(settings, 'SUPABASE_OUTBOX_BACKOFF_SECONDS', 5)
+    maximo = getattr(settings, 'SUPABASE_OUTBOX_BACKOFF_MAX_SECONDS', 3600)
+    return timedelta(seconds=min(base * 2 ** max(tentativas - 1, 0), maximo))
+
+
+def _models_by_table():
+    return {
+        supabase_table(model): model
+        for model in apps.get_app_config('questionarios').get_models()
+        if model.__name__ in SUPABASE_MODELS
+    }
+
+
+def _send_table(model, tabela, ids, session):
+    """
+    Envia o estado atual dos registos ``ids`` de uma tabela.
+
+    Returns:
+        dict: {registo_id: None (enviado) ou SupabaseRequestError}
+    """
+    existentes = {str(obj.pk): obj for obj in model.objects.filter(pk__in=ids)}
+    removidos = [i for i in ids if i not in existentes]
+    resultado = {}
+
+    if existentes:
+        try:
+            upsert_rows(tabela, [obj._prepare_data_for_supabase() for obj in existentes.values()], session)
+            resultado.update(dict.fromkeys(existentes))
+        except SupabaseRequestError as e:
+            if e.retryable or len(existentes) == 1:
+                resultado.update(dict.fromkeys(existentes, e))
+            else:
+                # Erro definitivo no lote: enviar um a um para isolar o(s) registo(s) inválido(s)
+                for registo_id, obj in existentes.items():
+                    try:
+                        upsert_rows(tabela, [obj._prepare_data_for_supabase()], session)
+                        resultado[registo_id] = None
+                    except SupabaseRequestError as erro:
+                        resultado[registo_id] = erro
+
+    if removidos:
+        try:
+            delete_rows(tabela, removidos, session)
+            resultado.update(dict.fromkeys(removidos))
+        except SupabaseRequestError as e:
+            resultado.update(dict.fromkeys(removidos, e))
+    return resultado
+
+
+def flush_outbox(batch_size=None, session=None):
+    """
+    Envia um lote de entradas pendentes da outbox.
+
+    Returns:
+        dict: {'enviados', 'reagendados', 'falhados'} (número de entradas)
+    """
+    batch_size = batch_size or getattr(settings, 'SUPABASE_OUTBOX_BATCH_SIZE', 500)
+    max_tentativas = getattr(settings, 'SUPABASE_OUTBOX_MAX_TENTATIVAS', 8)
+    resumo = {'enviados': 0, 'reagendados': 0, 'falhados': 0}
+    if not is_configured():
+        return resumo
+
+    modelos = _models_by_table()
+    # O bloqueio das linhas é mantido durante o envio (limitado pelos timeouts):
+    # outros flushers passam ao lote seguinte e, se o processo terminar a meio,
+    # as entradas continuam pendentes
+    with transaction.atomic():
+        entradas = list(
+            SupabaseOutbox.objects.select_for_update(skip_locked=True)
+            .filter(estado=SupabaseOutbox.ESTADO_PENDENTE, proxima_tentativa__lte=timezone.now())
+            .order_by('pk')[:batch_size]
+        )
+        if not entradas:
+            return resumo
+
+        por_tabela = {}
+        for entrada in entradas:
+            por_tabela.setdefault(entrada.tabela, {}).setdefault(entrada.registo_id, []).append(entrada)
+
+        enviados = []
+        falhas = []
+        agora = timezone.now()
+        for tabela, registos in por_tabela.items():
+            model = modelos.get(tabela)
+            if model is None:
+                erro = SupabaseRequestError(f"Tabela '{tabela}' não corresponde a nenhum modelo sincronizado", False)
+                resultado = dict.fromkeys(registos, erro)
+            else:
+                resultado = _send_table(model, tabela, list(registos), session)
+            for registo_id, erro in resultado.items():
+                for entrada in registos[registo_id]:
+                    if erro is None:
+                        enviados.append(entrada.pk)
+                        continue
+                    entrada.tentativas += 1
+                    entrada.ultimo_erro = str(erro)
+                    if not erro.retryable or entrada.tentativas >= max_tentativas:
+                        entrada.estado = SupabaseOutbox.ESTADO_FALHADO
+                        resumo['falhados'] += 1
+                    else:
+                        entrada.proxima_tentativa = agora + backoff(entrada.tentativas)
+                        resumo['reagendados'] += 1
+                    falhas.append(entrada)
+
+        SupabaseOutbox.objects.filter(pk__in=enviados).delete()
+        SupabaseOutbox.objects.bulk_update(falhas, ['tentativas', 'ultimo_erro', 'estado', 'proxima_tentativa'])
+
+    resumo['enviados'] = len(enviados)
+    if falhas:
+        logger.warning(
+            f"Supabase: {resumo['enviados']} enviados, {resumo['reagendados']} reagendados, "
+            f"{resumo['falhados']} falhados"
+        )
+    else:
+        logger.info(f"Supabase: {resumo['enviados']} entradas sincronizadas")
+    return resumo
+
+
+def flush_all(batch_size=None, session=None):
+    """Envia lotes até não haver entradas pendentes prontas. Retorna o resumo acumulado."""
+    total = {'enviados': 0, 'reagendados': 0, 'falhados': 0}
+    while True:
+        resumo = flush_outbox(batch_size, session)
+        for chave, valor in resumo.items():
+            total[chave] += valor
+        if not any(resumo.values()):
+            return total
+
+
+def retry_dead_letters(queryset=None):
+    """Repõe na fila as entradas falhadas (todas ou as de ``queryset``)."""
+    queryset = SupabaseOutbox.objects.all() if queryset is None else queryset
+    return queryset.filter(estado=SupabaseOutbox.ESTADO_FALHADO).update(
+        estado=SupabaseOutbox.ESTADO_PENDENTE, tentativas=0, proxima_tentativa=timezone.now(), ultimo_erro='',
+    )
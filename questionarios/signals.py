@@ -0,0 +1,66 @@
+"""
+Sinais de manutenção das estruturas derivadas dos indicadores.
+
+Todos os modelos que herdam de IndicadorBase passam por aqui após gravação ou
+eliminação, para atualizar incrementalmente as tabelas derivadas.
+"""
+import logging
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models.base import IndicadorBase
+from .services import cobertura, factos, rollups
+from .services.importacao import indicadores_atualizados_em_lote
+from .services.result_cache import bump_version
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_save)
+def indicador_guardado(sender, instance, raw=False, **kwargs):
+    """Atualiza as estruturas derivadas após gravar um indicador."""
+    if raw or not issubclass(sender, IndicadorBase):
+        return
+    try:
+        with transaction.atomic():
+            periodo_anterior = factos.stored_period(instance)
+            factos.sync_instance_facts(instance)
+            periodos = {(instance.operadora, instance.ano, instance.mes)}
+            if periodo_anterior:
+                periodos.add(periodo_anterior)
+            rollups.refresh_periods(sender, periodos)
+            cobertura.refresh_coverage(sender, periodos)
+            bump_version(sender)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar factos/rollups/cobertura de {sender.__name__} (ID: {instance.pk}): {e}")
+
+
+@receiver(post_delete)
+def indicador_eliminado(sender, instance, **kwargs):
+    """Atualiza as estruturas derivadas após eliminar um indicador."""
+    if not issubclass(sender, IndicadorBase):
+        return
+    try:
+        with transaction.atomic():
+            factos.delete_instance_facts(instance)
+            periodos = [(instance.operadora, instance.ano, instance.mes)]
+            rollups.refresh_periods(sender, periodos)
+            cobertura.refresh_coverage(sender, periodos)
+            bump_version(sender)
+    except Exception as e:
+        logger.error(f"Erro ao remover factos/rollups/cobertura de {sender.__name__} (ID: {instance.pk}): {e}")
+
+
+@receiver(indicadores_atualizados_em_lote)
+def indicadores_importados(sender, instances, periodos, **kwargs):
+    """Atualiza as estruturas derivadas uma única vez após uma gravação em lote."""
+    try:
+        with transaction.atomic():
+            factos.sync_bulk_facts(sender, instances)
+            rollups.refresh_periods(sender, periodos)
+            cobertura.refresh_coverage(sender, periodos)
+            bump_version(sender)
+    except Exception as e:
+        logger.error(f"Erro ao atualizar factos/rollups/cobertura de {sender.__name__} em lote: {e}")
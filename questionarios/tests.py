@@ -1,3 +1,1094 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import json
+import os
+import random
+import tempfile
+import zipfile
+from datetime import timedelta
 
-# Create your tests here.
+import pandas as pd
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import models
+from django.db.models import Avg, Sum
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from observatorio.cache import LRUFileBasedCache
+
+from .models import (
+    AssinantesIndicador, EmpregoIndicador, EstacoesMoveisIndicador,
+    InternetFixoIndicador, InvestimentoIndicador, LBIIndicador,
+    ReceitasIndicador, TrafegoInternetIndicador, TrafegoOriginadoIndicador,
+    TarifarioVozMTNIndicador, TrafegoTerminadoIndicador, ImportacaoExcel, IndicadorFacto, SupabaseOutbox,
+)
+from .excel_parser import (
+    MONTH_MAPPING, SheetIndex, clean_value, clean_values, detect_operadora, detect_year, detect_year_in_text,
+    extract_sheet_records, parse_internet_traffic, process_excel_file, read_mapped_sheet,
+)
+from .excel_reader import open_workbook
+from .services import cobertura
+from .services.aggregation import (
+    QUARTERS, aggregate_market_data, calculation_totals_by_operator, calculation_totals_by_quarter,
+    calculation_totals_for_year,
+)
+from .services.exportacao import HAS_PYARROW, ExportError, iter_csv, iter_ndjson, parse_filters, write_parquet
+from .services.factos import fact_fields, fact_totals, rebuild_facts
+from .services.batch_import import batch_import
+from .services.import_jobs import claim_next_job, enqueue_import, run_job
+from .services.importacao import bulk_upsert, incremental_upsert
+from .services.metadata import registry
+from .services.rollups import rebuild_rollups
+from .services.supabase_outbox import flush_outbox
+from .utils.supabase_sync import SYNC_ALL_TABLES, SupabaseClient, sync_all_data
+from .services.result_cache import bump_version, cached_result, result_cache
+
+
+def build_indicador(model, operadora, ano, mes, rng, nulls=False):
+    """Cria (sem gravar) um indicador com valores aleatórios em todos os campos numéricos."""
+    values = {'operadora': operadora, 'ano': ano, 'mes': mes}
+    for field in model._meta.concrete_fields:
+        if field.name in values or field.primary_key or field.is_relation:
+            continue
+        if nulls and field.null:
+            values[field.name] = None
+        elif isinstance(field, models.DecimalField):
+            values[field.name] = Decimal(rng.randint(0, 10 ** 6)) / 100
+        elif isinstance(field, models.IntegerField):
+            values[field.name] = rng.randint(0, 10 ** 5)
+        elif isinstance(field, (models.CharField, models.TextField)) and not field.null and not field.has_default():
+            values[field.name] = ''
+    return model(**values)
+
+
+class CalculationExpressionParityTests(TestCase):
+    """As expressões de CALCULATION_FIELDS devem coincidir com os métodos calcular_* em Python."""
+
+    MODELS = [
+        AssinantesIndicador, EmpregoIndicador, EstacoesMoveisIndicador,
+        InternetFixoIndicador, InvestimentoIndicador, LBIIndicador,
+        ReceitasIndicador, TrafegoInternetIndicador, TrafegoOriginadoIndicador,
+        TrafegoTerminadoIndicador,
+    ]
+
+    def setUp(self):
+        rng = random.Random(2024)
+        # bulk_create não dispara os sinais de sincronização com o Supabase
+        for model in self.MODELS:
+            model.objects.bulk_create([
+                build_indicador(model, operadora, 2024, mes, rng, nulls=(mes % 4 == 0))
+                for operadora in ('orange', 'telecel')
+                for mes in range(1, 13)
+            ])
+
+    def test_registry_methods_exist(self):
+        for model in self.MODELS:
+            for method_name in model.CALCULATION_FIELDS:
+                with self.subTest(model=model.__name__, method=method_name):
+                    self.assertTrue(callable(getattr(model, method_name, None)))
+
+    def test_aggregate_matches_python_methods(self):
+        for model in self.MODELS:
+            rows = list(model.objects.all())
+            totals = model.aggregate_calculations()
+            for method_name in model.CALCULATION_FIELDS:
+                with self.subTest(model=model.__name__, method=method_name):
+                    expected = sum(getattr(row, method_name)() for row in rows)
+                    self.assertEqual(totals[method_name], expected)
+
+    def test_annotate_matches_python_methods_per_row(self):
+        for model in self.MODELS:
+            queryset = model.objects.annotate(**{
+                f'sql_{name}': expression
+                for name, expression in model.get_calculation_expressions().items()
+            })
+            for row in queryset:
+                for method_name in model.CALCULATION_FIELDS:
+                    with self.subTest(model=model.__name__, method=method_name, pk=row.pk):
+                        self.assertEqual(getattr(row, f'sql_{method_name}'), getattr(row, method_name)())
+
+    def test_quarter_totals_match_python_methods(self):
+        queryset = ReceitasIndicador.objects.filter(operadora='orange')
+        totals = calculation_totals_by_quarter(queryset, ['calcular_total_receitas'])
+        for trimestre in range(1, 5):
+            meses = range((trimestre - 1) * 3 + 1, trimestre * 3 + 1)
+            expected = sum(r.calcular_total_receitas() for r in queryset.filter(mes__in=meses))
+            self.assertEqual(totals[trimestre]['calcular_total_receitas'], expected)
+
+    def test_stock_totals_use_last_month_of_period(self):
+        AssinantesIndicador.objects.filter(operadora='telecel', ano=2024, mes=12).delete()
+
+        def total(operadora, mes):
+            return AssinantesIndicador.objects.get(operadora=operadora, ano=2024, mes=mes).calcular_total_assinantes()
+
+        anual = calculation_totals_by_operator(AssinantesIndicador, 'calcular_total_assinantes', 2024)
+        self.assertEqual(anual['por_operadora'], {'orange': total('orange', 12), 'telecel': total('telecel', 11)})
+        self.assertEqual(anual['total'], total('orange', 12) + total('telecel', 11))
+        trimestral = calculation_totals_by_operator(AssinantesIndicador, 'calcular_total_assinantes', 2024, [4, 5, 6])
+        self.assertEqual(trimestral['por_operadora'], {'orange': total('orange', 6), 'telecel': total('telecel', 6)})
+
+        # Fluxos continuam a ser somados
+        receitas = calculation_totals_by_operator(ReceitasIndicador, 'calcular_total_receitas', 2024)
+        esperado = sum(r.calcular_total_receitas() for r in ReceitasIndicador.objects.filter(operadora='orange'))
+        self.assertEqual(receitas['por_operadora']['orange'], esperado)
+
+    def test_year_totals_use_last_month_for_stock(self):
+        AssinantesIndicador.objects.filter(operadora='telecel', ano=2024, mes__in=[9, 12]).delete()
+
+        def total(operadora, mes):
+            return AssinantesIndicador.objects.get(operadora=operadora, ano=2024, mes=mes).calcular_total_assinantes()
+
+        metodo = 'calcular_total_assinantes'
+        por_trimestre, anual = calculation_totals_for_year(AssinantesIndicador, 2024, [metodo], with_annual=True)
+        self.assertEqual(
+            {q: valores[metodo] for q, valores in por_trimestre.items()},
+            {
+                1: total('orange', 3) + total('telecel', 3),
+                2: total('orange', 6) + total('telecel', 6),
+                3: total('orange', 9) + total('telecel', 8),
+                4: total('orange', 12) + total('telecel', 11),
+            },
+        )
+        self.assertEqual(anual[metodo], total('orange', 12) + total('telecel', 11))
+
+        rebuild_facts([AssinantesIndicador])
+        rebuild_rollups()
+        self.assertEqual(
+            calculation_totals_for_year(AssinantesIndicador, 2024, [metodo], operadora='telecel', with_annual=True),
+            ({q: {metodo: total('telecel', mes)} for q, mes in ((1, 3), (2, 6), (3, 8), (4, 11))},
+             {metodo: total('telecel', 11)}),
+        )
+
+
+def run_data_migration(name, function):
+    """Executa a função RunPython de uma migração de dados com os modelos atuais."""
+    getattr(importlib.import_module(f'questionarios.migrations.{name}'), function)(django_apps, None)
+
+
+class IndicadorFactoTests(TestCase):
+    """A tabela de factos acompanha gravações, eliminações, mudanças de período e importações em lote."""
+
+    def setUp(self):
+        self.rng = random.Random(5)
+
+    def facts(self, model, pk):
+        return IndicadorFacto.objects.filter(indicador=model._meta.model_name, registro_id=pk)
+
+    def assert_facts_match_table(self, model, ano=2024):
+        totais = fact_totals(ano, [model._meta.model_name])
+        for campo in fact_fields(model):
+            esperado = {
+                row['operadora']: row['total']
+                for row in model.objects.filter(ano=ano).values('operadora').annotate(total=Sum(campo)).order_by()
+            }
+            with self.subTest(campo=campo):
+                self.assertEqual(totais.get((model._meta.model_name, campo), {}), esperado)
+
+    def test_save_period_change_and_delete(self):
+        campos = fact_fields(ReceitasIndicador)
+        registo = build_indicador(ReceitasIndicador, 'orange', 2024, 1, self.rng)
+        registo.save()
+        self.assertEqual(self.facts(ReceitasIndicador, registo.pk).count(), len(campos))
+
+        setattr(registo, campos[0], 123)
+        registo.save()
+        self.assertEqual(self.facts(ReceitasIndicador, registo.pk).count(), len(campos))
+        self.assertEqual(self.facts(ReceitasIndicador, registo.pk).get(campo=campos[0]).valor, 123)
+
+        registo.ano, registo.mes = 2023, 12
+        registo.save()
+        self.assertEqual(
+            set(self.facts(ReceitasIndicador, registo.pk).values_list('ano', 'mes').distinct()), {(2023, 12)},
+        )
+
+        pk = registo.pk
+        registo.delete()
+        self.assertFalse(self.facts(ReceitasIndicador, pk).exists())
+
+    def test_bulk_upsert_updates_facts(self):
+        # Os factos da importação em lote são atualizados após o commit
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_upsert(EmpregoIndicador, [
+                {'operadora': 'orange', 'ano': 2024, 'mes': mes, 'emprego_direto_total': mes * 10}
+                for mes in range(1, 13)
+            ])
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_upsert(EmpregoIndicador, [{'operadora': 'orange', 'ano': 2024, 'mes': 3, 'emprego_direto_total': 7}])
+        registo = EmpregoIndicador.objects.get(operadora='orange', ano=2024, mes=3)
+        self.assertEqual(self.facts(EmpregoIndicador, registo.pk).get(campo='emprego_direto_total').valor, 7)
+        self.assertEqual(IndicadorFacto.objects.filter(indicador='empregoindicador').count(),
+                         12 * len(fact_fields(EmpregoIndicador)))
+        self.assert_facts_match_table(EmpregoIndicador)
+
+    def test_migration_backfills_existing_rows(self):
+        # bulk_create não dispara os sinais: registos anteriores à tabela de factos
+        ReceitasIndicador.objects.bulk_create([
+            build_indicador(ReceitasIndicador, operadora, 2024, mes, self.rng)
+            for operadora in ('orange', 'telecel') for mes in range(1, 13)
+        ])
+        self.assertFalse(IndicadorFacto.objects.exists())
+        run_data_migration('0014_backfill_indicador_facto', 'backfill_facts')
+        self.assert_facts_match_table(ReceitasIndicador)
+
+        registo = ReceitasIndicador.objects.get(operadora='telecel', ano=2024, mes=5)
+        registo.mes = 13
+        registo.save()
+        ReceitasIndicador.objects.get(operadora='orange', ano=2024, mes=1).delete()
+        self.assert_facts_match_table(ReceitasIndicador)
+
+
+class AggregateMarketDataTests(TestCase):
+    """Os totais trimestrais, anuais e por operadora coincidem com valores calculados à mão."""
+
+    def setUp(self):
+        rng = random.Random(3)
+        registos = []
+        for operadora, mes, direto, homens in (
+            ('orange', 1, 10, 4), ('orange', 2, 20, 8), ('orange', 4, 30, 6), ('telecel', 1, 5, 3),
+        ):
+            registo = build_indicador(EmpregoIndicador, operadora, 2024, mes, rng)
+            registo.emprego_direto_total, registo.nacionais_homem = direto, homens
+            registos.append(registo)
+        registos.append(build_indicador(EmpregoIndicador, 'orange', 2023, 1, rng))
+        EmpregoIndicador.objects.bulk_create(registos)
+
+    def expected(self):
+        def periodo(direto, homens):
+            return {'total_emprego_direto_total': direto, 'total_nacionais_homem': homens, 'total_inexistente': 0}
+
+        def trimestres(*valores):
+            return {f'Q{q}': periodo(*valores[q - 1]) for q in QUARTERS}
+
+        return {
+            'TOTAL': {
+                'quarterly': trimestres((35, 5.0), (30, 6.0), (0, 0), (0, 0)),
+                'annual': periodo(65, 5.25),
+            },
+            'ORANGE': {
+                'quarterly': trimestres((30, 6.0), (30, 6.0), (0, 0), (0, 0)),
+                'annual': periodo(60, 6.0),
+            },
+            'TELECEL': {
+                'quarterly': trimestres((5, 3.0), (0, 0), (0, 0), (0, 0)),
+                'annual': periodo(5, 3.0),
+            },
+            # Operadora sem registos: zeros em todos os campos
+            'MTN': {
+                'quarterly': trimestres((0, 0), (0, 0), (0, 0), (0, 0)),
+                'annual': periodo(0, 0),
+            },
+        }
+
+    def test_matches_hand_computed_totals(self):
+        campos = {'emprego_direto_total': Sum, 'nacionais_homem': Avg, 'inexistente': Sum}
+        operadoras = ['orange', 'telecel', 'mtn']
+        self.assertEqual(aggregate_market_data(EmpregoIndicador, 2024, campos, operadoras), self.expected())
+
+        rebuild_facts([EmpregoIndicador])
+        rebuild_rollups()
+        self.assertEqual(aggregate_market_data(EmpregoIndicador, 2024, campos, operadoras), self.expected())
+
+
+class RollupTests(TestCase):
+    """Os rollups reconstruídos devem reproduzir os totais calculados nas tabelas largas."""
+
+    def setUp(self):
+        rng = random.Random(7)
+        for model in (ReceitasIndicador, EmpregoIndicador):
+            model.objects.bulk_create([
+                build_indicador(model, operadora, 2024, mes, rng, nulls=(mes == 5))
+                for operadora in ('orange', 'telecel')
+                for mes in range(1, 13)
+            ])
+
+    def test_calculation_totals_from_rollups(self):
+        metodos = list(ReceitasIndicador.CALCULATION_FIELDS)
+        sem_rollups = calculation_totals_for_year(ReceitasIndicador, 2024, metodos, operadora='telecel')
+        rebuild_facts([ReceitasIndicador])
+        rebuild_rollups()
+        com_rollups = calculation_totals_for_year(ReceitasIndicador, 2024, metodos, operadora='telecel')
+        self.assertEqual(com_rollups, sem_rollups)
+
+    def test_market_data_from_rollups(self):
+        campos = {campo: Sum for campo in ('emprego_direto_total', 'nacionais_homem', 'emprego_indireto')}
+        sem_rollups = aggregate_market_data(EmpregoIndicador, 2024, campos, operadoras=['orange', 'telecel'])
+        rebuild_facts([EmpregoIndicador])
+        rebuild_rollups()
+        com_rollups = aggregate_market_data(EmpregoIndicador, 2024, campos, operadoras=['orange', 'telecel'])
+        self.assertEqual(com_rollups, sem_rollups)
+
+
+class RollupBackfillTests(TestCase):
+    """Depois das migrações de dados, gravações isoladas mantêm os rollups completos."""
+
+    def setUp(self):
+        rng = random.Random(13)
+        # bulk_create não dispara os sinais: registos anteriores aos rollups
+        ReceitasIndicador.objects.bulk_create([
+            build_indicador(ReceitasIndicador, operadora, 2024, mes, rng)
+            for operadora in ('orange', 'telecel') for mes in range(1, 13)
+        ])
+        run_data_migration('0014_backfill_indicador_facto', 'backfill_facts')
+        run_data_migration('0015_backfill_indicador_rollups', 'backfill_rollups')
+
+    def assert_totals_match_tables(self):
+        metodo = 'calcular_total_receitas'
+        expressao = ReceitasIndicador.get_calculation_expression(metodo)
+        por_operadora = {
+            row['operadora']: row['total']
+            for row in ReceitasIndicador.objects.filter(ano=2024).values('operadora')
+            .annotate(total=Sum(expressao)).order_by()
+        }
+        self.assertEqual(
+            calculation_totals_by_operator(ReceitasIndicador, metodo, 2024)['por_operadora'], por_operadora,
+        )
+        self.assertEqual(
+            calculation_totals_by_operator(ReceitasIndicador, metodo, 2024, [1, 2, 3])['por_operadora'],
+            {
+                row['operadora']: row['total']
+                for row in ReceitasIndicador.objects.filter(ano=2024, mes__in=[1, 2, 3]).values('operadora')
+                .annotate(total=Sum(expressao)).order_by()
+            },
+        )
+        for operadora in ('orange', 'telecel'):
+            with self.subTest(operadora=operadora):
+                self.assertEqual(
+                    calculation_totals_for_year(ReceitasIndicador, 2024, [metodo], operadora=operadora),
+                    calculation_totals_by_quarter(
+                        ReceitasIndicador.objects.filter(ano=2024, operadora=operadora), [metodo],
+                    ),
+                )
+
+    def test_single_save_keeps_year_complete(self):
+        registo = ReceitasIndicador.objects.get(operadora='orange', ano=2024, mes=4)
+        registo.receitas_mensalidades = 150
+        registo.save()
+        self.assert_totals_match_tables()
+
+    def test_delete_and_period_change(self):
+        ReceitasIndicador.objects.get(operadora='telecel', ano=2024, mes=2).delete()
+        registo = ReceitasIndicador.objects.get(operadora='orange', ano=2024, mes=3)
+        registo.mes = 8
+        ReceitasIndicador.objects.filter(operadora='orange', ano=2024, mes=8).delete()
+        registo.save()
+        self.assert_totals_match_tables()
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ResultCacheTests(TestCase):
+    """Os resultados em cache ficam obsoletos quando a versão dos dados muda."""
+
+    def setUp(self):
+        # Cache própria dos testes: nunca limpar a cache partilhada (ficheiros/Redis)
+        cache.clear()
+
+    def test_version_bump_invalidates_cached_result(self):
+        chamadas = []
+
+        @cached_result(models=[ReceitasIndicador], namespace='tests.total')
+        def total(ano):
+            chamadas.append(ano)
+            return len(chamadas)
+
+        self.assertEqual(total(2024), 1)
+        self.assertEqual(total(2024), 1)
+        bump_version(EmpregoIndicador)
+        self.assertEqual(total(2024), 1)
+        bump_version(ReceitasIndicador)
+        self.assertEqual(total(2024), 2)
+        self.assertEqual(chamadas, [2024, 2024])
+
+    def test_evict_removes_single_key(self):
+        key = result_cache.make_key('tests.evict', {'ano': 2024}, [ReceitasIndicador])
+        result_cache.set(key, {'total': 1})
+        self.assertEqual(result_cache.get(key), {'total': 1})
+        result_cache.evict(key)
+        self.assertIsNone(result_cache.get(key))
+
+
+class LRUFileBasedCacheTests(TestCase):
+    """A cache em ficheiros remove primeiro as entradas com acesso mais antigo."""
+
+    def test_cull_keeps_recently_read_entries(self):
+        with tempfile.TemporaryDirectory() as location:
+            lru = LRUFileBasedCache(location, {'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2}})
+            for i in range(4):
+                lru.set(f'k{i}', i)
+                os.utime(lru._key_to_file(f'k{i}'), (1000 + i, 1000 + i))
+            self.assertEqual(lru.get('k0'), 0)  # k0 passa a ser a mais recente
+            lru.set('k4', 4)
+            self.assertEqual(lru.get('k0'), 0)
+            self.assertIsNone(lru.get('k1'))
+            self.assertIsNone(lru.get('k2'))
+            self.assertEqual(lru.get('k4'), 4)
+
+
+class IndicatorRegistryTests(TestCase):
+    """O registo de metadados cobre todos os campos e extrai códigos, unidades e semântica."""
+
+    def test_registry_covers_fact_fields(self):
+        for model in registry.models():
+            with self.subTest(model=model.__name__):
+                self.assertEqual(tuple(registry.fields(model)), fact_fields(model))
+
+    def test_field_metadata(self):
+        meta = registry.field(EstacoesMoveisIndicador, 'sms')
+        self.assertEqual(meta.kpi_code, '2.1.1')
+        self.assertEqual(meta.label, 'SMS')
+        self.assertTrue(meta.is_stock)
+        self.assertIn(meta, registry.by_kpi('2.1.1'))
+        self.assertEqual(registry.aggregation(EstacoesMoveisIndicador, 'total_carregamentos'), 'sum')
+        self.assertEqual(registry.unit(ReceitasIndicador, 'receitas_mensalidades'), 'FCFA')
+        self.assertIn('calcular_total_receitas', registry.derived_totals(ReceitasIndicador, 'receitas_mensalidades'))
+        self.assertIs(registry.model('receitasindicador'), ReceitasIndicador)
+
+
+class CoberturaTests(TestCase):
+    """O índice de cobertura responde a faltas, conformidade e anos disponíveis."""
+
+    def setUp(self):
+        rng = random.Random(11)
+        ReceitasIndicador.objects.bulk_create([
+            build_indicador(ReceitasIndicador, operadora, 2024, mes, rng)
+            for operadora, meses in (('orange', range(1, 13)), ('telecel', range(1, 10)))
+            for mes in meses
+        ])
+        EmpregoIndicador.objects.bulk_create([
+            build_indicador(EmpregoIndicador, 'orange', ano, 1, rng) for ano in (2023, 2024)
+        ])
+        cobertura.rebuild_coverage([ReceitasIndicador, EmpregoIndicador])
+
+    def test_missing_months(self):
+        self.assertEqual(cobertura.missing_months('orange', 2024, [ReceitasIndicador]), {})
+        self.assertEqual(
+            cobertura.missing_months('telecel', 2024, [ReceitasIndicador, EmpregoIndicador], ate_mes=11),
+            {'receitasindicador': [10, 11], 'empregoindicador': list(range(1, 12))},
+        )
+
+    def test_compliance_rate_and_years(self):
+        taxa = cobertura.compliance_rate(2024, indicadores=[ReceitasIndicador])
+        self.assertEqual((taxa['esperadas'], taxa['submetidas']), (24, 21))
+        self.assertEqual(taxa['por_operadora'], {'orange': 100.0, 'telecel': 75.0})
+        self.assertEqual(cobertura.available_years([EmpregoIndicador]), [2023, 2024])
+        self.assertEqual(cobertura.available_years([ReceitasIndicador]), [2024])
+
+    def test_indicator_summary_matches_tables(self):
+        esperado = {
+            'receitasindicador': ReceitasIndicador.objects.count(),
+            'empregoindicador': EmpregoIndicador.objects.count(),
+            'assinantesindicador': 0,
+        }
+        modelos = [ReceitasIndicador, EmpregoIndicador, AssinantesIndicador]
+        with self.assertNumQueries(1):
+            resumo = cobertura.indicator_summary(modelos)
+        self.assertEqual({k: v['count'] for k, v in resumo.items()}, esperado)
+
+        cobertura.IndicadorCobertura.objects.all().delete()
+        with self.assertNumQueries(2):
+            resumo_direto = cobertura.indicator_summary(modelos)
+        self.assertEqual(resumo_direto, resumo)
+
+    def test_migration_backfills_rows_created_without_signals(self):
+        cobertura.IndicadorCobertura.objects.all().delete()
+        autor = User.objects.create_user('operador')
+        ReceitasIndicador.objects.filter(operadora='orange', ano=2024, mes=5).update(atualizado_por=autor)
+        run_data_migration('0016_backfill_indicador_cobertura', 'backfill_coverage')
+        build_indicador(EmpregoIndicador, 'telecel', 2022, 3, random.Random(3)).save()
+
+        self.assertEqual(
+            cobertura.IndicadorCobertura.objects.get(
+                indicador='receitasindicador', operadora='orange', ano=2024, mes=5,
+            ).atualizado_por, autor,
+        )
+
+        modelos = [ReceitasIndicador, EmpregoIndicador]
+        resumo = cobertura.indicator_summary(modelos)
+        self.assertEqual(
+            {k: v['count'] for k, v in resumo.items()},
+            {'receitasindicador': 21, 'empregoindicador': 3},
+        )
+        self.assertEqual(cobertura.available_years([EmpregoIndicador]), [2022, 2023, 2024])
+        self.assertEqual(
+            cobertura.missing_months('telecel', 2024, [ReceitasIndicador]),
+            {'receitasindicador': [10, 11, 12]},
+        )
+
+    def test_rebuild_records_author_of_latest_row(self):
+        autor = User.objects.create_user('operador')
+        ReceitasIndicador.objects.filter(operadora='telecel', ano=2024, mes=2).update(atualizado_por=autor)
+        cobertura.rebuild_coverage([ReceitasIndicador])
+        self.assertEqual(
+            dict(cobertura.IndicadorCobertura.objects.filter(
+                indicador='receitasindicador', operadora='telecel', ano=2024, mes__in=[1, 2],
+            ).values_list('mes', 'atualizado_por')),
+            {1: None, 2: autor.pk},
+        )
+
+    def test_refresh_removes_deleted_period(self):
+        ReceitasIndicador.objects.filter(operadora='orange', ano=2024, mes=12).update(mes=13)
+        cobertura.refresh_coverage(ReceitasIndicador, [('orange', 2024, 12), ('orange', 2024, 13)])
+        self.assertEqual(cobertura.missing_months('orange', 2024, [ReceitasIndicador]), {'receitasindicador': [12]})
+
+
+class BulkImportTests(TestCase):
+    """A importação grava um registo por mês numa única operação em lote."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('importador')
+
+    def test_bulk_upsert_creates_then_updates_only_given_fields(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            resultado = bulk_upsert(
+                EmpregoIndicador,
+                [{'operadora': 'orange', 'ano': 2024, 'mes': mes, 'emprego_direto_total': mes * 10} for mes in range(1, 13)],
+                user=self.user,
+            )
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual((resultado['criados'], resultado['atualizados']), (12, 0))
+
+        resultado = bulk_upsert(
+            EmpregoIndicador,
+            [{'operadora': 'orange', 'ano': 2024, 'mes': 3, 'nacionais_homem': 7}],
+        )
+        self.assertEqual((resultado['criados'], resultado['atualizados']), (0, 1))
+        registo = EmpregoIndicador.objects.get(operadora='orange', ano=2024, mes=3)
+        self.assertEqual((registo.emprego_direto_total, registo.nacionais_homem), (30, 7))
+        self.assertEqual(registo.criado_por, self.user)
+        self.assertEqual(EmpregoIndicador.objects.count(), 12)
+
+    def test_bulk_upsert_without_unique_constraint(self):
+        bulk_upsert(AssinantesIndicador, [{'operadora': 'telecel', 'ano': 2024, 'mes': 1, 'assinantes_pre_pago': 5}])
+        bulk_upsert(AssinantesIndicador, [{'operadora': 'telecel', 'ano': 2024, 'mes': 1, 'assinantes_pre_pago': 9}])
+        self.assertEqual(
+            list(AssinantesIndicador.objects.values_list('assinantes_pre_pago', flat=True)), [9]
+        )
+
+    def test_clean_values_matches_clean_value(self):
+        celulas = [[12, 3.25, '1.234,56', ' NA ', '-', '', None, float('nan')], ['abc', '7', 0, '0,5', 2.0, True, ' 10 ', 'x,y']]
+        esperado = [[clean_value(v) for v in linha] for linha in celulas]
+        self.assertEqual(clean_values(celulas).tolist(), esperado)
+
+    def test_sheet_index_lookup(self):
+        df = pd.DataFrame({'Cod.': [None, '1.1', 2.11], 'INDICADOR': ['Título', ' Por via  Satélite', 'x']})
+        index = SheetIndex(df)
+        self.assertEqual(index.find(1.1), 1)
+        self.assertEqual(index.find(2.11), 2)
+        self.assertEqual(index.find('Por via Satélite'), 1)
+        self.assertIsNone(index.find(9.9))
+
+    def test_parse_internet_traffic_writes_once_per_sheet(self):
+        linhas = [
+            {'Cod.': 1.1, 'INDICADOR': 'Por via Satélite', **{mes: 1.5 for mes in MONTH_MAPPING}},
+            {'Cod.': 3.1, 'INDICADOR': 'Residencial', **{mes: '1.234,5' for mes in MONTH_MAPPING}},
+        ]
+        df = pd.DataFrame(linhas)
+        # hashes, registos existentes, existentes, savepoint, upsert, releitura, release, hashes
+        with self.assertNumQueries(8):
+            processados, erros, _ = parse_internet_traffic(df, 2024, 'orange', self.user)
+        self.assertEqual(processados, 2 * 12)
+        self.assertGreater(erros, 0)  # restantes códigos do mapeamento não estão na folha
+        registo = TrafegoInternetIndicador.objects.get(operadora='orange', ano=2024, mes=6)
+        self.assertEqual(registo.por_via_satelite, Decimal('1.50'))
+        self.assertEqual(registo.residencial, Decimal('1234.50'))
+
+
+def build_workbook(sheets):
+    """Livro Excel em memória com as folhas indicadas (cabeçalho na linha 4, como no KPI ARN)."""
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine='openpyxl') as writer:
+        for name, linhas in sheets.items():
+            pd.DataFrame(linhas).to_excel(writer, sheet_name=name, startrow=3, index=False)
+    buffer.seek(0)
+    return buffer
+
+
+class ExcelWorkbookImportTests(TestCase):
+    """Um ficheiro com várias folhas popula todos os indicadores mapeados numa passagem."""
+
+    def test_process_all_mapped_sheets(self):
+        meses = {mes: num for mes, num in MONTH_MAPPING.items()}
+        workbook = build_workbook({
+            'Internet_Trafico': [{'Cod.': 1.3, 'INDICADOR': 'Fibra Ótica', **meses}],
+            'EMPREGO': [
+                {'Cod.': None, 'INDICADOR': 'Total do emprego directo', **{m: 100 for m in meses}},
+                {'Cod.': None, 'INDICADOR': 'Nacionais - Mulher', **{m: '4' for m in meses}},
+            ],
+            'Outra folha': [{'x': 1}],
+        })
+        user = User.objects.create_user('importador')
+        resultado = process_excel_file(workbook, user, 'telecel', 2024)
+
+        self.assertEqual(TrafegoInternetIndicador.objects.filter(operadora='telecel', ano=2024).count(), 12)
+        self.assertEqual(
+            TrafegoInternetIndicador.objects.get(operadora='telecel', ano=2024, mes=5).fibra_otica, Decimal('5')
+        )
+        emprego = EmpregoIndicador.objects.get(operadora='telecel', ano=2024, mes=7)
+        self.assertEqual((emprego.emprego_direto_total, emprego.nacionais_mulher), (100, 4))
+        self.assertEqual(resultado['processed'], 12 + 2 * 12)
+
+    def test_partially_filled_sheet_imports_only_filled_months(self):
+        meses = list(MONTH_MAPPING)
+        workbook = build_workbook({
+            'EMPREGO': [
+                {'Cod.': None, 'INDICADOR': 'Total do emprego directo', **{m: (50 if i < 3 else None) for i, m in enumerate(meses)}},
+                {'Cod.': None, 'INDICADOR': 'Nacionais - Mulher', **{m: (2 if i < 4 else None) for i, m in enumerate(meses)}},
+            ],
+        })
+        user = User.objects.create_user('importador')
+        resultado = process_excel_file(workbook, user, 'orange', 2024)
+
+        self.assertEqual((resultado['processed'], resultado['errors']), (3 + 4, 0))
+        registos = EmpregoIndicador.objects.filter(operadora='orange', ano=2024).order_by('mes')
+        self.assertEqual(
+            list(registos.values_list('mes', 'emprego_direto_total', 'nacionais_mulher')),
+            [(1, 50, 2), (2, 50, 2), (3, 50, 2), (4, 0, 2)],
+        )
+
+    def test_streaming_reader_matches_pandas(self):
+        linhas = [{'Cod.': None, 'INDICADOR': 'Título', **{m: None for m in MONTH_MAPPING}, 'Notas': 'x'}]
+        linhas += [{'Cod.': 9.9, 'INDICADOR': f'Irrelevante {i}', **{m: i for m in MONTH_MAPPING}, 'Notas': ''} for i in range(50)]
+        linhas += [
+            {'Cod.': 1.1, 'INDICADOR': 'Por via Satélite', **{m: '1.234,5' for m in MONTH_MAPPING}, 'Notas': ''},
+            {'Cod.': None, 'INDICADOR': ' residencial ', **{m: 7 for m in MONTH_MAPPING}, 'Notas': ''},
+        ]
+        workbook = build_workbook({'Outra': [{'x': 1}], 'Internet_Trafico': linhas})
+        completo = pd.read_excel(workbook, sheet_name='Internet_Trafico', header=3)
+
+        with open_workbook(workbook) as streaming:
+            df = read_mapped_sheet(streaming, 'Internet_Trafico', 'trafego_internet')
+        self.assertEqual(len(df), 2)
+        self.assertNotIn('Notas', df.columns)
+        self.assertEqual(detect_year(df), detect_year(completo))
+        self.assertEqual(
+            extract_sheet_records(df, 'trafego_internet', 2024, 'orange')[:2],
+            extract_sheet_records(completo, 'trafego_internet', 2024, 'orange')[:2],
+        )
+
+
+class ImportJobTests(TestCase):
+    """Uploads criam um trabalho pendente; o worker processa-o e regista o progresso por folha."""
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = User.objects.create_user('importador', password='x')
+
+    def upload(self):
+        workbook = build_workbook({
+            'Internet_Trafico': [{'Cod.': 1.3, 'INDICADOR': 'Fibra Ótica', **{m: 2 for m in MONTH_MAPPING}}],
+        })
+        return SimpleUploadedFile('kpi.xlsx', workbook.getvalue())
+
+    def test_worker_claims_and_runs_job(self):
+        job = enqueue_import(self.upload(), self.user, operadora='orange', ano=2023)
+        self.assertEqual(job.estado, ImportacaoExcel.ESTADO_PENDENTE)
+
+        claimed = claim_next_job('teste')
+        self.assertEqual((claimed.pk, claimed.estado, claimed.worker), (job.pk, 'em_execucao', 'teste'))
+        self.assertIsNone(claim_next_job('outro'))
+
+        with self.captureOnCommitCallbacks(execute=False):
+            job = run_job(claimed)
+        self.assertEqual(job.estado, ImportacaoExcel.ESTADO_CONCLUIDO)
+        self.assertEqual((job.total_folhas, job.folhas_processadas, job.processados), (1, 1, 12))
+        self.assertEqual(job.progresso['Internet_Trafico']['processados'], 12)
+        self.assertEqual(TrafegoInternetIndicador.objects.filter(operadora='orange', ano=2023).count(), 12)
+
+        self.client.force_login(self.user)
+        status = self.client.get(reverse('questionarios:import_status', args=[job.pk]), secure=True).json()
+        self.assertTrue(status['terminado'])
+        self.assertEqual(status['percentagem'], 100)
+
+
+class BatchImportTests(TestCase):
+    """Um zip com um livro por operadora/ano é lido em paralelo e gravado por (operadora, ano)."""
+
+    def build_zip(self, livros):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as arquivo:
+            for nome, valor in livros.items():
+                # Um valor por mês (None = mês por preencher) ou o mesmo valor em todos os meses
+                valores = valor if isinstance(valor, dict) else {m: valor for m in MONTH_MAPPING}
+                workbook = build_workbook({
+                    'Internet_Trafico': [{'Cod.': 1.3, 'INDICADOR': 'Fibra Ótica', **{m: valores.get(m) for m in MONTH_MAPPING}}],
+                })
+                arquivo.writestr(nome, workbook.getvalue())
+            arquivo.writestr('__MACOSX/._KPI_Orange_2022.xlsx', b'')
+        buffer.seek(0)
+        return buffer
+
+    def test_detect_operadora_and_year_from_filename(self):
+        self.assertEqual(detect_operadora('KPI_ARN_Orange_2023.xlsx'), 'orange')
+        self.assertEqual(detect_operadora('questionario-MTN-T1.xlsx'), 'telecel')
+        self.assertIsNone(detect_operadora('kpi_consolidado.xlsx'))
+        self.assertEqual(detect_year_in_text('kpi_telecel_2024_T1'), 2024)
+
+    def test_zip_of_workbooks(self):
+        arquivo = self.build_zip({'KPI_Orange_2022.xlsx': 3, 'kpi-telecel-2023.xlsx': 7, 'sem_dados.xlsx': 1})
+        with self.captureOnCommitCallbacks(execute=False):
+            results = batch_import(arquivo, workers=2, indicator_type='trafego_internet')
+
+        self.assertEqual(results['livros'], 3)
+        self.assertEqual(set(results['grupos']), {('orange', 2022), ('telecel', 2023)})
+        self.assertEqual(results['processed'], 24)
+        self.assertTrue(any('sem_dados.xlsx' in d and 'operadora' in d for d in results['error_details']))
+        self.assertEqual(
+            TrafegoInternetIndicador.objects.get(operadora='telecel', ano=2023, mes=4).fibra_otica, Decimal('7')
+        )
+        self.assertEqual(TrafegoInternetIndicador.objects.filter(operadora='orange', ano=2022).count(), 12)
+
+
+    def test_quarterly_workbooks_do_not_wipe_earlier_months(self):
+        meses = list(MONTH_MAPPING)
+        arquivo = self.build_zip({
+            'KPI_Orange_2024_T1.xlsx': {m: 3 for m in meses[:3]},
+            'KPI_Orange_2024_T2.xlsx': {m: 5 for m in meses[3:6]},
+        })
+        with self.captureOnCommitCallbacks(execute=False):
+            results = batch_import(arquivo, workers=1, indicator_type='trafego_internet')
+
+        self.assertEqual(results['processed'], 6)
+        self.assertEqual(
+            list(TrafegoInternetIndicador.objects.filter(operadora='orange', ano=2024)
+                 .order_by('mes').values_list('mes', 'fibra_otica')),
+            [(mes, Decimal(3 if mes <= 3 else 5)) for mes in range(1, 7)],
+        )
+
+    @override_settings(IMPORT_BATCH_MAX_WORKBOOK_SIZE=1024)
+    def test_zip_entry_over_size_limit_is_rejected(self):
+        with self.assertRaisesMessage(ValueError, 'excedem o limite de 1024 bytes'):
+            batch_import(self.build_zip({'KPI_Orange_2022.xlsx': 3}), workers=1)
+        self.assertFalse(TrafegoInternetIndicador.objects.exists())
+
+
+class IncrementalImportTests(TestCase):
+    """Reimportar só grava os meses cujos valores mudaram; o dry-run devolve o mesmo resumo."""
+
+    def registos(self, valores):
+        return [
+            {'operadora': 'orange', 'ano': 2024, 'mes': mes, 'emprego_direto_total': valor, 'nacionais_homem': 3}
+            for mes, valor in enumerate(valores, start=1)
+        ]
+
+    def test_reimport_writes_only_changed_months(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            resumo = incremental_upsert(EmpregoIndicador, self.registos([10] * 12))
+        self.assertEqual((resumo['novos'], resumo['atualizados'], resumo['inalterados']), (12, 0, 0))
+
+        # Reenvio idêntico: hashes e data_atualizacao coincidem, sem ler valores nem escrever
+        with self.captureOnCommitCallbacks(execute=False) as callbacks, self.assertNumQueries(2):
+            resumo = incremental_upsert(EmpregoIndicador, self.registos([10] * 12))
+        self.assertEqual((resumo['novos'], resumo['atualizados'], resumo['inalterados']), (0, 0, 12))
+        self.assertEqual(callbacks, [])
+
+        alterados = [10] * 12
+        alterados[4] = 11
+        resumo = incremental_upsert(EmpregoIndicador, self.registos(alterados), dry_run=True)
+        self.assertEqual((resumo['atualizados'], resumo['inalterados']), (1, 11))
+        self.assertEqual(resumo['alteracoes'], {('orange', 2024, 5): ['emprego_direto_total']})
+        self.assertEqual(EmpregoIndicador.objects.get(mes=5).emprego_direto_total, 10)
+
+        with self.captureOnCommitCallbacks(execute=False):
+            incremental_upsert(EmpregoIndicador, self.registos(alterados))
+        self.assertEqual(EmpregoIndicador.objects.get(mes=5).emprego_direto_total, 11)
+
+    def test_manual_edit_invalidates_hash(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            incremental_upsert(EmpregoIndicador, self.registos([10] * 12))
+        EmpregoIndicador.objects.filter(mes=2).update(emprego_direto_total=99, data_atualizacao=timezone.now())
+
+        resumo = incremental_upsert(EmpregoIndicador, self.registos([10] * 12), dry_run=True)
+        self.assertEqual((resumo['atualizados'], resumo['inalterados']), (1, 11))
+
+
+class StubPostgREST:
+    """
+    Servidor HTTP local que regista os pedidos e responde como o PostgREST.
+
+    ``responder(method, query, body, headers)`` devolve o estado HTTP ou (estado, JSON).
+    """
+
+    def __init__(self, responder=None):
+        import json
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        from urllib.parse import parse_qs, urlsplit
+
+        self.requests = []
+        self.responder = responder or (lambda method, query, body, headers: 201)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def handle_method(self):
+                url = urlsplit(self.path)
+                tamanho = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(tamanho)) if tamanho else None
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                stub.requests.append((self.command, url.path, query, body))
+                resposta = stub.responder(self.command, query, body, self.headers)
+                estado, conteudo = resposta if isinstance(resposta, tuple) else (resposta, None)
+                dados = json.dumps(conteudo).encode() if conteudo is not None else b''
+                self.send_response(estado)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            do_GET = do_POST = do_DELETE = handle_method
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class SupabaseOutboxTests(TestCase):
+    """As gravações só escrevem na outbox; o flusher envia-as em lote ao PostgREST."""
+
+    def setUp(self):
+        self.stub = StubPostgREST(lambda *args: self.responder(*args))
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.responder = lambda method, query, body, headers: 201
+        override = override_settings(
+            SUPABASE_URL=self.stub.url, SUPABASE_KEY='chave', SUPABASE_OUTBOX_MAX_TENTATIVAS=2,
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_save_writes_outbox_entry_without_http(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            registo = build_indicador(EmpregoIndicador, 'orange', 2024, 1, random.Random(1))
+            registo.save()
+            registo.emprego_direto_total = 6
+            registo.save()
+        self.assertEqual(SupabaseOutbox.objects.filter(registo_id=str(registo.pk)).count(), 2)
+        self.assertEqual(self.stub.requests, [])
+
+        # As duas gravações resultam num único envio, com o estado atual do registo
+        self.assertEqual(flush_outbox(), {'enviados': 2, 'reagendados': 0, 'falhados': 0})
+        [(method, path, query, body)] = self.stub.requests
+        self.assertEqual((method, path, query), ('POST', '/rest/v1/emprego_indicador', {'on_conflict': 'id'}))
+        self.assertEqual([(r['id'], r['emprego_direto_total']) for r in body], [(str(registo.pk), 6)])
+        self.assertFalse(SupabaseOutbox.objects.exists())
+
+    def test_bulk_upsert_and_delete_are_sent_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            bulk_upsert(
+                EmpregoIndicador,
+                [{'operadora': 'orange', 'ano': 2024, 'mes': mes, 'emprego_direto_total': mes} for mes in range(1, 13)],
+            )
+            removido = EmpregoIndicador.objects.get(mes=12).pk
+            EmpregoIndicador.objects.filter(pk=removido).delete()
+        self.assertEqual(SupabaseOutbox.objects.count(), 13)
+
+        flush_outbox()
+        pedidos = {method: (query, body) for method, _, query, body in self.stub.requests}
+        self.assertEqual(len(self.stub.requests), 2)
+        self.assertEqual(len(pedidos['POST'][1]), 11)
+        self.assertEqual(pedidos['DELETE'][0], {'id': f'in.({removido})'})
+        self.assertFalse(SupabaseOutbox.objects.exists())
+
+    def test_transient_errors_retry_with_backoff_then_dead_letter(self):
+        self.responder = lambda method, query, body, headers: 503
+        with self.captureOnCommitCallbacks(execute=False):
+            build_indicador(EmpregoIndicador, 'orange', 2024, 1, random.Random(1)).save()
+
+        self.assertEqual(flush_outbox()['reagendados'], 1)
+        entrada = SupabaseOutbox.objects.get()
+        self.assertEqual((entrada.estado, entrada.tentativas), (SupabaseOutbox.ESTADO_PENDENTE, 1))
+        self.assertGreater(entrada.proxima_tentativa, timezone.now())
+        self.assertIn('HTTP 503', entrada.ultimo_erro)
+
+        # Ainda não chegou a hora da nova tentativa
+        self.assertEqual(flush_outbox(), {'enviados': 0, 'reagendados': 0, 'falhados': 0})
+        SupabaseOutbox.objects.update(proxima_tentativa=timezone.now())
+        self.assertEqual(flush_outbox()['falhados'], 1)
+        self.assertEqual(SupabaseOutbox.objects.get().estado, SupabaseOutbox.ESTADO_FALHADO)
+        self.assertEqual(len(self.stub.requests), 2)
+
+    def test_client_error_isolates_invalid_row(self):
+        with self.captureOnCommitCallbacks(execute=False):
+            bulk_upsert(
+                EmpregoIndicador,
+                [{'operadora': 'orange', 'ano': 2024, 'mes': mes, 'emprego_direto_total': mes} for mes in range(1, 4)],
+            )
+        invalido = str(EmpregoIndicador.objects.get(mes=2).pk)
+        self.responder = lambda method, query, body, headers: 400 if any(r['id'] == invalido for r in body) else 201
+
+        self.assertEqual(flush_outbox(), {'enviados': 2, 'reagendados': 0, 'falhados': 1})
+        # Um pedido em lote e, após o erro 400, um por registo
+        self.assertEqual(len(self.stub.requests), 4)
+        entrada = SupabaseOutbox.objects.get()
+        self.assertEqual((entrada.registo_id, entrada.estado), (invalido, SupabaseOutbox.ESTADO_FALHADO))
+
+
+class FakePostgRESTTable:
+    """Tabela remota em memória com o subconjunto de filtros PostgREST usado pela sincronização."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def __call__(self, method, query, body, headers):
+        if method == 'POST':
+            for row in body:
+                self.rows[str(row['id'])] = row
+            return 201
+        filtro = query.get('id', '')
+        if filtro.startswith('in.('):
+            ids = set(filtro[4:-1].split(','))
+            selecionados = [row for row in self.rows.values() if str(row['id']) in ids]
+        elif filtro.startswith('gt.'):
+            selecionados = [row for row in self.rows.values() if int(row['id']) > int(filtro[3:])]
+        else:
+            selecionados = list(self.rows.values())
+        if method == 'DELETE':
+            for row in selecionados:
+                del self.rows[str(row['id'])]
+            return 204
+        if query.get('order') == 'data_atualizacao.desc':
+            selecionados = sorted(
+                (r for r in selecionados if r.get('data_atualizacao')), key=lambda r: r['data_atualizacao'], reverse=True,
+            )
+        else:
+            selecionados.sort(key=lambda r: int(r['id']))
+        inicio, fim = (int(n) for n in headers['Range'].split('-'))
+        colunas = query['select'].split(',')
+        return 200, [{c: row.get(c) for c in colunas} for row in selecionados[inicio:fim + 1]]
+
+
+class SupabaseSyncTests(TestCase):
+    """A sincronização incremental só compara os registos atualizados desde a marca de água remota."""
+
+    def setUp(self):
+        self.tabela = FakePostgRESTTable()
+        self.stub = StubPostgREST(self.tabela)
+        self.stub.__enter__()
+        self.addCleanup(self.stub.__exit__)
+        override = override_settings(SUPABASE_URL=self.stub.url, SUPABASE_KEY='chave')
+        override.enable()
+        self.addCleanup(override.disable)
+        with self.captureOnCommitCallbacks(execute=False):
+            bulk_upsert(
+                EmpregoIndicador,
+                [{'operadora': 'orange', 'ano': 2024, 'mes': mes, 'emprego_direto_total': mes} for mes in range(1, 13)],
+            )
+        EmpregoIndicador.objects.filter(mes__lt=12).update(data_atualizacao=timezone.now() - timedelta(days=1))
+
+    def sync(self, full=False):
+        self.stub.requests.clear()
+        client = SupabaseClient(page_size=5, batch_size=5)
+        [resumo] = sync_all_data(full=full, workers=1, tables=['EmpregoIndicador'], client=client)
+        self.assertIsNone(resumo['erro'])
+        return resumo
+
+    def test_incremental_sync_sends_only_changed_rows(self):
+        resumo = self.sync()
+        self.assertEqual((resumo['comparados'], resumo['enviados']), (12, 12))
+        self.assertEqual(sum(1 for r in self.stub.requests if r[0] == 'POST'), 3)
+        self.assertEqual(len(self.tabela.rows), 12)
+
+        # Sem alterações: marca de água + versões dos registos recentes, sem upserts
+        resumo = self.sync()
+        self.assertEqual((resumo['comparados'], resumo['enviados']), (1, 0))
+        self.assertEqual([r[0] for r in self.stub.requests], ['GET', 'GET'])
+
+        registo = EmpregoIndicador.objects.get(mes=3)
+        EmpregoIndicador.objects.filter(pk=registo.pk).update(emprego_direto_total=99, data_atualizacao=timezone.now())
+        resumo = self.sync()
+        self.assertEqual((resumo['comparados'], resumo['enviados']), (2, 1))
+        self.assertEqual(self.tabela.rows[str(registo.pk)]['emprego_direto_total'], 99)
+
+    def test_full_sync_removes_remote_only_rows(self):
+        self.sync()
+        self.tabela.rows['9999'] = {'id': '9999', 'data_atualizacao': None}
+        resumo = self.sync(full=True)
+        self.assertEqual((resumo['comparados'], resumo['enviados'], resumo['removidos']), (12, 0, 1))
+        self.assertNotIn('9999', self.tabela.rows)
+
+    def test_nightly_sync_keeps_its_remote_table_names(self):
+        client = SupabaseClient(page_size=5, batch_size=5)
+        [resumo] = sync_all_data(workers=1, tables={'EmpregoIndicador': SYNC_ALL_TABLES['EmpregoIndicador']}, client=client)
+        self.assertEqual(resumo['tabela'], 'emprego')
+        self.assertTrue(all(path.endswith('/rest/v1/emprego') for _, path, _, _ in self.stub.requests))
+
+
+class RawExportTests(TestCase):
+    """Exportação dos registos em bruto, lida por blocos e enviada à medida que é gerada."""
+
+    def setUp(self):
+        bulk_upsert(AssinantesIndicador, [
+            {'operadora': operadora, 'ano': ano, 'mes': mes, 'assinantes_pre_pago': ano + mes}
+            for operadora in ('orange', 'telecel') for ano in (2023, 2024) for mes in range(1, 13)
+        ])
+
+    def test_csv_and_ndjson_apply_filters(self):
+        filtros = parse_filters({'ano': ['2024'], 'mes': ['1,2'], 'operadora': ['Orange']})
+        self.assertEqual(filtros, {'ano': [2024], 'mes': [1, 2], 'operadora': ['orange']})
+
+        linhas = list(csv.DictReader(io.StringIO(b''.join(iter_csv(AssinantesIndicador, chunk_size=1, **filtros)).decode())))
+        self.assertEqual([(r['operadora'], r['mes'], r['assinantes_pre_pago']) for r in linhas],
+                         [('orange', '1', '2025'), ('orange', '2', '2026')])
+
+        registos = [json.loads(l) for l in b''.join(iter_ndjson(AssinantesIndicador, **filtros)).decode().splitlines()]
+        self.assertEqual([r['assinantes_pre_pago'] for r in registos], [2025, 2026])
+        self.assertEqual(list(registos[0]), [f.attname for f in AssinantesIndicador._meta.concrete_fields])
+
+        with self.assertRaises(ExportError):
+            parse_filters({'mes': ['13']})
+
+    def test_operadora_filter_ignores_case(self):
+        build_indicador(TarifarioVozMTNIndicador, 'TELECEL', 2024, 1, random.Random(1)).save()
+        linhas = b''.join(iter_csv(TarifarioVozMTNIndicador, **parse_filters({'operadora': ['telecel']})))
+        self.assertEqual(len(linhas.decode().splitlines()), 2)
+
+    def test_view_streams_rows(self):
+        self.client.force_login(User.objects.create_user('analista', is_staff=True))
+        url = reverse('questionarios:raw_export', args=['AssinantesIndicador'])
+        response = self.client.get(url, {'formato': 'ndjson', 'ano': '2023'}, secure=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 24)
+
+        self.assertEqual(self.client.get(url, {'formato': 'xml'}, secure=True).status_code, 400)
+        self.client.force_login(User.objects.create_user('visitante'))
+        self.assertEqual(self.client.get(url, secure=True).status_code, 403)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            destino = os.path.join(pasta, 'assinantes.csv')
+            call_command('export_indicators', 'assinantesindicador', '--operadora', 'telecel',
+                         '--output', destino, stdout=io.StringIO())
+            with open(destino, newline='') as ficheiro:
+                self.assertEqual(len(list(csv.DictReader(ficheiro))), 24)
+
+    @skipUnless(HAS_PYARROW, 'pyarrow não instalado')
+    def test_parquet_row_groups(self):
+        import pyarrow.parquet as pq
+        with tempfile.TemporaryDirectory() as pasta:
+            destino = os.path.join(pasta, 'assinantes.parquet')
+            total = write_parquet(AssinantesIndicador, destino, row_group_size=10, ano=[2024])
+            ficheiro = pq.ParquetFile(destino)
+            self.assertEqual((total, ficheiro.metadata.num_rows, ficheiro.metadata.num_row_groups), (24, 24, 3))
@@ -15,6 +15,7 @@ from .views import (
     analise_mercado,
     assinantes,
     upload,
+    exportacao,
     data_management_view
 )
 
@@ -150,4 +151,8 @@ urlpatterns = [
 
     # Excel Upload
     path('upload/excel/', upload.upload_excel_view, name='upload_excel'),
+    path('upload/excel/status/<int:pk>/', upload.import_status_view, name='import_status'),
+
+    # Exportação dos registos mensais em bruto (CSV, NDJSON, Parquet)
+    path('exportar/<str:indicador>/', exportacao.raw_export_view, name='raw_export'),
 ]
\ No newline at end of file
@@ -3,9 +3,8 @@ Utilities for the questionarios app, including Supabase integration.
 """
 import os
 from django.conf import settings
-from supabase import create_client, Client
 
-def get_supabase_client() -> Client:
+def get_supabase_client():
     """
     Retorna um cliente para interagir com o Supabase.
     
@@ -13,6 +12,9 @@ def get_supabase_client() -> Client:
         Client: O cliente Supabase configurado com as credenciais do .env
     """
     try:
+        # Import tardio: o SDK só é necessário aqui, não em questionarios.utils.supabase_sync
+        from supabase import create_client
+        
         url = settings.SUPABASE_URL
         key = settings.SUPABASE_KEY
         
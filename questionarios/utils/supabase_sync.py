@@ -1,143 +1,227 @@
-import os
-import json
-import requests
-from django.conf import settings
+"""
+Sincronização completa das tabelas de indicadores com o Supabase.
+
+Complementa a outbox (questionarios.services.supabase_outbox), que envia cada
+alteração: este módulo repõe o estado das tabelas remotas, por exemplo numa
+sincronização noturna ou após uma falha prolongada.
+
+- Modo incremental (padrão): a marca de água é o maior ``data_atualizacao``
+  remoto (menos uma margem, SUPABASE_SYNC_OVERLAP_SECONDS); só os registos
+  locais atualizados desde então são comparados e enviados.
+- Modo completo (``full=True``): compara todos os registos e remove do
+  Supabase os que já não existem no Django.
+
+Os registos locais são percorridos por páginas ordenadas por id (keyset), e
+para cada página é lido o ``data_atualizacao`` remoto dos mesmos ids num
+único pedido (limitado pelo cabeçalho Range); apenas os registos novos ou
+diferentes são enviados, em upserts de SUPABASE_SYNC_BATCH_SIZE registos.
+"""
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ..services.supabase_outbox import (
+    SUPABASE_MODELS, SupabaseRequestError, delete_rows, fetch_rows, get_session, supabase_table, upsert_rows,
+)
 
 logger = logging.getLogger(__name__)
 
+# Tabelas remotas da sincronização noturna (sync_all_tables). Têm nomes
+# próprios, diferentes dos de supabase_table() usados pela outbox.
+SYNC_ALL_TABLES = {
+    'EstacoesMoveisIndicador': 'estacoes_moveis',
+    'TrafegoOriginadoIndicador': 'trafego_originado',
+    'TrafegoTerminadoIndicador': 'trafego_terminado',
+    'ReceitasIndicador': 'receitas',
+    'EmpregoIndicador': 'emprego',
+    'InvestimentoIndicador': 'investimento',
+}
+
+
+def _as_datetime(value):
+    """``data_atualizacao`` remoto como datetime com fuso (UTC quando a coluna não tem fuso)."""
+    if not value:
+        return None
+    value = parse_datetime(value) if isinstance(value, str) else value
+    if value is not None and timezone.is_naive(value):
+        value = value.replace(tzinfo=dt_timezone.utc)
+    return value
+
+
 class SupabaseClient:
-    """Cliente para interagir com a API do Supabase."""
-    
-    def __init__(self):
+    """Cliente para sincronizar as tabelas do Django com a API REST do Supabase."""
+
+    def __init__(self, session=None, page_size=None, batch_size=None):
         self.supabase_url = settings.SUPABASE_URL
         self.supabase_key = settings.SUPABASE_KEY
-        self.headers = {
-            "apikey": self.supabase_key,
-            "Authorization": f"Bearer {self.supabase_key}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
-    
-    def sync_table(self, django_table, supabase_table):
+        self.session = session or get_session()
+        self.page_size = page_size or getattr(settings, 'SUPABASE_SYNC_PAGE_SIZE', 1000)
+        self.batch_size = batch_size or getattr(settings, 'SUPABASE_SYNC_BATCH_SIZE', 500)
+
+    def remote_watermark(self, supabase_table):
+        """Maior ``data_atualizacao`` da tabela remota (None se estiver vazia)."""
+        rows = fetch_rows(supabase_table, {
+            'select': 'data_atualizacao',
+            'data_atualizacao': 'not.is.null',
+            'order': 'data_atualizacao.desc',
+        }, 1, self.session)
+        return _as_datetime(rows[0]['data_atualizacao']) if rows else None
+
+    def _local_pages(self, model, since=None):
+        """Páginas de (id, data_atualizacao) locais, por ordem de id (keyset)."""
+        queryset = model.objects.order_by('pk')
+        if since is not None:
+            queryset = queryset.filter(data_atualizacao__gte=since)
+        ultimo = None
+        while True:
+            pagina = queryset if ultimo is None else queryset.filter(pk__gt=ultimo)
+            pagina = list(pagina.values_list('pk', 'data_atualizacao')[:self.page_size])
+            if pagina:
+                yield pagina
+            if len(pagina) < self.page_size:
+                return
+            ultimo = pagina[-1][0]
+
+    def _remote_pages(self, supabase_table):
+        """Páginas de ids remotos, por ordem de id (keyset: ``id=gt.<último>`` + Range)."""
+        ultimo = None
+        while True:
+            params = {'select': 'id', 'order': 'id.asc'}
+            if ultimo is not None:
+                params['id'] = f'gt.{ultimo}'
+            pagina = [row['id'] for row in fetch_rows(supabase_table, params, self.page_size, self.session)]
+            if pagina:
+                yield pagina
+            if len(pagina) < self.page_size:
+                return
+            ultimo = pagina[-1]
+
+    def _remote_versions(self, supabase_table, ids):
+        """{id: data_atualizacao} remoto dos ``ids`` indicados (um pedido)."""
+        lista = ','.join(str(i) for i in ids)
+        rows = fetch_rows(supabase_table, {
+            'select': 'id,data_atualizacao',
+            'id': f'in.({lista})',
+        }, len(ids), self.session)
+        return {str(row['id']): _as_datetime(row.get('data_atualizacao')) for row in rows}
+
+    def _prepare_record_data(self, django_record):
+        """
+        Prepara os dados de um registro Django para o formato do Supabase.
+        """
+        return django_record._prepare_data_for_supabase()
+
+    def upsert_records(self, model, supabase_table, pks):
+        """Envia os registos ``pks`` em upserts de ``batch_size``. Retorna o nº enviado."""
+        enviados = 0
+        for inicio in range(0, len(pks), self.batch_size):
+            lote = model.objects.filter(pk__in=pks[inicio:inicio + self.batch_size]).order_by('pk')
+            rows = [self._prepare_record_data(obj) for obj in lote]
+            if rows:
+                upsert_rows(supabase_table, rows, self.session)
+                enviados += len(rows)
+        return enviados
+
+    def sync_table(self, django_table, supabase_table, full=False):
         """
         Sincroniza uma tabela do Django com o Supabase.
-        
+
         Args:
             django_table: Nome do modelo Django
             supabase_table: Nome da tabela no Supabase
+            full: Compara todos os registos e remove os que não existem no Django
+
+        Returns:
+            dict: {'tabela', 'modo', 'desde', 'comparados', 'enviados', 'removidos', 'segundos', 'erro'}
         """
+        inicio = time.monotonic()
+        resumo = {
+            'tabela': supabase_table, 'modo': 'completo' if full else 'incremental', 'desde': None,
+            'comparados': 0, 'enviados': 0, 'removidos': 0, 'segundos': 0, 'erro': None,
+        }
         try:
-            logger.info(f"Iniciando sincronização entre Django ({django_table}) e Supabase ({supabase_table})")
-            
-            # Importar o modelo dinamicamente
-            from django.apps import apps
             model = apps.get_model('questionarios', django_table)
-            
-            # Obter todos os registros do Django
-            django_records = model.objects.all()
-            
-            # Obter todos os registros do Supabase
-            supabase_records = self.get_all_records(supabase_table)
-            
-            # Mapear registros do Supabase por ID para fácil acesso
-            supabase_map = {str(record.get('id', '')): record for record in supabase_records}
-            
-            # Sincronizar cada registro do Django com o Supabase
-            for django_record in django_records:
-                record_data = self._prepare_record_data(django_record)
-                
-                if str(django_record.id) in supabase_map:
-                    # Atualizar registro existente
-                    self.update_record(supabase_table, django_record.id, record_data)
-                    logger.debug(f"Atualizado registro ID {django_record.id} em {supabase_table}")
-                else:
-                    # Criar novo registro
-                    self.insert_record(supabase_table, record_data)
-                    logger.debug(f"Criado novo registro em {supabase_table}")
-            
-            logger.info(f"Sincronização concluída para {django_table} -> {supabase_table}")
-            
-            return True
-        except Exception as e:
-            logger.error(f"Erro na sincronização: {e}")
-            return False
-    
-    def _prepare_record_data(self, django_record):
-        """
-        Prepara os dados de um registro Django para o formato do Supabase.
-        """
-        data = {}
-        
-        # Obter todos os campos do modelo
-        fields = django_record._meta.fields
-        
-        for field in fields:
-            field_name = field.name
-            field_value = getattr(django_record, field_name)
-            
-            # Tratar campos especiais
-            if field_name == 'id':
-                data[field_name] = str(field_value)
-            elif field_name in ['criado_por', 'atualizado_por'] and field_value is not None:
-                data[field_name] = str(field_value.id)
-            elif field_name in ['data_criacao', 'data_atualizacao'] and field_value is not None:
-                data[field_name] = field_value.isoformat()
-            elif field_value is not None:
-                data[field_name] = field_value
-        
-        return data
-    
-    def get_all_records(self, table):
-        """Obtém todos os registros de uma tabela do Supabase."""
-        try:
-            url = f"{self.supabase_url}/rest/v1/{table}"
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logger.error(f"Erro ao obter registros da tabela {table}: {e}")
-            return []
-    
-    def insert_record(self, table, data):
-        """Insere um novo registro no Supabase."""
-        try:
-            url = f"{self.supabase_url}/rest/v1/{table}"
-            response = requests.post(url, headers=self.headers, json=data)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logger.error(f"Erro ao inserir registro na tabela {table}: {e}")
-            return None
-    
-    def update_record(self, table, record_id, data):
-        """Atualiza um registro existente no Supabase."""
-        try:
-            url = f"{self.supabase_url}/rest/v1/{table}?id=eq.{record_id}"
-            response = requests.patch(url, headers=self.headers, json=data)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            logger.error(f"Erro ao atualizar registro ID {record_id} na tabela {table}: {e}")
-            return None
+
+            since = None
+            if not full:
+                watermark = self.remote_watermark(supabase_table)
+                if watermark is not None:
+                    overlap = getattr(settings, 'SUPABASE_SYNC_OVERLAP_SECONDS', 300)
+                    since = watermark - timedelta(seconds=overlap)
+            resumo['desde'] = since.isoformat() if since else None
+
+            for pagina in self._local_pages(model, since):
+                remotos = self._remote_versions(supabase_table, [pk for pk, _ in pagina])
+                alterados = [pk for pk, atualizado in pagina if str(pk) not in remotos or remotos[str(pk)] != atualizado]
+                resumo['comparados'] += len(pagina)
+                resumo['enviados'] += self.upsert_records(model, supabase_table, alterados)
+
+            if full:
+                for pagina in self._remote_pages(supabase_table):
+                    existentes = {str(pk) for pk in model.objects.filter(pk__in=pagina).values_list('pk', flat=True)}
+                    removidos = [i for i in pagina if str(i) not in existentes]
+                    if removidos:
+                        delete_rows(supabase_table, removidos, self.session)
+                        resumo['removidos'] += len(removidos)
+        except (SupabaseRequestError, LookupError) as e:
+            logger.error(f"Erro na sincronização de {django_table} -> {supabase_table}: {e}")
+            resumo['erro'] = str(e)
+
+        resumo['segundos'] = round(time.monotonic() - inicio, 3)
+        logger.info(
+            f"Sincronização {resumo['modo']} {django_table} -> {supabase_table}: {resumo['comparados']} comparados, "
+            f"{resumo['enviados']} enviados, {resumo['removidos']} removidos em {resumo['segundos']}s"
+        )
+        return resumo
+
+
+def _sync_in_thread(client, django_table, supabase_table, full):
+    try:
+        return client.sync_table(django_table, supabase_table, full)
+    finally:
+        # Cada thread abre a sua ligação à base de dados
+        connection.close()
+
+
+def sync_all_data(full=False, workers=None, tables=None, client=None):
+    """
+    Sincroniza todas as tabelas de indicadores com o Supabase, em paralelo.
+
+    Args:
+        full: Sincronização completa (inclui remoções) em vez de incremental.
+        workers: Tabelas sincronizadas em simultâneo (padrão: SUPABASE_SYNC_WORKERS).
+        tables: Nomes dos modelos a sincronizar (padrão: SUPABASE_MODELS), ou
+            dicionário modelo -> tabela remota para usar outros nomes.
+        client: SupabaseClient a usar (partilhado pelas threads).
+
+    Returns:
+        list: Resumo de cada tabela (ver SupabaseClient.sync_table), por ordem do nome.
+    """
+    client = client or SupabaseClient()
+    workers = workers or getattr(settings, 'SUPABASE_SYNC_WORKERS', 4)
+    if isinstance(tables, dict):
+        tabelas = dict(tables)
+    else:
+        tabelas = {nome: supabase_table(apps.get_model('questionarios', nome)) for nome in (tables or SUPABASE_MODELS)}
+
+    if workers <= 1 or len(tabelas) <= 1:
+        resultados = [client.sync_table(nome, tabela, full) for nome, tabela in tabelas.items()]
+    else:
+        with ThreadPoolExecutor(max_workers=min(workers, len(tabelas))) as executor:
+            futures = [
+                executor.submit(_sync_in_thread, client, nome, tabela, full) for nome, tabela in tabelas.items()
+            ]
+            resultados = [future.result() for future in as_completed(futures)]
+    return sorted(resultados, key=lambda r: r['tabela'])
+
 
 def sync_all_tables():
     """Sincroniza todas as tabelas relevantes com o Supabase."""
-    client = SupabaseClient()
-    
-    # Mapeamento entre modelos Django e tabelas Supabase
-    table_mapping = {
-        'EstacoesMoveisIndicador': 'estacoes_moveis',
-        'TrafegoOriginadoIndicador': 'trafego_originado',
-        'TrafegoTerminadoIndicador': 'trafego_terminado',
-        'ReceitasIndicador': 'receitas',
-        'EmpregoIndicador': 'emprego',
-        'InvestimentoIndicador': 'investimento'
-    }
-    
-    success = True
-    for django_table, supabase_table in table_mapping.items():
-        if not client.sync_table(django_table, supabase_table):
-            success = False
-    
-    return success 
\ No newline at end of file
+    return all(resultado['erro'] is None for resultado in sync_all_data(tables=SYNC_ALL_TABLES))
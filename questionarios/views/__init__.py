@@ -14,6 +14,7 @@ from . import (
     analise_mercado,
     assinantes,
     upload,
+    exportacao,
     public,
     base_views
 )
@@ -34,6 +35,7 @@ __all__ = [
     'analise_mercado',
     'assinantes',
     'upload',
+    'exportacao',
     'public',
     'base_views'
 ]
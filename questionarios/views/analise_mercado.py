@@ -20,11 +20,11 @@ import json
 import decimal
 from datetime import datetime
 from django.db.models.functions import TruncMonth, TruncQuarter, ExtractYear, ExtractMonth
-from django.db.models import FloatField, Case, When, Value, DecimalField
-from decimal import Decimal
+from django.db.models import FloatField, Case, When
 from django.db.models.functions import Cast
-from django.core.exceptions import FieldDoesNotExist
-from django.db import models
+from ..services import cobertura
+from ..services.aggregation import aggregate_market_data, calculation_totals_by_operator
+from ..services.result_cache import CachedContextMixin
 
 logger = logging.getLogger(__name__)
 
@@ -152,12 +152,12 @@ class AdminDashboardView(LoginRequiredMixin, PermissionRequiredMixin, TemplateVi
             }
         ]
         
-        # Adicionar contagem de registros para cada indicador
+        # Contagem de registros e última atualização de todos os indicadores numa consulta
+        resumo = cobertura.indicator_summary([indicador['modelo'] for indicador in indicadores])
         for indicador in indicadores:
-            indicador['count'] = indicador['modelo'].objects.count()
-            # Pegar a última atualização
-            ultimo_registro = indicador['modelo'].objects.order_by('-data_atualizacao').first()
-            indicador['ultima_atualizacao'] = ultimo_registro.data_atualizacao if ultimo_registro else None
+            dados = resumo[indicador['modelo']._meta.model_name]
+            indicador['count'] = dados['count']
+            indicador['ultima_atualizacao'] = dados['ultima_atualizacao']
         
         context['indicadores'] = indicadores
         return context
@@ -239,15 +239,24 @@ class AnalisesMercadoDashboardView(LoginRequiredMixin, TemplateView):
     
     def get_anos_disponiveis(self):
         """Retorna anos disponíveis nos dados"""
-        # Usar o primeiro modelo como referência para anos disponíveis
-        anos = EstacoesMoveisIndicador.objects.values_list('ano', flat=True).distinct().order_by('ano')
-        return list(anos)
+        return cobertura.available_years([EstacoesMoveisIndicador])
 
 # Analytical Views
 
-class RelatorioAnualView(LoginRequiredMixin, TemplateView):
+# Indicadores dos relatórios anual/trimestral: chave -> (modelo, total do registo CALCULATION_FIELDS)
+RELATORIO_INDICADORES = {
+    'assinantes': (AssinantesIndicador, 'calcular_total_assinantes'),
+    'estacoes_moveis': (EstacoesMoveisIndicador, 'calcular_total_estacoes_moveis'),
+    'receitas': (ReceitasIndicador, 'calcular_total_receitas'),
+    'investimentos': (InvestimentoIndicador, 'calcular_total_geral'),
+    'trafego_originado': (TrafegoOriginadoIndicador, 'calcular_total_voz_minutos'),
+    'trafego_internet': (TrafegoInternetIndicador, 'calcular_total_trafego'),
+}
+
+class RelatorioAnualView(LoginRequiredMixin, CachedContextMixin, TemplateView):
     """Relatório anual de mercado"""
     template_name = 'questionarios/relatorio_anual.html'
+    cache_models = [modelo for modelo, _ in RELATORIO_INDICADORES.values()]
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -266,64 +275,20 @@ class RelatorioAnualView(LoginRequiredMixin, TemplateView):
         return context
         
     def get_dados_anuais(self, ano):
-        """Obtém os dados anuais para o ano selecionado"""
-        dados = {}
-        
-        # Obter dados de assinantes
-        assinantes = AssinantesIndicador.objects.filter(ano=ano)
-        dados['assinantes'] = {
-            'total': sum(a.total_assinantes or 0 for a in assinantes),
-            'por_operadora': {a.operadora: a.total_assinantes for a in assinantes}
-        }
-        
-        # Obter dados de estações móveis
-        estacoes = EstacoesMoveisIndicador.objects.filter(ano=ano)
-        dados['estacoes_moveis'] = {
-            'total': sum(e.calcular_total_estacoes_moveis() or 0 for e in estacoes),
-            'por_operadora': {e.operadora: e.calcular_total_estacoes_moveis() for e in estacoes}
+        """Obtém os dados anuais para o ano selecionado (somas calculadas na BD)"""
+        return {
+            chave: calculation_totals_by_operator(modelo, metodo, ano)
+            for chave, (modelo, metodo) in RELATORIO_INDICADORES.items()
         }
-        
-        # Obter dados de receitas
-        receitas = ReceitasIndicador.objects.filter(ano=ano)
-        dados['receitas'] = {
-            'total': sum(r.calcular_total_receitas() or 0 for r in receitas),
-            'por_operadora': {}
-        }
-        for operadora in ['orange', 'telecel', 'telecel']:
-            receitas_op = receitas.filter(operadora=operadora)
-            dados['receitas']['por_operadora'][operadora] = sum(r.calcular_total_receitas() or 0 for r in receitas_op)
-        
-        # Obter dados de investimento
-        investimentos = InvestimentoIndicador.objects.filter(ano=ano)
-        dados['investimentos'] = {
-            'total': sum(i.calcular_total_investimentos() or 0 for i in investimentos),
-            'por_operadora': {i.operadora: i.calcular_total_investimentos() for i in investimentos}
-        }
-        
-        # Obter dados de tráfego
-        trafego_originado = TrafegoOriginadoIndicador.objects.filter(ano=ano)
-        dados['trafego_originado'] = {
-            'total': sum(t.calcular_total_trafego() or 0 for t in trafego_originado),
-            'por_operadora': {t.operadora: t.calcular_total_trafego() for t in trafego_originado}
-        }
-        
-        # Obter dados de internet
-        internet = TrafegoInternetIndicador.objects.filter(ano=ano)
-        dados['trafego_internet'] = {
-            'total': sum(i.calcular_total_trafego() or 0 for i in internet),
-            'por_operadora': {i.operadora: i.calcular_total_trafego() for i in internet}
-        }
-        
-        return dados
     
     def get_anos_disponiveis(self):
         """Retorna anos disponíveis nos dados"""
-        anos = AssinantesIndicador.objects.values_list('ano', flat=True).distinct().order_by('ano')
-        return list(anos)
+        return cobertura.available_years([AssinantesIndicador])
 
-class RelatorioTrimestralView(LoginRequiredMixin, TemplateView):
+class RelatorioTrimestralView(LoginRequiredMixin, CachedContextMixin, TemplateView):
     """Relatório trimestral de mercado"""
     template_name = 'questionarios/relatorio_trimestral.html'
+    cache_models = [modelo for modelo, _ in RELATORIO_INDICADORES.values()]
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -357,78 +322,15 @@ class RelatorioTrimestralView(LoginRequiredMixin, TemplateView):
         return list(range((trimestre - 1) * 3 + 1, trimestre * 3 + 1))
     
     def get_dados_trimestrais(self, ano, meses):
-        """Obtém os dados trimestrais para o ano e meses selecionados"""
-        dados = {}
-        
-        # Obter dados de assinantes
-        assinantes = AssinantesIndicador.objects.filter(ano=ano, mes__in=meses)
-        dados['assinantes'] = {
-            'total': sum(a.total_assinantes or 0 for a in assinantes),
-            'por_operadora': {}
-        }
-        
-        # Agrupar por operadora
-        for operadora in ['orange', 'telecel', 'telecel']:
-            assinantes_op = assinantes.filter(operadora=operadora)
-            dados['assinantes']['por_operadora'][operadora] = sum(a.total_assinantes or 0 for a in assinantes_op)
-        
-        # Fazer o mesmo para os outros indicadores
-        # Estações móveis
-        estacoes = EstacoesMoveisIndicador.objects.filter(ano=ano, mes__in=meses)
-        dados['estacoes_moveis'] = {
-            'total': sum(e.calcular_total_estacoes_moveis() or 0 for e in estacoes),
-            'por_operadora': {}
-        }
-        for operadora in ['orange', 'telecel', 'telecel']:
-            estacoes_op = estacoes.filter(operadora=operadora)
-            dados['estacoes_moveis']['por_operadora'][operadora] = sum(e.calcular_total_estacoes_moveis() or 0 for e in estacoes_op)
-        
-        # Receitas
-        receitas = ReceitasIndicador.objects.filter(ano=ano, mes__in=meses)
-        dados['receitas'] = {
-            'total': sum(r.calcular_total_receitas() or 0 for r in receitas),
-            'por_operadora': {}
-        }
-        for operadora in ['orange', 'telecel', 'telecel']:
-            receitas_op = receitas.filter(operadora=operadora)
-            dados['receitas']['por_operadora'][operadora] = sum(r.calcular_total_receitas() or 0 for r in receitas_op)
-        
-        # Investimentos
-        investimentos = InvestimentoIndicador.objects.filter(ano=ano, mes__in=meses)
-        dados['investimentos'] = {
-            'total': sum(i.calcular_total_investimentos() or 0 for i in investimentos),
-            'por_operadora': {}
-        }
-        for operadora in ['orange', 'telecel', 'telecel']:
-            investimentos_op = investimentos.filter(operadora=operadora)
-            dados['investimentos']['por_operadora'][operadora] = sum(i.calcular_total_investimentos() or 0 for i in investimentos_op)
-        
-        # Tráfego originado
-        trafego_originado = TrafegoOriginadoIndicador.objects.filter(ano=ano, mes__in=meses)
-        dados['trafego_originado'] = {
-            'total': sum(t.calcular_total_trafego() or 0 for t in trafego_originado),
-            'por_operadora': {}
+        """Obtém os dados trimestrais para o ano e meses selecionados (somas calculadas na BD)"""
+        return {
+            chave: calculation_totals_by_operator(modelo, metodo, ano, meses=meses)
+            for chave, (modelo, metodo) in RELATORIO_INDICADORES.items()
         }
-        for operadora in ['orange', 'telecel', 'telecel']:
-            trafego_op = trafego_originado.filter(operadora=operadora)
-            dados['trafego_originado']['por_operadora'][operadora] = sum(t.calcular_total_trafego() or 0 for t in trafego_op)
-        
-        # Internet
-        internet = TrafegoInternetIndicador.objects.filter(ano=ano, mes__in=meses)
-        dados['trafego_internet'] = {
-            'total': sum(i.calcular_total_trafego() or 0 for i in internet),
-            'por_operadora': {}
-        }
-        for operadora in ['orange', 'telecel', 'telecel']:
-            internet_op = internet.filter(operadora=operadora)
-            dados['trafego_internet']['por_operadora'][operadora] = sum(i.calcular_total_trafego() or 0 for i in internet_op)
-        
-        return dados
     
     def get_anos_disponiveis(self):
         """Retorna anos disponíveis nos dados"""
-        anos = AssinantesIndicador.objects.values_list('ano', flat=True).distinct().order_by('ano')
-        return list(anos)
+        return cobertura.available_years([AssinantesIndicador])
 
 class EvolucaoMercadoView(LoginRequiredMixin, TemplateView):
     """Evolução do mercado ao longo do tempo"""
@@ -482,8 +384,7 @@ class EvolucaoMercadoView(LoginRequiredMixin, TemplateView):
     
     def get_anos_disponiveis(self):
         """Retorna anos disponíveis nos dados"""
-        anos = AssinantesIndicador.objects.values_list('ano', flat=True).distinct().order_by('ano')
-        return list(anos)
+        return cobertura.available_years([AssinantesIndicador])
     
     def get_evolucao_indicador(self, modelo, campo, anos):
         """Obtém a evolução de um indicador ao longo dos anos"""
@@ -617,8 +518,7 @@ class ComparacaoAnualView(LoginRequiredMixin, TemplateView):
     
     def get_anos_disponiveis(self):
         """Retorna anos disponíveis nos dados"""
-        anos = AssinantesIndicador.objects.values_list('ano', flat=True).distinct().order_by('ano')
-        return list(anos)
+        return cobertura.available_years([AssinantesIndicador])
 
 # Função auxiliar para calcular variação percentual
 def calcular_variacao_percentual(valor_anterior, valor_atual):
@@ -637,100 +537,24 @@ def get_available_years(model):
     """Get distinct years available for a given indicator model."""
     # Add try-except block for safety
     try:
-        years = model.objects.values_list('ano', flat=True).distinct()
-        return sorted(list(years)) if years else []
+        return cobertura.available_years([model])
     except Exception as e:
         logger.error(f"Error getting available years for {model.__name__}: {e}")
         return []
 
-def get_quarterly_data(model, year, operadora=None, aggregate_fields={}):
-    """Aggregates data quarterly for a given model, year, and fields."""
-    queryset = model.objects.filter(ano=year)
-    if operadora:
-        queryset = queryset.filter(operadora=operadora)
-    
-    quarterly_results = {}
-    for q in range(1, 5):
-        start_month = (q - 1) * 3 + 1
-        end_month = q * 3
-        quarter_queryset = queryset.filter(mes__gte=start_month, mes__lte=end_month)
-        
-        aggregates = {}
-        if aggregate_fields:
-            valid_aggregates = {}
-            for field, agg_func in aggregate_fields.items():
-                try:
-                    model._meta.get_field(field)
-                    valid_aggregates[f'total_{field}'] = agg_func(field)
-                except FieldDoesNotExist:
-                    logger.warning(f"Field '{field}' does not exist on model {model.__name__}. Skipping aggregation.")
-                    # Use a default value since we don't know the field type
-                    valid_aggregates[f'total_{field}'] = Value(Decimal('0.0'), output_field=DecimalField())
-            
-            if valid_aggregates:
-                try:
-                    quarter_aggregates = quarter_queryset.aggregate(**valid_aggregates)
-                    for key, value in quarter_aggregates.items():
-                         aggregates[key] = float(value) if isinstance(value, Decimal) else (value or 0)
-                except Exception as agg_error:
-                    logger.error(f"Error during quarterly aggregation for model {model.__name__}, quarter {q}: {agg_error}")
-                    # Populate with zeros on error
-                    for field in aggregate_fields.keys():
-                         aggregates[f'total_{field}'] = 0
-            else:
-                 for field in aggregate_fields.keys():
-                      aggregates[f'total_{field}'] = 0
-        
-        quarterly_results[f'Q{q}'] = aggregates
-        
-    return quarterly_results
-
-def get_annual_data(model, year, operadora=None, aggregate_fields={}):
-    """Aggregates data annually for a given model, year, and fields."""
-    queryset = model.objects.filter(ano=year)
-    if operadora:
-        queryset = queryset.filter(operadora=operadora)
-        
-    aggregates = {}
-    if aggregate_fields:
-        valid_aggregates = {}
-        for field, agg_func in aggregate_fields.items():
-            try:
-                field_obj = model._meta.get_field(field)
-                output_field_type = DecimalField() if isinstance(field_obj, (models.DecimalField, models.FloatField)) else None
-                if output_field_type:
-                     valid_aggregates[f'total_{field}'] = agg_func(field, output_field=output_field_type)
-                else:
-                     valid_aggregates[f'total_{field}'] = agg_func(field)
-            except FieldDoesNotExist:
-                logger.warning(f"Field '{field}' does not exist on model {model.__name__}. Skipping aggregation.")
-                # Provide appropriate zero value since we don't know the field type
-                valid_aggregates[f'total_{field}'] = Value(Decimal('0.0'))
-        
-        if valid_aggregates:
-            try:
-                annual_aggregates = queryset.aggregate(**valid_aggregates)
-                for key, value in annual_aggregates.items():
-                    aggregates[key] = float(value) if isinstance(value, Decimal) else (value or 0)
-            except Exception as agg_error:
-                logger.error(f"Error during annual aggregation for model {model.__name__}, year {year}: {agg_error}")
-                for field in aggregate_fields.keys():
-                    aggregates[f'total_{field}'] = 0
-        else:
-            for field in aggregate_fields.keys():
-                 aggregates[f'total_{field}'] = 0
-            
-    return aggregates
-
 # --- Base Analysis View --- 
 
-class BaseAnalysisView(TemplateView):
+class BaseAnalysisView(CachedContextMixin, TemplateView):
     """Base view for market analysis, providing common context."""
     analysis_title = "Análise de Mercado"
     indicator_model = None # Must be set by subclass
     aggregate_fields = {} # Must be set by subclass {field_name: AggregationFunction}
     template_name = 'questionarios/analise/base_analise.html' # Default template
 
+    def get_cache_models(self):
+        # Context only depends on the analysed indicator's data
+        return [self.indicator_model] if self.indicator_model else None
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context['analysis_title'] = self.analysis_title
@@ -769,21 +593,13 @@ class BaseAnalysisView(TemplateView):
         
         context['ano_selecionado'] = ano_selecionado
         
-        analysis_data = {}
-        # Get total market data (all operators)
-        analysis_data['TOTAL'] = {
-            'quarterly': get_quarterly_data(self.indicator_model, ano_selecionado, aggregate_fields=self.aggregate_fields),
-            'annual': get_annual_data(self.indicator_model, ano_selecionado, aggregate_fields=self.aggregate_fields)
-        }
-        
-        # Get data per operator
-        for op in operadoras:
-            # Ensure operadora code is lowercase if models use lowercase
-            op_code = op.lower()
-            analysis_data[op.upper()] = { # Keep UPPER for keys in context if templates expect it
-                'quarterly': get_quarterly_data(self.indicator_model, ano_selecionado, operadora=op_code, aggregate_fields=self.aggregate_fields),
-                'annual': get_annual_data(self.indicator_model, ano_selecionado, operadora=op_code, aggregate_fields=self.aggregate_fields)
-            }
+        # Total de mercado, operadoras, trimestres e ano numa única consulta agrupada
+        analysis_data = aggregate_market_data(
+            self.indicator_model,
+            ano_selecionado,
+            self.aggregate_fields,
+            operadoras=operadoras,
+        )
             
         context['analysis_data_json'] = json.dumps(analysis_data, default=decimal_default)
         context['analysis_data'] = analysis_data # Pass raw data too if needed by template
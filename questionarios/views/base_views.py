@@ -9,6 +9,8 @@ from django.contrib import messages
 from django.db.models import Q
 from abc import ABC, abstractmethod
 
+from ..services.aggregation import calculation_totals_for_year
+
 # Constantes para choices
 MONTH_CHOICES = [
     (1, 'Janeiro'),
@@ -217,27 +219,28 @@ class BaseResumoView(LoginRequiredMixin, PermissionRequiredMixin, ListView, Base
         return context
     
     def _calculate_totals(self, indicadores):
-        """Calcula totais trimestrais e anuais usando métodos do modelo."""
+        """Calcula totais trimestrais e anuais a partir dos rollups (ver CALCULATION_FIELDS)."""
         calculation_methods = self.model.get_calculation_methods()
+        por_trimestre, anual = calculation_totals_for_year(
+            self.model,
+            self.kwargs.get('ano'),
+            calculation_methods,
+            operadora=self.request.GET.get('operadora'),
+            with_annual=True,
+        )
         
         # Totais trimestrais
         totais_trimestrais = []
-        for trimestre in range(1, 5):
-            meses = range((trimestre - 1) * 3 + 1, trimestre * 3 + 1)
-            dados_trimestre = indicadores.filter(mes__in=meses)
-            
+        for trimestre, valores in por_trimestre.items():
             totals = {'trimestre': trimestre}
-            for method_name, method_label in calculation_methods.items():
-                total = sum(getattr(dado, method_name)() for dado in dados_trimestre if hasattr(dado, method_name))
-                totals[f'total_{method_name}'] = total
-            
+            for method_name in calculation_methods:
+                totals[f'total_{method_name}'] = valores[method_name]
             totais_trimestrais.append(totals)
         
-        # Totais anuais
+        # Totais anuais (existências: último mês com dados, não a soma dos trimestres)
         totals_annual = {}
-        for method_name, method_label in calculation_methods.items():
-            total = sum(getattr(dado, method_name)() for dado in indicadores if hasattr(dado, method_name))
-            totals_annual[f'total_{method_name}_anual'] = total
+        for method_name in calculation_methods:
+            totals_annual[f'total_{method_name}_anual'] = anual[method_name]
         
         return {
             'totais_trimestrais': totais_trimestrais,
@@ -0,0 +1,49 @@
+import tempfile
+
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
+
+from ..services.exportacao import EXPORT_FORMATS, ExportError, iter_csv, iter_ndjson, parse_filters, write_parquet
+from ..services.metadata import registry
+
+
+@login_required
+def raw_export_view(request, indicador):
+    """
+    Exporta os registos mensais de um indicador (CSV, NDJSON ou Parquet).
+
+    Parâmetros GET: ``formato`` (csv, ndjson ou parquet), ``ano``, ``mes`` e
+    ``operadora`` (aceitam vários valores, repetidos ou separados por vírgulas).
+    Ex.: /questionarios/exportar/receitasindicador/?formato=ndjson&ano=2023,2024
+    """
+    model = registry.model(indicador.lower())
+    if model is None:
+        return JsonResponse({'error': f"Indicador '{indicador}' desconhecido"}, status=404)
+    if not (request.user.is_staff or request.user.has_perm(f'questionarios.view_{model._meta.model_name}')):
+        return JsonResponse({'error': 'Sem permissão para exportar este indicador'}, status=403)
+
+    formato = request.GET.get('formato', 'csv').lower()
+    if formato not in EXPORT_FORMATS:
+        return JsonResponse({'error': f"Formato inválido: escolha entre {', '.join(EXPORT_FORMATS)}"}, status=400)
+    try:
+        filtros = parse_filters(request.GET)
+    except ExportError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    content_type, extensao = EXPORT_FORMATS[formato]
+    filename = f"{model._meta.model_name}.{extensao}"
+    if formato == 'parquet':
+        # O rodapé do Parquet só é escrito no fim: gerar num ficheiro temporário e enviar por blocos
+        output = tempfile.TemporaryFile(suffix='.parquet')
+        try:
+            write_parquet(model, output, **filtros)
+        except ExportError as e:
+            output.close()
+            return JsonResponse({'error': str(e)}, status=400)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=filename, content_type=content_type)
+
+    linhas = iter_csv(model, **filtros) if formato == 'csv' else iter_ndjson(model, **filtros)
+    response = StreamingHttpResponse(linhas, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -5,6 +5,7 @@ from django.views.generic import CreateView, UpdateView, DeleteView, DetailView,
 from ..models.receitas import ReceitasIndicador
 from ..forms.receitas import ReceitasForm
 from .base_views import FilteredListView
+from ..services.aggregation import calculation_totals_for_year
 
 class ReceitasCreateView(LoginRequiredMixin, PermissionRequiredMixin, CreateView):
     model = ReceitasIndicador
@@ -64,37 +65,37 @@ class ReceitasResumoView(LoginRequiredMixin, PermissionRequiredMixin, ListView):
         context = super().get_context_data(**kwargs)
         ano = self.kwargs.get('ano')
         operadora = self.request.GET.get('operadora')
-        indicadores = self.get_queryset()
+        # Cálculos trimestrais e anuais a partir dos rollups (ou da base de dados)
+        metodos = [
+            'calcular_total_receitas_retalhistas',
+            'calcular_total_receitas_voz',
+            'calcular_total_receitas_dados',
+            'calcular_total_receitas_grossistas',
+            'calcular_total_receitas_internacional',
+            'calcular_total_receitas',
+        ]
+        por_trimestre, anual = calculation_totals_for_year(
+            self.model, ano, metodos, operadora=operadora, with_annual=True,
+        )
 
-        # Cálculos trimestrais
         totais_trimestrais = []
-        for trimestre in range(1, 5):
-            meses = range((trimestre - 1) * 3 + 1, trimestre * 3 + 1)
-            dados_trimestre = indicadores.filter(mes__in=meses)
-            
-            total_receitas_retalhistas = sum(dado.calcular_total_receitas_retalhistas() for dado in dados_trimestre)
-            total_receitas_voz = sum(dado.calcular_total_receitas_voz() for dado in dados_trimestre)
-            total_receitas_dados = sum(dado.calcular_total_receitas_dados() for dado in dados_trimestre)
-            total_receitas_grossistas = sum(dado.calcular_total_receitas_grossistas() for dado in dados_trimestre)
-            total_receitas_internacional = sum(dado.calcular_total_receitas_internacional() for dado in dados_trimestre)
-            
+        for trimestre, valores in por_trimestre.items():
             totais_trimestrais.append({
                 'trimestre': trimestre,
-                'total_receitas_retalhistas': total_receitas_retalhistas,
-                'total_receitas_voz': total_receitas_voz,
-                'total_receitas_dados': total_receitas_dados,
-                'total_receitas_grossistas': total_receitas_grossistas,
-                'total_receitas_internacional': total_receitas_internacional,
-                'total_receitas': total_receitas_retalhistas + total_receitas_grossistas
+                'total_receitas_retalhistas': valores['calcular_total_receitas_retalhistas'],
+                'total_receitas_voz': valores['calcular_total_receitas_voz'],
+                'total_receitas_dados': valores['calcular_total_receitas_dados'],
+                'total_receitas_grossistas': valores['calcular_total_receitas_grossistas'],
+                'total_receitas_internacional': valores['calcular_total_receitas_internacional'],
+                'total_receitas': valores['calcular_total_receitas']
             })
 
-        # Cálculos anuais
-        total_receitas_retalhistas_anual = sum(dado.calcular_total_receitas_retalhistas() for dado in indicadores)
-        total_receitas_voz_anual = sum(dado.calcular_total_receitas_voz() for dado in indicadores)
-        total_receitas_dados_anual = sum(dado.calcular_total_receitas_dados() for dado in indicadores)
-        total_receitas_grossistas_anual = sum(dado.calcular_total_receitas_grossistas() for dado in indicadores)
-        total_receitas_internacional_anual = sum(dado.calcular_total_receitas_internacional() for dado in indicadores)
-        total_receitas_anual = total_receitas_retalhistas_anual + total_receitas_grossistas_anual
+        total_receitas_retalhistas_anual = anual['calcular_total_receitas_retalhistas']
+        total_receitas_voz_anual = anual['calcular_total_receitas_voz']
+        total_receitas_dados_anual = anual['calcular_total_receitas_dados']
+        total_receitas_grossistas_anual = anual['calcular_total_receitas_grossistas']
+        total_receitas_internacional_anual = anual['calcular_total_receitas_internacional']
+        total_receitas_anual = anual['calcular_total_receitas']
 
         context['ano'] = ano
         context['operadora_selecionada'] = operadora
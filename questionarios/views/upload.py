@@ -1,8 +1,11 @@
-from django.shortcuts import render, redirect
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib import messages
+from django.http import JsonResponse
+from django.urls import reverse
 from ..forms import ExcelUploadForm
-from ..excel_parser import process_excel_file # Import the processing function
+from ..models.importacao import ImportacaoExcel
+from ..services.import_jobs import enqueue_import, job_status
 
 @login_required
 @permission_required('questionarios.add_trafegointernetindicador', raise_exception=True) # Example permission
@@ -10,25 +13,32 @@ def upload_excel_view(request):
     if request.method == 'POST':
         form = ExcelUploadForm(request.POST, request.FILES)
         if form.is_valid():
-            excel_file = request.FILES['excel_file']
-            user = request.user
-            
-            # Placeholder: Determine operadora if not provided in form/file
-            # operadora_code = request.POST.get('operadora') or 'some_default' 
-            operadora_code = None # Let parser try to figure it out (or define default)
-
-            results = process_excel_file(excel_file, user, operadora_code)
-            
-            if results['errors'] == 0:
-                messages.success(request, f"{results['processed']} registros processados com sucesso!")
-            else:
-                messages.warning(request, f"{results['processed']} registros processados, mas ocorreram {results['errors']} erros.")
-                # Optionally display detailed errors stored in results['error_details']
-                for error_detail in results['error_details']:
-                    messages.error(request, error_detail, extra_tags='small') # Show details as smaller errors
-            
-            return redirect('questionarios:upload_excel') # Redirect back to upload page
+            # O ficheiro é processado pelo worker (run_import_worker), fora do pedido
+            job = enqueue_import(
+                request.FILES['excel_file'],
+                request.user,
+                operadora=form.cleaned_data.get('operadora'),
+                ano=form.cleaned_data.get('ano'),
+                simulacao=form.cleaned_data.get('dry_run', False),
+            )
+            messages.info(request, f"Ficheiro '{job.nome_ficheiro}' recebido. A importação está a ser processada.")
+            return redirect(f"{reverse('questionarios:upload_excel')}?job={job.pk}")
     else:
         form = ExcelUploadForm()
-        
-    return render(request, 'questionarios/upload_excel.html', {'form': form}) 
\ No newline at end of file
+
+    job = None
+    job_id = request.GET.get('job')
+    if job_id and job_id.isdigit():
+        job = ImportacaoExcel.objects.filter(pk=job_id, criado_por=request.user).first()
+    recentes = ImportacaoExcel.objects.filter(criado_por=request.user)[:5]
+
+    return render(request, 'questionarios/upload_excel.html', {'form': form, 'job': job, 'recentes': recentes})
+
+
+@login_required
+def import_status_view(request, pk):
+    """Estado de uma importação em JSON, consultado periodicamente pela página de upload."""
+    job = get_object_or_404(ImportacaoExcel, pk=pk)
+    if job.criado_por_id != request.user.pk and not request.user.is_staff:
+        return JsonResponse({'error': 'Importação não encontrada'}, status=404)
+    return JsonResponse(job_status(job))
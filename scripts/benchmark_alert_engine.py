@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+"""
+Benchmark da avaliação incremental de alertas
+Observatório ARN - Alertas de Relatórios
+
+Cria numa transação (anulada no fim, nada fica gravado) 24 meses de dados de
+três operadoras e N alertas de todos os tipos sobre os campos de
+AssinantesIndicador (e 20% sobre outro indicador, que não devem ser
+avaliados), e mede:
+
+- a compilação do índice de alertas (uma vez por alteração de alertas);
+- a avaliação após a alteração de um mês (gravação de um registo);
+- a avaliação após uma importação de 12 meses;
+- a avaliação completa (todos os alertas, todos os períodos).
+
+Uso:
+    python scripts/benchmark_alert_engine.py
+    python scripts/benchmark_alert_engine.py --alerts 1000 5000 10000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'observatorio.settings')
+
+OPERADORAS = ('orange', 'telecel', 'mtn')
+ANO = 2024
+
+
+def setup_django():
+    import django
+    django.setup()
+
+
+class Rollback(Exception):
+    pass
+
+
+def build_data(rng):
+    """
+    24 meses (ANO-1 e ANO) de assinantes para três operadoras: séries com
+    crescimento e ruído pequenos e choques ocasionais (2% dos meses).
+
+    Returns:
+        (campos, bases): campos numéricos e valor base por (operadora, campo).
+    """
+    from questionarios.models import AssinantesIndicador
+    from questionarios.services.factos import fact_fields, rebuild_facts
+    from questionarios.services.importacao import bulk_upsert
+
+    campos = fact_fields(AssinantesIndicador)
+    bases = {(operadora, campo): rng.randint(10000, 100000) for operadora in OPERADORAS for campo in campos}
+    registos = []
+    for operadora in OPERADORAS:
+        for indice, (ano, mes) in enumerate((ano, mes) for ano in (ANO - 1, ANO) for mes in range(1, 13)):
+            registo = {'operadora': operadora, 'ano': ano, 'mes': mes}
+            for campo in campos:
+                fator = 1 + 0.01 * indice + rng.gauss(0, 0.02)
+                if rng.random() < 0.02:
+                    fator *= 1.5
+                registo[campo] = int(bases[(operadora, campo)] * fator)
+            registos.append(registo)
+    # notify=False: os factos são gerados abaixo, sem avaliar alertas durante a preparação
+    bulk_upsert(AssinantesIndicador, registos, notify=False)
+    rebuild_facts([AssinantesIndicador])
+    return campos, bases
+
+
+def build_alerts(n, campos, bases, rng):
+    """``n`` alertas (80% sobre AssinantesIndicador), com limites perto dos valores reais."""
+    from dashboard.models import ReportAlert
+
+    def mercado(campo):
+        return sum(bases[(operadora, campo)] for operadora in OPERADORAS)
+
+    def condicao(tipo, campo):
+        operadora = rng.choice(OPERADORAS)
+        if tipo == 'threshold':
+            return {'operador': '>', 'valor': int(mercado(campo) * rng.uniform(1.1, 1.5))}
+        if tipo == 'target':
+            return {'operadora': operadora, 'valor': int(bases[(operadora, campo)] * rng.uniform(1.2, 1.6))}
+        if tipo == 'variation':
+            return {'percentual': rng.randint(10, 30), 'periodo': rng.choice(['mes', 'ano']), 'direcao': 'ambas'}
+        if tipo == 'share':
+            quota = bases[(operadora, campo)] / mercado(campo) * 100
+            return {'operadora': operadora, 'operador': '<', 'valor': round(quota * rng.uniform(0.7, 0.9), 1)}
+        return {'desvios': 3, 'meses': 12, 'operadora': operadora}
+
+    tipos = ('threshold', 'target', 'variation', 'share', 'anomaly')
+    alertas = []
+    for i in range(n):
+        tipo = tipos[i % len(tipos)]
+        if i % 5 == 4:
+            indicador, cond = 'empregoindicador.emprego_direto_total', {'valor': 1}
+            tipo = 'threshold'
+        else:
+            campo = rng.choice(campos)
+            indicador, cond = f'assinantesindicador.{campo}', condicao(tipo, campo)
+        alertas.append(ReportAlert(nome=f'Alerta {i}', tipo=tipo, indicador=indicador, condicao=cond))
+    ReportAlert.objects.bulk_create(alertas, batch_size=1000)
+
+
+def timed(func, *args):
+    inicio = time.perf_counter()
+    resultado = func(*args)
+    return resultado, time.perf_counter() - inicio
+
+
+def run(n, seed):
+    from django.db import transaction
+
+    from dashboard.models import ReportAlert, ReportAlertHistory
+    from dashboard.services.alert_engine import alert_index, evaluate_all, evaluate_changes
+
+    rng = random.Random(seed)
+    resultados = {}
+    try:
+        with transaction.atomic():
+            campos, bases = build_data(rng)
+            build_alerts(n, campos, bases, rng)
+
+            alert_index.invalidate()
+            indice, resultados['compilar'] = timed(alert_index.get)
+            resultados['compilados'] = sum(len(a) for a in indice.values())
+
+            disparados, resultados['1 mês'] = timed(evaluate_changes, {'assinantesindicador': {(ANO, 6)}})
+            resultados['disparados 1 mês'] = len(disparados)
+            _, resultados['12 meses'] = timed(
+                evaluate_changes, {'assinantesindicador': {(ANO, mes) for mes in range(1, 13)}},
+            )
+            ReportAlertHistory.objects.all().delete()
+            disparados, resultados['completa'] = timed(evaluate_all)
+            resultados['disparados'] = len(disparados)
+            resultados['alertas'] = ReportAlert.objects.count()
+            raise Rollback
+    except Rollback:
+        pass
+    alert_index.invalidate()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da avaliação incremental de alertas.')
+    parser.add_argument('--alerts', type=int, nargs='+', default=[1000, 5000], help='Número de alertas.')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+
+    print(f"{'alertas':>8} {'compilados':>10} {'compilar s':>11} {'1 mês s':>8} {'disparos':>9} "
+          f"{'12 meses s':>11} {'completa s':>11} {'disparos':>9}")
+    for n in args.alerts:
+        r = run(n, args.seed)
+        print(
+            f"{r['alertas']:>8} {r['compilados']:>10} {r['compilar']:>11.3f} {r['1 mês']:>8.3f} "
+            f"{r['disparados 1 mês']:>9} {r['12 meses']:>11.3f} {r['completa']:>11.3f} {r['disparados']:>9}"
+        )
+
+
+if __name__ == '__main__':
+    main()
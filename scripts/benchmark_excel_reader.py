@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+"""
+Benchmark da leitura de livros KPI ARN
+Observatório ARN - Importação Excel
+
+Gera livros sintéticos com 50 folhas (algumas mapeadas em SHEET_MAPPINGS e as
+restantes irrelevantes, com muitas linhas e colunas) e compara, para cada
+tamanho, a leitura com pandas (folhas completas) e o leitor em streaming
+(questionarios.excel_reader). Cada medição corre num processo próprio e
+reporta o pico de memória (RSS) e o débito (linhas lidas/s e MB/s).
+Não escreve na base de dados: mede apenas a leitura e a extração dos registos.
+
+Uso:
+    python scripts/benchmark_excel_reader.py
+    python scripts/benchmark_excel_reader.py --rows 200 2000 --sheets 50
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'observatorio.settings')
+
+
+def setup_django():
+    import django
+    django.setup()
+
+
+def build_workbook(path, sheets, rows, extra_columns):
+    """Livro sintético: as primeiras folhas seguem SHEET_MAPPINGS, as restantes são ruído."""
+    from openpyxl import Workbook
+
+    from questionarios.excel_mappings import MONTH_MAPPING, SHEET_MAPPINGS
+    from questionarios.excel_parser import resolve_field_mapping
+
+    # Workbook normal (não write_only): grava a <dimension> de cada folha, como o Excel,
+    # sem a qual o openpyxl read_only percorre a folha inteira ao abrir o livro
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    meses = list(MONTH_MAPPING)
+    extras = [f'Coluna {i}' for i in range(extra_columns)]
+    mapeadas = list(SHEET_MAPPINGS)[:min(len(SHEET_MAPPINGS), sheets)]
+
+    for index in range(sheets):
+        if index < len(mapeadas):
+            key = mapeadas[index]
+            nome = SHEET_MAPPINGS[key]['sheet_names'][0]
+            codigos = [c for c in resolve_field_mapping(key) if isinstance(c, (int, float))] or list(resolve_field_mapping(key))
+        else:
+            nome, codigos = f'Anexo {index}', []
+        worksheet = workbook.create_sheet(nome[:31])
+        for _ in range(3):
+            worksheet.append([])
+        worksheet.append(['Cod.', 'INDICADOR', *meses, *extras])
+        for linha in range(rows):
+            codigo = codigos[linha] if linha < len(codigos) else None
+            rotulo = codigo if isinstance(codigo, str) else f'Indicador {linha}'
+            worksheet.append([
+                codigo if not isinstance(codigo, str) else None, rotulo,
+                *[f'{linha * 10 + m},5' for m in range(12)],
+                *[linha] * extra_columns,
+            ])
+    workbook.save(path)
+    return os.path.getsize(path), len(mapeadas)
+
+
+def read_with_pandas(path):
+    import pandas as pd
+
+    from questionarios.excel_mappings import SHEET_MAPPINGS
+    from questionarios.excel_parser import extract_sheet_records, find_sheet
+
+    registos = linhas = 0
+    with pd.ExcelFile(path) as workbook:
+        for key, mapping in SHEET_MAPPINGS.items():
+            sheet_name = find_sheet(workbook.sheet_names, mapping)
+            if sheet_name is None:
+                continue
+            df = workbook.parse(sheet_name, header=mapping['header_row'])
+            linhas += len(df)
+            registos += len(extract_sheet_records(df, key, 2024, 'orange')[0])
+    return registos, linhas
+
+
+def read_streaming(path):
+    from questionarios.excel_mappings import SHEET_MAPPINGS
+    from questionarios.excel_parser import extract_sheet_records, find_sheet, read_mapped_sheet
+    from questionarios.excel_reader import open_workbook
+
+    registos = linhas = 0
+    with open_workbook(path) as workbook:
+        for key, mapping in SHEET_MAPPINGS.items():
+            sheet_name = find_sheet(workbook.sheet_names, mapping)
+            if sheet_name is None:
+                continue
+            df = read_mapped_sheet(workbook, sheet_name, key)
+            linhas += len(df)
+            registos += len(extract_sheet_records(df, key, 2024, 'orange')[0])
+    return registos, linhas
+
+
+READERS = {'pandas': read_with_pandas, 'streaming': read_streaming}
+
+
+def peak_rss_mb():
+    """Pico de RSS do processo em MB (VmHWM no Linux; ru_maxrss nos restantes sistemas)."""
+    try:
+        with open('/proc/self/status') as status:
+            for linha in status:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss está em KB no Linux e em bytes no macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 / 1024 if sys.platform == 'darwin' else maxrss / 1024
+
+
+def _measure(reader, path, queue):
+    import logging
+    logging.disable(logging.WARNING)
+    setup_django()
+    # Importar as bibliotecas antes da medição: o aumento de RSS mede apenas os dados lidos
+    import openpyxl  # noqa: F401
+    import pandas  # noqa: F401
+    from questionarios import excel_parser, excel_reader  # noqa: F401
+    base = peak_rss_mb()
+    inicio = time.perf_counter()
+    registos, linhas = READERS[reader](path)
+    duracao = time.perf_counter() - inicio
+    queue.put({'registos': registos, 'linhas': linhas, 'segundos': duracao, 'pico': peak_rss_mb(), 'base': base})
+
+
+def measure(reader, path):
+    """Executa ``reader`` num processo novo (spawn) para isolar o pico de RSS.
+
+    ``linhas`` é o número de linhas guardadas em DataFrames pelo leitor.
+    """
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    processo = context.Process(target=_measure, args=(reader, path, queue))
+    processo.start()
+    resultado = queue.get()
+    processo.join()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da leitura de livros Excel (pandas vs streaming).')
+    parser.add_argument('--sheets', type=int, default=50, help='Folhas por livro (padrão: 50).')
+    parser.add_argument('--rows', type=int, nargs='+', default=[200, 1000, 3000], help='Linhas por folha.')
+    parser.add_argument('--extra-columns', type=int, default=20, help='Colunas irrelevantes por folha.')
+    parser.add_argument('--readers', nargs='+', choices=sorted(READERS), default=sorted(READERS))
+    args = parser.parse_args()
+
+    setup_django()
+
+    print(f"{'linhas/folha':>12} {'MB':>7} {'leitor':>10} {'pico RSS MB':>12} {'+RSS MB':>8} "
+          f"{'segundos':>9} {'linhas/s':>10} {'MB/s':>7} {'em memória':>10} {'registos':>9}")
+    with tempfile.TemporaryDirectory(prefix='benchmark_excel_') as pasta:
+        for rows in args.rows:
+            path = os.path.join(pasta, f'kpi_{args.sheets}x{rows}.xlsx')
+            tamanho, mapeadas = build_workbook(path, args.sheets, rows, args.extra_columns)
+            tamanho /= 1024 * 1024
+            # Linhas das folhas mapeadas que cada leitor tem de percorrer
+            linhas_lidas = mapeadas * rows
+            for reader in args.readers:
+                r = measure(reader, path)
+                print(
+                    f"{rows:>12} {tamanho:>7.1f} {reader:>10} {r['pico']:>12.1f} "
+                    f"{r['pico'] - r['base']:>8.1f} {r['segundos']:>9.2f} "
+                    f"{linhas_lidas / r['segundos']:>10.0f} {tamanho / r['segundos']:>7.2f} "
+                    f"{r['linhas']:>10} {r['registos']:>9}"
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Benchmark do classificador de intenções do Assistente ARN
+Observatório ARN - Chatbot
+
+Compara, sobre um corpus de perguntas em português, a implementação
+anterior (um ``re.findall`` por padrão de cada intenção e procura linear
+dos aliases das operadoras) com o autómato compilado de
+dashboard.services.intent_engine, incluindo as intenções ChatIntent de
+``populate_chat_intents`` (criadas numa transação anulada no fim).
+
+Mede o tempo por mensagem da classificação e da extração de entidades, o
+tempo de compilação e a concordância com a implementação anterior (só
+com os padrões incorporados, que devem dar as mesmas pontuações).
+
+Uso:
+    python scripts/benchmark_intent_engine.py
+    python scripts/benchmark_intent_engine.py --repeat 2000
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from io import StringIO
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'observatorio.settings')
+
+CORPUS = [
+    'Olá, bom dia!',
+    'Quantos assinantes tem a Orange?',
+    'Quantos assinantes tem a TELECEL em 2023?',
+    'Qual o número de assinantes móveis no último ano?',
+    'Mostre o total de clientes da Orange Bissau em 2022',
+    'Quantos utilizadores de internet móvel existem este ano?',
+    'Assinantes activos pós-pago no 3º trimestre de 2024',
+    'Qual a quota de mercado da Orange?',
+    'Qual é a maior operadora do país?',
+    'Quem é o líder do mercado em 2023?',
+    'Qual a participação no mercado da antiga telecel?',
+    'Mostre o market share por operadora',
+    'Qual o volume de tráfego de voz on-net da TELECEL?',
+    'Quantos minutos de chamadas internacionais em 2021?',
+    'Volume de chamadas off-net no 2º trimestre',
+    'Como está o tráfego de dados móveis?',
+    'Qual a receita total de 2023?',
+    'Qual o volume de negócios da Orange em FCFA?',
+    'Os lucros da TELECEL cresceram no ano passado?',
+    'Quanto foi o faturamento no 4º trimestre de 2022?',
+    'Quanto a Orange investiu em infraestrutura em 2024?',
+    'Mostre o CAPEX das operadoras',
+    'Qual a aplicação de capital em 2020?',
+    'Compare TELECEL e Orange em receitas',
+    'TELECEL vs Orange: qual é melhor?',
+    'Qual a diferença de assinantes entre Orange e TELECEL?',
+    'Como evoluiu o número de assinantes desde 2019?',
+    'Qual a tendência das receitas nos últimos anos?',
+    'O mercado está crescendo ou houve queda em 2023?',
+    'Mostre a variação do tráfego internacional',
+    'Quantas transações financeiras de mobile money em 2024?',
+    'Qual o volume de carregamento e levantamento de dinheiro móvel?',
+    'Quantas pessoas trabalham no setor?',
+    'Qual a taxa de penetração da banda larga?',
+    'Obrigado, até logo',
+    'Preciso de ajuda',
+]
+
+
+def setup_django():
+    import django
+    django.setup()
+
+
+class Rollback(Exception):
+    pass
+
+
+def legacy_detect(patterns, mensagem):
+    """Implementação anterior de ARNAssistantService.detectar_intencao."""
+    mensagem_lower = mensagem.lower()
+    scores = {}
+    for intencao, lista in patterns.items():
+        score = 0
+        for pattern in lista:
+            score += len(re.findall(pattern, mensagem_lower))
+        if score > 0:
+            scores[intencao] = score
+    if not scores:
+        return 'nao_entendido', 0.0
+    melhor = max(scores, key=scores.get)
+    return melhor, min(scores[melhor] / 3.0, 1.0)
+
+
+def legacy_entities(operadores, mensagem, ano_atual):
+    """Implementação anterior de ARNAssistantService.extrair_entidades."""
+    entidades = {}
+    mensagem_lower = mensagem.lower()
+    for operadora, aliases in operadores.items():
+        for alias in aliases:
+            if alias in mensagem_lower:
+                entidades['operadora'] = operadora
+                break
+    ano_match = re.search(r'\b(20\d{2})\b', mensagem)
+    if ano_match:
+        entidades['ano'] = int(ano_match.group(1))
+    elif 'último ano' in mensagem_lower or 'ano passado' in mensagem_lower:
+        entidades['ano'] = ano_atual - 1
+    elif 'este ano' in mensagem_lower:
+        entidades['ano'] = ano_atual
+    trimestre_match = re.search(r'\b([1-4])º?\s*trimestre\b', mensagem_lower)
+    if trimestre_match:
+        entidades['trimestre'] = int(trimestre_match.group(1))
+    return entidades
+
+
+def per_message(func, mensagens, repeat):
+    """Microssegundos por mensagem."""
+    inicio = time.perf_counter()
+    for _ in range(repeat):
+        for mensagem in mensagens:
+            func(mensagem)
+    return (time.perf_counter() - inicio) / (repeat * len(mensagens)) * 1e6
+
+
+def run(repeat):
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from dashboard.services.intent_engine import ENTITIES, INTENT_PATTERNS, build_matcher, intent_engine
+
+    operadores = ENTITIES['operadores']
+    resultados = {}
+    try:
+        with transaction.atomic():
+            call_command('populate_chat_intents', stdout=StringIO())
+            intent_engine.invalidate()
+            inicio = time.perf_counter()
+            matcher = intent_engine.matcher()
+            resultados['compilar'] = time.perf_counter() - inicio
+            resultados['intencoes'] = len(matcher.intents)
+
+            incorporados = build_matcher(INTENT_PATTERNS)
+            resultados['concordancia'] = sum(
+                incorporados.classify(m) == legacy_detect(INTENT_PATTERNS, m) for m in CORPUS
+            )
+            resultados['entendidas antes'] = sum(
+                legacy_detect(INTENT_PATTERNS, m)[0] != 'nao_entendido' for m in CORPUS
+            )
+            resultados['entendidas'] = sum(matcher.classify(m)[0] != 'nao_entendido' for m in CORPUS)
+
+            resultados['intencao antes'] = per_message(lambda m: legacy_detect(INTENT_PATTERNS, m), CORPUS, repeat)
+            resultados['intencao'] = per_message(intent_engine.classify, CORPUS, repeat)
+            resultados['entidades antes'] = per_message(
+                lambda m: legacy_entities(operadores, m, 2025), CORPUS, repeat,
+            )
+            resultados['entidades'] = per_message(lambda m: intent_engine.extract_entities(m, 2025), CORPUS, repeat)
+            raise Rollback
+    except Rollback:
+        pass
+    intent_engine.invalidate()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do classificador de intenções do assistente.')
+    parser.add_argument('--repeat', type=int, default=500, help='Repetições do corpus.')
+    args = parser.parse_args()
+
+    setup_django()
+    r = run(args.repeat)
+
+    total = len(CORPUS)
+    print(f"Corpus: {total} perguntas x {args.repeat}")
+    print(f"Compilação ({r['intencoes']} intenções, padrões + ChatIntent): {r['compilar'] * 1000:.2f} ms")
+    print(f"{'':<24} {'anterior µs':>12} {'compilado µs':>13} {'ganho':>7}")
+    for nome, chave in (('classificação', 'intencao'), ('extração de entidades', 'entidades')):
+        antes, depois = r[f'{chave} antes'], r[chave]
+        print(f"{nome:<24} {antes:>12.1f} {depois:>13.1f} {antes / depois:>6.1f}x")
+    print(f"Mesma intenção e confiança (só padrões incorporados): {r['concordancia']}/{total}")
+    print(f"Perguntas entendidas: {r['entendidas antes']}/{total} antes, {r['entendidas']}/{total} com ChatIntent")
+
+
+if __name__ == '__main__':
+    main()